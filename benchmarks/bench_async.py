@@ -0,0 +1,148 @@
+"""
+Throughput of the Flask (WSGI) and ASGI entry points at high concurrency.
+
+Both serve POST /api/positions and GET /api/polls/<id>/detail against the
+in-memory backend (sim.backend), with every query taking --latency seconds
+to stand in for a PostgREST round trip. The Flask app runs on a pool of
+--threads worker threads, like a threaded WSGI server; the ASGI app runs
+on one event loop with --concurrency requests in flight.
+
+Usage (from the repository root):
+    python benchmarks/bench_async.py --requests 400 --concurrency 100 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+# Nothing here talks to Supabase; the client modules only need a URL
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_SECRET_KEY", "benchmark")
+
+from api import amm, asgi, database, index  # noqa: E402
+from sim.backend import InMemorySupabase, AsyncInMemorySupabase  # noqa: E402
+
+
+def _backend(users, polls, trades_per_user, seed):
+    rng = random.Random(seed)
+    backend = InMemorySupabase()
+    user_ids = [backend.add_profile(balance=100_000) for _ in range(users)]
+    poll_ids = [backend.add_poll(title=f"Poll {n}") for n in range(polls)]
+    trades = []
+    for user_id in user_ids:
+        for poll_id in rng.sample(poll_ids, trades_per_user):
+            trades.append({"poll_id": poll_id, "user_id": user_id, "outcome": rng.random() < 0.5,
+                           "num_shares": rng.randint(1, 20), "share_price": rng.randint(50, 1500)})
+    backend.seed_table("trades", trades)
+    return backend, user_ids, poll_ids
+
+
+def _workload(user_ids, poll_ids, n, seed):
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(n):
+        user_id = rng.choice(user_ids)
+        if rng.random() < 0.5:
+            requests.append(("POST", "/api/positions", "", {"user_id": user_id}))
+        else:
+            requests.append(("GET", f"/api/polls/{rng.choice(poll_ids)}/detail", f"user_id={user_id}", None))
+    return requests
+
+
+def run_wsgi(requests, threads):
+    def call(request):
+        method, path, query, body = request
+        start = time.perf_counter()
+        response = index.app.test_client().open(path, method=method, query_string=query, json=body)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(call, requests))
+    return time.perf_counter() - start, latencies
+
+
+async def _asgi_call(request):
+    method, path, query, body = request
+    payload = json.dumps(body).encode() if body is not None else b""
+    scope = {"type": "http", "method": method, "path": path, "query_string": query.encode(),
+             "headers": [(b"content-type", b"application/json")]}
+    statuses = []
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    start = time.perf_counter()
+    await asgi.app(scope, receive, send)
+    assert statuses == [200], statuses
+    return time.perf_counter() - start
+
+
+async def _run_asgi(requests, concurrency):
+    limit = asyncio.Semaphore(concurrency)
+
+    async def call(request):
+        async with limit:
+            return await _asgi_call(request)
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(call(request) for request in requests))
+    return time.perf_counter() - start, latencies
+
+
+def run_asgi(requests, concurrency):
+    return asyncio.run(_run_asgi(requests, concurrency))
+
+
+def _report(name, elapsed, latencies, calls):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<6} {len(latencies) / elapsed:9.1f} req/s  p50 {statistics.median(latencies) * 1000:7.1f}ms"
+          f"  p99 {p99 * 1000:7.1f}ms  {calls / len(latencies):5.1f} queries/request")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=100, help="requests in flight on the ASGI app")
+    parser.add_argument("--threads", type=int, default=16, help="worker threads for the Flask app")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per query")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--polls", type=int, default=50)
+    parser.add_argument("--trades-per-user", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    backend, user_ids, poll_ids = _backend(args.users, args.polls, args.trades_per_user, args.seed)
+    database.override_supabase(backend)
+    database.override_async_supabase(AsyncInMemorySupabase(backend))
+    amm.supabase = backend
+    # Benchmark the handlers, not token verification
+    index.verify_token = asgi.verify_token = lambda token: (token, None)
+
+    requests = _workload(user_ids, poll_ids, args.requests, args.seed)
+    # Warm the stats projection and imports outside the timings
+    run_wsgi(requests[:2], 1)
+    run_asgi(requests[:2], 1)
+
+    backend.latency = args.latency
+    print(f"{args.requests} requests, {args.latency * 1000:.0f}ms per query")
+    for name, run, width in (("wsgi", run_wsgi, args.threads), ("asgi", run_asgi, args.concurrency)):
+        calls = backend.calls
+        elapsed, latencies = run(requests, width)
+        _report(name, elapsed, latencies, backend.calls - calls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Cold-start cost of the serverless entry point (src/api/index.py).
+
+Each measurement runs in a fresh interpreter, like a new serverless
+instance: importing api.index, then serving one first request, plus the
+import time of every api module on its own (cumulative, including whatever
+it pulls in that isn't already loaded by the interpreter itself). Times
+are medians over --runs.
+
+Usage (from the repository root):
+    python benchmarks/bench_cold_start.py --runs 5
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src"))
+ENV = {
+    **os.environ,
+    # Nothing here talks to Supabase; the client only needs a URL to build
+    "SUPABASE_URL": os.environ.get("SUPABASE_URL", "http://localhost"),
+    "SUPABASE_SECRET_KEY": os.environ.get("SUPABASE_SECRET_KEY", "benchmark"),
+    "PYTHONPATH": SRC,
+}
+
+# A request that needs no database: what a cold start costs before any
+# handler-specific work
+FIRST_REQUEST = """
+import time
+start = time.perf_counter()
+from api.index import app
+imported = time.perf_counter()
+app.test_client().post("/api/auth/logout")
+served = time.perf_counter()
+print(imported - start, served - imported)
+"""
+
+_IMPORTTIME = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)")
+
+
+def _python(*args):
+    result = subprocess.run([sys.executable, *args], cwd=SRC, env=ENV,
+                            capture_output=True, text=True, check=True)
+    return result
+
+
+def module_import_ms(module):
+    """Cumulative import time of `module` in a fresh interpreter."""
+    stderr = _python("-X", "importtime", "-c", f"import {module}").stderr
+    for line in stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match and match.group(2) == module:
+            return int(match.group(1)) / 1000
+    return 0.0
+
+
+def api_modules():
+    return sorted(f"api.{name[:-3]}" for name in os.listdir(os.path.join(SRC, "api"))
+                  if name.endswith(".py") and name != "__init__.py")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    imports, requests = [], []
+    for _ in range(args.runs):
+        imported, served = map(float, _python("-c", FIRST_REQUEST).stdout.split())
+        imports.append(imported)
+        requests.append(served)
+    print(f"import api.index   {statistics.median(imports) * 1000:8.1f}ms")
+    print(f"first request      {statistics.median(requests) * 1000:8.1f}ms")
+    print()
+
+    print(f"{'module':<20} {'import':>9}")
+    for module in api_modules():
+        ms = statistics.median(module_import_ms(module) for _ in range(args.runs))
+        print(f"{module:<20} {ms:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
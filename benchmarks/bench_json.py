@@ -0,0 +1,110 @@
+"""
+Serialization time and payload size of the API's largest responses.
+
+Builds synthetic bodies shaped like list_polls (a full page of polls with
+creator and tags), get_all_tags and get_positions, then reports for each:
+encoding time with the standard library and with api.serialization.dumps
+(orjson when installed), the body size, the size after gzip (and brotli
+when installed), and the same for a sparse fieldset.
+
+Usage (from the repository root):
+    python benchmarks/bench_json.py --repeat 200
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+
+from api import serialization  # noqa: E402
+from api.serialization import dumps, pick  # noqa: E402
+
+WORDS = ("exam curve snow campus final midterm hockey election weather cafeteria "
+         "library deadline professor grade average lecture varsity parking").split()
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n))
+
+
+def _payloads(seed):
+    rng = random.Random(seed)
+    polls = [{
+        "id": poll_id,
+        "title": _sentence(rng, 8),
+        "description": _sentence(rng, 40),
+        "created_at": "2025-11-18T10:00:00.123456+00:00",
+        "ends_at": "2025-12-18T10:00:00+00:00",
+        "public": True,
+        "creator": rng.randint(1, 5000),
+        "outcome": None,
+        "deleted": False,
+        "liquidity_b0": None,
+        "profiles": {"username": f"user{rng.randint(1, 5000)}"},
+        "poll_tags": [{"tag_id": rng.randint(1, 300)} for _ in range(3)],
+        "has_ended": False,
+        "tags": [rng.choice(WORDS) for _ in range(3)],
+    } for poll_id in range(1, 101)]
+    tags = [{"id": tag_id, "name": f"{rng.choice(WORDS)}{tag_id}", "polls": rng.randint(0, 400)}
+            for tag_id in range(1, 3001)]
+    positions = [{
+        "poll_id": rng.randint(1, 10_000),
+        "poll_title": _sentence(rng, 8),
+        "side": rng.choice(("Yes", "No")),
+        "quantity": rng.randint(1, 500),
+        "avg_price": round(rng.random(), 2),
+        "current_price": rng.randint(1, 99),
+        "current_pnl": round(rng.uniform(-50, 50), 2),
+        "pct_change": rng.uniform(-1, 1),
+        "value": round(rng.uniform(0, 100), 2),
+        "open": True,
+    } for _ in range(100)]
+    return [
+        ("list_polls (100)", {"polls": polls}, {"polls": pick(polls, ["id", "title", "ends_at", "has_ended"])}),
+        ("all tags (3000)", {"tags": tags}, {"tags": pick(tags, ["name"])}),
+        ("positions (100)", {"positions": positions}, None),
+    ]
+
+
+def _time(encode, payload, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encode(payload)
+    return (time.perf_counter() - start) / repeat
+
+
+def _sizes(body):
+    sizes = [len(body), len(gzip.compress(body, compresslevel=serialization.GZIP_LEVEL))]
+    if serialization.brotli is not None:
+        sizes.append(len(serialization.brotli.compress(body, quality=serialization.BROTLI_QUALITY)))
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    encoder = "orjson" if serialization.orjson is not None else "json (orjson not installed)"
+    columns = "raw / gzip" + (" / brotli" if serialization.brotli is not None else "")
+    print(f"fast encoder: {encoder}")
+    print(f"{'payload':<20} {'json':>9} {'fast':>9}  size ({columns})")
+
+    for name, payload, sparse in _payloads(args.seed):
+        stdlib = _time(lambda obj: json.dumps(obj).encode(), payload, args.repeat)
+        fast = _time(dumps, payload, args.repeat)
+        sizes = " / ".join(f"{size:,}" for size in _sizes(dumps(payload)))
+        print(f"{name:<20} {stdlib * 1000:7.3f}ms {fast * 1000:7.3f}ms  {sizes}")
+        if sparse is not None:
+            fast = _time(dumps, sparse, args.repeat)
+            sizes = " / ".join(f"{size:,}" for size in _sizes(dumps(sparse)))
+            print(f"{'  with fields=':<20} {'':>9} {fast * 1000:7.3f}ms  {sizes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Throughput of the LMSR pricing functions in api.amm.
+
+Compares pricing markets one at a time with market_price() against the
+batch path (batch_probabilities / batch_market_prices), which is
+vectorized when numpy is installed.
+
+Usage (from the repository root):
+    python benchmarks/bench_lmsr.py --markets 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+# api.amm builds a Supabase client at import; nothing here talks to it
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from api import amm  # noqa: E402
+
+
+def _markets(n, seed):
+    rng = random.Random(seed)
+    q_yes = [rng.random() * 10 ** rng.randint(0, 9) for _ in range(n)]
+    q_no = [rng.random() * 10 ** rng.randint(0, 9) for _ in range(n)]
+    return q_yes, q_no
+
+
+def _rate(label, n, fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {n / elapsed:>14,.0f} evaluations/s  ({elapsed:.3f}s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--markets", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    q_yes, q_no = _markets(args.markets, args.seed)
+    n = args.markets
+    print(f"numpy: {'yes' if amm.np is not None else 'no (pure Python fallback)'}")
+
+    _rate("market_price (one at a time)", n, lambda: [amm.market_price(y, q) for y, q in zip(q_yes, q_no)])
+    _rate("batch_probabilities", n, lambda: amm.batch_probabilities(q_yes, q_no))
+    _rate("batch_market_prices", n, lambda: amm.batch_market_prices(q_yes, q_no))
+
+    if amm.np is not None:
+        arrays = amm.np.asarray(q_yes), amm.np.asarray(q_no)
+        _rate("batch_probabilities (ndarray in)", n, lambda: amm.batch_probabilities(*arrays))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Latency of poll search (api.search.SearchIndex) over a synthetic corpus.
+
+Builds an index of --polls generated polls, then times a mix of one-word,
+multi-word and prefix queries (the last word of each query is a prefix),
+asking for the first page of 20 results. "first" includes computing the
+per-term scores that later queries reuse until the index changes.
+
+Usage (from the repository root):
+    python benchmarks/bench_search.py --polls 100000
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "src")))
+# api.database builds a Supabase client at import; nothing here talks to it
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from api.search import SearchIndex  # noqa: E402
+
+VOCABULARY = 20_000
+
+
+def _word(rank):
+    # Word frequencies in titles and descriptions roughly follow Zipf's law
+    return f"w{rank}"
+
+
+def _polls(n, seed):
+    rng = random.Random(seed)
+    ranks = range(1, VOCABULARY + 1)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in ranks))
+    for poll_id in range(1, n + 1):
+        yield {
+            "id": poll_id,
+            "title": " ".join(_word(r) for r in rng.choices(ranks, cum_weights=cum_weights, k=rng.randint(3, 8))),
+            "description": " ".join(_word(r) for r in rng.choices(ranks, cum_weights=cum_weights, k=rng.randint(10, 40))),
+            "public": True,
+            "poll_tags": [{"tags": {"id": t, "name": f"tag{t}"}} for t in rng.sample(range(50), 2)],
+        }
+
+
+def _queries():
+    # A very common word, common pairs, rarer words and prefixes
+    return ["w1", "w2 w3", "w10 w25", "w150", "w1200 w40", "w73", "w12", "tag7"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--polls", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    for row in _polls(args.polls, args.seed):
+        index.add(row)
+    print(f"indexed {args.polls:,} polls in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'query':<24} {'matches':>8}  {'first':>8}  {'repeat':>8}")
+    for query in _queries():
+        start = time.perf_counter()
+        _, total = index.search(query, limit=20)
+        first = time.perf_counter() - start
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            index.search(query, limit=20)
+        repeat = (time.perf_counter() - start) / args.repeat
+        print(f"{query!r:<24} {total:>8,}  {first * 1000:6.2f}ms  {repeat * 1000:6.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
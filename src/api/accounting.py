@@ -0,0 +1,77 @@
+import math
+
+from api.amm import _ls_lmsr_cost, SHARE_PAYOUT_CENTS, B0
+
+
+def record_trade(supabase, poll_id, outcome_yes, num_shares, cash_cents):
+    """
+    Fold one trade into the poll's market-maker counters.
+
+    num_shares is signed (buys positive, sells negative) and cash_cents is
+    the cash the market maker received (buys positive, sells negative).
+    The increment happens in a single RPC so concurrent trades can't
+    overwrite each other's counters.
+    """
+    supabase.rpc("record_market_trade", {
+        "p_poll_id": poll_id,
+        "p_outcome": outcome_yes,
+        "p_num_shares": int(num_shares),
+        "p_cash_cents": int(cash_cents),
+    }).execute()
+
+
+def record_settlement(supabase, poll_id, outcome, payout_cents, refund_cents):
+    """
+    Record what the market maker paid out when the poll was resolved.
+    """
+    supabase.rpc("record_market_settlement", {
+        "p_poll_id": poll_id,
+        "p_outcome": outcome,
+        "p_payout_cents": int(payout_cents),
+        "p_refund_cents": int(refund_cents),
+    }).execute()
+
+
+def get_market_accounting(supabase, poll_id, b0=B0):
+    """
+    Read the maintained counters for a poll and summarize them.
+    Polls without trades have no row yet and summarize to zeros.
+    """
+    result = supabase.table("market_accounting").select("*").eq("poll_id", poll_id).execute()
+    row = result.data[0] if result.data else {}
+    return summarize_accounting(row, b0=b0)
+
+
+def summarize_accounting(row, b0=B0):
+    """
+    Turn a market_accounting row into the figures used to tune B0.
+
+    Returns:
+    {
+        "collected_cents": <int>,       # net cash taken in from trades
+        "yes_liability_cents": <int>,   # owed if YES wins
+        "no_liability_cents": <int>,    # owed if NO wins
+        "worst_case_loss_cents": <int>, # max liability - collected (negative = guaranteed profit)
+        "subsidy_bound_cents": <int>,   # LS-LMSR bound on loss, C(0, 0) for this b0
+        "resolved": <bool>,
+        "realized_loss_cents": <int>    # payout + refunds - collected, once resolved
+    }
+    """
+    collected = int(row.get("collected_cents") or 0)
+    yes_liability = int(row.get("yes_shares") or 0) * SHARE_PAYOUT_CENTS
+    no_liability = int(row.get("no_shares") or 0) * SHARE_PAYOUT_CENTS
+    resolved = row.get("resolved_outcome") is not None
+
+    summary = {
+        "collected_cents": collected,
+        "yes_liability_cents": yes_liability,
+        "no_liability_cents": no_liability,
+        "worst_case_loss_cents": max(yes_liability, no_liability) - collected,
+        "subsidy_bound_cents": math.ceil(_ls_lmsr_cost(0, 0, b0=b0) * 100),
+        "resolved": resolved,
+        "realized_loss_cents": None,
+    }
+    if resolved:
+        paid = int(row.get("payout_cents") or 0) + int(row.get("refund_cents") or 0)
+        summary["realized_loss_cents"] = paid - collected
+    return summary
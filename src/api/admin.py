@@ -1,9 +1,16 @@
 from flask import jsonify, request
-from api.database import get_supabase
-from api.tags import get_or_create_tag
+from api.database import get_supabase, get_async_supabase
+from api.tags import sync_poll_tags
+from api.accounting import record_settlement
+from api.events import append_settlement
+from api.stats import poll_stats_bulk
+from api.stream import publish_resolution
+from api import versions
+from api.cache import cache_stats
 from datetime import datetime, timezone
+import asyncio
 
-from api.amm import _lmsr_prices, _compute_b_ls_lmsr, B0
+from api.amm import _lmsr_prices, _compute_b_ls_lmsr, settlement_cents, poll_b0, parse_liquidity_b0
 
 def get_unapproved_polls():
     """
@@ -97,7 +104,7 @@ def get_unresolved_polls():
         if not supabase:
             return jsonify({"error": "Database connection not available"}), 503
         now = datetime.now(timezone.utc)
-        result = supabase.table("polls").select("id, title, description, ends_at, poll_tags(tags(name))").lt("ends_at", now).eq("public", True).is_("outcome", None).eq("deleted", False).order("created_at", desc=False).execute()
+        result = supabase.table("polls").select("id, title, description, ends_at, liquidity_b0, poll_tags(tags(name))").lt("ends_at", now).eq("public", True).is_("outcome", None).eq("deleted", False).order("created_at", desc=False).execute()
         
         polls = result.data
 
@@ -105,8 +112,7 @@ def get_unresolved_polls():
             return jsonify({"polls": []}), 200
         
         poll_ids = [p["id"] for p in polls]
-        stats_result = supabase.rpc("get_poll_stats_bulk", {"poll_ids": poll_ids}).execute()
-        stats_by_id = {row["poll_id"]: row for row in stats_result.data}
+        stats_by_id = poll_stats_bulk(supabase, poll_ids)
 
         pos_result = supabase.rpc("get_positions_bulk", {"poll_ids": poll_ids}).execute()
         positions = {row["poll_id"]: row for row in pos_result.data}
@@ -125,14 +131,10 @@ def get_unresolved_polls():
             yes_votes = positions.get(poll_id, {}).get("yes_votes", 0)
             no_votes = positions.get(poll_id, {}).get("no_votes", 0)
 
-            b = _compute_b_ls_lmsr(yes_votes, no_votes, B0)
+            b = _compute_b_ls_lmsr(yes_votes, no_votes, poll_b0(poll))
             odds_yes, odds_no = _lmsr_prices(yes_votes, no_votes, b)
 
-            stats = stats_by_id.get(poll_id, {
-                "num_traders": 0,
-                "volume": 0,
-                "24h_volume": 0
-            })
+            stats = stats_by_id[poll_id]
 
             processed_polls.append({
                 "id": poll_id,
@@ -193,7 +195,8 @@ def approve_poll():
         )
         if not response.data:
             return jsonify({"error": f"No poll found with id {poll_id}"}), 404
-        
+
+        versions.bump(versions.POLLS, versions.poll_scope(poll_id))
         return jsonify({"message": "Succesfully approved poll"}), 200
 
     except Exception as e:
@@ -213,6 +216,7 @@ def update_poll() -> None:
         "description": <desc>, # Optional
         "tags": ["tag1", "tag2", ...] # Optional
         "ends_at": datetime, # Optional
+        "liquidity_b0": <float>, # Optional
     }
     """
     if not current_user_is_admin():
@@ -243,26 +247,12 @@ def update_poll() -> None:
         title = data.get("title")
         desc = data.get("description")
         ends_at = data.get("ends_at")
-        # Update Tags
-        incoming_tags = data.get("tags", [])  # ["sports", "hockey", ...]
-        incoming_tags = [t.strip() for t in incoming_tags if t.strip()]
-
-        incoming_tag_ids = { get_or_create_tag(name, supabase) for name in incoming_tags }
-
-        current_rows = supabase.table("poll_tags")\
-            .select("tag_id")\
-            .eq("poll_id", poll_id)\
-            .execute()
-
-        current_tag_ids = {row["tag_id"] for row in current_rows.data}
-
-        to_add = incoming_tag_ids - current_tag_ids
-        to_remove = current_tag_ids - incoming_tag_ids
-
-        for tag_id in to_add:
-            supabase.table("poll_tags").insert({"poll_id": poll_id, "tag_id": tag_id}).execute()
-        
-        supabase.table("poll_tags").delete().eq("poll_id", poll_id).in_("tag_id", to_remove).execute()
+        # Update Tags (only when given, so other edits leave them alone)
+        if data.get("tags") is not None:
+            incoming_tags = [t.strip() for t in data["tags"] if t.strip()]  # ["sports", "hockey", ...]
+            added, removed = sync_poll_tags(supabase, poll_id, incoming_tags)
+            if added or removed:
+                versions.bump(versions.POLLS, versions.TAGS, versions.poll_scope(poll_id))
 
         updates = {}
         if title is not None:
@@ -274,6 +264,21 @@ def update_poll() -> None:
         if ends_at is not None:
             updates["ends_at"] = ends_at
 
+        if data.get("liquidity_b0") is not None:
+            try:
+                liquidity_b0 = parse_liquidity_b0(data["liquidity_b0"])
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
+            # Trades were priced, and the accounting bounded, with the current
+            # liquidity; changing it now would reprice every open position
+            poll_result = supabase.table("polls").select("liquidity_b0").eq("id", poll_id).execute()
+            if poll_result.data and poll_b0(poll_result.data[0]) != liquidity_b0:
+                trades_result = supabase.table("trades").select("id").eq("poll_id", poll_id).limit(1).execute()
+                if trades_result.data:
+                    return jsonify({"error": "Cannot change liquidity_b0 after trades have been made"}), 403
+            updates["liquidity_b0"] = liquidity_b0
+
         if not updates:
             return jsonify({"message": "No attributes to update"}), 200
 
@@ -288,6 +293,7 @@ def update_poll() -> None:
         if not response.data:
             return jsonify({"error": f"No poll found with id {poll_id}"}), 400
 
+        versions.bump(versions.POLLS, versions.poll_scope(poll_id), versions.market_scope(poll_id))
         return jsonify({"message": f"Successfully updated {poll_id}"}), 200
 
     except Exception as e:
@@ -332,6 +338,7 @@ def reject_poll():
         if not response:
             return jsonify({"error": "Failed to delete poll"}), 500
 
+        versions.bump(versions.POLLS, versions.poll_scope(poll_id))
         return jsonify({"message": "Successfully deleted poll"}), 200
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
@@ -351,28 +358,10 @@ def resolve_poll():
     try:
         data = request.get_json()
 
-        if not data:
-            return jsonify({"error": "Request body is required"}), 400
-        
-        poll_id = data.get("poll_id")
-
-        # Validate poll id
-        if not poll_id:
-            return jsonify({"error": "Poll ID is a required field"}), 400
-
         try:
-            poll_id = int(poll_id)
-        except:
-            return jsonify({"error": "Poll ID must be a valid integer"}), 400
-        
-        outcome = data.get("outcome")
-
-        # Validate outcome
-        if outcome is None:
-            return jsonify({"error": "Outcome is a required field"}), 400
-        
-        if not isinstance(outcome, bool):
-            return jsonify({"error": "Outcome must be true or false"}), 400
+            poll_id, outcome = _parse_resolution(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         supabase = get_supabase()
 
@@ -384,6 +373,9 @@ def resolve_poll():
         if not update_request.data:
             return jsonify({"error": f"No poll found with ID: {poll_id}"}), 400
         
+        publish_resolution(poll_id, outcome)
+        versions.bump(versions.POLLS, versions.poll_scope(poll_id), versions.market_scope(poll_id), versions.BALANCES)
+
         ended_at = supabase.table("polls").select("ends_at").eq("id", poll_id).execute()
         if not ended_at.data:
             return jsonify({"error": "Could not retrieve end date"}), 500
@@ -394,52 +386,198 @@ def resolve_poll():
         rollback_trades = supabase.table("trades").select("user_id, share_price").eq("poll_id", poll_id).gt("timestamp", ended_at_dt).execute()
 
         payouts = {}
-
-        # Only used to update the current user's balance visually without having to log out and in again
-        cur_user_payout = 0
-
-        #Get the current user's position to update navbar
-        token = request.cookies.get("sb-access-token")
-        if not token:
-            # If any of these checks fail, it's not worth throwing an error and making the whole function break, just return 0 for user's position
-            return jsonify({"message": "Poll resolved successfully", "user_profit": 0})
-        try:
-            claims = supabase.auth.get_claims(token)
-        except Exception:
-            return jsonify({"message": "Poll resolved successfully", "user_profit": 0})
-
-        if not claims or not claims.get("claims").get("email"):
-            return jsonify({"message": "Poll resolved successfully", "user_profit": 0})
-        
-        profile = supabase.table("profiles").select("id").eq("email", claims.get("claims").get("email")).single().execute()
-        cur_user = profile.data["id"]
-
         for trade in valid_trades.data:
             user_id = trade["user_id"]
             payouts[user_id] = payouts.get(user_id, 0) + trade["num_shares"]
-        
-        for user_id, shares in payouts.items():
-            supabase.rpc("increment_balance", {
-                "user_id": user_id,
-                "amount": shares * 100
-            }).execute()
-            if profile.data and user_id == cur_user:
-                cur_user_payout += 100*shares
-        
+
+        credits = [(user_id, settlement_cents(shares, won=True)) for user_id, shares in payouts.items()]
         # Refund users who traded after the rollback time
-        for trade in rollback_trades.data:
+        refunds = [(trade["user_id"], int(trade["share_price"])) for trade in rollback_trades.data]
+        total_payout = sum(amount for _, amount in credits)
+        total_refund = sum(amount for _, amount in refunds)
+
+        # Settle the books before paying out; nothing below can skip it
+        record_settlement(supabase, poll_id, outcome, total_payout, total_refund)
+        append_settlement(supabase, poll_id, outcome, total_payout, total_refund)
+
+        for user_id, amount in credits + refunds:
             supabase.rpc("increment_balance", {
-                "user_id": trade["user_id"],
-                "amount": trade["share_price"]
+                "user_id": user_id,
+                "amount": amount
             }).execute()
-            if profile.data and user_id == cur_user:
-                cur_user_payout += trade["share_price"]
+
+        # Only used to update the current user's balance visually without having to log out and in again
+        cur_user = _current_user_id(supabase)
+        cur_user_payout = sum(amount for user_id, amount in credits + refunds if user_id == cur_user)
 
         return jsonify({"message": "Poll resolved successfully", "user_profit": cur_user_payout})
         
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+def _parse_resolution(data):
+    """(poll_id, outcome) from a resolve request body; raises ValueError with the message to return."""
+    if not data:
+        raise ValueError("Request body is required")
+
+    poll_id = data.get("poll_id")
+
+    # Validate poll id
+    if not poll_id:
+        raise ValueError("Poll ID is a required field")
+
+    try:
+        poll_id = int(poll_id)
+    except (ValueError, TypeError):
+        raise ValueError("Poll ID must be a valid integer")
+
+    outcome = data.get("outcome")
+
+    # Validate outcome
+    if outcome is None:
+        raise ValueError("Outcome is a required field")
+
+    if not isinstance(outcome, bool):
+        raise ValueError("Outcome must be true or false")
+
+    return poll_id, outcome
+
+
+def _current_user_id(supabase):
+    """The caller's profile id, or None when the session can't be read."""
+    token = request.cookies.get("sb-access-token")
+    if not token:
+        return None
+    try:
+        claims = supabase.auth.get_claims(token)
+    except Exception:
+        return None
+
+    if not claims or not claims.get("claims").get("email"):
+        return None
+
+    profile = supabase.table("profiles").select("id").eq("email", claims.get("claims").get("email")).execute()
+    return profile.data[0]["id"] if profile.data else None
+
+
+# Most balance increments a resolution has in flight at once
+PAYOUT_CONCURRENCY = 16
+
+
+async def _admin_profile_async(supabase, token):
+    """The caller's profile ({"id", "admin"}) if they are an admin, else None."""
+    if not token:
+        return None
+
+    try:
+        claims = await supabase.auth.get_claims(token)
+    except Exception:
+        raise Exception("Could not access session info")
+
+    if not claims or not claims.get("claims").get("email"):
+        raise Exception("Could not retrieve user email")
+
+    profile = await supabase.table("profiles").select("id, admin").eq("email", claims.get("claims").get("email")).single().execute()
+    if profile.data and profile.data["admin"] is True:
+        return profile.data
+    return None
+
+
+def _record_resolution(poll_id, outcome, total_payout, total_refund):
+    supabase = get_supabase()
+    record_settlement(supabase, poll_id, outcome, total_payout, total_refund)
+    append_settlement(supabase, poll_id, outcome, total_payout, total_refund)
+
+
+async def resolve_poll_async(data, token):
+    """
+    resolve_poll for the ASGI app (api.asgi), returning (body, status).
+
+    The trades to pay out and to refund are read together, and balance
+    increments are sent concurrently (PAYOUT_CONCURRENCY at a time) rather
+    than one round trip after another. The caller's own share is worked
+    out from the profile the admin check already read.
+    """
+    try:
+        supabase = await get_async_supabase()
+        if not supabase:
+            return {"error": "Database connection not available"}, 503
+
+        admin = await _admin_profile_async(supabase, token)
+        if not admin:
+            return {"error": "User does not have permission to access admin functions"}, 403
+
+        try:
+            poll_id, outcome = _parse_resolution(data)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        update_request = await supabase.table("polls").update({"outcome": outcome}).eq("id", poll_id).execute()
+        if not update_request.data:
+            return {"error": f"No poll found with ID: {poll_id}"}, 400
+
+        publish_resolution(poll_id, outcome)
+        versions.bump(versions.POLLS, versions.poll_scope(poll_id), versions.market_scope(poll_id), versions.BALANCES)
+
+        # The update returns the row, so the end date needs no second read
+        ends_at = update_request.data[0].get("ends_at")
+        if not ends_at:
+            return {"error": "Could not retrieve end date"}, 500
+        ended_at = datetime.fromisoformat(ends_at.replace("Z", "+00:00")).isoformat()
+
+        valid_trades, rollback_trades = await asyncio.gather(
+            supabase.table("trades").select("user_id, num_shares").eq("poll_id", poll_id).eq("outcome", outcome).lt("timestamp", ended_at).execute(),
+            supabase.table("trades").select("user_id, share_price").eq("poll_id", poll_id).gt("timestamp", ended_at).execute(),
+        )
+
+        payouts = {}
+        for trade in valid_trades.data:
+            payouts[trade["user_id"]] = payouts.get(trade["user_id"], 0) + trade["num_shares"]
+
+        credits = [(user_id, settlement_cents(shares, won=True)) for user_id, shares in payouts.items()]
+        total_payout = sum(amount for _, amount in credits)
+        # Refund users who traded after the rollback time
+        refunds = [(trade["user_id"], int(trade["share_price"])) for trade in rollback_trades.data]
+        total_refund = sum(amount for _, amount in refunds)
+
+        limit = asyncio.Semaphore(PAYOUT_CONCURRENCY)
+
+        async def credit(user_id, amount):
+            async with limit:
+                await supabase.rpc("increment_balance", {"user_id": user_id, "amount": amount}).execute()
+
+        # Settle the books before paying out, as resolve_poll does
+        await asyncio.to_thread(_record_resolution, poll_id, outcome, total_payout, total_refund)
+        await asyncio.gather(*(credit(user_id, amount) for user_id, amount in credits + refunds))
+
+        cur_user_payout = sum(amount for user_id, amount in credits + refunds if user_id == admin["id"])
+        return {"message": "Poll resolved successfully", "user_profit": cur_user_payout}, 200
+
+    except Exception as e:
+        return {"error": f"Server error: {str(e)}"}, 500
+
+
+def get_cache_stats():
+    """Hit/miss counters of the response caches in this process
+
+    Returns:
+    {
+        "caches": [
+            {
+                "name": "list_polls",
+                "backend": "LRUBackend",
+                "hits": <int>,
+                "misses": <int>,
+                "errors": <int>,
+                "hit_ratio": <float>
+            }
+        ]
+    }"""
+    if not current_user_is_admin():
+        return jsonify({"error": "User does not have permission to access admin functions"}), 403
+
+    return jsonify({"caches": cache_stats()}), 200
+
 def current_user_is_admin():
     """Internal function that returns True if the current user is an admin
     Used as a safeguard to ensure regular users cannot access admin functions"""
@@ -1,18 +1,43 @@
 import math
 import os
-from typing import Dict, Tuple
+from typing import TYPE_CHECKING, Dict, Tuple
 
-from supabase import create_client, Client
+if TYPE_CHECKING:
+    from supabase import Client
 
-SUPABASE_URL = os.environ["SUPABASE_URL"]
-SUPABASE_KEY = os.environ.get("SUPABASE_SECRET_KEY", "dummy_key")  # or anon key in dev
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+try:
+    import numpy as np
+except ImportError:  # batch pricing falls back to plain Python
+    np = None
 
-# Base liquidity parameter for LS-LMSR
+# Fallback client for callers that don't pass one. Built on first use, so
+# importing the pricing maths doesn't pay for the Supabase package.
+supabase: "Client | None" = None
+
+
+def _default_client() -> "Client":
+    global supabase
+    if supabase is None:
+        from supabase import create_client
+
+        url = os.environ["SUPABASE_URL"]
+        key = os.environ.get("SUPABASE_SECRET_KEY", "dummy_key")  # or anon key in dev
+        supabase = create_client(url, key)
+    return supabase
+
+
+# Base liquidity parameter for LS-LMSR, used by polls without their own liquidity_b0
 B0 = 5.0  # tune for your app
 
+# Allowed range for a poll's liquidity_b0
+MIN_LIQUIDITY_B0 = 1.0
+MAX_LIQUIDITY_B0 = 100.0
 
-def _aggregate_positions(poll_id: int, client: Client | None = None) -> Dict[str, int]:
+# A winning share settles at 1 G$, stored as integer cents like profiles.balance
+SHARE_PAYOUT_CENTS = 100
+
+
+def _aggregate_positions(poll_id: int, client: "Client | None" = None) -> Dict[str, int]:
     """
     Aggregate net shares per outcome for a given poll.
 
@@ -21,7 +46,7 @@ def _aggregate_positions(poll_id: int, client: Client | None = None) -> Dict[str
 
     Returns a dict like {"YES": q_yes, "NO": q_no}.
     """
-    supabase_client = client or supabase
+    supabase_client = client or _default_client()
     trades_query = (
         supabase_client.table("poll_votes")
         .select("yes_votes, no_votes")
@@ -35,6 +60,51 @@ def _aggregate_positions(poll_id: int, client: Client | None = None) -> Dict[str
     return {"YES": trades_query.data[0]["yes_votes"], "NO": trades_query.data[0]["no_votes"]}
 
 
+def _aggregate_positions_bulk(poll_ids, client: "Client | None" = None) -> Dict[int, Dict[str, int]]:
+    """
+    _aggregate_positions for many polls in a single query.
+
+    Returns {poll_id: {"YES": q_yes, "NO": q_no}} with an entry for every
+    requested id; polls without trades map to zeros.
+    """
+    supabase_client = client or _default_client()
+    positions = {poll_id: {"YES": 0, "NO": 0} for poll_id in poll_ids}
+    if not positions:
+        return positions
+    votes_query = (
+        supabase_client.table("poll_votes")
+        .select("poll_id, yes_votes, no_votes")
+        .in_("poll_id", list(positions))
+        .execute()
+    )
+    for row in votes_query.data or []:
+        positions[row["poll_id"]] = {"YES": row["yes_votes"], "NO": row["no_votes"]}
+    return positions
+
+
+def poll_b0(poll: Dict | None) -> float:
+    """
+    Base liquidity for a poll row, falling back to B0 when the poll has none.
+    """
+    if not poll or poll.get("liquidity_b0") is None:
+        return B0
+    return float(poll["liquidity_b0"])
+
+
+def parse_liquidity_b0(value) -> float:
+    """
+    Validate a liquidity_b0 coming from a request.
+    Raises ValueError if it isn't a number within the allowed range.
+    """
+    try:
+        b0 = float(value)
+    except (TypeError, ValueError):
+        raise ValueError("liquidity_b0 must be a number")
+    if not math.isfinite(b0) or b0 < MIN_LIQUIDITY_B0 or b0 > MAX_LIQUIDITY_B0:
+        raise ValueError(f"liquidity_b0 must be between {MIN_LIQUIDITY_B0} and {MAX_LIQUIDITY_B0}")
+    return b0
+
+
 def _compute_b_ls_lmsr(q_yes: float, q_no: float, b0: float = B0) -> float:
     """
     Liquidity-sensitive b: b = b0 * sqrt(Q),
@@ -46,96 +116,296 @@ def _compute_b_ls_lmsr(q_yes: float, q_no: float, b0: float = B0) -> float:
     return b0 * math.sqrt(Q)
 
 
+def _logaddexp(a: float, b: float) -> float:
+    """log(exp(a) + exp(b)) without overflow."""
+    m = max(a, b)
+    return m + math.log1p(math.exp(-abs(a - b)))
+
+
+def _log_sigmoid(x: float) -> float:
+    """log(1 / (1 + exp(-x))) without overflow or loss of precision."""
+    if x >= 0:
+        return -math.log1p(math.exp(-x))
+    return x - math.log1p(math.exp(x))
+
+
 def _lmsr_cost(q_yes: float, q_no: float, b: float) -> float:
     """
     LMSR cost function for binary market:
       C(q) = b * log( exp(q_yes / b) + exp(q_no / b) )
     """
-    m = max(q_yes / b, q_no / b)
-    return b * (m + math.log(math.exp(q_yes / b - m) + math.exp(q_no / b - m)))
+    return b * _logaddexp(q_yes / b, q_no / b)
+
+
+def _lmsr_probability(q_yes: float, q_no: float, b: float) -> float:
+    """
+    Exact probability of YES in a binary LMSR, the logistic of (q_yes - q_no) / b.
+    Never overflows, however lopsided the market.
+    """
+    x = (q_yes - q_no) / b
+    if x >= 0:
+        return 1.0 / (1.0 + math.exp(-x))
+    e = math.exp(x)
+    return e / (1.0 + e)
+
+
+def _probability_to_cents(prob_yes: float) -> Tuple[int, int]:
+    """
+    Display prices in whole cents. NO is derived from YES so the pair always
+    sums to 100.
+    """
+    price_yes = int(round(prob_yes * 100))
+    return price_yes, 100 - price_yes
 
 
-def _lmsr_prices(q_yes: float, q_no: float, b: float) -> Tuple[float, float]:
+def _lmsr_prices(q_yes: float, q_no: float, b: float) -> Tuple[int, int]:
     """
     Prices for YES and NO in a binary LMSR given q_yes, q_no, and b.
     """
-    exp_yes = math.exp(q_yes / b)
-    exp_no = math.exp(q_no / b)
-    denom = exp_yes + exp_no
-    price_yes = int(round((exp_yes / denom) * 100))
-    price_no = int(round((exp_no / denom) * 100))
-    return price_yes, price_no
+    return _probability_to_cents(_lmsr_probability(q_yes, q_no, b))
 
 
-def quote_and_cost_ls_lmsr(
-    poll_id: int,
+def market_price(q_yes: float, q_no: float, b0: float = B0) -> Dict[str, float]:
+    """
+    Current price of a market, both exact and for display.
+
+    Returns:
+      {
+        "prob_yes": ..., "prob_no": ...,    # floats in [0, 1]
+        "price_yes": ..., "price_no": ...,  # integer cents, summing to 100
+        "b": ...
+      }
+    """
+    b = _compute_b_ls_lmsr(q_yes, q_no, b0=b0)
+    prob_yes = _lmsr_probability(q_yes, q_no, b)
+    price_yes, price_no = _probability_to_cents(prob_yes)
+    return {
+        "prob_yes": prob_yes,
+        "prob_no": 1.0 - prob_yes,
+        "price_yes": price_yes,
+        "price_no": price_no,
+        "b": b,
+    }
+
+
+def batch_probabilities(q_yes, q_no, b0=B0):
+    """
+    YES probabilities for many markets at once. q_yes, q_no and b0 may be
+    sequences of equal length (b0 may also be a single number).
+
+    Uses numpy when it is installed and returns an ndarray; otherwise falls
+    back to a list computed with _lmsr_probability.
+    """
+    if np is not None:
+        q_yes = np.asarray(q_yes, dtype=float)
+        q_no = np.asarray(q_no, dtype=float)
+        b = np.asarray(b0, dtype=float) * np.sqrt(np.maximum(np.abs(q_yes) + np.abs(q_no), 1.0))
+        # 0.5 * (1 + tanh(x / 2)) is the logistic, and tanh can't overflow
+        return 0.5 * (1.0 + np.tanh((q_yes - q_no) / (2.0 * b)))
+
+    if isinstance(b0, (int, float)):
+        b0 = [b0] * len(q_yes)
+    return [
+        _lmsr_probability(y, n, _compute_b_ls_lmsr(y, n, b0=b))
+        for y, n, b in zip(q_yes, q_no, b0)
+    ]
+
+
+def batch_market_prices(q_yes, q_no, b0=B0):
+    """
+    Display prices for many markets at once: a list of (price_yes, price_no)
+    integer-cent pairs, each summing to 100.
+    """
+    probs = batch_probabilities(q_yes, q_no, b0)
+    if np is not None:
+        # rint rounds half to even, like round() in _probability_to_cents
+        cents = np.rint(probs * 100).astype(np.int64)
+        return list(zip(cents.tolist(), (100 - cents).tolist()))
+    return [_probability_to_cents(p) for p in probs]
+
+
+def _to_cents(amount: float, round_up: bool) -> int:
+    """
+    Convert a dollar amount coming out of the float LMSR into integer cents.
+
+    Float noise is absorbed first (to a millionth of a cent) so that e.g.
+    1.2300000000001 doesn't get bumped up a cent. After that the rounding is
+    directional: money the trader pays is rounded up, money the trader
+    receives is rounded down, so the market maker never pays out a fraction
+    of a cent it didn't collect.
+    """
+    cents = round(amount * 100, 6)
+    return math.ceil(cents) if round_up else math.floor(cents)
+
+
+def _market_prices(q_yes: float, q_no: float, b0: float = B0) -> Tuple[int, int]:
+    """
+    Display prices (integer cents per share) for a market state, using the
+    LS-LMSR b of that state.
+    """
+    price = market_price(q_yes, q_no, b0=b0)
+    return price["price_yes"], price["price_no"]
+
+
+def _ls_lmsr_cost(q_yes: float, q_no: float, b0: float = B0) -> float:
+    """
+    LS-LMSR cost potential: the LMSR cost function evaluated with the b of
+    the state itself, C(q) = b(q) * log( exp(q_yes / b(q)) + exp(q_no / b(q)) ).
+    """
+    return _lmsr_cost(q_yes, q_no, _compute_b_ls_lmsr(q_yes, q_no, b0=b0))
+
+
+def _ls_lmsr_split(q_yes: float, q_no: float, b0: float = B0) -> Tuple[float, float]:
+    """
+    _ls_lmsr_cost as (max(q_yes, q_no), the rest). The first part is exact for
+    whole share counts and the second is below b * log(2), so differences
+    of the two parts keep their cents however large the market is.
+    """
+    b = _compute_b_ls_lmsr(q_yes, q_no, b0=b0)
+    return max(q_yes, q_no), b * math.log1p(math.exp(-abs(q_yes - q_no) / b))
+
+
+def _ls_lmsr_cost_change(
+    q_yes: float,
+    q_no: float,
+    q_yes_new: float,
+    q_no_new: float,
+    b0: float = B0,
+) -> float:
+    """
+    C(q_new) - C(q) for the LS-LMSR potential, each side with its own b.
+
+    Because every trade is priced from the potential of the two states, the
+    amounts along any sequence of trades telescope: a sequence that brings
+    the market back to where it started nets to zero before rounding,
+    whatever order the positions were opened and closed in.
+    """
+    top, rest = _ls_lmsr_split(q_yes, q_no, b0=b0)
+    top_new, rest_new = _ls_lmsr_split(q_yes_new, q_no_new, b0=b0)
+    return (top_new - top) + (rest_new - rest)
+
+
+def _ls_lmsr_marginal_price(q_yes: float, q_no: float, outcome_yes: bool, b0: float = B0) -> float:
+    """
+    Price of the next sliver of one outcome, the gradient of the LS-LMSR
+    potential: p + db/dq * H(p), with H the entropy of the market's
+    probabilities in nats. The second term is the liquidity fee that makes
+    LS-LMSR prices sum to more than one.
+    """
+    b = _compute_b_ls_lmsr(q_yes, q_no, b0=b0)
+    x = (q_yes - q_no) / b
+    log_p, log_not_p = _log_sigmoid(x), _log_sigmoid(-x)
+    p = math.exp(log_p)
+    entropy = -(p * log_p + (1.0 - p) * log_not_p)
+
+    Q = abs(q_yes) + abs(q_no)
+    q = q_yes if outcome_yes else q_no
+    db = 0.0 if Q <= 1.0 else b0 / (2.0 * math.sqrt(Q)) * (1.0 if q >= 0 else -1.0)
+    return (p if outcome_yes else 1.0 - p) + db * entropy
+
+
+def share_price_bound_cents(b0: float = B0) -> int:
+    """
+    Most a single share can cost, in cents. A marginal price is at most
+    1 + b0 * log(2) / 2 (see _ls_lmsr_marginal_price), so in thin markets a
+    share can cost more than its payout; the excess is the market maker's
+    liquidity fee and shrinks as 1 / sqrt(Q) as the market grows.
+    """
+    return math.ceil(SHARE_PAYOUT_CENTS * (1.0 + b0 * math.log(2) / 2.0))
+
+
+def quote_trade_cents(
+    q_yes: float,
+    q_no: float,
     outcome_yes: bool,
     delta_shares: int,
     b0: float = B0,
 ) -> Dict[str, float]:
     """
-    Compute LS-LMSR prices and the cost of buying `delta_shares` of an outcome
-    in a given poll.
+    Exact integer-cents quote for moving a market by `delta_shares` of one
+    outcome. Positive deltas are buys, negative deltas are sells.
 
-    outcome_yes:
-        True  -> buying YES
-        False -> buying NO
+    The amount is the change in the LS-LMSR potential (see
+    _ls_lmsr_cost_change), rounded in the market maker's favour: up for
+    buys, down for sells. Every trade therefore costs at least its exact
+    share of the potential change, and since those shares sum to zero over
+    any sequence that returns the market to a previous state, no such
+    sequence can take money out of the market maker.
 
     Returns:
       {
-        "price_yes": ...,
-        "price_no": ...,
-        "price_yes_after": ...,
-        "price_no_after": ...,
-        "cost": ...,
+        "cost_cents": ...,   # signed: > 0 trader pays, < 0 trader receives
+        "price_yes": ..., "price_no": ...,              # before, cents/share
+        "price_yes_after": ..., "price_no_after": ...,  # after, cents/share
         "b": ...,
-        "q_yes_before": ...,
-        "q_no_before": ...,
-        "q_yes_after": ...,
-        "q_no_after": ...
+        "q_yes_before": ..., "q_no_before": ...,
+        "q_yes_after": ..., "q_no_after": ...
       }
-
-    In production, call this inside a transaction:
-      1) read current q
-      2) compute quote
-      3) if user accepts, insert trade row and commit
     """
-    # 1. Get current net positions from Supabase
-    q = _aggregate_positions(poll_id)
-    q_yes = float(q.get("YES", 0))
-    q_no = float(q.get("NO", 0))
-
-    # 2. Compute LS-LMSR liquidity parameter b at runtime
-    b = _compute_b_ls_lmsr(q_yes, q_no, b0=b0)
+    q_yes = float(q_yes)
+    q_no = float(q_no)
+    delta = float(delta_shares)
 
-    # 3. Current prices
-    price_yes_before, price_no_before = _lmsr_prices(q_yes, q_no, b)
-
-    # 4. New quantities after proposed trade
     if outcome_yes:
-        q_yes_new = q_yes + delta_shares
-        q_no_new = q_no
+        q_yes_new, q_no_new = q_yes + delta, q_no
     else:
-        q_yes_new = q_yes
-        q_no_new = q_no + delta_shares
+        q_yes_new, q_no_new = q_yes, q_no + delta
 
-    # 5. Cost = C(q_new) - C(q_old), using this trade's b
-    cost_before = _lmsr_cost(q_yes, q_no, b)
-    cost_after = _lmsr_cost(q_yes_new, q_no_new, b)
-    trade_cost = cost_after - cost_before
+    amount = _ls_lmsr_cost_change(q_yes, q_no, q_yes_new, q_no_new, b0=b0)
+    if delta >= 0:
+        cost_cents = _to_cents(max(amount, 0.0), round_up=True)
+    else:
+        cost_cents = -_to_cents(max(-amount, 0.0), round_up=False)
 
-    # 6. Prices after trade (for showing slippage)
-    price_yes_after, price_no_after = _lmsr_prices(q_yes_new, q_no_new, b)
+    price_yes_before, price_no_before = _market_prices(q_yes, q_no, b0=b0)
+    price_yes_after, price_no_after = _market_prices(q_yes_new, q_no_new, b0=b0)
 
     return {
+        "cost_cents": cost_cents,
         "price_yes": price_yes_before,
         "price_no": price_no_before,
         "price_yes_after": price_yes_after,
         "price_no_after": price_no_after,
-        "cost": trade_cost,
-        "b": b,
+        "b": _compute_b_ls_lmsr(q_yes, q_no, b0=b0),
         "q_yes_before": q_yes,
         "q_no_before": q_no,
         "q_yes_after": q_yes_new,
         "q_no_after": q_no_new,
     }
+
+
+def settlement_cents(num_shares: int, won: bool) -> int:
+    """
+    Value in cents of `num_shares` shares once the market has resolved.
+    """
+    return int(num_shares) * SHARE_PAYOUT_CENTS if won else 0
+
+
+def quote_and_cost_ls_lmsr(
+    poll_id: int,
+    outcome_yes: bool,
+    delta_shares: int,
+    b0: float = B0,
+) -> Dict[str, float]:
+    """
+    Compute LS-LMSR prices and the cost of buying `delta_shares` of an outcome
+    in a given poll (negative `delta_shares` quotes a sale).
+
+    outcome_yes:
+        True  -> buying YES
+        False -> buying NO
+
+    Returns the quote_trade_cents() payload plus:
+      {
+        "cost": ...,  # cost_cents in dollars, kept for existing callers
+      }
+
+    In production, call this inside a transaction:
+      1) read current q
+      2) compute quote
+      3) if user accepts, insert trade row and commit
+    """
+    q = _aggregate_positions(poll_id)
+    quote = quote_trade_cents(q.get("YES", 0), q.get("NO", 0), outcome_yes, delta_shares, b0=b0)
+    quote["cost"] = quote["cost_cents"] / 100.0
+    return quote
@@ -0,0 +1,233 @@
+"""
+ASGI entry point serving the same API as api/index.py, for an ASGI server
+(from src/: `uvicorn api.asgi:app`, or any other ASGI server).
+
+The handlers that spend most of their time waiting on several PostgREST
+calls run natively on the event loop with the async Supabase client, so
+their independent queries overlap and a slow request doesn't hold a
+worker thread. Every other route is passed through to the Flask app in a
+worker thread, so both entry points serve identical APIs and api/index.py
+keeps working on its own.
+"""
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib.parse import parse_qs
+import asyncio
+import io
+import json
+import re
+import sys
+import os
+
+from werkzeug.http import dump_cookie
+
+# Add parent directory to path to import database module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+
+def verify_token(token):
+    # Imported on first use, like the route modules in api.index
+    from api.auth import verify_token as verify
+
+    return verify(token)
+
+
+class Request:
+    """The parts of an HTTP request the async handlers use."""
+
+    def __init__(self, scope, body):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.args = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        self.headers = {}
+        for name, value in scope.get("headers", []):
+            name = name.decode("latin-1").lower()
+            value = value.decode("latin-1")
+            self.headers[name] = f"{self.headers[name]},{value}" if name in self.headers else value
+        cookies = SimpleCookie()
+        cookies.load(self.headers.get("cookie", ""))
+        self.cookies = {name: morsel.value for name, morsel in cookies.items()}
+        self.body = body
+
+    def arg(self, name, default=None):
+        values = self.args.get(name)
+        return values[0] if values else default
+
+    def get_json(self):
+        try:
+            return json.loads(self.body) if self.body else None
+        except ValueError:
+            return None
+
+
+def _logged_out():
+    headers = [("location", "/login")]
+    for name in ("sb-access-token", "sb-refresh-token", "user-info"):
+        headers.append(("set-cookie", dump_cookie(name, "", expires=0, max_age=0)))
+    return None, 303, headers
+
+
+def protected(handler):
+    """api.index.protected for async handlers."""
+    async def wrapper(request, **params):
+        token = request.cookies.get("sb-access-token")
+        tok = await asyncio.to_thread(verify_token, token)
+        if tok is None:
+            return _logged_out()
+        body, status = await handler(request, **params)
+        headers = []
+        if tok[0] != token:
+            headers.append(("set-cookie", dump_cookie("sb-access-token", tok[0], expires=tok[2], httponly=True)))
+            headers.append(("set-cookie", dump_cookie("sb-refresh-token", tok[1], expires=tok[2], httponly=True)))
+            # Never let a shared cache hand these cookies to someone else
+            headers.append(("cache-control", "private, no-store"))
+        return body, status, headers
+    return wrapper
+
+
+@protected
+async def get_positions_route(request):
+    """Retrieve user positions."""
+    from api.positions import get_positions_async, DEFAULT_PAGE_SIZE
+
+    data = request.get_json()
+    if not data:
+        return {"error": "Request body is required"}, 400
+    status = str(data.get("status", "")).strip().lower() if data.get("status") is not None else ""
+    return await get_positions_async(
+        data.get("user_id", ""), data.get("poll_id", ""), status,
+        data.get("page_size", DEFAULT_PAGE_SIZE), data.get("page", 1), data.get("cursor"),
+    )
+
+
+@protected
+async def get_poll_detail_route(request, poll_id):
+    """Retrieve a poll with its price, stats and the user's positions."""
+    from api.poll_detail import get_poll_detail_async
+
+    return await get_poll_detail_async(poll_id, request.arg("user_id"))
+
+
+async def resolve_poll_route(request):
+    """Sets a poll's outcome and pays out users"""
+    from api.admin import resolve_poll_async
+
+    return await resolve_poll_async(request.get_json(), request.cookies.get("sb-access-token"))
+
+
+ROUTES = [
+    ("POST", re.compile(r"/api/positions"), get_positions_route),
+    ("GET", re.compile(r"/api/polls/(?P<poll_id>[^/]+)/detail"), get_poll_detail_route),
+    ("POST", re.compile(r"/api/admin/resolve"), resolve_poll_route),
+]
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    return b"".join(chunks)
+
+
+async def _send_json(send, body, status, headers=()):
+    payload = b"" if body is None else json.dumps(body).encode()
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+    if body is not None:
+        headers.append((b"content-type", b"application/json"))
+    headers.append((b"content-length", str(len(payload)).encode()))
+    await send({"type": "http.response.start", "status": status, "headers": headers})
+    await send({"type": "http.response.body", "body": payload})
+
+
+def _environ(scope, body):
+    """A WSGI environ for an ASGI HTTP request."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "REMOTE_ADDR": client[0],
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+        elif name != "CONTENT_LENGTH":
+            key = f"HTTP_{name}"
+            environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def _call_flask(scope, body, send):
+    """Serve a request with the Flask app in a worker thread, streaming its body."""
+    flask_app = import_module("api.index").app
+    started = {}
+
+    def start_response(status, headers, exc_info=None):
+        started["status"] = int(status.split(" ", 1)[0])
+        started["headers"] = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+
+    response = await asyncio.to_thread(flask_app, _environ(scope, body), start_response)
+    chunks = iter(response)
+    try:
+        # Streamed responses (e.g. price streams) produce their chunks over time
+        chunk = await asyncio.to_thread(next, chunks, None)
+        await send({"type": "http.response.start", "status": started["status"], "headers": started["headers"]})
+        while chunk is not None:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            chunk = await asyncio.to_thread(next, chunks, None)
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        close = getattr(response, "close", None)
+        if close:
+            await asyncio.to_thread(close)
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    """The ASGI application."""
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+
+    body = await _read_body(receive)
+    for method, pattern, handler in ROUTES:
+        match = pattern.fullmatch(scope["path"])
+        if match and scope["method"] == method:
+            try:
+                result = await handler(Request(scope, body), **match.groupdict())
+            except Exception as e:
+                result = {"error": f"Server error: {str(e)}"}, 500
+            return await _send_json(send, *result)
+
+    await _call_flask(scope, body, send)
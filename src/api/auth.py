@@ -3,21 +3,28 @@ from base64 import b64decode, b64encode
 from dotenv import load_dotenv
 from json import loads, dumps
 from typing import Optional
-import supabase as sb
 import jwt
 import os
 from datetime import datetime, timedelta, timezone
 
 from api.database import get_supabase
+from api import versions
 
 DAILY_LOGIN_BONUS = 500  # Points awarded for first daily login (increases linearly with streaks)
 
 load_dotenv()
-jwks = jwt.PyJWKClient(os.getenv("SUPABASE_URL") + "/auth/v1/.well-known/jwks.json")
+# Built on first use so that importing this module costs nothing per cold start
+jwks = None
+
+def _jwks():
+	global jwks
+	if jwks is None:
+		jwks = jwt.PyJWKClient(os.getenv("SUPABASE_URL") + "/auth/v1/.well-known/jwks.json")
+	return jwks
 
 def _validate_token(token):
 	try:
-		signing_key = jwks.get_signing_key_from_jwt(token)
+		signing_key = _jwks().get_signing_key_from_jwt(token)
 		jwt.decode(token, signing_key.key, algorithms=["ES256", "RS256"], options={"verify_exp": True, "verify_aud": False})
 		return True
 	except Exception as e:
@@ -57,12 +64,13 @@ def login():
 
 	# Authenticate with Supabase
 	supabase = get_supabase()
+	from supabase import AuthError
 	try:
 		res = supabase.auth.sign_in_with_password({
 			"email": email,
 			"password": password
 		})
-	except sb.AuthError as e:
+	except AuthError as e:
 		return jsonify({"error": str(e)}), 400
 	except Exception as e:
 		return jsonify({"error": str(e), "type": str(type(e))}), 500
@@ -122,6 +130,7 @@ def register():
 	# Check if stuff is taken
 	update = False
 	supabase = get_supabase()
+	from supabase import AuthError
 	try:
 		res = supabase.table("profiles").select("username").eq("username", username).execute()
 	except Exception as e:
@@ -141,7 +150,7 @@ def register():
 			signup_credentials["type"] = "signup"
 			try:
 				supabase.auth.resend(signup_credentials)
-			except sb.AuthError as e:
+			except AuthError as e:
 				return jsonify({"error": str(e)}), 400
 			except Exception as e:
 				return jsonify({"error": str(e), "type": str(type(e))}), 500
@@ -166,6 +175,7 @@ def register():
 		}).execute()
 	except Exception as e:
 		return jsonify({"error": "Failed to create user profile: " + str(e)}), 500
+	versions.bump(versions.BALANCES)
 
 	return "", 200
 
@@ -240,6 +250,7 @@ def login_bonus(user_id: int):
 			"current_streak": login_streak,
 			"balance": new_balance
 		}).eq("auth_id", user_id).execute()
+		versions.bump(versions.BALANCES)
 
 	elif today - last_bonus_date > timedelta(days=1):
 		# Reset streak
@@ -249,3 +260,4 @@ def login_bonus(user_id: int):
 			"current_streak": 1,
 			"balance": new_balance
 		}).eq("auth_id", user_id).execute()
+		versions.bump(versions.BALANCES)
@@ -0,0 +1,197 @@
+from collections import OrderedDict
+import threading
+import time
+import os
+
+from api import versions
+
+try:
+    import redis
+except ImportError:  # the shared tier is optional
+    redis = None
+
+# Point this at a redis:// URL to share cached responses between workers;
+# without it (or without the redis package) each process keeps its own LRU
+RESPONSE_CACHE_URL_ENV = "RESPONSE_CACHE_URL"
+DEFAULT_MAX_ENTRIES = 512
+
+
+class LRUBackend:
+    """In-process least-recently-used store with per-entry expiry."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def incr(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """
+    Shared store on a key-value server. Generation counters live there too,
+    so an invalidation in one worker is seen by all of them.
+    """
+
+    def __init__(self, url):
+        # Short timeouts: a slow cache must not be slower than the database
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+
+    def get(self, key):
+        value = self._client.get(key)
+        return value.decode() if value is not None else None
+
+    def set(self, key, value, ttl):
+        self._client.set(key, value, ex=max(int(ttl), 1))
+
+    def counter(self, name):
+        return int(self._client.get(f"gen:{name}") or 0)
+
+    def incr(self, name):
+        return self._client.incr(f"gen:{name}")
+
+
+def default_backend():
+    url = os.getenv(RESPONSE_CACHE_URL_ENV)
+    if url and redis is not None:
+        return RedisBackend(url)
+    return LRUBackend()
+
+
+class ResponseCache:
+    """
+    Cache of serialized responses for one endpoint.
+
+    Keys are the endpoint's normalized parameters plus a generation number.
+    Invalidating bumps the generation, which orphans every old entry at once
+    (they age out of the backend on their own). Entries can also be grouped
+    into partitions (e.g. per user) with generations of their own, so one
+    partition can be invalidated without dropping the rest.
+    """
+
+    def __init__(self, name, ttl, backend=None):
+        self.name = name
+        self.ttl = ttl
+        self.backend = backend if backend is not None else default_backend()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get_or_compute(self, params_key, compute, partition=None):
+        """
+        Cached value for params_key, or compute() stored under it. compute must
+        return a string. Backend failures fall back to computing.
+        """
+        try:
+            generation = self.backend.counter(self.name)
+            if partition is not None:
+                generation = f"{generation}:{partition}.{self.backend.counter(self._partition(partition))}"
+            key = f"{self.name}:{generation}:{params_key}"
+            value = self.backend.get(key)
+        except Exception:
+            key, value = None, None
+            self._count("errors")
+
+        if value is not None:
+            self._count("hits")
+            return value
+
+        self._count("misses")
+        value = compute()
+        if key is not None:
+            try:
+                self.backend.set(key, value, self.ttl)
+            except Exception:
+                self._count("errors")
+        return value
+
+    def invalidate(self, partition=None):
+        try:
+            self.backend.incr(self.name if partition is None else self._partition(partition))
+        except Exception:
+            self._count("errors")
+
+    def _partition(self, partition):
+        return f"{self.name}/{partition}"
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "name": self.name,
+                "backend": type(self.backend).__name__,
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _count(self, field):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+
+_caches = {}
+
+
+def response_cache(name, ttl, depends_on, partition_of=None):
+    """
+    Create (once) and register a response cache that is invalidated whenever
+    one of the api.versions scopes in depends_on is bumped.
+
+    partition_of: optional function mapping a bumped scope to the cache
+                  partition it invalidates (or None), e.g. a user scope to
+                  that user's entries
+    """
+    if name not in _caches:
+        cache = ResponseCache(name, ttl)
+        scopes = set(depends_on)
+
+        def invalidate(bumped):
+            if scopes & set(bumped):
+                cache.invalidate()
+            if partition_of is not None:
+                for scope in bumped:
+                    partition = partition_of(scope)
+                    if partition is not None:
+                        cache.invalidate(partition)
+
+        versions.on_bump(invalidate)
+        _caches[name] = cache
+    return _caches[name]
+
+
+def cache_stats():
+    """Hit/miss counters for every registered response cache."""
+    return [cache.stats() for cache in _caches.values()]
@@ -1,10 +1,66 @@
+import asyncio
 import os
+import weakref
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from typing import TYPE_CHECKING
 
 from flask import request
 
-def get_supabase() -> Client:
+if TYPE_CHECKING:
+    from supabase import AsyncClient, Client
+
+# When set, get_supabase() returns this client instead of connecting
+# (used by the simulation harness to run handlers against sim.backend)
+_client_override = None
+_async_client_override = None
+# Bumped by override_supabase, so in-process copies of table data (the tag
+# registry) know they were loaded from another source
+_client_generation = 0
+
+# One async client per event loop: its connection pool belongs to the loop
+# that created it. Async handlers only query with the service key and never
+# sign in on it, so requests can share it.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def override_supabase(client) -> None:
+    """Route get_supabase() to `client`; pass None to go back to Supabase."""
+    global _client_override, _client_generation
+    _client_override = client
+    _client_generation += 1
+
+
+def client_generation() -> int:
+    """Changes whenever override_supabase switches the data source."""
+    return _client_generation
+
+
+def get_supabase() -> "Client":
+    if _client_override is not None:
+        return _client_override
+    # Imported here so requests that never reach the database don't load it
+    from supabase import create_client
+
     url = os.getenv("SUPABASE_URL")
     key = os.getenv("SUPABASE_SECRET_KEY")
     return create_client(url, key)
+
+
+def override_async_supabase(client) -> None:
+    """Route get_async_supabase() to `client`; pass None to go back to Supabase."""
+    global _async_client_override
+    _async_client_override = client
+
+
+async def get_async_supabase() -> "AsyncClient":
+    """The async client for handlers running on an event loop (see api.asgi)."""
+    if _async_client_override is not None:
+        return _async_client_override
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        from supabase import acreate_client
+
+        client = await acreate_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_SECRET_KEY"))
+        _async_clients[loop] = client
+    return client
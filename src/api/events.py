@@ -0,0 +1,316 @@
+from datetime import datetime, timezone
+import threading
+import time
+
+# Append-only journal of market events (the market_events table). Every trade
+# and settlement is appended with a monotonically increasing sequence number
+# (the row id), so consumers can build projections incrementally: read
+# everything after their last checkpoint, apply it, save the new checkpoint.
+#
+# Event shapes (as returned by read_events and passed to listeners):
+# {"seq": 41, "type": "trade", "poll_id": 1, "user_id": 7, "outcome": True,
+#  "num_shares": -3,          # signed: buys positive, sells negative
+#  "cash_cents": -152,        # market maker's cash: buys positive, sells negative
+#  "price_yes": 48, "price_no": 52,   # after the trade
+#  "created_at": "..."}
+# {"seq": 42, "type": "settlement", "poll_id": 1, "outcome": True,
+#  "payout_cents": 5000, "refund_cents": 120, "created_at": "..."}
+
+TRADE = "trade"
+SETTLEMENT = "settlement"
+
+DEFAULT_BATCH_SIZE = 500
+# Identity values are handed out before commit, so a lower seq can become
+# visible after a higher one. A consumer waits this long for a gap to fill
+# before treating it as a rolled-back insert and moving past it.
+GAP_GRACE_SECONDS = 5
+# Projections that can serialize their state save it to projection_snapshots,
+# so a new process starts from the latest snapshot and replays only the
+# events after it instead of the whole journal. A snapshot is saved once this
+# many events have been applied since the last one, or this long after it.
+SNAPSHOT_MIN_EVENTS = 1000
+SNAPSHOT_INTERVAL_SECONDS = 300
+
+_EVENT_FIELDS = (
+    "type", "poll_id", "user_id", "outcome", "num_shares", "cash_cents",
+    "price_yes", "price_no", "payout_cents", "refund_cents", "created_at",
+)
+
+_listeners = []
+_listeners_lock = threading.Lock()
+
+
+def on_event(listener):
+    """
+    Call listener(event) for every event appended by this process, right
+    after it is journaled. For state that must survive restarts or see other
+    workers' events, use a Consumer instead.
+    """
+    with _listeners_lock:
+        _listeners.append(listener)
+
+
+def _append(supabase, row):
+    row = {**row, "created_at": datetime.now(timezone.utc).isoformat()}
+    result = supabase.table("market_events").insert(row).execute()
+    event = _to_event(result.data[0] if result.data else row)
+
+    with _listeners_lock:
+        listeners = list(_listeners)
+    for listener in listeners:
+        listener(event)
+    return event
+
+
+def append_trade(supabase, poll_id, user_id, outcome_yes, num_shares, cash_cents, price_yes, price_no):
+    """Journal a trade. num_shares and cash_cents are signed as in api.accounting.record_trade."""
+    return _append(supabase, {
+        "type": TRADE,
+        "poll_id": poll_id,
+        "user_id": user_id,
+        "outcome": outcome_yes,
+        "num_shares": int(num_shares),
+        "cash_cents": int(cash_cents),
+        "price_yes": int(price_yes),
+        "price_no": int(price_no),
+    })
+
+
+def append_settlement(supabase, poll_id, outcome, payout_cents, refund_cents):
+    """Journal a poll resolution and what it paid out."""
+    return _append(supabase, {
+        "type": SETTLEMENT,
+        "poll_id": poll_id,
+        "outcome": outcome,
+        "payout_cents": int(payout_cents),
+        "refund_cents": int(refund_cents),
+    })
+
+
+def _to_event(row):
+    event = {"seq": row.get("id")}
+    for field in _EVENT_FIELDS:
+        if row.get(field) is not None:
+            event[field] = row[field]
+    return event
+
+
+def read_events(supabase, after_seq=0, limit=DEFAULT_BATCH_SIZE, poll_id=None, types=None):
+    """
+    Events with seq > after_seq in sequence order, optionally for one poll
+    and/or only some event types.
+    """
+    query = supabase.table("market_events").select("*").gt("id", after_seq)
+    if poll_id is not None:
+        query = query.eq("poll_id", poll_id)
+    if types:
+        query = query.in_("type", list(types))
+    result = query.order("id").limit(limit).execute()
+    return [_to_event(row) for row in result.data or []]
+
+
+def get_checkpoint(supabase, consumer):
+    """Last seq the consumer has fully processed (0 if it never ran)."""
+    result = supabase.table("event_checkpoints").select("seq").eq("consumer", consumer).execute()
+    return int(result.data[0]["seq"]) if result.data else 0
+
+
+def save_checkpoint(supabase, consumer, seq):
+    supabase.table("event_checkpoints").upsert({
+        "consumer": consumer,
+        "seq": int(seq),
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }, on_conflict="consumer").execute()
+
+
+class Consumer:
+    """
+    A named, checkpointed reader of the journal.
+
+    poll() hands every new event to handler(event) in sequence order and then
+    saves a checkpoint. Delivery is at-least-once: if the process dies between
+    handling and checkpointing, the batch is delivered again, so handlers
+    should be idempotent or tolerate replays.
+    """
+
+    def __init__(self, name, handler, types=None, batch_size=DEFAULT_BATCH_SIZE):
+        self.name = name
+        self.handler = handler
+        self.types = types
+        self.batch_size = batch_size
+
+    def load_checkpoint(self, supabase):
+        return get_checkpoint(supabase, self.name)
+
+    def store_checkpoint(self, supabase, seq):
+        save_checkpoint(supabase, self.name, seq)
+
+    def poll(self, supabase):
+        """Process one batch. Returns the number of events handled."""
+        checkpoint = self.load_checkpoint(supabase)
+        # Gaps must be checked across all types, so filter after reading
+        events = read_events(supabase, after_seq=checkpoint, limit=self.batch_size)
+
+        handled = 0
+        last_seq = checkpoint
+        for event in events:
+            if event["seq"] != last_seq + 1 and _is_recent(event):
+                # An earlier insert may still be committing; come back later
+                break
+            if not self.types or event["type"] in self.types:
+                self.handler(event)
+                handled += 1
+            last_seq = event["seq"]
+
+        if last_seq != checkpoint:
+            self.store_checkpoint(supabase, last_seq)
+        return handled
+
+    def run_until_caught_up(self, supabase):
+        """Poll until a batch comes back short. Returns the total handled."""
+        total = 0
+        while True:
+            checkpoint = self.load_checkpoint(supabase)
+            total += self.poll(supabase)
+            if self.load_checkpoint(supabase) - checkpoint < self.batch_size:
+                return total
+
+
+class MemoryConsumer(Consumer):
+    """
+    A Consumer whose checkpoint lives in memory, for projections that each
+    process rebuilds from the journal on start-up.
+    """
+
+    def __init__(self, name, handler, types=None, batch_size=DEFAULT_BATCH_SIZE):
+        super().__init__(name, handler, types=types, batch_size=batch_size)
+        self.seq = 0
+
+    def load_checkpoint(self, supabase):
+        return self.seq
+
+    def store_checkpoint(self, supabase, seq):
+        self.seq = seq
+
+
+def load_snapshot(supabase, name, version):
+    """(seq, state) of a projection's latest snapshot in this format version, or None."""
+    result = (supabase.table("projection_snapshots").select("seq, state")
+              .eq("name", name).eq("version", version).execute())
+    if not result.data:
+        return None
+    return int(result.data[0]["seq"]), result.data[0]["state"]
+
+
+def save_snapshot(supabase, name, version, seq, state):
+    # Two workers may race; an older snapshot winning only means a longer replay
+    supabase.table("projection_snapshots").upsert({
+        "name": name,
+        "version": version,
+        "seq": int(seq),
+        "state": state,
+        "updated_at": datetime.now(timezone.utc).isoformat(),
+    }, on_conflict="name").execute()
+
+
+class Projection:
+    """
+    In-memory state derived from the journal, one copy per process.
+
+    Subclasses set name/types and implement apply(event). The projection
+    catches up with the journal on first use, applies this process's own
+    events as they are appended (register on_event with
+    api.events.on_event), and picks up other workers' events at most every
+    refresh_seconds.
+
+    Subclasses that also set snapshot_version and implement snapshot() and
+    restore(state) start from the latest saved snapshot rather than
+    replaying the whole journal, and save a new one every
+    SNAPSHOT_MIN_EVENTS events or SNAPSHOT_INTERVAL_SECONDS. Bump
+    snapshot_version whenever the state format changes; older snapshots
+    are then ignored.
+    """
+
+    name = None
+    types = None
+    snapshot_version = None
+
+    def __init__(self, refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._consumer = MemoryConsumer(self.name, self.apply, types=self.types)
+        self._refreshed_at = None
+        self._snapshot_checked = False
+        self._snapshot_seq = 0
+        self._snapshot_at = None
+
+    def apply(self, event):
+        raise NotImplementedError
+
+    def snapshot(self):
+        """JSON-serializable copy of the state."""
+        raise NotImplementedError
+
+    def restore(self, state):
+        """Replace the state with one returned by snapshot()."""
+        raise NotImplementedError
+
+    def on_event(self, event):
+        """Apply an event journaled by this process, if it is the next one in sequence."""
+        with self._lock:
+            if event.get("seq") != self._consumer.seq + 1:
+                # Other workers' events come first; the next read catches up
+                self._refreshed_at = None
+                return
+            if not self.types or event["type"] in self.types:
+                self.apply(event)
+            self._consumer.seq = event["seq"]
+
+    def refresh(self, supabase, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._refreshed_at is not None and now - self._refreshed_at < self.refresh_seconds:
+                return
+            if self.snapshot_version is not None and not self._snapshot_checked:
+                self._restore_snapshot(supabase)
+            self._consumer.run_until_caught_up(supabase)
+            self._refreshed_at = now
+            if self.snapshot_version is not None:
+                self._save_snapshot(supabase, now)
+
+    def _restore_snapshot(self, supabase):
+        saved = load_snapshot(supabase, self.name, self.snapshot_version)
+        self._snapshot_checked = True
+        if saved is not None and saved[0] > self._consumer.seq:
+            seq, state = saved
+            self.restore(state)
+            self._consumer.seq = self._snapshot_seq = seq
+
+    def _save_snapshot(self, supabase, now):
+        if self._snapshot_at is None:
+            self._snapshot_at = now
+        behind = self._consumer.seq - self._snapshot_seq
+        if behind <= 0:
+            return
+        if behind < SNAPSHOT_MIN_EVENTS and now - self._snapshot_at < SNAPSHOT_INTERVAL_SECONDS:
+            return
+        save_snapshot(supabase, self.name, self.snapshot_version, self._consumer.seq, self.snapshot())
+        self._snapshot_seq = self._consumer.seq
+        self._snapshot_at = now
+
+
+def event_time(event):
+    """An event's created_at as a Unix timestamp (now, if it has none)."""
+    created_at = event.get("created_at")
+    if not created_at:
+        return time.time()
+    moment = datetime.fromisoformat(str(created_at).replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _is_recent(event):
+    if not event.get("created_at"):
+        return False
+    return time.time() - event_time(event) < GAP_GRACE_SECONDS
@@ -0,0 +1,247 @@
+"""
+Export of a user's whole trade history with running positions and PnL,
+streamed as NDJSON or CSV.
+
+Trades are read in id order in keyset-paginated batches (id > last id
+seen), so each read is an index range scan however deep into the history
+it is, and the response is written as it is read: memory use depends on
+the number of positions the user has held, not on the number of trades.
+
+Positions are valued at average cost: a sale realizes its proceeds minus
+the average cost of the shares sold. After the trades come the positions
+still held at the end, valued at settlement for resolved polls and at the
+current market price otherwise, then a summary record.
+"""
+from flask import request, jsonify, Response
+from datetime import datetime, timezone
+import csv
+import io
+
+from api.database import get_supabase
+from api.serialization import dumps
+from api.amm import quote_trade_cents, settlement_cents, poll_b0
+
+# Trades read per query
+EXPORT_BATCH_SIZE = 1000
+# Polls looked up per query when valuing the final positions
+POLL_BATCH_SIZE = 200
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# CSV columns: every record type's fields, blank where they don't apply
+CSV_COLUMNS = (
+    "record", "trade_id", "timestamp", "poll_id", "side", "num_shares", "cash_cents",
+    "position_shares", "position_cost_cents", "realized_pnl_cents", "total_realized_pnl_cents",
+    "value_cents", "unrealized_pnl_cents", "status", "trades", "total_unrealized_pnl_cents", "error",
+)
+
+
+def _read_trades(supabase, user_id, batch_size):
+    """A user's trades in id order, one keyset-paginated query per batch."""
+    last_id = 0
+    while True:
+        rows = (supabase.table("trades")
+                .select("id, poll_id, outcome, num_shares, share_price, timestamp")
+                .eq("user_id", user_id)
+                .gt("id", last_id)
+                .order("id")
+                .limit(batch_size)
+                .execute()).data or []
+        yield from rows
+        if len(rows) < batch_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def running_positions(trades):
+    """
+    Trade records with the position and realized PnL after each trade.
+    Returns (records, positions): `positions` is {(poll_id, outcome):
+    {"shares", "cost_cents"}}, complete once `records` is exhausted.
+    """
+    positions = {}
+
+    def records():
+        total_realized = 0
+        for trade in trades:
+            key = (trade["poll_id"], trade["outcome"])
+            position = positions.setdefault(key, {"shares": 0, "cost_cents": 0})
+            shares = int(trade["num_shares"])
+            cash = int(trade["share_price"])  # total cents paid (buys) or received (sells)
+
+            realized = 0
+            if shares > 0:
+                position["shares"] += shares
+                position["cost_cents"] += cash
+            else:
+                sold = min(-shares, position["shares"])
+                cost_sold = (position["cost_cents"] * sold // position["shares"]) if position["shares"] else 0
+                realized = cash - cost_sold
+                position["shares"] -= sold
+                position["cost_cents"] -= cost_sold
+            total_realized += realized
+
+            yield {
+                "record": "trade",
+                "trade_id": trade["id"],
+                "timestamp": trade["timestamp"],
+                "poll_id": trade["poll_id"],
+                "side": "Yes" if trade["outcome"] else "No",
+                "num_shares": shares,
+                "cash_cents": -cash if shares > 0 else cash,
+                "position_shares": position["shares"],
+                "position_cost_cents": position["cost_cents"],
+                "realized_pnl_cents": realized,
+                "total_realized_pnl_cents": total_realized,
+            }
+
+    return records(), positions
+
+
+def _value_positions(supabase, positions):
+    """Records for the positions still held, valued now."""
+    held = sorted((key, p) for key, p in positions.items() if p["shares"])
+    poll_ids = sorted({poll_id for (poll_id, _), _ in held})
+    now = datetime.now(timezone.utc).isoformat()
+
+    polls, votes = {}, {}
+    for start in range(0, len(poll_ids), POLL_BATCH_SIZE):
+        chunk = poll_ids[start:start + POLL_BATCH_SIZE]
+        for row in supabase.table("polls").select("id, ends_at, outcome, liquidity_b0").in_("id", chunk).execute().data or []:
+            polls[row["id"]] = row
+        for row in supabase.table("poll_votes").select("poll_id, yes_votes, no_votes").in_("poll_id", chunk).execute().data or []:
+            votes[row["poll_id"]] = row
+
+    for (poll_id, outcome), position in held:
+        poll = polls.get(poll_id, {})
+        ended = bool(poll.get("ends_at")) and poll["ends_at"] <= now
+        if ended and poll.get("outcome") is not None:
+            status = "resolved"
+            value = settlement_cents(position["shares"], poll["outcome"] == outcome)
+        else:
+            status = "ended" if ended else "open"
+            row = votes.get(poll_id, {})
+            quote = quote_trade_cents(row.get("yes_votes", 0), row.get("no_votes", 0), outcome,
+                                      -position["shares"], b0=poll_b0(poll))
+            value = -int(quote["cost_cents"])
+        yield {
+            "record": "position",
+            "poll_id": poll_id,
+            "side": "Yes" if outcome else "No",
+            "position_shares": position["shares"],
+            "position_cost_cents": position["cost_cents"],
+            "value_cents": value,
+            "unrealized_pnl_cents": value - position["cost_cents"],
+            "status": status,
+        }
+
+
+def export_records(supabase, user_id, batch_size=EXPORT_BATCH_SIZE):
+    """Every record of a user's export: trades, final positions, then a summary."""
+    trades, positions = running_positions(_read_trades(supabase, user_id, batch_size))
+    count = 0
+    total_realized = 0
+    for record in trades:
+        count += 1
+        total_realized = record["total_realized_pnl_cents"]
+        yield record
+
+    total_unrealized = 0
+    for record in _value_positions(supabase, positions):
+        total_unrealized += record["unrealized_pnl_cents"]
+        yield record
+
+    yield {
+        "record": "summary",
+        "trades": count,
+        "total_realized_pnl_cents": total_realized,
+        "total_unrealized_pnl_cents": total_unrealized,
+    }
+
+
+def _encode(records, fmt, batch_size, header=True):
+    """Serialized chunks of about batch_size records each."""
+    def chunks():
+        batch = []
+        try:
+            for record in records:
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        except Exception:
+            yield batch  # what was read before the failure
+            raise
+        yield batch
+
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, restval="")
+        if header:
+            writer.writeheader()
+        for batch in chunks():
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    else:
+        for batch in chunks():
+            yield b"".join(dumps(record) + b"\n" for record in batch)
+
+
+def _stream(records, fmt, batch_size):
+    try:
+        yield from _encode(records, fmt, batch_size)
+    except Exception as e:
+        # The status line is long gone; report the failure in-band
+        yield from _encode(iter([{"record": "error", "error": f"Server error: {str(e)}"}]), fmt, 1, header=False)
+
+
+def export_trades():
+    """
+    Stream a user's trade history with running positions and PnL.
+
+    Query parameters:
+    - user_id: Required
+    - format: "ndjson" (default) or "csv"
+
+    Records (one JSON object per line, or one CSV row with a "record" column):
+    {"record": "trade", "trade_id", "timestamp", "poll_id", "side", "num_shares",
+     "cash_cents",                  # negative for buys, positive for sales
+     "position_shares", "position_cost_cents",   # the position after this trade
+     "realized_pnl_cents", "total_realized_pnl_cents"}
+    {"record": "position", "poll_id", "side", "position_shares", "position_cost_cents",
+     "value_cents", "unrealized_pnl_cents", "status": "open" | "ended" | "resolved"}
+    {"record": "summary", "trades", "total_realized_pnl_cents", "total_unrealized_pnl_cents"}
+    A failure after streaming has started ends the export with
+    {"record": "error", "error": "<message>"}.
+    """
+    try:
+        try:
+            user_id = int(request.args.get("user_id", ""))
+        except (ValueError, TypeError):
+            return jsonify({"error": "Invalid or missing user_id"}), 400
+
+        fmt = (request.args.get("format") or "ndjson").lower()
+        if fmt not in FORMATS:
+            return jsonify({"error": "Format must be ndjson or csv"}), 400
+
+        supabase = get_supabase()
+        if not supabase:
+            return jsonify({"error": "Database connection not available"}), 503
+
+        user_result = supabase.table("profiles").select("id").eq("id", user_id).execute()
+        if not user_result.data:
+            return jsonify({"error": "User does not exist"}), 404
+
+        records = export_records(supabase, user_id, EXPORT_BATCH_SIZE)
+        response = Response(_stream(records, fmt, EXPORT_BATCH_SIZE), mimetype=FORMATS[fmt])
+        response.headers["Content-Disposition"] = f'attachment; filename="trades-{user_id}.{fmt}"'
+        response.headers["Cache-Control"] = "private, no-store"
+        return response, 200
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
@@ -1,35 +1,87 @@
-from flask import Flask, request, jsonify, make_response, Response
+from flask import Flask, Blueprint, request, jsonify, make_response, Response
 from datetime import datetime, timezone
 from functools import wraps
+from importlib import import_module
 import sys
 import os
 
 # Add parent directory to path to import database module
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from api.database import get_supabase
 
-from api.auth import login, register, verify_email, verify_token
+# HTTP caching
+from api.versions import conditional, poll_scope, market_scope, POLLS, TAGS, BALANCES
 
-# Import poll functions
-from api.polls import create_poll, get_poll, edit_poll, list_polls, get_poll_stats
-from api.positions import get_positions_endpoint
-from api.userinfo import get_data
+# Request rate limits (per client address unless keyed otherwise)
+from api.ratelimit import rate_limited, authenticated_user
 
-# Import price functions
-from api.prices import get_price
-from api.trade import buy_shares, sell_shares, estimate_cost
+# Fast JSON encoding and response compression
+from api.serialization import FastJSONProvider, compress
 
-# Import tag functions
 
-from api.tags import add_tag_to_poll, get_all_tags, get_tag_by_id
-
-# Import admin functions
-from api.admin import get_unapproved_polls, get_unresolved_polls, approve_poll, update_poll, reject_poll, resolve_poll
-
-#Import leaderboard functions
-from api.leaderboard import get_leaderboard, calculate_total_users
+def _lazy(module, name):
+    """
+    Stand-in for api.<module>.<name> that imports the module on first call.
 
-app = Flask(__name__)
+    Every /api request cold-starts this file, so route modules (and the
+    Supabase client, pricing code and indexes behind them) are only loaded
+    by the requests that use them.
+    """
+    def handler(*args, **kwargs):
+        return getattr(import_module(f"api.{module}"), name)(*args, **kwargs)
+    handler.__name__ = name
+    return handler
+
+
+verify_token = _lazy("auth", "verify_token")
+login = _lazy("auth", "login")
+register = _lazy("auth", "register")
+verify_email = _lazy("auth", "verify_email")
+
+# Poll functions
+create_poll = _lazy("polls", "create_poll")
+get_poll = _lazy("polls", "get_poll")
+edit_poll = _lazy("polls", "edit_poll")
+list_polls = _lazy("polls", "list_polls")
+get_poll_stats = _lazy("polls", "get_poll_stats")
+get_positions_endpoint = _lazy("positions", "get_positions_endpoint")
+get_data = _lazy("userinfo", "get_data")
+get_equity_curve = _lazy("snapshots", "get_equity_curve")
+run_snapshots = _lazy("snapshots", "run_snapshots")
+
+# Price functions
+get_price = _lazy("prices", "get_price")
+get_prices = _lazy("prices", "get_prices")
+_parse_poll_ids = _lazy("prices", "_parse_poll_ids")
+stream_prices = _lazy("stream", "stream_prices")
+get_poll_detail = _lazy("poll_detail", "get_poll_detail")
+get_trending = _lazy("trending", "get_trending")
+search_polls = _lazy("search", "search_polls")
+buy_shares = _lazy("trade", "buy_shares")
+sell_shares = _lazy("trade", "sell_shares")
+export_trades = _lazy("export", "export_trades")
+estimate_cost = _lazy("trade", "estimate_cost")
+
+# Tag functions
+add_tag_to_poll = _lazy("tags", "add_tag_to_poll")
+get_all_tags = _lazy("tags", "get_all_tags")
+get_tag_by_id = _lazy("tags", "get_tag_by_id")
+complete_tags = _lazy("tags", "complete_tags")
+
+# Admin functions
+import_polls_endpoint = _lazy("poll_import", "import_polls_endpoint")
+get_unapproved_polls = _lazy("admin", "get_unapproved_polls")
+get_unresolved_polls = _lazy("admin", "get_unresolved_polls")
+approve_poll = _lazy("admin", "approve_poll")
+update_poll = _lazy("admin", "update_poll")
+reject_poll = _lazy("admin", "reject_poll")
+resolve_poll = _lazy("admin", "resolve_poll")
+get_cache_stats = _lazy("admin", "get_cache_stats")
+
+# Leaderboard functions
+get_leaderboard = _lazy("leaderboard", "get_leaderboard")
+calculate_total_users = _lazy("leaderboard", "calculate_total_users")
+
+routes = Blueprint("routes", __name__)
 
 def protected(handler):
     """
@@ -50,23 +102,36 @@ def protected(handler):
         if tok[0] != token:
             res.set_cookie("sb-access-token", tok[0], expires=tok[2], httponly=True)
             res.set_cookie("sb-refresh-token", tok[1], expires=tok[2], httponly=True)
+            # Never let a shared cache hand these cookies to someone else
+            res.headers["Cache-Control"] = "private, no-store"
         return res, stat
     return wrapper
 
 
-@app.route("/api/auth/login", methods=["POST"])
+def _batch_price_scopes():
+    """Version scopes for every poll in a GET /api/prices request."""
+    scopes = []
+    for poll_id in _parse_poll_ids(request.args.getlist("ids")):
+        scopes += [poll_scope(poll_id), market_scope(poll_id)]
+    return scopes
+
+
+@routes.route("/api/auth/login", methods=["POST"])
+@rate_limited("login", 10, 60)
 def login_route():
     return login()
 
-@app.route("/api/auth/register", methods=["POST"])
+@routes.route("/api/auth/register", methods=["POST"])
+@rate_limited("register", 5, 600)
 def register_route():
     return register()
 
-@app.route("/api/auth/verify", methods=["POST"])
+@routes.route("/api/auth/verify", methods=["POST"])
+@rate_limited("verify", 20, 60)
 def verify_email_route():
     return verify_email()
 
-@app.route("/api/auth/logout", methods=["GET", "POST"])
+@routes.route("/api/auth/logout", methods=["GET", "POST"])
 def logout_route():
     """Logout user by clearing auth cookies."""
     res = make_response()
@@ -76,129 +141,219 @@ def logout_route():
     res.headers.add("Location", "/")
     return res, 303
 
-@app.route("/api/polls", methods=["GET"])
+@routes.route("/api/polls", methods=["GET"])
 @protected
+@conditional(lambda: [POLLS])
 def list_polls_route():
     """List polls with pagination and filters."""
     return list_polls()
 
-@app.route("/api/polls", methods=["POST"])
+@routes.route("/api/polls", methods=["POST"])
 @protected
+@rate_limited("create_poll", 10, 60)
 def create_poll_route():
     """Create a new poll."""
     return create_poll()
 
-@app.route("/api/polls/<poll_id>", methods=["GET"])
+@routes.route("/api/polls/trending", methods=["GET"])
+@protected
+def get_trending_route():
+    """Open polls ranked by recent trading activity."""
+    return get_trending()
+
+@routes.route("/api/polls/search", methods=["GET"])
 @protected
+def search_polls_route():
+    """Full-text search over poll titles, descriptions and tags."""
+    return search_polls()
+
+@routes.route("/api/polls/<poll_id>", methods=["GET"])
+@protected
+@conditional(lambda poll_id: [poll_scope(poll_id)])
 def get_poll_route(poll_id):
     """Retrieve a poll by ID."""
     return get_poll(poll_id)
 
-@app.route("/api/polls/<poll_id>", methods=["PUT"])
+@routes.route("/api/polls/<poll_id>/detail", methods=["GET"])
+@protected
+def get_poll_detail_route(poll_id):
+    """Retrieve a poll with its price, stats and the user's positions."""
+    return get_poll_detail(poll_id)
+
+@routes.route("/api/polls/<poll_id>", methods=["PUT"])
 @protected
 def edit_poll_route(poll_id):
     """Edit a poll."""
     return edit_poll(poll_id)
 
-@app.route("/api/polls/<poll_id>/price", methods=["GET"])
+@routes.route("/api/polls/<poll_id>/price", methods=["GET"])
 @protected
+@conditional(lambda poll_id: [poll_scope(poll_id), market_scope(poll_id)], max_age=5)
 def get_price_route(poll_id):
     """Get current market price for a poll."""
     return get_price(poll_id)
 
-@app.route("/api/polls/<poll_id>/estimate", methods=["POST"])
+@routes.route("/api/polls/<poll_id>/stream", methods=["GET"])
+@protected
+def stream_prices_route(poll_id):
+    """Server-Sent Events stream of price updates for a poll."""
+    return stream_prices(poll_id)
+
+@routes.route("/api/prices", methods=["GET"])
+@protected
+@conditional(lambda: _batch_price_scopes(), max_age=5)
+def get_prices_route():
+    """Get current market prices for several polls at once."""
+    return get_prices()
+
+@routes.route("/api/polls/<poll_id>/estimate", methods=["POST"])
 @protected
 def get_price_estimate_route(poll_id):
     """Get quote for buying / selling"""
     return estimate_cost(poll_id)
 
-@app.route("/api/polls/<poll_id>/stats", methods=["GET"])
+@routes.route("/api/polls/<poll_id>/stats", methods=["GET"])
 @protected
 def get_poll_stats_route(poll_id):
     return get_poll_stats(poll_id)
 
-@app.route("/api/trades/buy", methods=["POST"])
+@routes.route("/api/trades/buy", methods=["POST"])
 @protected
+@rate_limited("trades", 30, 10, key=authenticated_user)
 def buy_shares_route():
     """Purchase shares at current market price."""
     return buy_shares()
 
-@app.route("/api/trades/sell", methods=["POST"])
+@routes.route("/api/trades/sell", methods=["POST"])
 @protected
+@rate_limited("trades", 30, 10, key=authenticated_user)
 def sell_shares_route():
     """Sell shares back to the market."""
     return sell_shares()
 
-@app.route("/api/tags/add", methods=["POST"])
+@routes.route("/api/trades/export", methods=["GET"])
+@protected
+@rate_limited("export", 5, 60)
+def export_trades_route():
+    """Stream a user's trade history with running positions and PnL (NDJSON or CSV)."""
+    return export_trades()
+
+@routes.route("/api/tags/add", methods=["POST"])
 @protected
 def add_tag_route():
     return add_tag_to_poll()
 
-@app.route("/api/tags/all", methods=["GET"])
+@routes.route("/api/tags/all", methods=["GET"])
 @protected
+@conditional(lambda: [TAGS], max_age=60)
 def get_all_tags_route():
     return get_all_tags()
 
-@app.route("/api/tags/id", methods=["POST"])
+@routes.route("/api/tags/complete", methods=["GET"])
+@protected
+@conditional(lambda: [TAGS], max_age=60)
+def complete_tags_route():
+    """Tag name autocomplete."""
+    return complete_tags()
+
+@routes.route("/api/tags/id", methods=["POST"])
 @protected
 def get_tag_by_id_route():
     return get_tag_by_id()
 
-@app.route("/api/positions", methods=["POST"])
+@routes.route("/api/positions", methods=["POST"])
 @protected
 def get_positions_route():
     """Retrieve user positions."""
     return get_positions_endpoint()
 
-@app.route("/api/user", methods=["POST"])
+@routes.route("/api/user", methods=["POST"])
 @protected
 def get_user_info_route():
     """Retrieve user information."""
     return get_data()
 
-@app.route("/api/admin/review/all", methods=["GET"])
+@routes.route("/api/user/equity", methods=["GET"])
+@protected
+def get_equity_curve_route():
+    """A user's equity curve from the periodic portfolio snapshots."""
+    return get_equity_curve()
+
+@routes.route("/api/cron/snapshots", methods=["GET"])
+def run_snapshots_route():
+    """Scheduled by the Vercel cron; authorized with CRON_SECRET rather than a session."""
+    return run_snapshots()
+
+@routes.route("/api/admin/review/all", methods=["GET"])
 @protected
 def get_unapproved_polls_route():
     "Retrieve all unapproved polls"
     return get_unapproved_polls()
 
-@app.route("/api/admin/resolve/all", methods=["GET"])
+@routes.route("/api/admin/resolve/all", methods=["GET"])
 def get_unresolved_polls_route():
     """Retrieve all unresolved polls"""
     return get_unresolved_polls()
 
-@app.route("/api/admin/resolve", methods=["POST"])
+@routes.route("/api/admin/resolve", methods=["POST"])
 def resolve_poll_route():
     """Sets a poll's outcome and pays out users"""
     return resolve_poll()
 
-@app.route("/api/admin/approve", methods=["POST"])
+@routes.route("/api/admin/approve", methods=["POST"])
 @protected
 def approve_poll_route():
     return approve_poll()
 
-@app.route("/api/admin/update", methods=["POST"])
+@routes.route("/api/admin/update", methods=["POST"])
 @protected
 def update_poll_route():
     return update_poll()
 
-@app.route("/api/admin/reject", methods=["POST"])
+@routes.route("/api/admin/reject", methods=["POST"])
 @protected
 def reject_poll_route():
     return reject_poll()
-@app.route("/api/leaderboard", methods=["GET"])
+
+@routes.route("/api/admin/polls/import", methods=["POST"])
 @protected
+def import_polls_route():
+    """Create many polls from JSON or CSV"""
+    return import_polls_endpoint()
+
+@routes.route("/api/admin/cache", methods=["GET"])
+@protected
+def get_cache_stats_route():
+    """Response cache hit ratios"""
+    return get_cache_stats()
+
+@routes.route("/api/leaderboard", methods=["GET"])
+@protected
+@conditional(lambda: [BALANCES], per_user=True)
 def leaderboard_route():
     """Get leaderboard data for frontend."""
     num_users = request.args.get('num_users', default=10)
     return get_leaderboard(num_users)
 
-@app.route("/api/leaderboard/count", methods=["GET"])
+@routes.route("/api/leaderboard/count", methods=["GET"])
 @protected
+@conditional(lambda: [BALANCES], max_age=60)
 def get_user_count_route():
     """Retrieve a count of users"""
     return calculate_total_users()
 
+
+def create_app():
+    """Build the Flask app serving every /api route."""
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    app.after_request(compress)
+    app.register_blueprint(routes)
+    return app
+
+
+app = create_app()
+
 if __name__ == "__main__":
     # Only run the dev server when executing directly; avoid starting it during imports (e.g., serverless)
     app.run(port=5328, debug=True)
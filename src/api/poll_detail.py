@@ -0,0 +1,211 @@
+from flask import request, jsonify, copy_current_request_context
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+import asyncio
+import time
+import sys
+import os
+
+# Add parent directory to path to import database module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from api.database import get_supabase, get_async_supabase
+from api.accounting import summarize_accounting
+from api.amm import poll_b0
+from api.polls import get_poll, get_poll_stats, _flatten_poll
+from api.prices import get_price, _price_payload
+from api.positions import get_positions, get_positions_async
+from api.stats import poll_stats
+
+# Shared pool for the component fetches; each detail request uses up to four workers
+DETAIL_WORKERS = 16
+# A component not done this long after the request submitted it, including
+# any time spent queued behind other requests, is reported as failed instead
+# of holding up the page
+COMPONENT_TIMEOUT_SECONDS = 10
+
+_executor = ThreadPoolExecutor(max_workers=DETAIL_WORKERS, thread_name_prefix="poll-detail")
+
+
+def _run_component(handler, *args):
+    """Call a route handler and unwrap its (response, status) pair."""
+    response, status = handler(*args)
+    return response.get_json(silent=True) or {}, status
+
+
+def get_poll_detail(poll_id):
+    """
+    Everything a poll page needs in one request: the poll (with tags), its
+    current price, its stats and, if user_id is given, that user's positions
+    in the poll. The parts are fetched concurrently, so the request takes as
+    long as the slowest part rather than their sum.
+
+    Query parameters:
+    - user_id: Optional, include this user's positions
+
+    If any part other than the poll itself fails, it is returned as null and
+    the failure is described under "errors"; the poll page can still render.
+
+    Returns:
+    {
+        "poll": { ... },        # as GET /api/polls/<id>
+        "price": { ... },       # as GET /api/polls/<id>/price
+        "stats": { ... },       # as GET /api/polls/<id>/stats
+        "positions": [ ... ],   # as POST /api/positions, or null without user_id
+        "errors": {
+            "<part>": {"status": <int>, "error": "<message>"}
+        }
+    }
+    """
+    try:
+        try:
+            poll_id = int(poll_id)
+        except (ValueError, TypeError):
+            return jsonify({"error": "Poll ID must be a valid integer"}), 400
+
+        user_id = request.args.get("user_id")
+        if user_id is not None:
+            try:
+                user_id = int(user_id)
+            except (ValueError, TypeError):
+                return jsonify({"error": "User ID must be a valid integer"}), 400
+
+        components = {
+            "poll": (get_poll, poll_id),
+            "price": (get_price, poll_id),
+            "stats": (get_poll_stats, poll_id),
+        }
+        if user_id is not None:
+            components["positions"] = (get_positions, user_id, poll_id)
+
+        # Handlers build their responses with jsonify, so each worker needs the request context
+        futures = {
+            name: _executor.submit(copy_current_request_context(_run_component), *call)
+            for name, call in components.items()
+        }
+        # One deadline for the whole request, so parts waited on later don't each get a fresh timeout
+        deadline = time.monotonic() + COMPONENT_TIMEOUT_SECONDS
+
+        outcomes = {}
+        for name, future in futures.items():
+            try:
+                outcomes[name] = future.result(timeout=max(deadline - time.monotonic(), 0))
+            except FutureTimeoutError:
+                # A part still queued is dropped so it doesn't take a worker from the next request
+                future.cancel()
+                outcomes[name] = {"error": "Timed out"}, 504
+            except Exception as e:
+                outcomes[name] = {"error": f"Server error: {str(e)}"}, 500
+
+        body, status = _assemble(outcomes)
+        return jsonify(body), status
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+def _assemble(outcomes):
+    """The detail response from each part's (body, status)."""
+    results = {}
+    errors = {}
+    for name, (body, status) in outcomes.items():
+        if status >= 400:
+            errors[name] = {"status": status, "error": body.get("error", "Unknown error")}
+            results[name] = None
+        else:
+            results[name] = body
+
+    # Without the poll there is no page to render
+    if "poll" in errors:
+        return {"error": errors["poll"]["error"]}, errors["poll"]["status"]
+
+    return {
+        "poll": results["poll"]["poll"],
+        "price": results["price"],
+        "stats": results["stats"],
+        "positions": results["positions"]["positions"] if results.get("positions") else None,
+        "errors": errors
+    }, 200
+
+
+async def _poll_part(supabase, poll_id):
+    result = await supabase.table("polls").select("*, poll_tags(tags(name))").eq("id", poll_id).execute()
+    if not result.data:
+        return {"error": "Poll not found"}, 404
+    return {"poll": _flatten_poll(result.data[0])}, 200
+
+
+async def _price_part(supabase, poll_id):
+    poll_result, votes_result = await asyncio.gather(
+        supabase.table("polls").select("id, outcome, liquidity_b0").eq("id", poll_id).execute(),
+        supabase.table("poll_votes").select("yes_votes, no_votes").eq("poll_id", poll_id).execute(),
+    )
+    if not poll_result.data:
+        return {"error": "Poll not found"}, 404
+    votes = votes_result.data[0] if votes_result.data else {}
+    q = {"YES": votes.get("yes_votes", 0), "NO": votes.get("no_votes", 0)}
+    return _price_payload(poll_id, poll_result.data[0], q), 200
+
+
+async def _stats_part(supabase, poll_id):
+    # The stats projection refreshes through the sync client, usually without a query
+    stats, accounting, poll_result = await asyncio.gather(
+        asyncio.to_thread(lambda: poll_stats(get_supabase(), poll_id)),
+        supabase.table("market_accounting").select("*").eq("poll_id", poll_id).execute(),
+        supabase.table("polls").select("liquidity_b0").eq("id", poll_id).execute(),
+    )
+    b0 = poll_b0(poll_result.data[0] if poll_result.data else None)
+    return {
+        "num_traders": stats["num_traders"],
+        "volume": stats["volume"],
+        "24h_volume": stats["24h_volume"],
+        "market_maker": summarize_accounting(accounting.data[0] if accounting.data else {}, b0=b0),
+    }, 200
+
+
+async def get_poll_detail_async(poll_id, user_id=None):
+    """
+    get_poll_detail for the ASGI app (api.asgi), returning (body, status).
+    The parts are coroutines on the async client rather than thread pool
+    jobs, and the price and stats parts run their own queries concurrently.
+    """
+    try:
+        try:
+            poll_id = int(poll_id)
+        except (ValueError, TypeError):
+            return {"error": "Poll ID must be a valid integer"}, 400
+
+        if user_id is not None:
+            try:
+                user_id = int(user_id)
+            except (ValueError, TypeError):
+                return {"error": "User ID must be a valid integer"}, 400
+
+        supabase = await get_async_supabase()
+        if not supabase:
+            return {"error": "Database connection not available"}, 503
+
+        parts = {
+            "poll": _poll_part(supabase, poll_id),
+            "price": _price_part(supabase, poll_id),
+            "stats": _stats_part(supabase, poll_id),
+        }
+        if user_id is not None:
+            parts["positions"] = get_positions_async(user_id, poll_id)
+
+        results = await asyncio.gather(
+            *(asyncio.wait_for(part, COMPONENT_TIMEOUT_SECONDS) for part in parts.values()),
+            return_exceptions=True,
+        )
+
+        outcomes = {}
+        for name, result in zip(parts, results):
+            if isinstance(result, asyncio.TimeoutError):
+                outcomes[name] = {"error": "Timed out"}, 504
+            elif isinstance(result, Exception):
+                outcomes[name] = {"error": f"Server error: {str(result)}"}, 500
+            else:
+                outcomes[name] = result
+
+        return _assemble(outcomes)
+
+    except Exception as e:
+        return {"error": f"Server error: {str(e)}"}, 500
@@ -0,0 +1,321 @@
+"""
+Bulk poll import, for launching many markets at once (a course's worth of
+exam polls, an event schedule).
+
+Rows are validated in memory with the same rules as create_poll, creators
+and tags are checked with one query each for the whole file, and polls and
+their tag links are inserted in chunks. Every row gets its own result, so
+one bad row doesn't hide the others.
+
+Usage (from src/, with the same .env as the API):
+    python -m api.poll_import polls.csv --dry-run
+    python -m api.poll_import polls.json --public
+
+CSV files have a header row with the create_poll field names; tags are tag
+names separated by ";".
+"""
+from flask import request, jsonify
+from datetime import datetime, timezone
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from api.database import get_supabase
+from api.admin import current_user_is_admin
+from api.polls import validate_poll_fields
+from api.tags import registry as tag_registry
+from api import versions
+
+MAX_IMPORT_ROWS = 1000
+IMPORT_CHUNK_SIZE = 200
+CSV_TAG_SEPARATOR = ";"
+
+_TRUE = ("1", "true", "yes", "y")
+_FALSE = ("", "0", "false", "no", "n")
+
+
+def parse_csv(text):
+    """Rows of a CSV import as dicts shaped like create_poll payloads."""
+    rows = []
+    for record in csv.DictReader(io.StringIO(text)):
+        row = {key.strip(): (value or "").strip() for key, value in record.items() if key}
+        row["tags"] = [t.strip() for t in row.get("tags", "").split(CSV_TAG_SEPARATOR) if t.strip()]
+        for field in ("ends_at", "liquidity_b0", "public"):
+            if not row.get(field):
+                row.pop(field, None)
+        rows.append(row)
+    return rows
+
+
+def parse_json(text):
+    """Rows of a JSON import: a list of polls or {"polls": [...]}."""
+    data = json.loads(text)
+    if isinstance(data, dict):
+        data = data.get("polls")
+    if not isinstance(data, list):
+        raise ValueError('Expected a list of polls or {"polls": [...]}')
+    return data
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in _TRUE:
+        return True
+    if text in _FALSE:
+        return False
+    raise ValueError("Public must be true or false")
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _existing(supabase, table, column, values, select):
+    found = []
+    for chunk in _chunks(sorted(values, key=str), IMPORT_CHUNK_SIZE):
+        result = supabase.table(table).select(select).in_(column, chunk).execute()
+        found += result.data or []
+    return found
+
+
+def import_polls(supabase, rows, dry_run=False, all_or_nothing=False, public=None):
+    """
+    Validate and insert polls.
+
+    rows: create_poll payloads, except that tags may be tag ids (ints) or
+          tag names (strings), and each row may set "public"
+    dry_run: validate only
+    all_or_nothing: insert nothing if any row is invalid
+    public: default for rows that don't set "public" (False: awaiting approval)
+
+    Returns:
+    {
+        "created": <int>,
+        "failed": <int>,
+        "dry_run": <bool>,
+        "results": [
+            {"row": 1, "poll_id": 17},
+            {"row": 2, "errors": ["Creator user does not exist"]},
+            {"row": 3, "valid": true},          # dry runs
+            ...
+        ]
+    }
+    Rows are numbered from 1 in input order.
+    """
+    errors = [[] for _ in rows]
+    polls = [None] * len(rows)
+    tag_refs = [[] for _ in rows]
+
+    # Per-row validation, no queries
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[i].append("Row must be an object")
+            continue
+        try:
+            polls[i] = validate_poll_fields({**row, "tags": None})
+            polls[i]["public"] = _parse_bool(row["public"]) if "public" in row else bool(public)
+        except ValueError as e:
+            errors[i].append(str(e))
+            continue
+        except (AttributeError, TypeError):
+            errors[i].append("Title, description and end time must be strings")
+            continue
+
+        tags = row.get("tags") or []
+        if not isinstance(tags, list):
+            errors[i].append("Tags must be an array")
+            continue
+        for tag in tags:
+            if isinstance(tag, bool) or not isinstance(tag, (int, str)) or (isinstance(tag, str) and not tag.strip()):
+                errors[i].append("Tags must be tag IDs or tag names")
+                break
+            tag_refs[i].append(tag.strip() if isinstance(tag, str) else tag)
+
+    # Set-based existence checks for the whole import
+    valid = [i for i in range(len(rows)) if not errors[i]]
+    creators = {polls[i]["creator"] for i in valid}
+    tag_ids = {ref for i in valid for ref in tag_refs[i] if isinstance(ref, int)}
+    tag_names = {ref for i in valid for ref in tag_refs[i] if isinstance(ref, str)}
+
+    known_creators = {row["id"] for row in _existing(supabase, "profiles", "id", creators, "id")}
+    known_tag_ids = {row["id"] for row in _existing(supabase, "tags", "id", tag_ids, "id")}
+    id_by_name = {row["name"]: row["id"] for row in _existing(supabase, "tags", "name", tag_names, "id, name")}
+
+    for i in valid:
+        if polls[i]["creator"] not in known_creators:
+            errors[i].append("Creator user does not exist")
+        resolved = []
+        for ref in tag_refs[i]:
+            if isinstance(ref, int):
+                if ref in known_tag_ids:
+                    resolved.append(ref)
+                else:
+                    errors[i].append(f"Tag ID {ref} does not exist")
+            elif ref in id_by_name:
+                resolved.append(id_by_name[ref])
+            else:
+                errors[i].append(f"Tag '{ref}' does not exist")
+        polls[i]["tags"] = sorted(set(resolved))
+
+    valid = [i for i in range(len(rows)) if not errors[i]]
+    results = [{"row": i + 1, "errors": errors[i]} if errors[i] else None for i in range(len(rows))]
+
+    if dry_run or (all_or_nothing and len(valid) < len(rows)):
+        for i in valid:
+            results[i] = {"row": i + 1, "valid": True}
+        return {"created": 0, "failed": len(rows) - len(valid), "dry_run": dry_run, "results": results}
+
+    created_at = datetime.now(timezone.utc).isoformat()
+    created = 0
+    links = []
+    for chunk in _chunks(valid, IMPORT_CHUNK_SIZE):
+        payload = []
+        for i in chunk:
+            poll = polls[i]
+            poll_data = {
+                "title": poll["title"],
+                "description": poll["description"],
+                "creator": poll["creator"],
+                "created_at": created_at,
+                "public": poll["public"],
+            }
+            if poll["ends_at"]:
+                poll_data["ends_at"] = poll["ends_at"].isoformat()
+            if poll["liquidity_b0"] is not None:
+                poll_data["liquidity_b0"] = poll["liquidity_b0"]
+            payload.append(poll_data)
+
+        try:
+            inserted = supabase.table("polls").insert(payload).execute().data or []
+            if len(inserted) != len(chunk):
+                raise RuntimeError("Failed to create poll")
+        except Exception as e:
+            for i in chunk:
+                results[i] = {"row": i + 1, "errors": [f"Insert failed: {str(e)}"]}
+            continue
+
+        chunk_links = []
+        for i, poll_row in zip(chunk, inserted):
+            results[i] = {"row": i + 1, "poll_id": poll_row["id"]}
+            chunk_links += [{"poll_id": poll_row["id"], "tag_id": tag_id} for tag_id in polls[i]["tags"]]
+        created += len(chunk)
+
+        if chunk_links:
+            try:
+                linked = supabase.table("poll_tags").insert(chunk_links).execute().data
+                if not linked:
+                    raise RuntimeError("no rows returned")
+                links += linked
+            except Exception:
+                for i in chunk:
+                    if polls[i]["tags"]:
+                        results[i]["warning"] = "Poll created but tags could not be associated"
+
+    if created:
+        versions.bump(versions.POLLS)
+    if links:
+        tag_registry.link(links)
+        versions.bump(versions.TAGS)
+
+    return {"created": created, "failed": len(rows) - created, "dry_run": False, "results": results}
+
+
+def import_polls_endpoint():
+    """
+    Create many polls at once (admins only).
+
+    Send either JSON:
+    {
+        "polls": [{"title": ..., "description": ..., "creator": 1, "tags": ["exams", 4], ...}, ...],
+        "dry_run": false,         // Optional: validate only
+        "all_or_nothing": false,  // Optional: insert nothing if any row is invalid
+        "public": false           // Optional: default for rows without "public"
+    }
+    or a CSV body (Content-Type: text/csv) with the options as query parameters.
+
+    Returns the import report (see import_polls): 201 if any poll was
+    created, 200 for a clean dry run, 400 otherwise.
+    """
+    if not current_user_is_admin():
+        return jsonify({"error": "User does not have permission to access admin functions"}), 403
+
+    try:
+        if request.mimetype == "text/csv":
+            options = request.args
+            try:
+                rows = parse_csv(request.get_data(as_text=True))
+            except csv.Error as e:
+                return jsonify({"error": f"Invalid CSV: {str(e)}"}), 400
+        else:
+            options = request.get_json(silent=True)
+            if not isinstance(options, dict) or not isinstance(options.get("polls"), list):
+                return jsonify({"error": 'Request body must be {"polls": [...]} or a CSV file'}), 400
+            rows = options["polls"]
+
+        if not rows:
+            return jsonify({"error": "No polls to import"}), 400
+        if len(rows) > MAX_IMPORT_ROWS:
+            return jsonify({"error": f"At most {MAX_IMPORT_ROWS} polls per import"}), 400
+
+        try:
+            dry_run = _parse_bool(options.get("dry_run", False))
+            all_or_nothing = _parse_bool(options.get("all_or_nothing", False))
+            public = _parse_bool(options.get("public", False))
+        except ValueError:
+            return jsonify({"error": "dry_run, all_or_nothing and public must be true or false"}), 400
+
+        supabase = get_supabase()
+        if not supabase:
+            return jsonify({"error": "Database connection not available"}), 503
+
+        report = import_polls(supabase, rows, dry_run=dry_run, all_or_nothing=all_or_nothing, public=public)
+
+        if report["created"]:
+            return jsonify(report), 201
+        if dry_run and not report["failed"]:
+            return jsonify(report), 200
+        return jsonify(report), 400
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import polls from a JSON or CSV file.")
+    parser.add_argument("path", help="a .json or .csv file")
+    parser.add_argument("--dry-run", action="store_true", help="validate without inserting")
+    parser.add_argument("--all-or-nothing", action="store_true", help="insert nothing if any row is invalid")
+    parser.add_argument("--public", action="store_true", help="publish rows that don't set public")
+    args = parser.parse_args(argv)
+
+    with open(args.path, encoding="utf-8") as f:
+        text = f.read()
+    rows = parse_csv(text) if args.path.lower().endswith(".csv") else parse_json(text)
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    report = import_polls(get_supabase(), rows, dry_run=args.dry_run,
+                          all_or_nothing=args.all_or_nothing, public=args.public)
+
+    for result in report["results"]:
+        if "errors" in result:
+            print(f"row {result['row']}: " + "; ".join(result["errors"]))
+        elif "warning" in result:
+            print(f"row {result['row']}: poll {result['poll_id']} ({result['warning']})")
+    if args.dry_run:
+        print(f"{len(rows) - report['failed']} valid, {report['failed']} invalid")
+    else:
+        print(f"{report['created']} created, {report['failed']} not created")
+    return 1 if report["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
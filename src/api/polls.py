@@ -1,19 +1,136 @@
-from flask import request, jsonify
-from datetime import datetime, timezone, date
+from flask import request, jsonify, current_app
+from datetime import datetime, timezone, timedelta
+import json
 import sys
 import os
 
 # Add parent directory to path to import database module
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from api.database import get_supabase
-
-# Rate limiting constants
+from api.accounting import get_market_accounting
+from api.stats import poll_stats
+from api.amm import parse_liquidity_b0, poll_b0
+from api.admin import current_user_is_admin
+from api import versions
+from api.cache import response_cache
+from api.ratelimit import rate_limit, too_many_requests
+from api.tags import registry as tag_registry
+from api.serialization import dumps, parse_fields, pick
+
+# Rate limiting constants. The count of the creator's polls in the polls
+# table is authoritative; the in-memory limiter in front of it turns away
+# repeat attempts without a query.
 MAX_POLLS_PER_DAY = 2
+_polls_per_creator = rate_limit("polls_per_creator", MAX_POLLS_PER_DAY, 24 * 3600)
 
 # Pagination constants
 DEFAULT_PAGE_SIZE = 20
 MAX_PAGE_SIZE = 100
 
+# Columns of the polls table
+POLL_COLUMNS = ("id", "title", "description", "created_at", "ends_at", "public",
+                "creator", "outcome", "deleted", "liquidity_b0")
+# What list_polls' fields= may name: columns, the creator's profile, and computed fields
+LIST_POLLS_FIELDS = POLL_COLUMNS + ("profiles", "tags", "has_ended")
+
+# Cached list_polls responses also expire on their own, since has_ended
+# depends on the clock rather than on any write
+LIST_POLLS_CACHE_TTL_SECONDS = 30
+_list_polls_cache = response_cache("list_polls", LIST_POLLS_CACHE_TTL_SECONDS, depends_on=[versions.POLLS, versions.TAGS])
+
+def validate_poll_fields(data):
+    """
+    Validate and normalize the fields of a new poll (see create_poll).
+    Raises ValueError with a message for the client on invalid input.
+
+    Returns:
+    {
+        "title": <str>,
+        "description": <str>,
+        "ends_at": <datetime or None>,
+        "creator": <int>,
+        "tags": [<tag id>, ...] or None,
+        "liquidity_b0": <float or None>
+    }
+    """
+    title = data.get("title", "").strip()
+    description = data.get("description", "").strip()
+    ends_at = data.get("ends_at")
+    creator = data.get("creator")
+    tags = data.get("tags", [])
+
+    # Validate title
+    if not title:
+        raise ValueError("Title is required")
+    if len(title) < 3:
+        raise ValueError("Title must be at least 3 characters long")
+    if len(title) > 200:
+        raise ValueError("Title must not exceed 200 characters")
+
+    # Validate description
+    if not description:
+        raise ValueError("Description is required")
+    if len(description) < 10:
+        raise ValueError("Description must be at least 10 characters long")
+    if len(description) > 1000:
+        raise ValueError("Description must not exceed 1000 characters")
+
+    # Validate ends_at (optional)
+    ends_at_dt = None
+    if ends_at:
+        try:
+            ends_at_dt = datetime.fromisoformat(ends_at.replace("Z", "+00:00"))
+            # Normalize to UTC even if the client sent a local (naive) datetime
+            if ends_at_dt.tzinfo is None:
+                ends_at_dt = ends_at_dt.replace(tzinfo=timezone.utc)
+            else:
+                ends_at_dt = ends_at_dt.astimezone(timezone.utc)
+        except (ValueError, AttributeError):
+            raise ValueError("Invalid end time format. Use ISO 8601 format")
+        # Ensure it's in the future
+        if ends_at_dt <= datetime.now(timezone.utc):
+            raise ValueError("End time must be in the future")
+
+    # Validate creator
+    if not creator:
+        raise ValueError("Creator ID is required")
+
+    try:
+        creator = int(creator)
+    except (ValueError, TypeError):
+        raise ValueError("Creator ID must be a valid integer")
+
+    # Validate tags (optional)
+    if tags is not None:
+        if not isinstance(tags, list):
+            raise ValueError("Tags must be an array")
+
+        # Validate each tag is an integer
+        validated_tags = []
+        for tag in tags:
+            try:
+                tag_id = int(tag)
+                validated_tags.append(tag_id)
+            except (ValueError, TypeError):
+                raise ValueError("All tag IDs must be valid integers")
+
+        tags = validated_tags
+
+    # Validate liquidity (optional)
+    liquidity_b0 = data.get("liquidity_b0")
+    if liquidity_b0 is not None:
+        liquidity_b0 = parse_liquidity_b0(liquidity_b0)
+
+    return {
+        "title": title,
+        "description": description,
+        "ends_at": ends_at_dt,
+        "creator": creator,
+        "tags": tags,
+        "liquidity_b0": liquidity_b0,
+    }
+
+
 def create_poll():
     """
     Create a new poll.
@@ -24,7 +141,8 @@ def create_poll():
         "description": "Poll description",
         "ends_at": "2025-11-15T10:00:00Z",
         "creator": 1,
-        "tags": [1, 2, 3]  // Optional: array of tag IDs
+        "tags": [1, 2, 3],  // Optional: array of tag IDs
+        "liquidity_b0": 5.0  // Optional, admins only: LS-LMSR base liquidity, defaults to api.amm.B0
     }
     """
     try:
@@ -34,73 +152,27 @@ def create_poll():
         if not data:
             return jsonify({"error": "Request body is required"}), 400
 
-        title = data.get("title", "").strip()
-        description = data.get("description", "").strip()
-        ends_at = data.get("ends_at")
-        creator = data.get("creator")
-        tags = data.get("tags", [])
-
-        # Validate title
-        if not title:
-            return jsonify({"error": "Title is required"}), 400
-        if len(title) < 3:
-            return jsonify({"error": "Title must be at least 3 characters long"}), 400
-        if len(title) > 200:
-            return jsonify({"error": "Title must not exceed 200 characters"}), 400
-
-        # Validate description
-        if not description:
-            return jsonify({"error": "Description is required"}), 400
-        if len(description) < 10:
-            return jsonify({"error": "Description must be at least 10 characters long"}), 400
-        if len(description) > 1000:
-            return jsonify({"error": "Description must not exceed 1000 characters"}), 400
-
-        # Validate ends_at (optional)
-        ends_at_dt = None
-        if ends_at:
-            try:
-                ends_at_dt = datetime.fromisoformat(ends_at.replace("Z", "+00:00"))
-                # Normalize to UTC even if the client sent a local (naive) datetime
-                if ends_at_dt.tzinfo is None:
-                    ends_at_dt = ends_at_dt.replace(tzinfo=timezone.utc)
-                else:
-                    ends_at_dt = ends_at_dt.astimezone(timezone.utc)
-                # Ensure it's in the future
-                if ends_at_dt <= datetime.now(timezone.utc):
-                    return jsonify({"error": "End time must be in the future"}), 400
-            except (ValueError, AttributeError):
-                return jsonify({"error": "Invalid end time format. Use ISO 8601 format"}), 400
-
-        # Validate creator
-        if not creator:
-            return jsonify({"error": "Creator ID is required"}), 400
-
         try:
-            creator = int(creator)
-        except (ValueError, TypeError):
-            return jsonify({"error": "Creator ID must be a valid integer"}), 400
-
-        # Validate tags (optional)
-        if tags is not None:
-            if not isinstance(tags, list):
-                return jsonify({"error": "Tags must be an array"}), 400
-
-            # Validate each tag is an integer
-            validated_tags = []
-            for tag in tags:
-                try:
-                    tag_id = int(tag)
-                    validated_tags.append(tag_id)
-                except (ValueError, TypeError):
-                    return jsonify({"error": "All tag IDs must be valid integers"}), 400
+            fields = validate_poll_fields(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-            tags = validated_tags
+        title = fields["title"]
+        description = fields["description"]
+        ends_at_dt = fields["ends_at"]
+        creator = fields["creator"]
+        tags = fields["tags"]
+        liquidity_b0 = fields["liquidity_b0"]
 
         supabase = get_supabase()
         if not supabase:
             return jsonify({"error": "Database connection not available"}), 503
 
+        # The base liquidity bounds how much the market maker can lose on the
+        # poll, so only admins may move it off the default
+        if liquidity_b0 is not None and not current_user_is_admin():
+            return jsonify({"error": "Only admins can set liquidity_b0"}), 403
+
         # Verify creator exists
         # profiles table stores user ids per schema
         user_result = supabase.table("profiles").select("id").eq("id", creator).execute()
@@ -113,18 +185,28 @@ def create_poll():
             if not tags_result.data or len(tags_result.data) != len(tags):
                 return jsonify({"error": "One or more tag IDs do not exist"}), 404
 
-        # Rate limiting check - count polls created today by this user
-        today_start = datetime.combine(date.today(), datetime.min.time()).replace(tzinfo=timezone.utc)
-        today_end = datetime.combine(date.today(), datetime.max.time()).replace(tzinfo=timezone.utc)
-
-        polls_today_result = supabase.table("polls").select("id").eq("creator", creator).gte("created_at", today_start.isoformat()).lte("created_at", today_end.isoformat()).execute()
-
-        polls_created_today = len(polls_today_result.data) if polls_today_result.data else 0
-
-        if polls_created_today >= MAX_POLLS_PER_DAY:
-            return jsonify({
-                "error": f"Rate limit exceeded. Maximum {MAX_POLLS_PER_DAY} polls per day"
-            }), 429
+        # Rate limiting check - polls created by this user in the last day
+        rate_limit_error = f"Rate limit exceeded. Maximum {MAX_POLLS_PER_DAY} polls per day"
+        retry_after = _polls_per_creator.hit(creator)
+        if retry_after:
+            return too_many_requests(retry_after, rate_limit_error)
+
+        day_ago = datetime.now(timezone.utc) - timedelta(days=1)
+        polls_today_result = (supabase.table("polls").select("id, created_at")
+                              .eq("creator", creator)
+                              .gte("created_at", day_ago.isoformat())
+                              .order("created_at")
+                              .limit(MAX_POLLS_PER_DAY)
+                              .execute())
+        polls_today = polls_today_result.data or []
+        if len(polls_today) >= MAX_POLLS_PER_DAY:
+            _polls_per_creator.refund(creator)
+            # Free again a day after the oldest of them
+            oldest = datetime.fromisoformat(str(polls_today[0]["created_at"]).replace("Z", "+00:00"))
+            if oldest.tzinfo is None:
+                oldest = oldest.replace(tzinfo=timezone.utc)
+            retry_after = max(1, int((oldest - day_ago).total_seconds()) + 1)
+            return too_many_requests(retry_after, rate_limit_error)
 
         # Create poll in database
         poll_data = {
@@ -137,13 +219,22 @@ def create_poll():
         if ends_at_dt:
             poll_data["ends_at"] = ends_at_dt.isoformat()
 
-        result = supabase.table("polls").insert(poll_data).execute()
+        if liquidity_b0 is not None:
+            poll_data["liquidity_b0"] = liquidity_b0
+
+        try:
+            result = supabase.table("polls").insert(poll_data).execute()
+        except Exception:
+            _polls_per_creator.refund(creator)
+            raise
 
         if not result.data:
+            _polls_per_creator.refund(creator)
             return jsonify({"error": "Failed to create poll"}), 500
 
         created_poll = result.data[0]
         poll_id = created_poll["id"]
+        versions.bump(versions.POLLS)
 
         # Insert poll-tag associations if tags were provided
         if tags:
@@ -157,6 +248,9 @@ def create_poll():
                     "poll": created_poll
                 }), 201
 
+            tag_registry.link(tags_result.data)
+            versions.bump(versions.TAGS)
+
         return jsonify({
             "message": "Poll created successfully",
             "poll": created_poll
@@ -165,6 +259,80 @@ def create_poll():
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
+def _list_polls_params(args):
+    """
+    Normalize list_polls query parameters, so equivalent requests share a
+    cache entry. Raises ValueError for an invalid creator or tag ID.
+    """
+    try:
+        page = int(args.get('page', 1))
+        if page < 1:
+            page = 1
+    except (ValueError, TypeError):
+        page = 1
+
+    try:
+        page_size = int(args.get('page_size', DEFAULT_PAGE_SIZE))
+        if page_size < 1:
+            page_size = DEFAULT_PAGE_SIZE
+        elif page_size > MAX_PAGE_SIZE:
+            page_size = MAX_PAGE_SIZE
+    except (ValueError, TypeError):
+        page_size = DEFAULT_PAGE_SIZE
+
+    public = args.get('public', 'true').lower()
+    if public not in ('true', 'false'):
+        public = 'all'
+
+    creator = args.get('creator')
+    if creator:
+        try:
+            creator = int(creator)
+        except (ValueError, TypeError):
+            raise ValueError("Invalid creator ID")
+    else:
+        creator = None
+
+    tag = args.get('tag')
+    if tag:
+        try:
+            tag = int(tag)
+        except (ValueError, TypeError):
+            raise ValueError("Invalid tag ID")
+    else:
+        tag = None
+
+    status = (args.get('status') or '').lower()
+    if status not in ('open', 'closed'):
+        status = None
+
+    return {
+        "page": page,
+        "page_size": page_size,
+        "public": public,
+        "creator": creator,
+        "tag": tag,
+        "status": status,
+        "fields": parse_fields(args.get('fields'), LIST_POLLS_FIELDS),
+    }
+
+
+def _list_polls_select(fields, tag_join):
+    """The select() for list_polls: only the requested columns, plus those needed to compute the rest."""
+    if fields is None:
+        if tag_join:
+            return "polls.*, poll_tags!inner(tag_id), profiles!left(username)"
+        return "*, profiles!left(username), poll_tags!left(tag_id)"
+
+    # id for tags, ends_at for has_ended and the status filter
+    columns = ["id", "ends_at"] + [f for f in fields if f in POLL_COLUMNS and f not in ("id", "ends_at")]
+    if tag_join:
+        columns.append("poll_tags!inner(tag_id)")
+    if "profiles" in fields:
+        columns.append("profiles!left(username)")
+    return ", ".join(columns)
+
+
 def list_polls():
     """
     List polls with pagination and optional filters.
@@ -176,124 +344,142 @@ def list_polls():
     - creator: Filter by creator ID
     - tag: Filter by tag ID
     - public: Filter by public status (true/false, default: true for public API)
+    - fields: Comma-separated poll fields to return (default: all), e.g.
+      fields=id,title,ends_at,has_ended; see LIST_POLLS_FIELDS
+
+    Responses are cached per normalized parameters (see api.cache) and
+    invalidated whenever a poll or tag changes.
     """
     try:
-        supabase = get_supabase()
-        if not supabase:
-            return jsonify({"error": "Database connection not available"}), 503
-
-        # Parse pagination parameters
         try:
-            page = int(request.args.get('page', 1))
-            if page < 1:
-                page = 1
-        except (ValueError, TypeError):
-            page = 1
+            params = _list_polls_params(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        try:
-            page_size = int(request.args.get('page_size', DEFAULT_PAGE_SIZE))
-            if page_size < 1:
-                page_size = DEFAULT_PAGE_SIZE
-            elif page_size > MAX_PAGE_SIZE:
-                page_size = MAX_PAGE_SIZE
-        except (ValueError, TypeError):
-            page_size = DEFAULT_PAGE_SIZE
+        key = json.dumps(params, sort_keys=True)
+        body = _list_polls_cache.get_or_compute(key, lambda: dumps(_list_polls_payload(params)).decode())
+        return current_app.response_class(body, mimetype="application/json"), 200
+
+    except ConnectionError as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+def _list_polls_payload(params):
+    """Build the list_polls response body for normalized parameters."""
+    supabase = get_supabase()
+    if not supabase:
+        raise ConnectionError("Database connection not available")
+
+    page = params["page"]
+    page_size = params["page_size"]
+    public_filter = params["public"]
+    creator_id = params["creator"]
+    tag_id = params["tag"]
+
+    # Calculate offset
+    offset = (page - 1) * page_size
+
+    fields = params.get("fields")
 
-        # Calculate offset
-        offset = (page - 1) * page_size
+    # Start building query
+    query = supabase.table("polls").select(_list_polls_select(fields, tag_join=False), count="exact")
 
-        # Start building query
-        query = supabase.table("polls").select("*, profiles!left(username), poll_tags!left(tag_id)", count="exact")
+    # Apply public filter (default to public only)
+    if public_filter == 'true':
+        query = query.eq("public", True)
+    elif public_filter == 'false':
+        query = query.eq("public", False)
+    # If public_filter is anything else, don't filter by public status
 
-        # Apply public filter (default to public only)
-        public_filter = request.args.get('public', 'true').lower()
+    # Apply creator filter
+    if creator_id is not None:
+        query = query.eq("creator", creator_id)
+
+    # Apply tag filter (requires join with poll_tags table)
+    if tag_id is not None:
+        # Use inner join to filter polls by tag
+        query = (supabase.table("polls")
+                .select(_list_polls_select(fields, tag_join=True), count="exact")
+                .eq("poll_tags.tag_id", tag_id))
+
+        # Reapply public filter after join
         if public_filter == 'true':
             query = query.eq("public", True)
         elif public_filter == 'false':
             query = query.eq("public", False)
-        # If public_filter is anything else, don't filter by public status
-
-        # Apply creator filter
-        creator = request.args.get('creator')
-        if creator:
-            try:
-                creator_id = int(creator)
-                query = query.eq("creator", creator_id)
-            except (ValueError, TypeError):
-                return jsonify({"error": "Invalid creator ID"}), 400
 
-        # Apply tag filter (requires join with poll_tags table)
-        tag = request.args.get('tag')
-        if tag:
-            try:
-                tag_id = int(tag)
-                # Use inner join to filter polls by tag
-                query = (supabase.table("polls")
-                        .select("polls.*, poll_tags!inner(tag_id), profiles!left(username)", count="exact")
-                        .eq("poll_tags.tag_id", tag_id))
+        # Reapply creator filter if exists
+        if creator_id is not None:
+            query = query.eq("creator", creator_id)
 
-                # Reapply public filter after join
-                if public_filter == 'true':
-                    query = query.eq("public", True)
-                elif public_filter == 'false':
-                    query = query.eq("public", False)
+    # Execute query with pagination
+    result = query.order("created_at", desc=True).range(offset, offset + page_size - 1).execute()
 
-                # Reapply creator filter if exists
-                if creator:
-                    query = query.eq("creator", creator_id)
+    polls = result.data if result.data else []
+    total_count = result.count if hasattr(result, 'count') and result.count is not None else len(polls)
 
-            except (ValueError, TypeError):
-                return jsonify({"error": "Invalid tag ID"}), 400
-
-        # Execute query with pagination
-        result = query.order("created_at", desc=True).range(offset, offset + page_size - 1).execute()
+    # Add has_ended flag to each poll
+    current_time = datetime.now(timezone.utc)
+    for poll in polls:
+        if poll.get("ends_at"):
+            ends_at = datetime.fromisoformat(poll["ends_at"].replace("Z", "+00:00"))
+            poll["has_ended"] = ends_at <= current_time
+        else:
+            poll["has_ended"] = False
 
-        polls = result.data if result.data else []
-        total_count = result.count if hasattr(result, 'count') and result.count is not None else len(polls)
+    # Attach tag names from the tag registry rather than querying per poll
+    if fields is None or "tags" in fields:
+        tag_registry.sync(supabase)
+        for poll in polls:
+            poll["tags"] = tag_registry.tag_names(poll["id"])
+
+    # Apply status filter after fetching (since it's computed)
+    status_filter = params["status"]
+    if status_filter == 'open':
+        polls = [p for p in polls if not p["has_ended"]]
+    elif status_filter == 'closed':
+        polls = [p for p in polls if p["has_ended"]]
+    if status_filter:
+        # Recalculate total if status filter applied (note: this is approximate)
+        total_count = len(polls)
+
+    total_pages = (total_count + page_size - 1) // page_size
+
+    return {
+        "polls": pick(polls, fields),
+        "pagination": {
+            "page": page,
+            "page_size": page_size,
+            "total": total_count,
+            "total_pages": total_pages
+        }
+    }
 
-        # Add has_ended flag to each poll
+def _set_has_ended(poll):
+    """Add has_ended to a poll row (polls without ends_at never end)."""
+    if poll.get("ends_at"):
+        ends_at = datetime.fromisoformat(poll["ends_at"].replace("Z", "+00:00"))
         current_time = datetime.now(timezone.utc)
-        for poll in polls:
-            if poll.get("ends_at"):
-                ends_at = datetime.fromisoformat(poll["ends_at"].replace("Z", "+00:00"))
-                poll["has_ended"] = ends_at <= current_time
-            else:
-                poll["has_ended"] = False
+        poll["has_ended"] = ends_at <= current_time
+    else:
+        poll["has_ended"] = False
+    return poll
 
-        # Fetch and attach tags for each poll
-        for poll in polls:
-            tags_result = supabase.table("poll_tags").select("tags(name)").eq("poll_id", poll["id"]).execute()
-            tag_names = []
-            if tags_result.data:
-                for tag_wrapper in tags_result.data:
-                    if tag_wrapper.get("tags") and tag_wrapper["tags"].get("name"):
-                        tag_names.append(tag_wrapper["tags"]["name"])
-            poll["tags"] = tag_names
-
-        # Apply status filter after fetching (since it's computed)
-        status_filter = request.args.get('status')
-        if status_filter:
-            if status_filter.lower() == 'open':
-                polls = [p for p in polls if not p["has_ended"]]
-            elif status_filter.lower() == 'closed':
-                polls = [p for p in polls if p["has_ended"]]
-            # Recalculate total if status filter applied (note: this is approximate)
-            total_count = len(polls)
-
-        total_pages = (total_count + page_size - 1) // page_size
 
-        return jsonify({
-            "polls": polls,
-            "pagination": {
-                "page": page,
-                "page_size": page_size,
-                "total": total_count,
-                "total_pages": total_pages
-            }
-        }), 200
+def _flatten_poll(poll_raw):
+    """A polls row selected with poll_tags(tags(name)), as returned by get_poll."""
+    tag_names = [
+        tag_wrapper["tags"]["name"]
+        for tag_wrapper in poll_raw.get("poll_tags", [])
+        if tag_wrapper.get("tags") and tag_wrapper["tags"].get("name")
+    ]
+
+    poll = {k: v for k, v in poll_raw.items() if k != "poll_tags"}
+    poll["tags"] = tag_names
+    return _set_has_ended(poll)
 
-    except Exception as e:
-        return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 def get_poll(poll_id):
     """
@@ -311,27 +497,7 @@ def get_poll(poll_id):
         if not result.data:
             return jsonify({"error": "Poll not found"}), 404
 
-        poll_raw = result.data[0]
-
-        # Flatten the tags
-        tag_names = [
-            tag_wrapper["tags"]["name"]
-            for tag_wrapper in poll_raw.get("poll_tags", [])
-            if tag_wrapper.get("tags") and tag_wrapper["tags"].get("name")
-        ]
-
-        poll = {k: v for k, v in poll_raw.items() if k != "poll_tags"}
-        poll["tags"] = tag_names
-
-        # Check if poll has ended (if ends_at is set)
-        if poll.get("ends_at"):
-            ends_at = datetime.fromisoformat(poll["ends_at"].replace("Z", "+00:00"))
-            current_time = datetime.now(timezone.utc)
-            poll["has_ended"] = ends_at <= current_time
-        else:
-            poll["has_ended"] = False
-
-        return jsonify({"poll": poll}), 200
+        return jsonify({"poll": _flatten_poll(result.data[0])}), 200
 
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
@@ -350,17 +516,7 @@ def get_poll_data(poll_id):
         if not result.data:
             return None
 
-        poll = result.data[0]
-
-        # Check if poll has ended (if ends_at is set)
-        if poll.get("ends_at"):
-            ends_at = datetime.fromisoformat(poll["ends_at"].replace("Z", "+00:00"))
-            current_time = datetime.now(timezone.utc)
-            poll["has_ended"] = ends_at <= current_time
-        else:
-            poll["has_ended"] = False
-
-        return poll
+        return _set_has_ended(result.data[0])
 
     except Exception as e:
         return None
@@ -472,6 +628,7 @@ def edit_poll(poll_id):
             return jsonify({"error": "Failed to update poll"}), 500
 
         updated_poll = result.data[0]
+        versions.bump(versions.POLLS, versions.poll_scope(poll_id))
 
         return jsonify({
             "message": "Poll updated successfully",
@@ -487,7 +644,8 @@ def get_poll_stats(poll_id):
     {
         "num_traders": <int>,
         "volume": <int>,
-        "24h_volume": <int>
+        "24h_volume": <int>,
+        "market_maker": { ... }  # see api.accounting.summarize_accounting
     }"""
     try:
         try:
@@ -499,16 +657,15 @@ def get_poll_stats(poll_id):
         if not supabase:
             return jsonify({"error": "Database connection not available"}), 503
 
-        result = supabase.rpc("get_poll_stats", {"p_poll_id": poll_id}).execute() # Calls a RPC function in supabase
-
-        if not result.data:
-            return jsonify({"error": "Could not connect to database"}), 500
-        
-        stats = result.data[0]  # contains num_traders, volume, 24h_volume
+        stats = poll_stats(supabase, poll_id)  # maintained from the trade journal, see api.stats
+        # The subsidy bound depends on the poll's own base liquidity
+        poll_result = supabase.table("polls").select("liquidity_b0").eq("id", poll_id).execute()
+        b0 = poll_b0(poll_result.data[0] if poll_result.data else None)
         return jsonify({
-            "num_traders": stats["num_traders"] or 0,
-            "volume": stats["volume"] or 0,
-            "24h_volume": stats["24h_volume"] or 0
+            "num_traders": stats["num_traders"],
+            "volume": stats["volume"],
+            "24h_volume": stats["24h_volume"],
+            "market_maker": get_market_accounting(supabase, poll_id, b0=b0)
         }), 200
         
     except Exception as e:
@@ -0,0 +1,131 @@
+"""
+Whole-portfolio valuation for a user: exposure and realized, unrealized
+and lifetime PnL across every position, not just one page of them.
+
+Positions come netted from the user_positions RPC in one query (closed-out
+ones included, since their cost basis is what they realized). The markets
+still held are read in batches, so valuing a portfolio costs a fixed
+handful of queries.
+
+A held position is worth what selling it back would pay now
+(amm.quote_trade_cents), the same value get_positions reports for it, so
+the summary and the position list agree. In all but the thinnest markets
+this is a little below quantity times the displayed price, since selling
+moves the price against the seller.
+
+Summaries are cached per user. A user's trades bump their
+versions.user_scope, which drops only their entry; a resolution bumps
+versions.POLLS, which changes every holder's valuation and drops them all.
+Prices still move with other users' trades, so entries also expire after
+PORTFOLIO_TTL_SECONDS.
+"""
+import json
+from datetime import datetime, timezone
+
+from api import versions
+from api.amm import poll_b0, quote_trade_cents, settlement_cents
+from api.cache import response_cache
+from api.serialization import dumps
+
+PORTFOLIO_TTL_SECONDS = 30
+# Polls read per query when pricing held positions
+POLL_BATCH_SIZE = 200
+
+
+def _user_partition(scope):
+    """The cache partition (user id) a bumped user scope invalidates."""
+    return scope.split(":", 1)[1] if scope.startswith("user:") else None
+
+
+_cache = response_cache("portfolio", PORTFOLIO_TTL_SECONDS, depends_on=[versions.POLLS],
+                        partition_of=_user_partition)
+
+
+def get_portfolio(supabase, user_id):
+    """Cached portfolio_summary for a user."""
+    user_id = int(user_id)
+    return json.loads(_cache.get_or_compute(
+        str(user_id),
+        lambda: dumps(portfolio_summary(supabase, user_id)).decode(),
+        partition=user_id,
+    ))
+
+
+def _market_states(supabase, poll_ids):
+    """({poll_id: polls row}, {poll_id: poll_votes row}) for the given polls."""
+    polls, votes = {}, {}
+    for start in range(0, len(poll_ids), POLL_BATCH_SIZE):
+        chunk = poll_ids[start:start + POLL_BATCH_SIZE]
+        for row in supabase.table("polls").select("id, ends_at, outcome, liquidity_b0").in_("id", chunk).execute().data or []:
+            polls[row["id"]] = row
+        for row in supabase.table("poll_votes").select("poll_id, yes_votes, no_votes").in_("poll_id", chunk).execute().data or []:
+            votes[row["poll_id"]] = row
+    return polls, votes
+
+
+def portfolio_summary(supabase, user_id):
+    """
+    Value every position a user holds or has held.
+
+    Returns (amounts in dollars):
+        {
+            "positions_value": <float>,   # held, unresolved positions at their sell quote
+            "exposure": <float>,          # cost basis of positions in polls still open
+            "unrealized_pnl": <float>,    # held, unresolved positions: value - cost basis
+            "realized_pnl": <float>,      # positions sold back to zero or settled
+            "lifetime_pnl": <float>,      # realized + unrealized
+            "open_positions": <int>       # held, unresolved positions
+        }
+    """
+    result = supabase.rpc("user_positions", {
+        "p_user_id": int(user_id),
+        "p_limit": None,
+        "p_include_closed": True,
+    }).execute()
+    rows = (result.data or {}).get("positions") or []
+
+    held = [row for row in rows if int(row["quantity"]) != 0]
+    polls, votes = _market_states(supabase, sorted({row["poll_id"] for row in held}))
+    now = datetime.now(timezone.utc).isoformat()
+
+    realized = 0
+    settled, unsettled = [], []
+    for row in rows:
+        if int(row["quantity"]) == 0:
+            # Bought and sold back: the net cash is the result
+            realized -= int(row["cost_basis_cents"])
+            continue
+        poll = polls.get(row["poll_id"], {})
+        ended = bool(poll.get("ends_at")) and poll["ends_at"] <= now
+        if ended and poll.get("outcome") is not None:
+            settled.append((row, poll["outcome"]))
+        else:
+            unsettled.append((row, ended))
+
+    for row, outcome in settled:
+        realized += settlement_cents(int(row["quantity"]), row["outcome"] == outcome) - int(row["cost_basis_cents"])
+
+    value = 0
+    unrealized = 0
+    exposure = 0
+    for row, ended in unsettled:
+        quantity = int(row["quantity"])
+        cost_basis = int(row["cost_basis_cents"])
+        market = votes.get(row["poll_id"], {})
+        # What selling the whole position back would pay, as in get_positions
+        quote = quote_trade_cents(market.get("yes_votes", 0), market.get("no_votes", 0), row["outcome"],
+                                  -quantity, b0=poll_b0(polls.get(row["poll_id"])))
+        position_value = -int(quote["cost_cents"])
+        value += position_value
+        unrealized += position_value - cost_basis
+        if not ended:
+            exposure += abs(cost_basis)
+
+    return {
+        "positions_value": value / 100.0,
+        "exposure": exposure / 100.0,
+        "unrealized_pnl": unrealized / 100.0,
+        "realized_pnl": realized / 100.0,
+        "lifetime_pnl": (realized + unrealized) / 100.0,
+        "open_positions": len(unsettled),
+    }
@@ -1,9 +1,10 @@
 from flask import request, jsonify
 from datetime import datetime, timezone, date
-from collections import defaultdict
-from api.database import get_supabase
-from api.amm import quote_and_cost_ls_lmsr, B0
-from api.polls import get_poll_data
+import asyncio
+import base64
+from api.database import get_supabase, get_async_supabase
+from api.amm import _aggregate_positions_bulk, batch_market_prices, quote_trade_cents, settlement_cents, poll_b0, SHARE_PAYOUT_CENTS
+from api.polls import _set_has_ended
 
 # Pagination Constants
 DEFAULT_PAGE_SIZE = 20
@@ -21,7 +22,8 @@ def get_positions_endpoint():
         "poll_id": "<poll_id>",  # Optional
         "status": "open/closed",  # Optional 
         "page_size": <int>,    # Optional, default 20, max 100
-        "page": <int>          # Optional, default 1 
+        "page": <int>,         # Optional, default 1
+        "cursor": "<cursor>"   # Optional, next_cursor of the previous page (overrides page)
     }
 
     Returns:
@@ -36,7 +38,11 @@ def get_positions_endpoint():
                     "current_pnl": <current_pnl>,
                     "open": <open>
                 },
-            ]
+            ],
+            "total": <int>,              # positions across all pages
+            "page": <int>,               # null when paging by cursor
+            "page_size": <int>,
+            "next_cursor": "<cursor>"    # null on the last page
         }
     """
     try:
@@ -52,15 +58,19 @@ def get_positions_endpoint():
 
         page_size = data.get("page_size", DEFAULT_PAGE_SIZE)
         page = data.get("page", 1)
+        cursor = data.get("cursor")
 
-        return get_positions(user_id, poll_id, status)
+        return get_positions(user_id, poll_id, status, page_size, page, cursor)
 
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 
-def get_positions(user_id, poll_id=None, status=None, page_size=DEFAULT_PAGE_SIZE, page=1):
-    """Reusable function to get positions for a user, optionally filtered by poll_id and status
+def get_positions(user_id, poll_id=None, status=None, page_size=DEFAULT_PAGE_SIZE, page=1, cursor=None):
+    """Reusable function to get one page of a user's positions, optionally filtered by poll_id and status
+
+    Trades are netted into positions by the user_positions RPC, so pages hold
+    whole positions and only the page's positions are priced.
     Returns:
         {
             "positions": [
@@ -73,7 +83,11 @@ def get_positions(user_id, poll_id=None, status=None, page_size=DEFAULT_PAGE_SIZ
                     "current_pnl": <current_pnl>,
                     "open": <open>
                 },
-            ]
+            ],
+            "total": <int>,
+            "page": <int>,
+            "page_size": <int>,
+            "next_cursor": "<cursor>"
         }
     """
     try:
@@ -82,27 +96,16 @@ def get_positions(user_id, poll_id=None, status=None, page_size=DEFAULT_PAGE_SIZ
         except (ValueError, TypeError):
             return jsonify({"error": "Invalid or missing user_id"}), 400
 
+        try:
+            after = _decode_cursor(cursor)
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
         supabase = get_supabase()
         if not supabase:
             return jsonify({"error": "Database connection error"}), 503
 
-        try:
-            page_size = int(page_size)
-            if page_size <= 0:
-                page_size = DEFAULT_PAGE_SIZE
-            elif page_size > MAX_PAGE_SIZE:
-                page_size = MAX_PAGE_SIZE
-        except (ValueError, TypeError):
-            page_size = DEFAULT_PAGE_SIZE
-
-        try:
-            page = int(page)
-            if page <= 0:
-                page = 1
-        except (ValueError, TypeError):
-            page = 1
-
-        offset = (page - 1) * page_size
+        page_size, page = _page_params(page_size, page)
 
         # Verify user exists
         user_result = supabase.table("profiles").select("id").eq("id", user_id).execute()
@@ -112,7 +115,6 @@ def get_positions(user_id, poll_id=None, status=None, page_size=DEFAULT_PAGE_SIZ
         now_utc = datetime.now(timezone.utc).isoformat()
 
         if poll_id:
-            # Return all trades on a given poll
             try:
                 poll_id = int(poll_id)
             except (ValueError, TypeError):
@@ -123,135 +125,239 @@ def get_positions(user_id, poll_id=None, status=None, page_size=DEFAULT_PAGE_SIZ
             if not poll_query.data:
                 return jsonify({"error": "Poll does not exist"}), 404
 
-            # Check poll status
-            if not poll_query.data[0]["ends_at"]:
-                is_open = True # Poll does not have end date
-            else:
-                is_open = now_utc < poll_query.data[0]["ends_at"]
-
-            # If we're looking at a specific poll, one of open/closed returns the poll, and the other returns nothing
-            if (status == "open" and not is_open) or (status == "closed" and is_open):
-                return jsonify({"positions": []}), 200
-            else:
-                # Also includes the case where status is not provided
-                result = supabase.table("trades").select("*").eq("user_id", user_id).eq("poll_id", poll_id).order("timestamp", desc=True).range(offset, offset + page_size - 1).execute()
-        else:
-            # No poll_id provided, return all trades filtered by status if provided
-            if status == "open":
-                open_polls = supabase.table("polls").select("id").gt("ends_at", now_utc).execute()
-                open_poll_ids = [poll['id'] for poll in open_polls.data]
-
-                if not open_poll_ids:
-                    return jsonify({"positions": []}), 200
-
-                result = supabase.table("trades").select("*").eq("user_id", user_id).in_("poll_id", open_poll_ids).order("timestamp", desc=True).range(offset, offset + page_size - 1).execute()
-            elif status == "closed":
-                closed_polls = supabase.table("polls").select("id").lt("ends_at", now_utc).execute()
-                closed_poll_ids = [poll['id'] for poll in closed_polls.data]
-
-                if not closed_poll_ids:
-                    return jsonify({"positions": []}), 200
-
-                result = supabase.table("trades").select("*").eq("user_id", user_id).in_("poll_id", closed_poll_ids).order("timestamp", desc=True).range(offset, offset + page_size - 1).execute()
-            else:
-                # Status not provided, return all trades
-                result = supabase.table("trades").select("*").eq("user_id", user_id).order("timestamp", desc=True).range(offset, offset + page_size - 1).execute()
-
-        # Construct positions
-        trades = result.data
-
-        # Fetch all poll titles
-        poll_ids = list({trade["poll_id"] for trade in trades})
-        poll_meta = {}
-        if poll_ids:
-            poll_query = supabase.table("polls").select("id", "title", "ends_at").in_("id", poll_ids).execute()
-            for row in poll_query.data:
-                ends_at = row.get("ends_at")
-                is_open = (ends_at is None) or (now_utc < ends_at)
-                poll_meta[row["id"]] = {
-                    "title": row.get("title", ""),
-                    "open": is_open
-                }
-
-        positions_map = defaultdict(lambda: {"quantity": 0, "cost_basis_cents": 0, "open": True, "result": None})
-
-        for trade in trades:
-            key = (trade["poll_id"], trade["outcome"])
-            quantity = int(trade["num_shares"])  # signed; buys positive, sells negative
-            share_price = trade.get("share_price", 0)  # stored as integer cents total for the trade
-
-            poll = get_poll_data(trade["poll_id"])
-            if not poll:
-                # Could not retrieve poll data, skip this trade
-                continue
-
-            # Aggregate quantity
-            positions_map[key]["quantity"] += quantity
-
-            # cost_basis_cents: buys add cost, sells subtract payout
-            try:
-                sp = int(share_price)
-            except (TypeError, ValueError):
-                sp = 0
-
-            if quantity > 0:
-                positions_map[key]["cost_basis_cents"] += sp
-            else:
-                # quantity < 0 => sold shares, subtract their cost basis
-                positions_map[key]["cost_basis_cents"] -= sp
-
-            positions_map[key]["result"] = poll["outcome"] if poll.get("has_ended") else None
-
-        combined_positions = []
-
-        for (poll_id, side), data in positions_map.items():
-            quantity = data["quantity"]
-            cost_basis_cents = data.get("cost_basis_cents", 0)
-
-            # skip zero-quantity positions
-            if quantity == 0:
-                continue
-
-            # average price per share in dollars (positive)
-            avg_price_dollars = (abs(cost_basis_cents) / abs(quantity) / 100.0) if quantity != 0 else 0.0
-
-            # Quote the market for closing the position now: selling `quantity` shares
-            # We pass -quantity to represent selling the current position
-            position_quote = quote_and_cost_ls_lmsr(poll_id, side, -1 * quantity, B0)
-            curr_price = position_quote.get("price_yes") if side else position_quote.get("price_no")
-
-            # cost returned by quote function is in dollars (cash change for the operation)
-            # value_now_dollars is what you'd receive (positive) from selling the current quantity
-            value_now_dollars = float(-1 * position_quote.get("cost", 0.0))
-            value_now_cents = int(round(value_now_dollars * 100))
-
-            if data.get("result") is not None:
-                # Poll has ended: determine final value based on resolution
-                if side == data["result"]:
-                    value_now_cents = int(quantity * 100)
-                    curr_price = 100
-                else:
-                    # Losing side: pays $0
-                    value_now_cents = 0
-                    curr_price = 0
-
-            # PnL in cents = current value - cost basis
-            pnl_cents = value_now_cents - cost_basis_cents
-
-            combined_positions.append({
-                "poll_id": poll_id,
-                "poll_title": poll_meta.get(poll_id, {}).get("title", True),
-                "side": "Yes" if side else "No",
-                "quantity": quantity,
-                "avg_price": round(avg_price_dollars, 2),
-                "current_price": curr_price,
-                "current_pnl": round(pnl_cents / 100.0, 2),
-                "pct_change": ((curr_price/100.0) - avg_price_dollars) / avg_price_dollars,
-                "value": value_now_cents / 100.0,
-                "open": poll_meta.get(poll_id, {}).get("open", True),
-            })
-
-        return jsonify({"positions": combined_positions}), 200
+        result = supabase.rpc("user_positions", _positions_params(user_id, poll_id, status, page_size, page, after)).execute()
+        body = result.data or {}
+        rows = (body.get("positions") or [])[:page_size]
+
+        # Fetch the page's polls and their market positions, two queries for the whole page
+        poll_ids = list(dict.fromkeys(row["poll_id"] for row in rows))
+        if not poll_ids:
+            return jsonify(_positions_page([], body, page_size, page, after)), 200
+
+        poll_query = supabase.table("polls").select("*").in_("id", poll_ids).execute()
+        polls = {row["id"]: _set_has_ended(row) for row in poll_query.data or []}
+        markets = _aggregate_positions_bulk(poll_ids, client=supabase)
+
+        positions = _price_positions(rows, _poll_meta(poll_query.data, now_utc), polls, markets)
+
+        return jsonify(_positions_page(positions, body, page_size, page, after)), 200
 
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+def _page_params(page_size, page):
+    """Clamp page_size to 1..MAX_PAGE_SIZE and page to >= 1, with defaults for bad values."""
+    try:
+        page_size = int(page_size)
+        if page_size <= 0:
+            page_size = DEFAULT_PAGE_SIZE
+        elif page_size > MAX_PAGE_SIZE:
+            page_size = MAX_PAGE_SIZE
+    except (ValueError, TypeError):
+        page_size = DEFAULT_PAGE_SIZE
+
+    try:
+        page = int(page)
+        if page <= 0:
+            page = 1
+    except (ValueError, TypeError):
+        page = 1
+
+    return page_size, page
+
+
+def _poll_meta(rows, now_utc):
+    """{poll_id: {"title", "open", "b0"}} for polls rows."""
+    poll_meta = {}
+    for row in rows or []:
+        ends_at = row.get("ends_at")
+        is_open = (ends_at is None) or (now_utc < ends_at)
+        poll_meta[row["id"]] = {
+            "title": row.get("title", ""),
+            "open": is_open,
+            "b0": poll_b0(row)
+        }
+    return poll_meta
+
+
+def _encode_cursor(row):
+    """Opaque cursor for the position after `row` in (poll_id, outcome) order."""
+    raw = f"{int(row['poll_id'])}:{int(bool(row['outcome']))}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def _decode_cursor(cursor):
+    """(poll_id, outcome) from _encode_cursor, or None. Raises ValueError for malformed cursors."""
+    if not cursor:
+        return None
+    try:
+        poll_id, outcome = base64.urlsafe_b64decode(str(cursor).encode()).decode().split(":")
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if outcome not in ("0", "1"):
+        raise ValueError("Invalid cursor")
+    return int(poll_id), outcome == "1"
+
+
+def _positions_params(user_id, poll_id, status, page_size, page, after):
+    """user_positions RPC arguments for a page, with one extra row to tell whether another page follows."""
+    return {
+        "p_user_id": user_id,
+        "p_poll_id": poll_id or None,
+        "p_status": status if status in ("open", "closed") else None,
+        "p_after_poll_id": after[0] if after else None,
+        "p_after_outcome": after[1] if after else None,
+        "p_offset": 0 if after else (page - 1) * page_size,
+        "p_limit": page_size + 1,
+    }
+
+
+def _positions_page(positions, body, page_size, page, after):
+    """Response body for a page of priced positions and its user_positions result."""
+    rows = body.get("positions") or []
+    return {
+        "positions": positions,
+        "total": body.get("total", 0),
+        "page": None if after else page,
+        "page_size": page_size,
+        "next_cursor": _encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None,
+    }
+
+
+def _price_positions(rows, poll_meta, polls, markets):
+    """
+    Value netted positions at current prices.
+
+    rows: [{"poll_id", "outcome", "quantity", "cost_basis_cents"}], as returned
+          by the user_positions RPC; output keeps their order
+    poll_meta: see _poll_meta
+    polls: {poll_id: poll row with has_ended}; positions on other polls are skipped
+    markets: {poll_id: {"YES": q_yes, "NO": q_no}}, as _aggregate_positions_bulk
+    """
+    poll_ids = [poll_id for poll_id in dict.fromkeys(row["poll_id"] for row in rows) if poll_id in polls]
+    prices = dict(zip(poll_ids, batch_market_prices(
+        [markets.get(poll_id, {}).get("YES", 0) for poll_id in poll_ids],
+        [markets.get(poll_id, {}).get("NO", 0) for poll_id in poll_ids],
+        [poll_b0(poll_meta.get(poll_id)) for poll_id in poll_ids],
+    ))) if poll_ids else {}
+
+    combined_positions = []
+
+    for row in rows:
+        poll_id, side = row["poll_id"], row["outcome"]
+        quantity = int(row["quantity"])
+        cost_basis_cents = int(row.get("cost_basis_cents") or 0)
+
+        poll = polls.get(poll_id)
+        if not poll:
+            # Could not retrieve poll data, skip this position
+            continue
+
+        # skip zero-quantity positions
+        if quantity == 0:
+            continue
+
+        result = poll["outcome"] if poll.get("has_ended") else None
+
+        # average price per share in dollars (positive)
+        avg_price_dollars = (abs(cost_basis_cents) / abs(quantity) / 100.0) if quantity != 0 else 0.0
+
+        price_yes, price_no = prices[poll_id]
+        curr_price = price_yes if side else price_no
+
+        # Quote the market for closing the position now: selling `quantity` shares.
+        # cost_cents is signed cash for the operation (negative = received), so
+        # value_now_cents is what you'd receive from selling the current quantity
+        market = markets.get(poll_id, {})
+        position_quote = quote_trade_cents(market.get("YES", 0), market.get("NO", 0), side, -1 * quantity,
+                                           b0=poll_b0(poll_meta.get(poll_id)))
+        value_now_cents = -int(position_quote["cost_cents"])
+
+        if result is not None:
+            # Poll has ended: winning side pays out per share, losing side pays $0
+            won = side == result
+            value_now_cents = settlement_cents(quantity, won)
+            curr_price = SHARE_PAYOUT_CENTS if won else 0
+
+        # PnL in cents = current value - cost basis
+        pnl_cents = value_now_cents - cost_basis_cents
+
+        combined_positions.append({
+            "poll_id": poll_id,
+            "poll_title": poll_meta.get(poll_id, {}).get("title", True),
+            "side": "Yes" if side else "No",
+            "quantity": quantity,
+            "avg_price": round(avg_price_dollars, 2),
+            "current_price": curr_price,
+            "current_pnl": round(pnl_cents / 100.0, 2),
+            "pct_change": ((curr_price/100.0) - avg_price_dollars) / avg_price_dollars,
+            "value": value_now_cents / 100.0,
+            "open": poll_meta.get(poll_id, {}).get("open", True),
+        })
+
+    return combined_positions
+
+
+async def get_positions_async(user_id, poll_id=None, status=None, page_size=DEFAULT_PAGE_SIZE, page=1, cursor=None):
+    """
+    get_positions for the ASGI app (api.asgi), returning (body, status).
+
+    The user and poll checks run alongside the positions query, and the
+    page's polls and their market positions are then fetched together (two
+    queries for the whole page instead of two per poll).
+    """
+    try:
+        try:
+            user_id = int(user_id)
+        except (ValueError, TypeError):
+            return {"error": "Invalid or missing user_id"}, 400
+
+        if poll_id:
+            try:
+                poll_id = int(poll_id)
+            except (ValueError, TypeError):
+                return {"error": "Invalid market_id"}, 400
+
+        try:
+            after = _decode_cursor(cursor)
+        except ValueError:
+            return {"error": "Invalid cursor"}, 400
+
+        supabase = await get_async_supabase()
+        if not supabase:
+            return {"error": "Database connection error"}, 503
+
+        page_size, page = _page_params(page_size, page)
+        now_utc = datetime.now(timezone.utc).isoformat()
+
+        queries = [
+            supabase.table("profiles").select("id").eq("id", user_id).execute(),
+            supabase.rpc("user_positions", _positions_params(user_id, poll_id, status, page_size, page, after)).execute(),
+        ]
+        if poll_id:
+            queries.append(supabase.table("polls").select("id").eq("id", poll_id).execute())
+        user_result, result, *poll_check = await asyncio.gather(*queries)
+        if not user_result.data:
+            return {"error": "User does not exist"}, 404
+        if poll_check and not poll_check[0].data:
+            return {"error": "Poll does not exist"}, 404
+
+        body = result.data or {}
+        rows = (body.get("positions") or [])[:page_size]
+        poll_ids = list(dict.fromkeys(row["poll_id"] for row in rows))
+        if not poll_ids:
+            return _positions_page([], body, page_size, page, after), 200
+
+        poll_result, votes_result = await asyncio.gather(
+            supabase.table("polls").select("*").in_("id", poll_ids).execute(),
+            supabase.table("poll_votes").select("poll_id, yes_votes, no_votes").in_("poll_id", poll_ids).execute(),
+        )
+        polls = {row["id"]: _set_has_ended(row) for row in poll_result.data or []}
+        markets = {row["poll_id"]: {"YES": row["yes_votes"], "NO": row["no_votes"]} for row in votes_result.data or []}
+
+        positions = _price_positions(rows, _poll_meta(poll_result.data, now_utc), polls, markets)
+        return _positions_page(positions, body, page_size, page, after), 200
+
+    except Exception as e:
+        return {"error": f"Server error: {str(e)}"}, 500
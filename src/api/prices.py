@@ -8,7 +8,48 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")
 from api.database import get_supabase
 
 # Import AMM functions
-from api.amm import _aggregate_positions, _compute_b_ls_lmsr, _lmsr_prices, B0
+from api.amm import (
+    _aggregate_positions,
+    _aggregate_positions_bulk,
+    _compute_b_ls_lmsr,
+    _lmsr_probability,
+    _probability_to_cents,
+    batch_probabilities,
+    poll_b0,
+)
+
+# Most polls a single batch price request may ask for
+MAX_BATCH_PRICE_IDS = 100
+
+
+def _price_payload(poll_id, poll, q):
+    """get_price's response for a polls row and its {"YES": q_yes, "NO": q_no}."""
+    q_yes = float(q.get("YES", 0))
+    q_no = float(q.get("NO", 0))
+
+    # Compute LS-LMSR liquidity parameter
+    b = _compute_b_ls_lmsr(q_yes, q_no, b0=poll_b0(poll))
+
+    # Get current prices
+    if poll.get("outcome") is True:
+        prob_yes = 1.0
+    elif poll.get("outcome") is False:
+        prob_yes = 0.0
+    else:
+        prob_yes = _lmsr_probability(q_yes, q_no, b)
+    price_yes, price_no = _probability_to_cents(prob_yes)
+    # Return price information as integer cents
+    return {
+        "poll_id": poll_id,
+        "price_yes": price_yes,
+        "price_no": price_no,
+        "prob_yes": prob_yes,
+        "prob_no": 1.0 - prob_yes,
+        "b": int(round(b)),
+        "q_yes": int(q_yes),
+        "q_no": int(q_no),
+        "timestamp": datetime.now(timezone.utc).isoformat()
+    }
 
 
 def get_price(poll_id):
@@ -21,8 +62,10 @@ def get_price(poll_id):
     Returns:
     {
         "poll_id": 1,
-        "price_yes": 0.52,
-        "price_no": 0.48,
+        "price_yes": 52,
+        "price_no": 48,
+        "prob_yes": 0.5213,
+        "prob_no": 0.4787,
         "b": 10.5,
         "q_yes": 15,
         "q_no": 8,
@@ -41,7 +84,7 @@ def get_price(poll_id):
             return jsonify({"error": "Database connection not available"}), 503
         
         # Verify poll exists
-        poll_result = supabase.table("polls").select("id, outcome").eq("id", poll_id).execute()
+        poll_result = supabase.table("polls").select("id, outcome, liquidity_b0").eq("id", poll_id).execute()
         if not poll_result.data:
             return jsonify({"error": "Poll not found"}), 404
         
@@ -55,31 +98,115 @@ def get_price(poll_id):
         
         # Get current positions
         q = _aggregate_positions(poll_id, client=supabase)
-        q_yes = float(q.get("YES", 0))
-        q_no = float(q.get("NO", 0))
-        
-        # Compute LS-LMSR liquidity parameter
-        b = _compute_b_ls_lmsr(q_yes, q_no, b0=B0)
+        return jsonify(_price_payload(poll_id, poll_result.data[0], q)), 200
         
-        # Get current prices
-        if poll_result.data[0].get("outcome") is True:
-            price_yes = 100
-            price_no = 0
-        elif poll_result.data[0].get("outcome") is False:
-            price_yes = 0
-            price_no = 100
-        else:
-            price_yes, price_no = _lmsr_prices(q_yes, q_no, b)
-        # Return price information as integer cents
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+def _parse_poll_ids(raw_values):
+    """
+    Poll ids from ?ids=1,2,3 (or repeated ?ids=), de-duplicated in request order.
+    Raises ValueError on anything that isn't a positive integer.
+    """
+    poll_ids = []
+    seen = set()
+    for raw in raw_values:
+        for part in raw.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                poll_id = int(part)
+            except ValueError:
+                raise ValueError("Poll IDs must be valid integers")
+            if poll_id <= 0:
+                raise ValueError("Poll IDs must be positive")
+            if poll_id not in seen:
+                seen.add(poll_id)
+                poll_ids.append(poll_id)
+    return poll_ids
+
+
+def get_prices():
+    """
+    Get current market prices for many polls in one request.
+
+    Query parameters:
+    - ids: comma-separated poll IDs (at most MAX_BATCH_PRICE_IDS)
+
+    Returns:
+    {
+        "prices": [
+            {
+                "poll_id": 1,
+                "price_yes": 52,
+                "price_no": 48,
+                "prob_yes": 0.5213,
+                "prob_no": 0.4787,
+                "b": 10.5,
+                "q_yes": 15,
+                "q_no": 8,
+                "outcome": null
+            }
+        ],
+        "missing": [7],  # requested IDs with no poll
+        "timestamp": "2025-11-18T10:00:00Z"
+    }
+    """
+    try:
+        try:
+            poll_ids = _parse_poll_ids(request.args.getlist("ids"))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        if not poll_ids:
+            return jsonify({"error": "At least one poll ID is required"}), 400
+        if len(poll_ids) > MAX_BATCH_PRICE_IDS:
+            return jsonify({"error": f"At most {MAX_BATCH_PRICE_IDS} poll IDs may be requested at once"}), 400
+
+        supabase = get_supabase()
+        if not supabase:
+            return jsonify({"error": "Database connection not available"}), 503
+
+        poll_result = supabase.table("polls").select("id, outcome, liquidity_b0").in_("id", poll_ids).execute()
+        polls = {poll["id"]: poll for poll in poll_result.data or []}
+        found = [poll_id for poll_id in poll_ids if poll_id in polls]
+        positions = _aggregate_positions_bulk(found, client=supabase)
+
+        q_yes = [float(positions[poll_id]["YES"]) for poll_id in found]
+        q_no = [float(positions[poll_id]["NO"]) for poll_id in found]
+        b0s = [poll_b0(polls[poll_id]) for poll_id in found]
+        probs = batch_probabilities(q_yes, q_no, b0s) if found else []
+
+        prices = []
+        for i, poll_id in enumerate(found):
+            outcome = polls[poll_id].get("outcome")
+            # Resolved polls are priced at their outcome, like get_price
+            if outcome is True:
+                prob_yes = 1.0
+            elif outcome is False:
+                prob_yes = 0.0
+            else:
+                prob_yes = float(probs[i])
+            price_yes, price_no = _probability_to_cents(prob_yes)
+            prices.append({
+                "poll_id": poll_id,
+                "price_yes": price_yes,
+                "price_no": price_no,
+                "prob_yes": prob_yes,
+                "prob_no": 1.0 - prob_yes,
+                "b": int(round(_compute_b_ls_lmsr(q_yes[i], q_no[i], b0=b0s[i]))),
+                "q_yes": int(q_yes[i]),
+                "q_no": int(q_no[i]),
+                "outcome": outcome,
+            })
+
         return jsonify({
-            "poll_id": poll_id,
-            "price_yes": price_yes,
-            "price_no": price_no,
-            "b": int(round(b)),
-            "q_yes": int(q_yes),
-            "q_no": int(q_no),
+            "prices": prices,
+            "missing": [poll_id for poll_id in poll_ids if poll_id not in polls],
             "timestamp": datetime.now(timezone.utc).isoformat()
         }), 200
-        
+
     except Exception as e:
         return jsonify({"error": f"Server error: {str(e)}"}), 500
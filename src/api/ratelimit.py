@@ -0,0 +1,230 @@
+from flask import request, jsonify
+from functools import wraps
+import math
+import os
+import threading
+import time
+
+try:
+    import redis
+except ImportError:  # the shared store is optional
+    redis = None
+
+# Request rate limits enforced without touching the database.
+#
+# Each limit is a sliding window counter: hits are counted in fixed windows,
+# and a request is allowed while
+#     previous window's count * (share of it still inside the sliding window)
+#     + current window's count
+# stays within the limit. That needs two counters per key, whatever the
+# limit, and never lets through more than the limit in any window-long span
+# by much (it assumes the previous window's hits were evenly spread).
+#
+# Counters live in this process unless RATE_LIMIT_URL points at a redis://
+# server (and the redis package is installed), in which case all workers
+# share them. A shared store that is unreachable lets requests through
+# rather than taking the API down with it.
+RATE_LIMIT_URL_ENV = "RATE_LIMIT_URL"
+# Proxies in front of the API that append to X-Forwarded-For. The client's
+# address is the entry the outermost of them added, counted from the right;
+# anything further left was sent by the client and can't be trusted. 0
+# ignores the header. Vercel's edge is the one proxy by default.
+TRUSTED_PROXY_HOPS_ENV = "TRUSTED_PROXY_HOPS"
+DEFAULT_TRUSTED_PROXY_HOPS = 1
+# The in-process store drops expired counters once it holds this many
+MAX_MEMORY_KEYS = 100_000
+
+
+class MemoryStore:
+    """In-process counters with expiry."""
+
+    def __init__(self):
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def incr(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            count, expires_at = self._counters.get(key, (0, 0))
+            if expires_at <= now:
+                count = 0
+            self._counters[key] = (count + 1, now + ttl)
+            if len(self._counters) > MAX_MEMORY_KEYS:
+                self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+            return count + 1
+
+    def decr(self, key):
+        with self._lock:
+            if key in self._counters:
+                count, expires_at = self._counters[key]
+                self._counters[key] = (max(count - 1, 0), expires_at)
+
+    def get(self, key):
+        with self._lock:
+            count, expires_at = self._counters.get(key, (0, 0))
+            return count if expires_at > time.monotonic() else 0
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+
+
+class RedisStore:
+    """Counters on a shared key-value server."""
+
+    def __init__(self, url):
+        self._client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+
+    def incr(self, key, ttl):
+        pipe = self._client.pipeline()
+        pipe.incr(f"ratelimit:{key}")
+        pipe.expire(f"ratelimit:{key}", max(int(math.ceil(ttl)), 1))
+        return pipe.execute()[0]
+
+    def decr(self, key):
+        self._client.decr(f"ratelimit:{key}")
+
+    def get(self, key):
+        return int(self._client.get(f"ratelimit:{key}") or 0)
+
+    def clear(self):
+        for key in self._client.scan_iter("ratelimit:*"):
+            self._client.delete(key)
+
+
+def default_store():
+    url = os.getenv(RATE_LIMIT_URL_ENV)
+    if url and redis is not None:
+        return RedisStore(url)
+    return MemoryStore()
+
+
+class RateLimit:
+    """At most `limit` hits per key in any `window_seconds`-long span."""
+
+    def __init__(self, name, limit, window_seconds, store=None):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.store = store if store is not None else default_store()
+
+    def _keys(self, key, now):
+        window = int(now // self.window_seconds)
+        return (f"{self.name}:{key}:{window}", f"{self.name}:{key}:{window - 1}",
+                (now % self.window_seconds) / self.window_seconds)
+
+    def hit(self, key):
+        """
+        Count a hit for key. Returns 0 if it is allowed, otherwise the number
+        of seconds to wait before retrying (and the hit is not counted).
+        """
+        now = time.time()
+        current_key, previous_key, elapsed = self._keys(key, now)
+        try:
+            # Count first and take it back if over, so concurrent hits can't
+            # all squeeze through the last free slot
+            current = self.store.incr(current_key, 2 * self.window_seconds)
+            previous = self.store.get(previous_key)
+        except Exception:
+            return 0
+
+        if previous * (1 - elapsed) + current <= self.limit:
+            return 0
+
+        try:
+            self.store.decr(current_key)
+        except Exception:
+            pass
+        if current > self.limit:
+            # The current window alone is full: wait for it to end
+            return self.window_seconds * (1 - elapsed)
+        # Wait until enough of the previous window has slid out
+        needed = (previous * (1 - elapsed) + current - self.limit) / previous
+        return max(needed * self.window_seconds, 1)
+
+    def refund(self, key):
+        """Take back a hit, e.g. when the request it allowed failed."""
+        current_key, _, _ = self._keys(key, time.time())
+        try:
+            self.store.decr(current_key)
+        except Exception:
+            pass
+
+    def reset(self):
+        self.store.clear()
+
+
+_limits = {}
+
+
+def rate_limit(name, limit, window_seconds):
+    """Create (once) and register a named limit."""
+    if name not in _limits:
+        _limits[name] = RateLimit(name, limit, window_seconds)
+    return _limits[name]
+
+
+def reset_all():
+    """Forget every counter (tests, or after changing limits)."""
+    for limit in _limits.values():
+        limit.reset()
+
+
+def _trusted_proxy_hops():
+    try:
+        return max(int(os.getenv(TRUSTED_PROXY_HOPS_ENV, DEFAULT_TRUSTED_PROXY_HOPS)), 0)
+    except ValueError:
+        return DEFAULT_TRUSTED_PROXY_HOPS
+
+
+def client_ip():
+    """The client's address, as seen by the outermost trusted proxy if there is one."""
+    hops = _trusted_proxy_hops()
+    forwarded = [hop.strip() for hop in request.headers.get("X-Forwarded-For", "").split(",") if hop.strip()]
+    if hops and forwarded:
+        return forwarded[-min(hops, len(forwarded))]
+    return request.remote_addr or "unknown"
+
+
+def authenticated_user():
+    """
+    Key function for @protected routes: the signed-in user (the subject of
+    the access token), falling back to the client's address.
+
+    The token's signature isn't checked again here; @protected has already
+    verified it before the limit is applied.
+    """
+    import jwt
+
+    try:
+        claims = jwt.decode(request.cookies.get("sb-access-token", ""), options={"verify_signature": False})
+    except jwt.PyJWTError:
+        claims = {}
+    subject = claims.get("sub")
+    return f"user={subject}" if subject else f"ip={client_ip()}"
+
+
+def too_many_requests(retry_after, message="Rate limit exceeded. Try again later"):
+    res = jsonify({"error": message, "retry_after": int(math.ceil(retry_after))})
+    res.headers["Retry-After"] = str(int(math.ceil(retry_after)))
+    return res, 429
+
+
+def rate_limited(name, limit, window_seconds, key=client_ip):
+    """
+    Decorator rejecting requests over `limit` per `window_seconds` with 429.
+
+    key: function returning what to count requests by (default: the
+         client's address)
+    """
+    limiter = rate_limit(name, limit, window_seconds)
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            retry_after = limiter.hit(key())
+            if retry_after:
+                return too_many_requests(retry_after)
+            return handler(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,405 @@
+from flask import request, jsonify
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+import heapq
+import math
+import re
+import threading
+import time
+
+from api.database import get_supabase
+from api.polls import _list_polls_params
+from api.serialization import pick
+from api import versions
+
+# Full-text poll search over an in-memory inverted index of titles,
+# descriptions and tag names, ranked with BM25.
+#
+# The index is built from the polls table on the first search. Writes in this
+# process keep it current through api.versions bumps: a changed poll is
+# re-read on the next search, and a POLLS bump (poll created) makes the next
+# search pick up polls newer than the newest one read. Other workers'
+# changes arrive with the same periodic checks, and the whole index is rebuilt
+# every SEARCH_REBUILD_SECONDS to catch edits made elsewhere. Rebuilds build a
+# new index while searches keep using the old one, then swap it in.
+
+SEARCH_REFRESH_SECONDS = 30
+SEARCH_REBUILD_SECONDS = 600
+# Checks for new polls also read again the ids this far below the newest one
+# read, since ids are handed out before commit and rows can land out of order
+SEARCH_ID_WINDOW = 100
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Term frequency multiplier per field
+FIELD_WEIGHTS = {"title": 3, "tags": 2, "description": 1}
+# The last query word also matches longer words starting with it
+# ("elec" -> "election", "electric"), up to this many of them
+MAX_PREFIX_EXPANSIONS = 64
+
+MAX_QUERY_LENGTH = 200
+_LOAD_CHUNK = 1000
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return _TOKEN.findall((text or "").lower())
+
+
+def _tag_names(row):
+    return [
+        tag_wrapper["tags"]["name"]
+        for tag_wrapper in row.get("poll_tags") or []
+        if tag_wrapper.get("tags") and tag_wrapper["tags"].get("name")
+    ]
+
+
+def _tag_ids(row):
+    return {
+        tag_wrapper["tags"]["id"]
+        for tag_wrapper in row.get("poll_tags") or []
+        if tag_wrapper.get("tags") and tag_wrapper["tags"].get("id") is not None
+    }
+
+
+class SearchIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}   # term -> {poll_id: weighted term frequency}
+        self._terms = []      # sorted, for prefix lookups
+        self._lengths = {}    # poll_id -> weighted document length
+        self._total_length = 0
+        self._docs = {}       # poll_id -> poll (without poll_tags) plus "_tag_ids"
+        # term -> {poll_id: BM25 score}; any change to the index clears it,
+        # since scores depend on the document count and average length
+        self._impacts = {}
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, row):
+        """Index (or re-index) one polls row selected with poll_tags(tags(id, name))."""
+        with self._lock:
+            self.remove(row["id"])
+            self._impacts.clear()
+            if row.get("deleted"):
+                return
+
+            frequencies = {}
+            fields = {"title": row.get("title"), "description": row.get("description"),
+                      "tags": " ".join(_tag_names(row))}
+            for field, text in fields.items():
+                for term in tokenize(text):
+                    frequencies[term] = frequencies.get(term, 0) + FIELD_WEIGHTS[field]
+
+            poll_id = row["id"]
+            for term, frequency in frequencies.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    insort(self._terms, term)
+                postings[poll_id] = frequency
+
+            length = sum(frequencies.values())
+            self._lengths[poll_id] = length
+            self._total_length += length
+            doc = {k: v for k, v in row.items() if k != "poll_tags"}
+            doc["tags"] = _tag_names(row)
+            doc["_tag_ids"] = _tag_ids(row)
+            self._docs[poll_id] = doc
+
+    def remove(self, poll_id):
+        with self._lock:
+            if poll_id not in self._docs:
+                return
+            doc = self._docs.pop(poll_id)
+            self._impacts.clear()
+            self._total_length -= self._lengths.pop(poll_id)
+            terms = set(tokenize(doc.get("title"))) | set(tokenize(doc.get("description")))
+            terms |= set(tokenize(" ".join(doc["tags"])))
+            for term in terms:
+                postings = self._postings[term]
+                postings.pop(poll_id, None)
+                if not postings:
+                    del self._postings[term]
+                    del self._terms[bisect_left(self._terms, term)]
+
+    def _expand(self, prefix):
+        start = bisect_left(self._terms, prefix)
+        expansions = []
+        for term in self._terms[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            expansions.append(term)
+        return expansions
+
+    def _impact(self, term):
+        impact = self._impacts.get(term)
+        if impact is None:
+            postings = self._postings[term]
+            count = len(self._docs)
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            length_base = BM25_K1 * (1 - BM25_B)
+            length_scale = BM25_K1 * BM25_B * count / self._total_length
+            lengths = self._lengths
+            impact = self._impacts[term] = {
+                poll_id: idf * frequency * (BM25_K1 + 1) / (frequency + length_base + length_scale * lengths[poll_id])
+                for poll_id, frequency in postings.items()
+            }
+        return impact
+
+    def search(self, query, prefix=True, accept=None, limit=None):
+        """
+        ([(poll, score)] best first, total matches) for polls matching every
+        query word. With prefix, the last word also matches words starting
+        with it. accept is an optional filter on the indexed poll dicts;
+        limit caps how many of the top results are returned.
+        """
+        words = tokenize(query)
+        if not words:
+            return [], 0
+
+        with self._lock:
+            if not self._docs:
+                return [], 0
+
+            # Each query word becomes a group of alternative terms
+            groups = [[word] for word in words]
+            if prefix:
+                groups[-1] = sorted(set(self._expand(words[-1])) | {words[-1]})
+
+            matches = []
+            for group in groups:
+                impacts = [self._impact(term) for term in group if term in self._postings]
+                if not impacts:
+                    return [], 0
+                if len(impacts) > 1:
+                    # A word's best-scoring alternative counts
+                    merged = {}
+                    for impact in impacts:
+                        for poll_id, score in impact.items():
+                            if score > merged.get(poll_id, 0.0):
+                                merged[poll_id] = score
+                    impacts = [merged]
+                matches.append(impacts[0])
+
+            # Intersect starting from the rarest word
+            matches.sort(key=len)
+            candidates = matches[0].keys()
+            for impact in matches[1:]:
+                candidates = candidates & impact.keys()
+            if accept is not None:
+                docs = self._docs
+                candidates = [poll_id for poll_id in candidates if accept(docs[poll_id])]
+
+            if len(matches) == 1:
+                impact = matches[0]
+                scored = [(impact[poll_id], poll_id) for poll_id in candidates]
+            else:
+                scored = [(sum(impact[poll_id] for impact in matches), poll_id) for poll_id in candidates]
+
+            if limit is not None and limit < len(scored):
+                top = heapq.nlargest(limit, scored)
+            else:
+                top = sorted(scored, reverse=True)
+            return [(self._docs[poll_id], score) for score, poll_id in top], len(scored)
+
+
+class PollSearch:
+    """A SearchIndex kept in sync with the polls table."""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Held for the length of a rebuild, so only one runs at a time
+        self._build_lock = threading.Lock()
+        self.index = None
+        self._built_at = None
+        self._checked_at = None
+        self._max_id = 0      # newest poll id read from the table
+        self._dirty = set()
+        self._check_new = False
+        self._building = False
+        self._dirty_while_building = set()
+
+    def on_bump(self, scopes):
+        """versions.on_bump listener: note polls to re-read on the next search."""
+        with self._lock:
+            for scope in scopes:
+                if scope == versions.POLLS:
+                    self._check_new = True
+                elif scope.startswith("poll:"):
+                    poll_id = int(scope.split(":", 1)[1])
+                    self._dirty.add(poll_id)
+                    if self._building:
+                        self._dirty_while_building.add(poll_id)
+
+    def _select(self, supabase):
+        return supabase.table("polls").select("*, poll_tags(tags(id, name))")
+
+    def rebuild(self, supabase):
+        """Build a new index from the whole table and swap it in; searches use the old one meanwhile."""
+        with self._build_lock:
+            self._rebuild(supabase)
+
+    def _rebuild(self, supabase):
+        with self._lock:
+            self._building = True
+            self._dirty_while_building = set()
+        try:
+            index = SearchIndex()
+            max_id = 0
+            offset = 0
+            while True:
+                result = self._select(supabase).order("id").range(offset, offset + _LOAD_CHUNK - 1).execute()
+                rows = result.data or []
+                for row in rows:
+                    index.add(row)
+                    max_id = max(max_id, row["id"])
+                if len(rows) < _LOAD_CHUNK:
+                    break
+                offset += _LOAD_CHUNK
+        finally:
+            with self._lock:
+                self._building = False
+        with self._lock:
+            self.index = index
+            self._max_id = max_id
+            self._built_at = self._checked_at = time.monotonic()
+            # Edits that landed during the build may be missing from it
+            self._dirty = self._dirty_while_building
+            self._check_new = False
+
+    def _rebuild_due(self):
+        with self._lock:
+            return self.index is None or time.monotonic() - self._built_at >= SEARCH_REBUILD_SECONDS
+
+    def sync(self, supabase):
+        """Build the index if needed and apply pending changes."""
+        if self._rebuild_due():
+            # The first build is waited for. Later ones run in whichever
+            # request gets there first, outside self._lock, and the other
+            # searches carry on with the old index
+            if self._build_lock.acquire(blocking=self.index is None):
+                try:
+                    if self._rebuild_due():
+                        self._rebuild(supabase)
+                finally:
+                    self._build_lock.release()
+
+        with self._lock:
+            if self.index is None:
+                return
+            now = time.monotonic()
+            if self._check_new or now - self._checked_at >= SEARCH_REFRESH_SECONDS:
+                after = max(self._max_id - SEARCH_ID_WINDOW, 0)
+                result = self._select(supabase).gt("id", after).order("id").execute()
+                for row in result.data or []:
+                    # Rows already indexed are kept current by bumps and rebuilds
+                    if not row.get("deleted") and row["id"] not in self.index._docs:
+                        self.index.add(row)
+                    self._max_id = max(self._max_id, row["id"])
+                self._check_new = False
+                self._checked_at = now
+
+            if self._dirty:
+                dirty = sorted(self._dirty)
+                result = self._select(supabase).in_("id", dirty).execute()
+                found = {row["id"]: row for row in result.data or []}
+                for poll_id in dirty:
+                    if poll_id in found:
+                        self.index.add(found[poll_id])
+                    else:
+                        self.index.remove(poll_id)
+                self._dirty.clear()
+
+    def search(self, supabase, query, prefix=True, accept=None, limit=None):
+        self.sync(supabase)
+        return self.index.search(query, prefix=prefix, accept=accept, limit=limit)
+
+
+poll_search = PollSearch()
+versions.on_bump(poll_search.on_bump)
+
+
+def _has_ended(doc, now):
+    if not doc.get("ends_at"):
+        return False
+    ends_at = datetime.fromisoformat(doc["ends_at"].replace("Z", "+00:00"))
+    return ends_at <= now
+
+
+def search_polls():
+    """
+    Search polls by title, description and tag names.
+
+    Query parameters:
+    - q: Search text (required). The last word also matches as a prefix.
+    - page, page_size, public, status, creator, tag, fields: as for list_polls
+      (the score is always included)
+
+    Returns:
+    {
+        "polls": [{...poll fields, "tags": [...], "has_ended": false, "score": 7.31}, ...],
+        "pagination": {"page": 1, "page_size": 20, "total": 3, "total_pages": 1}
+    }
+    """
+    try:
+        query = (request.args.get("q") or "").strip()
+        if not query:
+            return jsonify({"error": "Search query is required"}), 400
+        if len(query) > MAX_QUERY_LENGTH:
+            return jsonify({"error": f"Search query must not exceed {MAX_QUERY_LENGTH} characters"}), 400
+
+        try:
+            params = _list_polls_params(request.args)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        supabase = get_supabase()
+        if not supabase:
+            return jsonify({"error": "Database connection not available"}), 503
+
+        now = datetime.now(timezone.utc)
+
+        def accept(doc):
+            if params["public"] == "true" and not doc.get("public"):
+                return False
+            if params["public"] == "false" and doc.get("public"):
+                return False
+            if params["creator"] is not None and doc.get("creator") != params["creator"]:
+                return False
+            if params["tag"] is not None and params["tag"] not in doc["_tag_ids"]:
+                return False
+            if params["status"] == "open" and _has_ended(doc, now):
+                return False
+            if params["status"] == "closed" and not _has_ended(doc, now):
+                return False
+            return True
+
+        page, page_size = params["page"], params["page_size"]
+        offset = (page - 1) * page_size
+        results, total = poll_search.search(supabase, query, accept=accept, limit=offset + page_size)
+
+        polls = []
+        for doc, score in results[offset:]:
+            poll = {k: v for k, v in doc.items() if k != "_tag_ids"}
+            poll["has_ended"] = _has_ended(doc, now)
+            poll["score"] = round(score, 4)
+            polls.append(poll)
+
+        if params["fields"] is not None:
+            polls = pick(polls, params["fields"] + ["score"])
+
+        return jsonify({
+            "polls": polls,
+            "pagination": {
+                "page": page,
+                "page_size": page_size,
+                "total": total,
+                "total_pages": (total + page_size - 1) // page_size
+            }
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
@@ -0,0 +1,282 @@
+"""
+Periodic snapshots of every user's equity (cash + positions at what
+selling them back would pay, as in api.portfolio), kept as an equity curve
+per user for profile charts.
+
+take_snapshots walks the users in id order, SNAPSHOT_BATCH_SIZE at a time.
+For each batch one RPC returns their holdings in unresolved markets; the
+markets not read yet in this run are read in batches, each holding is
+valued with amm.quote_trade_cents, and the batch's snapshot is appended
+with one more RPC. A run therefore costs a few queries per batch of users
+and reads each market once, however many users hold it.
+
+Each run is recorded in snapshot_runs with the last user id it has written.
+An invocation stops starting batches after SNAPSHOT_TIME_BUDGET_SECONDS, so
+it ends inside the function's time limit; the run's row is then left
+without finished_at and the next invocation resumes it from that user with
+the same taken_at, before any new run starts.
+
+Snapshots are stored column-wise, one portfolio_snapshots row per user with
+an array per series (timestamps, cash, positions), capped at
+SNAPSHOT_MAX_POINTS, so a whole curve is read as a single row.
+
+The job runs from the Vercel cron in vercel.json (GET /api/cron/snapshots,
+authorized with the CRON_SECRET environment variable) or from the command
+line:
+    python -m api.snapshots
+"""
+from flask import request, jsonify
+from datetime import datetime, timezone
+from collections import defaultdict
+import argparse
+import os
+import sys
+import time
+
+from api.database import get_supabase
+from api.amm import poll_b0, quote_trade_cents
+
+# Users valued and written per batch
+SNAPSHOT_BATCH_SIZE = 500
+# Polls read per query when loading market states
+POLL_BATCH_SIZE = 200
+# Points kept per user: 90 days of hourly snapshots
+SNAPSHOT_MAX_POINTS = 24 * 90
+# An invocation starts no new batch after this long, leaving the rest of the
+# run to the next one
+SNAPSHOT_TIME_BUDGET_SECONDS = 45
+# Points returned by the equity curve endpoint unless ?points= asks otherwise
+DEFAULT_CURVE_POINTS = 500
+
+CRON_SECRET_ENV = "CRON_SECRET"
+
+
+def _load_markets(supabase, poll_ids, markets):
+    """Add {poll_id: (q_yes, q_no, b0)} for poll_ids to markets."""
+    poll_ids = sorted(poll_ids)
+    for start in range(0, len(poll_ids), POLL_BATCH_SIZE):
+        chunk = poll_ids[start:start + POLL_BATCH_SIZE]
+        polls = {row["id"]: row for row in
+                 supabase.table("polls").select("id, liquidity_b0").in_("id", chunk).execute().data or []}
+        votes = {row["poll_id"]: row for row in
+                 supabase.table("poll_votes").select("poll_id, yes_votes, no_votes").in_("poll_id", chunk).execute().data or []}
+        for poll_id in chunk:
+            market = votes.get(poll_id, {})
+            markets[poll_id] = (market.get("yes_votes", 0), market.get("no_votes", 0), poll_b0(polls.get(poll_id)))
+
+
+def _open_run(supabase, taken_at):
+    """The unfinished snapshot_runs row to resume, or a new one taken at taken_at."""
+    result = (supabase.table("snapshot_runs")
+              .select("id, taken_at, last_user_id, users")
+              .is_("finished_at", "null")
+              .order("id", desc=True)
+              .limit(1)
+              .execute())
+    if result.data:
+        return result.data[0]
+    taken_at = (taken_at or datetime.now(timezone.utc)).isoformat()
+    return supabase.table("snapshot_runs").insert({
+        "taken_at": taken_at,
+        "last_user_id": 0,
+        "users": 0,
+    }).execute().data[0]
+
+
+def take_snapshots(supabase, taken_at=None, batch_size=SNAPSHOT_BATCH_SIZE,
+                   time_budget=SNAPSHOT_TIME_BUDGET_SECONDS):
+    """
+    Append a snapshot of every user's cash and positions value, resuming an
+    unfinished run if there is one (taken_at then only applies to a new run).
+
+    Returns:
+        {
+            "taken_at": "<iso timestamp>",
+            "users": <int>,          # users written by this invocation
+            "markets": <int>,
+            "complete": <bool>,      # false if the time budget ran out
+            "last_user_id": <int>    # where the next invocation resumes
+        }
+    """
+    started = time.monotonic()
+    run = _open_run(supabase, taken_at)
+    taken_at = run["taken_at"]
+    last_id = int(run["last_user_id"])
+    total = int(run["users"])
+    markets = {}
+    users = 0
+    complete = False
+    while not complete:
+        # Every invocation writes at least one batch, so a run always progresses
+        if users and time.monotonic() - started >= time_budget:
+            break
+        profiles = (supabase.table("profiles")
+                    .select("id, balance")
+                    .gt("id", last_id)
+                    .order("id")
+                    .limit(batch_size)
+                    .execute()).data or []
+        complete = len(profiles) < batch_size
+        if profiles:
+            last_id = _snapshot_batch(supabase, taken_at, profiles, markets)
+            users += len(profiles)
+        supabase.table("snapshot_runs").update({
+            "last_user_id": last_id,
+            "users": total + users,
+            "finished_at": datetime.now(timezone.utc).isoformat() if complete else None,
+        }).eq("id", run["id"]).execute()
+
+    return {"taken_at": taken_at, "users": users, "markets": len(markets),
+            "complete": complete, "last_user_id": last_id}
+
+
+def _snapshot_batch(supabase, taken_at, profiles, markets):
+    """Append the snapshot of one batch of profiles; returns the batch's last user id."""
+    user_ids = [profile["id"] for profile in profiles]
+
+    holdings = supabase.rpc("portfolio_holdings", {"p_user_ids": user_ids}).execute().data or []
+    _load_markets(supabase, {row["poll_id"] for row in holdings} - markets.keys(), markets)
+
+    positions = defaultdict(int)
+    for row in holdings:
+        q_yes, q_no, b0 = markets[row["poll_id"]]
+        quote = quote_trade_cents(q_yes, q_no, row["outcome"], -int(row["quantity"]), b0=b0)
+        positions[row["user_id"]] -= int(quote["cost_cents"])
+
+    supabase.rpc("append_portfolio_snapshots", {
+        "p_taken_at": taken_at,
+        "p_user_ids": user_ids,
+        "p_cash_cents": [int(profile.get("balance") or 0) for profile in profiles],
+        "p_positions_cents": [positions[user_id] for user_id in user_ids],
+        "p_keep": SNAPSHOT_MAX_POINTS,
+    }).execute()
+    return user_ids[-1]
+
+
+def _parse_time(value):
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def _thin(n, points):
+    """Indexes of at most `points` of n samples, evenly spread and keeping the first and last."""
+    if n <= points:
+        return list(range(n))
+    if points == 1:
+        return [n - 1]
+    return sorted({round(i * (n - 1) / (points - 1)) for i in range(points)})
+
+
+def get_equity_curve():
+    """
+    A user's equity over time, from the periodic snapshots.
+
+    Query parameters:
+    - user_id: Required
+    - since: Optional ISO timestamp; earlier snapshots are left out
+    - points: Optional, at most this many snapshots, evenly spread
+              (default 500, max SNAPSHOT_MAX_POINTS)
+
+    Returns (parallel arrays, amounts in dollars):
+        {
+            "user_id": <user_id>,
+            "taken_at": ["<iso timestamp>", ...],
+            "equity": [<float>, ...],      # cash + positions
+            "cash": [<float>, ...],
+            "positions": [<float>, ...]    # unresolved positions at their sell quote
+        }
+    """
+    try:
+        try:
+            user_id = int(request.args.get("user_id", ""))
+        except (ValueError, TypeError):
+            return jsonify({"error": "Invalid or missing user_id"}), 400
+
+        since = request.args.get("since")
+        try:
+            since = _parse_time(since) if since else None
+        except ValueError:
+            return jsonify({"error": "since must be an ISO 8601 timestamp"}), 400
+        if since is not None and since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+
+        try:
+            points = int(request.args.get("points", DEFAULT_CURVE_POINTS))
+        except (ValueError, TypeError):
+            return jsonify({"error": "points must be an integer"}), 400
+        points = min(max(points, 1), SNAPSHOT_MAX_POINTS)
+
+        supabase = get_supabase()
+        if not supabase:
+            return jsonify({"error": "Database connection not available"}), 503
+
+        result = supabase.table("portfolio_snapshots").select("taken_at, cash_cents, positions_cents").eq("user_id", user_id).execute()
+        if not result.data:
+            # No snapshot yet, or no such user
+            user_result = supabase.table("profiles").select("id").eq("id", user_id).execute()
+            if not user_result.data:
+                return jsonify({"error": "User does not exist"}), 404
+            row = {"taken_at": [], "cash_cents": [], "positions_cents": []}
+        else:
+            row = result.data[0]
+
+        start = 0
+        if since is not None:
+            while start < len(row["taken_at"]) and _parse_time(row["taken_at"][start]) < since:
+                start += 1
+        indexes = [start + i for i in _thin(len(row["taken_at"]) - start, points)]
+
+        cash = [row["cash_cents"][i] for i in indexes]
+        positions = [row["positions_cents"][i] for i in indexes]
+        response = jsonify({
+            "user_id": user_id,
+            "taken_at": [row["taken_at"][i] for i in indexes],
+            "equity": [(c + p) / 100.0 for c, p in zip(cash, positions)],
+            "cash": [c / 100.0 for c in cash],
+            "positions": [p / 100.0 for p in positions],
+        })
+        # Changes once per snapshot run
+        response.headers["Cache-Control"] = "private, max-age=300"
+        return response, 200
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+def run_snapshots():
+    """
+    Cron entry point for take_snapshots. Vercel sends
+    "Authorization: Bearer <CRON_SECRET>"; anything else is refused. The
+    report's "complete" is false when the run stopped at its time budget
+    and will be resumed by the next scheduled call.
+    """
+    secret = os.getenv(CRON_SECRET_ENV)
+    if not secret:
+        return jsonify({"error": f"{CRON_SECRET_ENV} is not configured"}), 503
+    if request.headers.get("Authorization") != f"Bearer {secret}":
+        return jsonify({"error": "Unauthorized"}), 401
+
+    try:
+        supabase = get_supabase()
+        if not supabase:
+            return jsonify({"error": "Database connection not available"}), 503
+        return jsonify(take_snapshots(supabase)), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
+def main(argv=None):
+    argparse.ArgumentParser(description="Append an equity snapshot for every user.").parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    report = take_snapshots(get_supabase())
+    print(f"{report['users']} users snapshotted at {report['taken_at']} ({report['markets']} markets valued)")
+    if not report["complete"]:
+        print(f"Stopped at the time budget; the next run resumes after user {report['last_user_id']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,213 @@
+from hashlib import sha1
+import base64
+import math
+import time
+
+from api import events
+
+# Poll statistics (num_traders, volume, 24h_volume) maintained from the event
+# journal instead of aggregating trades on every request. Each process keeps
+# its own projection: it starts from the latest saved snapshot and replays the
+# journal after it, then applies its own trades as they happen and picks up
+# other workers' trades at most every STATS_REFRESH_SECONDS.
+#
+# Volumes are in cents, counting buys and sells alike (the absolute cash of
+# each trade), like the get_poll_stats RPC this replaces.
+
+STATS_REFRESH_SECONDS = 2
+ROLLING_HOURS = 24
+# Distinct traders are counted exactly up to this many per poll, then with a
+# HyperLogLog (about 3% error) so very busy polls stay small
+EXACT_TRADER_LIMIT = 1000
+HLL_PRECISION = 10
+
+
+class HyperLogLog:
+    """Approximate distinct counter in 2**precision bytes."""
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(self.size)
+
+    def add(self, value):
+        h = int.from_bytes(sha1(str(value).encode()).digest()[:8], "big")
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def to_state(self):
+        return base64.b64encode(bytes(self.registers)).decode("ascii")
+
+    @classmethod
+    def from_state(cls, state, precision=HLL_PRECISION):
+        sketch = cls(precision)
+        registers = base64.b64decode(state)
+        if len(registers) != sketch.size:
+            raise ValueError("HyperLogLog state has the wrong precision")
+        sketch.registers = bytearray(registers)
+        return sketch
+
+    def __len__(self):
+        alpha = 0.7213 / (1 + 1.079 / self.size)
+        estimate = alpha * self.size * self.size / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            # Small-range correction (linear counting)
+            estimate = self.size * math.log(self.size / zeros)
+        return int(round(estimate))
+
+
+class DistinctCounter:
+    """Exact set of ids that turns into a HyperLogLog once it grows large."""
+
+    def __init__(self, exact_limit=EXACT_TRADER_LIMIT):
+        self.exact_limit = exact_limit
+        self._items = set()
+
+    def add(self, value):
+        self._items.add(value)
+        if isinstance(self._items, set) and len(self._items) > self.exact_limit:
+            sketch = HyperLogLog()
+            for item in self._items:
+                sketch.add(item)
+            self._items = sketch
+
+    def __len__(self):
+        return len(self._items)
+
+    def to_state(self):
+        """["ids", [...]] while exact, ["hll", <registers>] once approximate."""
+        if isinstance(self._items, set):
+            return ["ids", sorted(self._items, key=str)]
+        return ["hll", self._items.to_state()]
+
+    @classmethod
+    def from_state(cls, state, exact_limit=EXACT_TRADER_LIMIT):
+        counter = cls(exact_limit)
+        kind, items = state
+        counter._items = set(items) if kind == "ids" else HyperLogLog.from_state(items)
+        return counter
+
+
+class HourlyRing:
+    """Volume per hour for the last ROLLING_HOURS hours, in a fixed ring of buckets."""
+
+    def __init__(self, hours=ROLLING_HOURS):
+        self.hours = [None] * hours
+        self.cents = [0] * hours
+
+    def add(self, hour, cents):
+        slot = hour % len(self.hours)
+        if self.hours[slot] != hour:
+            if self.hours[slot] is not None and self.hours[slot] > hour:
+                # Older than the window this slot already covers
+                return
+            self.hours[slot] = hour
+            self.cents[slot] = 0
+        self.cents[slot] += cents
+
+    def to_state(self):
+        return [self.hours, self.cents]
+
+    @classmethod
+    def from_state(cls, state):
+        hours, cents = state
+        ring = cls(len(hours))
+        ring.hours, ring.cents = list(hours), list(cents)
+        return ring
+
+    def total(self, now_hour):
+        window_start = now_hour - len(self.hours)
+        return sum(
+            cents for hour, cents in zip(self.hours, self.cents)
+            if hour is not None and window_start < hour <= now_hour
+        )
+
+
+class PollStats:
+    def __init__(self):
+        self.traders = DistinctCounter()
+        self.volume_cents = 0
+        self.hourly = HourlyRing()
+
+    def apply_trade(self, event):
+        cents = abs(int(event.get("cash_cents") or 0))
+        self.traders.add(event.get("user_id"))
+        self.volume_cents += cents
+        self.hourly.add(int(events.event_time(event) // 3600), cents)
+
+    def to_state(self):
+        return [self.traders.to_state(), self.volume_cents, self.hourly.to_state()]
+
+    @classmethod
+    def from_state(cls, state):
+        traders, volume_cents, hourly = state
+        stats = cls()
+        stats.traders = DistinctCounter.from_state(traders)
+        stats.volume_cents = int(volume_cents)
+        stats.hourly = HourlyRing.from_state(hourly)
+        return stats
+
+    def to_dict(self, now_hour):
+        return {
+            "num_traders": len(self.traders),
+            "volume": self.volume_cents,
+            "24h_volume": self.hourly.total(now_hour),
+        }
+
+
+class StatsProjection(events.Projection):
+    name = "poll_stats"
+    types = {events.TRADE}
+    snapshot_version = 1
+
+    def __init__(self, refresh_seconds=STATS_REFRESH_SECONDS):
+        super().__init__(refresh_seconds)
+        self._polls = {}
+
+    def apply(self, event):
+        stats = self._polls.get(event["poll_id"])
+        if stats is None:
+            stats = self._polls[event["poll_id"]] = PollStats()
+        stats.apply_trade(event)
+
+    def snapshot(self):
+        return [[poll_id, stats.to_state()] for poll_id, stats in self._polls.items()]
+
+    def restore(self, state):
+        self._polls = {poll_id: PollStats.from_state(stats) for poll_id, stats in state}
+
+    def get(self, supabase, poll_ids):
+        """Stats for each poll id (zeros for polls without trades)."""
+        self.refresh(supabase)
+        now_hour = int(time.time() // 3600)
+        with self._lock:
+            empty = PollStats()
+            return {
+                poll_id: self._polls.get(poll_id, empty).to_dict(now_hour)
+                for poll_id in poll_ids
+            }
+
+
+projection = StatsProjection()
+events.on_event(projection.on_event)
+
+
+def poll_stats(supabase, poll_id):
+    """
+    Returns:
+    {
+        "num_traders": <int>,
+        "volume": <int>,       # cents
+        "24h_volume": <int>    # cents
+    }
+    """
+    return projection.get(supabase, [poll_id])[poll_id]
+
+
+def poll_stats_bulk(supabase, poll_ids):
+    """poll_stats for many polls: {poll_id: stats}."""
+    return projection.get(supabase, poll_ids)
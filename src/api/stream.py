@@ -0,0 +1,286 @@
+from flask import jsonify, Response
+from collections import defaultdict
+from datetime import datetime, timezone
+import json
+import threading
+import time
+import sys
+import os
+
+# Add parent directory to path to import database module
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from api.database import get_supabase
+from api.amm import _aggregate_positions, market_price, poll_b0
+
+# A subscriber receives at most one event per interval; anything published in
+# between is merged into a single event
+STREAM_MIN_INTERVAL_SECONDS = 0.25
+# Comment lines keep idle connections from being closed by proxies
+STREAM_HEARTBEAT_SECONDS = 15.0
+# A cached snapshot only reflects trades made through this process, so new
+# viewers re-read the database once it is older than this
+STREAM_SNAPSHOT_TTL_SECONDS = 5.0
+
+
+class Subscription:
+    """
+    One viewer's mailbox. It holds at most one pending event: new events are
+    merged into it instead of queueing, so a slow reader never falls behind.
+    """
+
+    def __init__(self, poll_id):
+        self.poll_id = poll_id
+        self._cond = threading.Condition()
+        self._pending = None
+
+    def offer(self, event):
+        with self._cond:
+            self._pending = event if self._pending is None else _coalesce(self._pending, event)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Next (possibly merged) event, or None if nothing arrived in time."""
+        with self._cond:
+            if self._pending is None:
+                self._cond.wait(timeout)
+            event, self._pending = self._pending, None
+            return event
+
+
+class PriceBroker:
+    """
+    In-process pub/sub for poll price updates.
+
+    Trade and resolution handlers publish an event they have already
+    computed; the broker hands the same event to every subscriber of the
+    poll. The latest state of each watched poll is kept for a short while
+    so a burst of new viewers can start from it without each one touching
+    the database.
+
+    Only viewers connected to the same process see an update. With several
+    workers each one fans out the trades it handled itself.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+        self._latest = {}
+        self._seq = 0
+
+    def subscribe(self, poll_id):
+        subscription = Subscription(poll_id)
+        with self._lock:
+            self._subscribers[poll_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.poll_id)
+            if subscribers is None:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                # Nobody is watching, so the cached state would only go stale
+                del self._subscribers[subscription.poll_id]
+                self._latest.pop(subscription.poll_id, None)
+
+    def latest(self, poll_id, max_age=None):
+        """Cached state of a watched poll, or None if there is none younger than max_age seconds."""
+        with self._lock:
+            cached = self._latest.get(poll_id)
+            if cached is None:
+                return None
+            snapshot, stored_at = cached
+            if max_age is not None and time.monotonic() - stored_at > max_age:
+                return None
+            return dict(snapshot)
+
+    def remember(self, poll_id, snapshot):
+        """Cache a snapshot freshly read from the database for a watched poll."""
+        with self._lock:
+            if poll_id in self._subscribers:
+                self._latest[poll_id] = (dict(snapshot), time.monotonic())
+
+    def publish(self, poll_id, event):
+        with self._lock:
+            subscribers = list(self._subscribers.get(poll_id, ()))
+            if not subscribers:
+                return 0
+            self._seq += 1
+            event = {**event, "poll_id": poll_id, "seq": self._seq}
+            snapshot = {**event, "type": "snapshot", "trades": 0, "volume_shares": 0, "volume_cents": 0}
+            self._latest[poll_id] = (snapshot, time.monotonic())
+        for subscription in subscribers:
+            subscription.offer(event)
+        return len(subscribers)
+
+    def subscriber_count(self, poll_id):
+        with self._lock:
+            return len(self._subscribers.get(poll_id, ()))
+
+
+broker = PriceBroker()
+
+
+def _coalesce(older, newer):
+    """
+    Merge two events for the same poll: prices and quantities come from the
+    newer one, trade counts and volume add up, and a resolution is never lost.
+    """
+    merged = {**older, **newer}
+    for key in ("trades", "volume_shares", "volume_cents"):
+        merged[key] = older.get(key, 0) + newer.get(key, 0)
+    if older.get("type") == "resolved":
+        merged["type"] = "resolved"
+        merged["outcome"] = older.get("outcome")
+    return merged
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def publish_trade(poll_id, outcome_yes, num_shares, cash_cents, quote):
+    """
+    Broadcast a completed trade. num_shares and cash_cents are signed as in
+    the trades table ledger (sells negative); quote is the trade's
+    _quote_move result, so no prices are recomputed here.
+    """
+    return broker.publish(poll_id, {
+        "type": "price",
+        "timestamp": _now(),
+        "price_yes": quote["price_yes_after"],
+        "price_no": quote["price_no_after"],
+        "q_yes": int(quote["q_yes_after"]),
+        "q_no": int(quote["q_no_after"]),
+        "outcome": None,
+        "last_trade": {"outcome": "YES" if outcome_yes else "NO", "num_shares": num_shares},
+        "trades": 1,
+        "volume_shares": abs(int(num_shares)),
+        "volume_cents": abs(int(cash_cents)),
+    })
+
+
+def publish_resolution(poll_id, outcome):
+    """Broadcast that a poll has resolved; streams close after delivering it."""
+    return broker.publish(poll_id, {
+        "type": "resolved",
+        "timestamp": _now(),
+        "price_yes": 100 if outcome else 0,
+        "price_no": 0 if outcome else 100,
+        "outcome": outcome,
+    })
+
+
+def _snapshot(supabase, poll):
+    q = _aggregate_positions(poll["id"], client=supabase)
+    q_yes = int(q.get("YES", 0))
+    q_no = int(q.get("NO", 0))
+    outcome = poll.get("outcome")
+    if outcome is None:
+        price = market_price(q_yes, q_no, b0=poll_b0(poll))
+        price_yes, price_no = price["price_yes"], price["price_no"]
+    else:
+        price_yes, price_no = (100, 0) if outcome else (0, 100)
+    return {
+        "type": "snapshot",
+        "poll_id": poll["id"],
+        "seq": 0,
+        "timestamp": _now(),
+        "price_yes": price_yes,
+        "price_no": price_no,
+        "q_yes": q_yes,
+        "q_no": q_no,
+        "outcome": outcome,
+        "trades": 0,
+        "volume_shares": 0,
+        "volume_cents": 0,
+    }
+
+
+def _format_event(event):
+    return f"id: {event.get('seq', 0)}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _event_stream(subscription, initial, min_interval, heartbeat):
+    yield _format_event(initial)
+    if initial.get("outcome") is not None:
+        return
+    last_sent = time.monotonic()
+    while True:
+        # Let bursts pile up in the mailbox instead of sending each trade
+        wait = min_interval - (time.monotonic() - last_sent)
+        if wait > 0:
+            time.sleep(wait)
+        event = subscription.get(timeout=heartbeat)
+        if event is None:
+            yield ": keep-alive\n\n"
+            continue
+        yield _format_event(event)
+        last_sent = time.monotonic()
+        if event["type"] == "resolved":
+            return
+
+
+def stream_prices(poll_id):
+    """
+    Server-Sent Events stream of price updates for a poll.
+
+    The first event ("snapshot") is the current state. After that a "price"
+    event is sent after trades, at most every STREAM_MIN_INTERVAL_SECONDS,
+    with bursts merged into one event, and a final "resolved" event when the
+    poll resolves.
+
+    Event data:
+    {
+        "poll_id": 1,
+        "seq": 42,
+        "type": "snapshot" | "price" | "resolved",
+        "timestamp": "2025-11-18T10:00:00+00:00",
+        "price_yes": 52,
+        "price_no": 48,
+        "q_yes": 15,
+        "q_no": 8,
+        "outcome": null,
+        "trades": 3,            # trades merged into this event
+        "volume_shares": 12,
+        "volume_cents": 640
+    }
+    """
+    try:
+        try:
+            poll_id = int(poll_id)
+        except (ValueError, TypeError):
+            return jsonify({"error": "Poll ID must be a valid integer"}), 400
+
+        supabase = get_supabase()
+        if not supabase:
+            return jsonify({"error": "Database connection not available"}), 503
+
+        # Subscribe before reading the state so no trade falls in between
+        subscription = broker.subscribe(poll_id)
+        initial = broker.latest(poll_id, max_age=STREAM_SNAPSHOT_TTL_SECONDS)
+        if initial is None:
+            try:
+                poll_result = supabase.table("polls").select("id, outcome, liquidity_b0").eq("id", poll_id).execute()
+                if not poll_result.data:
+                    broker.unsubscribe(subscription)
+                    return jsonify({"error": "Poll not found"}), 404
+                initial = _snapshot(supabase, poll_result.data[0])
+            except Exception:
+                broker.unsubscribe(subscription)
+                raise
+            broker.remember(poll_id, initial)
+
+        stream = _event_stream(subscription, initial, STREAM_MIN_INTERVAL_SECONDS, STREAM_HEARTBEAT_SECONDS)
+        response = Response(stream, mimetype="text/event-stream")
+        # The server closes the response however the stream ends, including
+        # when the client disconnects before the generator ever runs
+        response.call_on_close(lambda: broker.unsubscribe(subscription))
+        response.headers["Cache-Control"] = "no-cache"
+        # Stop nginx-style proxies from buffering the stream
+        response.headers["X-Accel-Buffering"] = "no"
+        return response, 200
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
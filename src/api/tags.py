@@ -1,9 +1,284 @@
 from flask import request, jsonify
-from api.database import get_supabase
+import threading
+import time
+from api.database import get_supabase, client_generation
+from api import versions
+from api.serialization import parse_fields, pick
 
 MIN_TAG_LENGTH = 2
 MAX_TAG_LENGTH = 20
 
+# The tag registry picks up new tags and poll-tag links at most this often,
+# and reloads everything (to see links other workers removed) this often
+TAG_REGISTRY_REFRESH_SECONDS = 30
+TAG_REGISTRY_RELOAD_SECONDS = 600
+# Each refresh reads again the rows this many ids below the newest one it has
+# seen, since ids are handed out before commit and rows can land out of order
+TAG_REGISTRY_ID_WINDOW = 100
+
+# What get_all_tags' fields= may name
+TAG_FIELDS = ("id", "name", "polls")
+
+DEFAULT_COMPLETION_LIMIT = 10
+MAX_COMPLETION_LIMIT = 50
+_LOAD_CHUNK = 1000
+
+
+class _TrieNode:
+    __slots__ = ("children", "tag_ids")
+
+    def __init__(self):
+        self.children = {}
+        self.tag_ids = set()
+
+
+class TagTrie:
+    """Prefix tree over lowercased tag names."""
+
+    def __init__(self):
+        self._root = _TrieNode()
+
+    def insert(self, name, tag_id):
+        node = self._root
+        for char in name.lower():
+            node = node.children.setdefault(char, _TrieNode())
+        node.tag_ids.add(tag_id)
+
+    def remove(self, name, tag_id):
+        key = name.lower()
+        path = [self._root]
+        for char in key:
+            node = path[-1].children.get(char)
+            if node is None:
+                return
+            path.append(node)
+        path[-1].tag_ids.discard(tag_id)
+        # Prune branches that no longer lead to a tag
+        for depth in range(len(key), 0, -1):
+            node = path[depth]
+            if node.tag_ids or node.children:
+                break
+            del path[depth - 1].children[key[depth - 1]]
+
+    def complete(self, prefix):
+        """Ids of every tag whose name starts with prefix (case-insensitive)."""
+        node = self._root
+        for char in prefix.lower():
+            node = node.children.get(char)
+            if node is None:
+                return set()
+        found = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            found |= node.tag_ids
+            stack.extend(node.children.values())
+        return found
+
+
+class TagRegistry:
+    """
+    In-memory copy of the tags table and the poll_tags links.
+
+    Lookups by name, prefix completion and per-tag poll sets are answered
+    from memory. Writes made through this module update it directly; other
+    workers' writes arrive with the periodic refresh. get_supabase() hands
+    out a new client per request, so the registry doesn't follow client
+    objects: it reloads on its TTL, after invalidate(), or when
+    override_supabase switches the data source (tests, the simulator).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._generation = client_generation()
+        self._by_name = {}     # name -> {"id", "name"}
+        self._by_id = {}       # tag id -> {"id", "name"}
+        self._trie = TagTrie()
+        self._polls = {}       # tag id -> set of poll ids
+        self._tags_of = {}     # poll id -> set of tag ids
+        # Newest ids read by sync; rows written by this process don't move
+        # them, so other workers' rows in between are still read
+        self._max_tag_id = 0
+        self._max_link_id = 0
+        self._loaded_at = None
+        self._refreshed_at = None
+
+    def _add_tag(self, row):
+        tag = {"id": row["id"], "name": row["name"]}
+        old = self._by_id.get(tag["id"])
+        if old is not None and old["name"] != tag["name"]:
+            self._by_name.pop(old["name"], None)
+            self._trie.remove(old["name"], tag["id"])
+        self._by_id[tag["id"]] = tag
+        self._by_name[tag["name"]] = tag
+        self._trie.insert(tag["name"], tag["id"])
+
+    def _add_link(self, row):
+        self._polls.setdefault(row["tag_id"], set()).add(row["poll_id"])
+        self._tags_of.setdefault(row["poll_id"], set()).add(row["tag_id"])
+
+    def _read(self, supabase, table, columns, after_id):
+        offset = 0
+        while True:
+            result = (supabase.table(table).select(columns).gt("id", after_id)
+                      .order("id").range(offset, offset + _LOAD_CHUNK - 1).execute())
+            rows = result.data or []
+            yield from rows
+            if len(rows) < _LOAD_CHUNK:
+                return
+            offset += _LOAD_CHUNK
+
+    def sync(self, supabase):
+        """Load the registry if needed, or pick up rows added since the last refresh."""
+        with self._lock:
+            now = time.monotonic()
+            reload = (self._loaded_at is None or self._generation != client_generation()
+                      or now - self._loaded_at >= TAG_REGISTRY_RELOAD_SECONDS)
+            if reload:
+                self._reset()
+            elif now - self._refreshed_at < TAG_REGISTRY_REFRESH_SECONDS:
+                return
+            max_tag_id, max_link_id = self._max_tag_id, self._max_link_id
+            for row in self._read(supabase, "tags", "id, name", max(max_tag_id - TAG_REGISTRY_ID_WINDOW, 0)):
+                self._add_tag(row)
+                max_tag_id = max(max_tag_id, row["id"])
+            for row in self._read(supabase, "poll_tags", "id, poll_id, tag_id", max(max_link_id - TAG_REGISTRY_ID_WINDOW, 0)):
+                self._add_link(row)
+                max_link_id = max(max_link_id, row["id"])
+            self._max_tag_id, self._max_link_id = max_tag_id, max_link_id
+            # Only a complete load counts; a failed one is retried next time
+            if reload:
+                self._loaded_at = now
+            self._refreshed_at = now
+
+    def invalidate(self):
+        """Drop everything; the next sync loads the registry again."""
+        with self._lock:
+            self._reset()
+
+    def lookup(self, name):
+        """Tag id for a name, or None. Names are case-sensitive, like the tags table's unique constraint."""
+        with self._lock:
+            tag = self._by_name.get(name.strip())
+            return tag["id"] if tag else None
+
+    def all(self):
+        """Every tag as {"id", "name", "polls"}, ordered by id."""
+        with self._lock:
+            return [self._with_count(self._by_id[tag_id]) for tag_id in sorted(self._by_id)]
+
+    def complete(self, prefix, limit=DEFAULT_COMPLETION_LIMIT):
+        """Tags starting with prefix, most used first."""
+        with self._lock:
+            tags = [self._with_count(self._by_id[tag_id]) for tag_id in self._trie.complete(prefix)]
+        tags.sort(key=lambda tag: (-tag["polls"], tag["name"].lower()))
+        return tags[:limit]
+
+    def _with_count(self, tag):
+        return {**tag, "polls": len(self._polls.get(tag["id"], ()))}
+
+    def poll_ids(self, tag_id):
+        with self._lock:
+            return set(self._polls.get(tag_id, ()))
+
+    def tag_names(self, poll_id):
+        """Names of a poll's tags, in tag id order."""
+        with self._lock:
+            return [self._by_id[tag_id]["name"] for tag_id in sorted(self._tags_of.get(poll_id, ())) if tag_id in self._by_id]
+
+    def register(self, rows):
+        """Record tags rows ({"id", "name"}) written by this process."""
+        with self._lock:
+            for row in rows:
+                self._add_tag(row)
+
+    def link(self, rows):
+        """Record poll_tags rows written by this process."""
+        with self._lock:
+            for row in rows:
+                self._add_link(row)
+
+    def unlink(self, poll_id, tag_ids):
+        with self._lock:
+            for tag_id in tag_ids:
+                self._polls.get(tag_id, set()).discard(poll_id)
+                self._tags_of.get(poll_id, set()).discard(tag_id)
+
+
+registry = TagRegistry()
+
+
+def upsert_tags(supabase, names):
+    """
+    Ids for tag names, creating the missing tags in one round trip.
+    Returns {name: tag_id} for the names as given.
+    """
+    registry.sync(supabase)
+    ids = {}
+    missing = []
+    for name in names:
+        tag_id = registry.lookup(name)
+        if tag_id is None:
+            missing.append(name)
+        else:
+            ids[name] = tag_id
+
+    if missing:
+        unique = list(dict.fromkeys(name.strip() for name in missing))
+        result = supabase.table("tags").upsert(
+            [{"name": name} for name in unique], on_conflict="name"
+        ).execute()
+        registry.register(result.data or [])
+        for name in missing:
+            tag_id = registry.lookup(name)
+            if tag_id is None:
+                raise RuntimeError(f"Failed to create tag {name!r}")
+            ids[name] = tag_id
+        versions.bump(versions.TAGS)
+    return ids
+
+def sync_poll_tags(supabase, poll_id, names):
+    """
+    Make a poll's tags exactly the given names, creating missing tags.
+
+    Costs at most four round trips whatever the number of tags: one upsert
+    for new tag names, one read of the current links, one batch insert and
+    one batch delete. Returns (added tag ids, removed tag ids).
+    """
+    desired = set(upsert_tags(supabase, names).values())
+
+    current_rows = supabase.table("poll_tags").select("tag_id").eq("poll_id", poll_id).execute()
+    current = {row["tag_id"] for row in current_rows.data or []}
+
+    to_add = desired - current
+    to_remove = current - desired
+
+    if to_add:
+        inserted = supabase.table("poll_tags").insert(
+            [{"poll_id": poll_id, "tag_id": tag_id} for tag_id in sorted(to_add)]
+        ).execute()
+        registry.link(inserted.data or [])
+
+    if to_remove:
+        supabase.table("poll_tags").delete().eq("poll_id", poll_id).in_("tag_id", sorted(to_remove)).execute()
+        registry.unlink(poll_id, to_remove)
+
+    return to_add, to_remove
+
+
+def _registered_tag_id(supabase, name):
+    """Tag id from the registry, or None if it is unknown there or the registry can't load."""
+    try:
+        registry.sync(supabase)
+    except Exception:
+        # The registry only saves a lookup; the caller falls back to the table
+        return None
+    return registry.lookup(name)
+
+
 def add_tag_to_poll():
     """Add a tag to a poll
 
@@ -32,12 +307,19 @@ def add_tag_to_poll():
         if not supabase:
             return jsonify({"error": "Database connection not available"}), 503
 
-        response = supabase.table("tags").select("id").eq("name", tag).execute()
+        tagId = _registered_tag_id(supabase, tag)
 
-        if getattr(response, "error", None):
-            return jsonify({"error": "Database error"}), 503
+        if tagId is None:
+            # Not in the registry yet; it may have just been created elsewhere
+            response = supabase.table("tags").select("id").eq("name", tag).execute()
 
-        if len(response.data) == 0:
+            if getattr(response, "error", None):
+                return jsonify({"error": "Database error"}), 503
+
+            if response.data:
+                tagId = response.data[0]["id"]
+
+        if tagId is None:
             # Create tag if doesn't already exist
 
             # Validate tag name
@@ -51,11 +333,6 @@ def add_tag_to_poll():
             tagId = create_tag(tag)
             if not tagId:
                 return jsonify({"error": "Failed to create tag"}), 500
-        else:
-            if not response.data:
-                tagId = create_tag(tag)
-            else:
-                tagId = response.data[0]["id"]
 
         # Create poll-tag relation in database
         poll_tags_data = {
@@ -68,6 +345,9 @@ def add_tag_to_poll():
         if not result.data:
             return jsonify({"error": "Failed to create poll"}), 500
 
+        registry.link(result.data)
+        versions.bump(versions.TAGS, versions.POLLS, versions.poll_scope(pollId))
+
         return jsonify({
             "message": "Tag added successfully"
         }), 200
@@ -89,14 +369,18 @@ def create_tag(name: str) -> int:
     if not result.data:
         return None
 
+    registry.register([{"id": result.data[0]["id"], "name": name}])
     return result.data[0]["id"]
 
 def get_all_tags():
     """Return all tags
-    
+
+    Query parameters:
+    - fields: Comma-separated tag fields to return (id, name, polls; default: all)
+
     Returns:
     {
-        "tags": ["tag1", "tag2", ...]
+        "tags": [{"id": 1, "name": "tag1", "polls": 12}, ...]
     }"""
     try:
         supabase = get_supabase()
@@ -104,13 +388,15 @@ def get_all_tags():
         if not supabase:
             return jsonify({"error": "Database connection not available"}), 503
 
-        response = supabase.table("tags").select("id, name").execute()
+        try:
+            fields = parse_fields(request.args.get("fields"), TAG_FIELDS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        if getattr(response, "error", None):
-            return jsonify({"error": "Failed to retrieve tags"}), 500
+        registry.sync(supabase)
 
         return jsonify({
-            "tags": response.data
+            "tags": pick(registry.all(), fields)
         }), 200
 
 
@@ -118,6 +404,41 @@ def get_all_tags():
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 
+def complete_tags():
+    """Autocomplete tag names
+
+    Query parameters:
+    - q: Prefix to complete (case-insensitive)
+    - limit: Maximum number of tags (default: 10, max: 50)
+
+    Returns:
+    {
+        "tags": [{"id": 1, "name": "hockey", "polls": 12}, ...]  // most used first
+    }"""
+    try:
+        prefix = (request.args.get("q") or "").strip()
+
+        try:
+            limit = int(request.args.get("limit", DEFAULT_COMPLETION_LIMIT))
+        except (ValueError, TypeError):
+            return jsonify({"error": "Limit must be a valid integer"}), 400
+        limit = max(1, min(limit, MAX_COMPLETION_LIMIT))
+
+        supabase = get_supabase()
+
+        if not supabase:
+            return jsonify({"error": "Database connection not available"}), 503
+
+        registry.sync(supabase)
+
+        return jsonify({
+            "tags": registry.complete(prefix, limit)
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
+
+
 def get_tag_by_id():
     """Return the tag which matches the provided ID
 
@@ -161,15 +482,4 @@ def get_tag_by_id():
         return jsonify({"error": f"Server error: {str(e)}"}), 500
 
 def get_or_create_tag(name, supabase):
-    supabase = get_supabase()
-
-    # Check if exists
-    response = supabase.table("tags").select("id").eq("name", name).execute()
-
-    if response.data:
-        return response.data[0]["id"]
-
-    # Otherwise create
-    result = supabase.table("tags").insert({"name": name}).execute()
-
-    return result.data[0]["id"]
+    return upsert_tags(supabase, [name])[name]
@@ -1,19 +1,24 @@
 from flask import request, jsonify
+import logging
 import sys
 import os
 
 # Allow imports of shared modules
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from api.database import get_supabase  # noqa: E402
+from api.accounting import record_trade as record_market_trade  # noqa: E402
+from api.stream import publish_trade  # noqa: E402
+from api.events import append_trade  # noqa: E402
+from api import versions  # noqa: E402
 
 from api.amm import (  # noqa: E402
     _aggregate_positions,
-    _compute_b_ls_lmsr,
-    _lmsr_cost,
-    _lmsr_prices,
-    B0,
+    quote_trade_cents,
+    poll_b0,
 )
 
+logger = logging.getLogger(__name__)
+
 
 def buy_shares():
     """
@@ -27,7 +32,8 @@ def buy_shares():
         if not supabase:
             return jsonify({"error": "Database connection not available"}), 503
 
-        if not _poll_exists(supabase, poll_id):
+        poll = _get_poll(supabase, poll_id)
+        if not poll:
             return jsonify({"error": "Poll not found"}), 404
 
         user_balance = _get_user_balance(supabase, user_id)
@@ -35,23 +41,23 @@ def buy_shares():
             return jsonify({"error": "User not found"}), 404
 
         market_state = _aggregate_positions(poll_id, client=supabase)
-        quote = _quote_move(market_state, num_shares, outcome_yes, direction="buy")
+        quote = _quote_move(market_state, num_shares, outcome_yes, direction="buy", b0=poll_b0(poll))
 
-        if user_balance + 1e-9 < 100*quote["cash_change"]:
+        if user_balance < quote["cash_change_cents"]:
             return jsonify({"error": "Insufficient balance"}), 400
 
-        new_balance = round(user_balance - 100*quote["cash_change"])
+        new_balance = user_balance - quote["cash_change_cents"]
         _persist_balance(supabase, user_id, new_balance)
         # store total trade cost in cents
-        total_cost_cents = int(round(quote["cash_change"] * 100))
         _record_trade(
             supabase,
             poll_id,
             user_id,
             outcome_yes,
             num_shares,
-            share_price=total_cost_cents,
+            share_price=quote["cash_change_cents"],
         )
+        _after_trade(supabase, poll_id, user_id, outcome_yes, num_shares, quote["cash_change_cents"], quote)
 
         return (
             jsonify(
@@ -93,7 +99,8 @@ def sell_shares():
         if not supabase:
             return jsonify({"error": "Database connection not available"}), 503
 
-        if not _poll_exists(supabase, poll_id):
+        poll = _get_poll(supabase, poll_id)
+        if not poll:
             return jsonify({"error": "Poll not found"}), 404
 
         user_balance = _get_user_balance(supabase, user_id)
@@ -105,20 +112,20 @@ def sell_shares():
             return jsonify({"error": "Cannot sell more shares than owned"}), 400
 
         market_state = _aggregate_positions(poll_id, client=supabase)
-        quote = _quote_move(market_state, num_shares, outcome_yes, direction="sell")
+        quote = _quote_move(market_state, num_shares, outcome_yes, direction="sell", b0=poll_b0(poll))
 
-        new_balance = round(user_balance + 100*quote["cash_change"]) # DB stores balance in cents
+        new_balance = user_balance + quote["cash_change_cents"] # DB stores balance in cents
         _persist_balance(supabase, user_id, new_balance)
         # store total payout in cents (positive) and record sold shares as negative
-        total_payout_cents = int(round(quote["cash_change"] * 100))
         _record_trade(
             supabase,
             poll_id,
             user_id,
             outcome_yes,
             num_shares=-num_shares,
-            share_price=total_payout_cents,
+            share_price=quote["cash_change_cents"],
         )
+        _after_trade(supabase, poll_id, user_id, outcome_yes, -num_shares, -quote["cash_change_cents"], quote)
 
         return (
             jsonify(
@@ -148,6 +155,30 @@ def sell_shares():
         return jsonify({"error": f"Server error: {str(exc)}"}), 500
 
 
+def _after_trade(supabase, poll_id, user_id, outcome_yes, num_shares, cash_cents, quote):
+    """
+    Follow-up work once the balance and trade row are written: accounting,
+    the event journal, the live price stream and cache versions.
+
+    The trade has gone through by now, so a failure here is logged rather than
+    returned; a 500 would invite the client to retry and trade twice. Each
+    step runs even if an earlier one failed.
+    """
+    steps = (
+        ("record_market_trade", lambda: record_market_trade(supabase, poll_id, outcome_yes, num_shares, cash_cents)),
+        ("append_trade", lambda: append_trade(supabase, poll_id, user_id, outcome_yes, num_shares, cash_cents,
+                                              quote["price_yes_after"], quote["price_no_after"])),
+        ("publish_trade", lambda: publish_trade(poll_id, outcome_yes, num_shares, cash_cents, quote)),
+        ("versions.bump", lambda: versions.bump(versions.market_scope(poll_id), versions.BALANCES,
+                                                versions.user_scope(user_id))),
+    )
+    for name, step in steps:
+        try:
+            step()
+        except Exception:
+            logger.exception("%s failed after trade on poll %s by user %s", name, poll_id, user_id)
+
+
 def _parse_trade_payload(data):
     try:
         poll_id = int(data.get("poll_id"))
@@ -181,14 +212,16 @@ def _normalize_outcome(value):
     raise ValueError("Outcome must be YES or NO")
 
 
-def _poll_exists(supabase, poll_id):
+def _get_poll(supabase, poll_id):
     resp = (
         supabase.table("polls")
-        .select("id")
+        .select("id, liquidity_b0")
         .eq("id", poll_id)
         .execute()
     )
-    return bool(resp.data)
+    if not resp.data:
+        return None
+    return resp.data[0]
 
 
 def _get_user_balance(supabase, user_id):
@@ -202,9 +235,9 @@ def _get_user_balance(supabase, user_id):
         return None
     balance = resp.data[0].get("balance", 0)
     try:
-        return float(balance)
+        return int(balance)
     except (TypeError, ValueError):
-        return 0.0
+        return 0
 
 
 def _persist_balance(supabase, user_id, new_balance):
@@ -236,33 +269,32 @@ def _get_user_position(supabase, poll_id, user_id, outcome_yes):
     return total
 
 
-def _quote_move(market_state, num_shares, outcome_yes, direction):
-    q_yes = float(market_state.get("YES", 0))
-    q_no = float(market_state.get("NO", 0))
-    shares = float(num_shares)
-
-    b = _compute_b_ls_lmsr(q_yes, q_no, b0=B0)
-    price_yes_before, price_no_before = _lmsr_prices(q_yes, q_no, b)
-
-    if direction == "buy":
-        q_yes_new = q_yes + shares if outcome_yes else q_yes
-        q_no_new = q_no + shares if not outcome_yes else q_no
-        cash_change = _lmsr_cost(q_yes_new, q_no_new, b) - _lmsr_cost(q_yes, q_no, b)
-    else:
-        q_yes_new = q_yes - shares if outcome_yes else q_yes
-        q_no_new = q_no - shares if not outcome_yes else q_no
-        cash_change = _lmsr_cost(q_yes, q_no, b) - _lmsr_cost(q_yes_new, q_no_new, b)
+def _quote_move(market_state, num_shares, outcome_yes, direction, b0):
+    """
+    Quote a buy or sell against the market in integer cents.
 
-    cash_change = max(cash_change, 0.0)
-    cash_change = round(cash_change, 2)
-    price_yes_after, price_no_after = _lmsr_prices(q_yes_new, q_no_new, b)
+    cash_change_cents is what the trader pays (buy) or receives (sell);
+    cash_change is the same amount in dollars for API responses.
+    """
+    delta = num_shares if direction == "buy" else -num_shares
+    quote = quote_trade_cents(
+        market_state.get("YES", 0),
+        market_state.get("NO", 0),
+        outcome_yes,
+        delta,
+        b0=b0,
+    )
+    cash_change_cents = abs(quote["cost_cents"])
 
     return {
-        "cash_change": cash_change,
-        "price_yes_before": price_yes_before,
-        "price_no_before": price_no_before,
-        "price_yes_after": price_yes_after,
-        "price_no_after": price_no_after,
+        "cash_change": cash_change_cents / 100.0,
+        "cash_change_cents": cash_change_cents,
+        "price_yes_before": quote["price_yes"],
+        "price_no_before": quote["price_no"],
+        "price_yes_after": quote["price_yes_after"],
+        "price_no_after": quote["price_no_after"],
+        "q_yes_after": quote["q_yes_after"],
+        "q_no_after": quote["q_no_after"],
     }
 
 
@@ -274,11 +306,8 @@ def _record_trade(
     num_shares,
     share_price,
 ):
-    # ensure share_price is stored as integer cents
-    try:
-        share_price_cents = int(round(float(share_price)))
-    except (TypeError, ValueError):
-        share_price_cents = 0
+    # share_price is the total for the trade in integer cents
+    share_price_cents = int(share_price)
 
     (
         supabase.table("trades")
@@ -327,13 +356,17 @@ def estimate_cost(poll_id):
         if not supabase:
             return jsonify({"error": "Database connection not available"}), 503
         
+        poll = _get_poll(supabase, poll_id)
+        if not poll:
+            return jsonify({"error": "Poll not found"}), 404
+
         market_state = _aggregate_positions(poll_id, client=supabase)
         if buy:
-            quote = _quote_move(market_state, num_shares, outcome_yes, direction="buy")
+            quote = _quote_move(market_state, num_shares, outcome_yes, direction="buy", b0=poll_b0(poll))
         else:
-            quote = _quote_move(market_state, num_shares, outcome_yes, direction="sell")
+            quote = _quote_move(market_state, num_shares, outcome_yes, direction="sell", b0=poll_b0(poll))
         
-        return jsonify({"estimate": float(quote["cash_change"])}), 200
+        return jsonify({"estimate": quote["cash_change"]}), 200
         
     except Exception as exc:
         return jsonify({"error": f"Server error: {str(exc)}"}), 500
@@ -0,0 +1,311 @@
+from flask import request, jsonify
+from bisect import bisect_left, insort
+from datetime import datetime
+import time
+
+from api.database import get_supabase
+from api import events, versions
+
+# Trending feed: polls ranked by recent trading activity, maintained from the
+# event journal (see api.events.Projection) and paginated from memory.
+#
+# Every trade adds to its poll's score:
+#     VOLUME_WEIGHT * dollars traded
+#   + TRADER_WEIGHT if the trader hasn't traded this poll in the last half-life
+#   + PRICE_MOVE_WEIGHT * cents the YES price moved
+# and contributions lose half their weight every TRENDING_HALF_LIFE_SECONDS.
+#
+# Decay uses a fixed landmark ("forward decay"): a trade at time t is stored
+# scaled by 2**((t - landmark) / half_life). Every stored score would decay by
+# the same factor, so the ranking only changes when a poll trades and a
+# sorted list can be updated in O(log n) per trade instead of re-scoring.
+
+TRENDING_HALF_LIFE_SECONDS = 6 * 3600
+TRENDING_REFRESH_SECONDS = 2
+# Poll rows (title, visibility, outcome) are cached alongside the ranking;
+# writes in this process drop them at once, other workers' after this long
+TRENDING_POLL_TTL_SECONDS = 30
+
+VOLUME_WEIGHT = 1.0
+TRADER_WEIGHT = 5.0
+PRICE_MOVE_WEIGHT = 0.5
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Rescale stored scores before 2**exponent gets anywhere near overflowing
+_MAX_EXPONENT = 512
+_INITIAL_PRICE = 50
+_FETCH_CHUNK = 100
+
+
+class TrendingProjection(events.Projection):
+    name = "trending"
+    types = {events.TRADE, events.SETTLEMENT}
+    snapshot_version = 1
+
+    def __init__(self, refresh_seconds=TRENDING_REFRESH_SECONDS, half_life=TRENDING_HALF_LIFE_SECONDS):
+        super().__init__(refresh_seconds)
+        self.half_life = half_life
+        self._landmark = None
+        self._keys = {}        # poll_id -> forward-decayed score
+        self._ranking = []     # sorted (-key, poll_id)
+        self._last_price = {}  # poll_id -> YES price after its last trade
+        self._last_seen = {}   # poll_id -> {user_id: time of their last trade}
+        self._pruned_at = None # event time of the last _last_seen sweep
+        self._rows = {}        # poll_id -> (poll row or None, fetched at)
+        self._rows_gen = 0     # bumped whenever cached rows are dropped
+
+    def apply(self, event):
+        poll_id = event["poll_id"]
+        if event["type"] == events.SETTLEMENT:
+            # Resolved markets leave the feed for good
+            self._set_key(poll_id, None)
+            self._last_price.pop(poll_id, None)
+            self._last_seen.pop(poll_id, None)
+            return
+
+        t = events.event_time(event)
+        if self._landmark is None:
+            self._landmark = t
+        if (t - self._landmark) / self.half_life > _MAX_EXPONENT:
+            self._rescale(t)
+
+        price = event.get("price_yes")
+        move = 0
+        if price is not None:
+            move = abs(price - self._last_price.get(poll_id, _INITIAL_PRICE))
+            self._last_price[poll_id] = price
+
+        self._prune_last_seen(t)
+        seen = self._last_seen.setdefault(poll_id, {})
+        previous = seen.get(event.get("user_id"))
+        new_trader = previous is None or t - previous >= self.half_life
+        seen[event.get("user_id")] = t
+
+        contribution = (
+            VOLUME_WEIGHT * abs(int(event.get("cash_cents") or 0)) / 100
+            + TRADER_WEIGHT * new_trader
+            + PRICE_MOVE_WEIGHT * move
+        )
+        weight = 2 ** ((t - self._landmark) / self.half_life)
+        self._set_key(poll_id, self._keys.get(poll_id, 0) + contribution * weight)
+
+    def _prune_last_seen(self, t):
+        """
+        Drop sightings older than a half-life, since those traders count as
+        new again anyway. Sweeping every map at most once per half-life keeps
+        the cost per trade constant.
+        """
+        if self._pruned_at is not None and t - self._pruned_at < self.half_life:
+            return
+        self._pruned_at = t
+        cutoff = t - self.half_life
+        for poll_id in list(self._last_seen):
+            seen = {user_id: at for user_id, at in self._last_seen[poll_id].items() if at > cutoff}
+            if seen:
+                self._last_seen[poll_id] = seen
+            else:
+                del self._last_seen[poll_id]
+
+    def _set_key(self, poll_id, key):
+        old = self._keys.pop(poll_id, None)
+        if old is not None:
+            del self._ranking[bisect_left(self._ranking, (-old, poll_id))]
+        if key is not None:
+            self._keys[poll_id] = key
+            insort(self._ranking, (-key, poll_id))
+
+    def _rescale(self, t):
+        factor = 2 ** ((self._landmark - t) / self.half_life)
+        self._landmark = t
+        self._keys = {poll_id: key * factor for poll_id, key in self._keys.items()}
+        self._ranking = sorted((-key, poll_id) for poll_id, key in self._keys.items())
+
+    def snapshot(self):
+        # A trader seen more than a half-life ago counts as new again, so
+        # older sightings needn't be kept
+        cutoff = time.time() - self.half_life
+        return {
+            "landmark": self._landmark,
+            "keys": list(self._keys.items()),
+            "last_price": list(self._last_price.items()),
+            "last_seen": [
+                [poll_id, [[user_id, t] for user_id, t in seen.items() if t > cutoff]]
+                for poll_id, seen in self._last_seen.items()
+            ],
+        }
+
+    def restore(self, state):
+        keys = {poll_id: float(key) for poll_id, key in state["keys"]}
+        self._landmark = state["landmark"]
+        self._keys = keys
+        self._ranking = sorted((-key, poll_id) for poll_id, key in keys.items())
+        self._last_price = dict(state["last_price"])
+        self._last_seen = {poll_id: dict(seen) for poll_id, seen in state["last_seen"]}
+        self._pruned_at = None
+
+    def forget_polls(self, scopes):
+        """versions.on_bump listener: drop cached rows of polls that changed."""
+        scopes = set(scopes)
+        with self._lock:
+            dropped = [p for p in self._rows if versions.poll_scope(p) in scopes]
+            for poll_id in dropped:
+                del self._rows[poll_id]
+            if dropped or versions.POLLS in scopes:
+                self._rows_gen += 1
+
+    def _load_rows(self, supabase, poll_ids):
+        """
+        {poll_id: poll row or None} for poll_ids, from the cache where it is
+        fresh. Missing rows are fetched without holding the lock, so trades
+        and other pages aren't held up by the query; they are cached only if
+        no poll was edited in the meantime.
+        """
+        now = time.monotonic()
+        with self._lock:
+            rows = {}
+            stale = []
+            for poll_id in poll_ids:
+                cached = self._rows.get(poll_id)
+                if cached is None or now - cached[1] >= TRENDING_POLL_TTL_SECONDS:
+                    stale.append(poll_id)
+                else:
+                    rows[poll_id] = cached[0]
+            generation = self._rows_gen
+        if not stale:
+            return rows
+
+        fetched = {}
+        for start in range(0, len(stale), _FETCH_CHUNK):
+            chunk = stale[start:start + _FETCH_CHUNK]
+            result = supabase.table("polls").select("*, poll_tags(tags(name))").in_("id", chunk).execute()
+            found = {row["id"]: row for row in result.data or []}
+            for poll_id in chunk:
+                fetched[poll_id] = found.get(poll_id)
+        rows.update(fetched)
+
+        with self._lock:
+            if self._rows_gen == generation:
+                for poll_id, row in fetched.items():
+                    self._rows[poll_id] = (row, now)
+        return rows
+
+    def page(self, supabase, page, page_size):
+        """
+        (entries, total) for one page of the feed, where each entry is
+        (poll row, score) for a public, unresolved poll that is still open.
+
+        The ranking is walked from the top, loading poll rows _FETCH_CHUNK at
+        a time, only until the page is filled. total is exact when the walk
+        reaches the end of the ranking; otherwise the polls left unwalked are
+        estimated to be listed in the same proportion as the walked ones.
+        """
+        self.refresh(supabase)
+        now = time.time()
+        offset = (page - 1) * page_size
+        # Walk a copy of the ranking so the lock isn't held while rows load
+        with self._lock:
+            ranking = list(self._ranking)
+            landmark = self._landmark
+
+        listed = []
+        walked = 0
+        while walked < len(ranking) and len(listed) < offset + page_size:
+            chunk = ranking[walked:walked + _FETCH_CHUNK]
+            rows = self._load_rows(supabase, [poll_id for _, poll_id in chunk])
+            for neg_key, poll_id in chunk:
+                walked += 1
+                row = rows[poll_id]
+                if row is not None and _is_listed(row, now):
+                    listed.append((row, -neg_key))
+                    if len(listed) == offset + page_size:
+                        break
+
+        total = len(listed)
+        unwalked = len(ranking) - walked
+        if unwalked:
+            total += round(unwalked * len(listed) / walked)
+
+        decay = 2 ** ((landmark - now) / self.half_life) if landmark is not None else 0
+        entries = [(row, key * decay) for row, key in listed[offset:offset + page_size]]
+        return entries, total
+
+
+def _is_listed(row, now):
+    if not row.get("public") or row.get("deleted") or row.get("outcome") is not None:
+        return False
+    return not _has_ended(row, now)
+
+
+def _has_ended(row, now):
+    if not row.get("ends_at"):
+        return False
+    ends_at = datetime.fromisoformat(row["ends_at"].replace("Z", "+00:00"))
+    return ends_at.timestamp() <= now
+
+
+projection = TrendingProjection()
+events.on_event(projection.on_event)
+versions.on_bump(projection.forget_polls)
+
+
+def get_trending():
+    """
+    Trending open polls, most active first.
+
+    Query parameters:
+    - page: Page number (default: 1)
+    - page_size: Results per page (default: 20, max: 100)
+
+    Returns:
+    {
+        "polls": [{...poll fields, "tags": [...], "has_ended": false, "trending_score": 12.5}, ...],
+        "pagination": {"page": 1, "page_size": 20, "total": 42, "total_pages": 3}
+    }
+
+    Only polls that have been traded appear in the feed.
+    """
+    try:
+        try:
+            page = max(int(request.args.get("page", 1)), 1)
+        except (ValueError, TypeError):
+            page = 1
+        try:
+            page_size = int(request.args.get("page_size", DEFAULT_PAGE_SIZE))
+            if page_size < 1:
+                page_size = DEFAULT_PAGE_SIZE
+            page_size = min(page_size, MAX_PAGE_SIZE)
+        except (ValueError, TypeError):
+            page_size = DEFAULT_PAGE_SIZE
+
+        supabase = get_supabase()
+        if not supabase:
+            return jsonify({"error": "Database connection not available"}), 503
+
+        entries, total = projection.page(supabase, page, page_size)
+
+        polls = []
+        for row, score in entries:
+            poll = {k: v for k, v in row.items() if k != "poll_tags"}
+            poll["tags"] = [
+                tag_wrapper["tags"]["name"]
+                for tag_wrapper in row.get("poll_tags") or []
+                if tag_wrapper.get("tags") and tag_wrapper["tags"].get("name")
+            ]
+            poll["has_ended"] = False
+            poll["trending_score"] = round(score, 4)
+            polls.append(poll)
+
+        return jsonify({
+            "polls": polls,
+            "pagination": {
+                "page": page,
+                "page_size": page_size,
+                "total": total,
+                "total_pages": (total + page_size - 1) // page_size
+            }
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Server error: {str(e)}"}), 500
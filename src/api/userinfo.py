@@ -1,6 +1,7 @@
 from flask import request, jsonify
 from api.database import get_supabase
 from api.positions import get_positions
+from api.portfolio import get_portfolio
 
 
 def get_data():
@@ -21,10 +22,22 @@ def get_data():
         {
             "username": "<username>",
             "balance": <balance>,
+            "equity": <equity>,                  # balance + positions_value
+            "positions_value": <positions_value>,
             "lifetime_pnl": <lifetime_pnl>,
+            "realized_pnl": <realized_pnl>,
+            "unrealized_pnl": <unrealized_pnl>,
             "exposure": <exposure>,
-            "positions": [ ... ]  # List of positions as returned by get_positions()
+            "positions": [ ... ],  # One page of positions as returned by get_positions()
+            "total_positions": <int>,
+            "next_cursor": "<cursor>"
         }
+
+    The totals cover every position (see api.portfolio), not just the page.
+    An unresolved position is valued at what selling it back to the market
+    would pay now (amm.quote_trade_cents), both in positions_value and in
+    each position's "value"; a resolved one at its payout. This is below
+    quantity * current_price, because selling moves the price.
     """
     try:
         data = request.get_json()
@@ -62,21 +75,20 @@ def get_data():
         if status != 200:
             return positions_response, status
         positions_data = positions_response.get_json()
-        positions = positions_data.get("positions", [])
-
-        lifetime_pnl = 0.0
-        exposure = 0.0
-        for position in positions:
-            lifetime_pnl += position.get("current_pnl", 0.0)
-            if position.get("open", True):
-                exposure += int(position.get("quantity", 0)) * float(position.get("avg_price", 0.0))
+        portfolio = get_portfolio(supabase, user_id)
 
         return jsonify({
             "username": username,
             "balance": balance / 100.0,
-            "lifetime_pnl": lifetime_pnl,
-            "positions": positions,
-            "exposure": exposure
+            "equity": balance / 100.0 + portfolio["positions_value"],
+            "positions_value": portfolio["positions_value"],
+            "lifetime_pnl": portfolio["lifetime_pnl"],
+            "realized_pnl": portfolio["realized_pnl"],
+            "unrealized_pnl": portfolio["unrealized_pnl"],
+            "positions": positions_data.get("positions", []),
+            "total_positions": positions_data.get("total", 0),
+            "next_cursor": positions_data.get("next_cursor"),
+            "exposure": portfolio["exposure"]
         }), 200
 
     except Exception as e:
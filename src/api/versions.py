@@ -0,0 +1,148 @@
+from flask import request, make_response
+from functools import wraps
+from hashlib import sha1
+from werkzeug.http import http_date, parse_date
+import threading
+import time
+import uuid
+
+# Data version counters behind the ETag / Last-Modified headers of read
+# endpoints. Write handlers bump the scopes they change; a conditional GET
+# whose scopes haven't moved is answered with 304 before the handler runs.
+#
+# The counters live in this process. Other workers (or serverless instances)
+# don't see each other's bumps, so every validator also carries an epoch that
+# rolls over every VERSION_TTL_SECONDS: a response can be stale for at most
+# that long on a worker that didn't handle the write.
+VERSION_TTL_SECONDS = 30
+
+# Scopes
+POLLS = "polls"         # anything shown in poll listings
+TAGS = "tags"           # the tag set
+BALANCES = "balances"   # any profile balance (leaderboard)
+
+_BOOT_ID = uuid.uuid4().hex
+_BOOT_TIME = time.time()
+
+_lock = threading.Lock()
+_versions = {}
+_listeners = []
+
+
+def poll_scope(poll_id):
+    """A single poll's row and tags."""
+    return f"poll:{int(poll_id)}"
+
+
+def market_scope(poll_id):
+    """A single poll's market state (trades, prices)."""
+    return f"market:{int(poll_id)}"
+
+
+def user_scope(user_id):
+    """A single user's balance and positions."""
+    return f"user:{int(user_id)}"
+
+
+def bump(*scopes):
+    """Record that the data behind these scopes changed."""
+    now = time.time()
+    with _lock:
+        for scope in scopes:
+            counter, _ = _versions.get(scope, (0, _BOOT_TIME))
+            _versions[scope] = (counter + 1, now)
+        listeners = list(_listeners)
+    for listener in listeners:
+        listener(scopes)
+
+
+def on_bump(listener):
+    """Call listener(scopes) after every bump (used by api.cache to invalidate)."""
+    with _lock:
+        _listeners.append(listener)
+
+
+def current(scopes):
+    """(counters, last modified time) for a set of scopes, including the TTL epoch."""
+    now = time.time()
+    epoch = int(now // VERSION_TTL_SECONDS)
+    last_modified = max(_BOOT_TIME, epoch * VERSION_TTL_SECONDS)
+    counters = []
+    with _lock:
+        for scope in scopes:
+            counter, modified = _versions.get(scope, (0, _BOOT_TIME))
+            counters.append(counter)
+            last_modified = max(last_modified, modified)
+    return (epoch, tuple(counters)), last_modified
+
+
+def _etag(scopes, key, per_user):
+    versions, last_modified = current(scopes)
+    parts = [_BOOT_ID, repr(versions), repr(tuple(scopes)), key]
+    if per_user:
+        parts.append(request.cookies.get("sb-access-token") or "")
+    return sha1("|".join(parts).encode()).hexdigest(), last_modified
+
+
+def _not_modified(etag, last_modified, per_user):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if per_user:
+        # A date says nothing about whose session the copy was made for
+        return False
+    since = parse_date(request.headers.get("If-Modified-Since"))
+    return since is not None and int(last_modified) <= since.timestamp()
+
+
+def conditional(scopes, max_age=0, per_user=False, public=False):
+    """
+    Decorator adding ETag / Last-Modified / Cache-Control to a GET handler.
+
+    scopes: function taking the handler's arguments and returning the
+            version scopes its response depends on
+    max_age: seconds the response may be reused without revalidating; 0
+             means always revalidate
+    per_user: the response depends on who is asking, so the ETag includes
+              the session, no Last-Modified is sent and If-Modified-Since
+              is ignored (and the response is always private)
+    public: shared caches (CDNs) may store the response too. Leave it off
+            for @protected routes, or a CDN would serve them to anyone
+    """
+    visibility = "public" if public and not per_user else "private"
+    if per_user:
+        cache_control = "private, no-cache"
+    elif max_age:
+        cache_control = f"{visibility}, max-age={max_age}"
+    else:
+        cache_control = f"{visibility}, no-cache"
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            try:
+                scope_list = list(scopes(*args, **kwargs))
+            except (TypeError, ValueError):
+                # Invalid ids etc. are the handler's to report
+                return handler(*args, **kwargs)
+
+            etag, last_modified = _etag(scope_list, request.full_path, per_user)
+            if _not_modified(etag, last_modified, per_user):
+                res = make_response("", 304)
+                _set_headers(res, etag, None if per_user else last_modified, cache_control)
+                return res, 304
+
+            res, status = handler(*args, **kwargs)
+            if status == 200:
+                _set_headers(res, etag, None if per_user else last_modified, cache_control)
+            return res, status
+        return wrapper
+    return decorator
+
+
+def _set_headers(res, etag, last_modified, cache_control):
+    res.set_etag(etag, weak=True)
+    res.headers["Cache-Control"] = cache_control
+    # Last-Modified has one-second resolution; a second that is still in
+    # progress could see another write, so only advertise finished seconds
+    if last_modified is not None and int(last_modified) < int(time.time()):
+        res.headers["Last-Modified"] = http_date(int(last_modified))
@@ -0,0 +1,32 @@
+-- One-off backfill of market_accounting for polls traded before it existed
+-- (api.accounting keeps it up to date from then on). Run once against an
+-- existing database, after creating market_accounting and its functions from
+-- schema.sql and before deploying code that records trades into it. Polls
+-- that already have a row are left alone.
+--
+-- Resolved polls get the settlement that api.admin.resolve_poll works out:
+-- 100 cents per winning share bought before the poll ended, plus a refund of
+-- the share price of every trade made after it ended.
+BEGIN;
+
+LOCK TABLE public.market_accounting IN EXCLUSIVE MODE;
+
+INSERT INTO public.market_accounting
+  (poll_id, collected_cents, yes_shares, no_shares, payout_cents, refund_cents, resolved_outcome)
+SELECT p.id,
+       sum(CASE WHEN t.num_shares > 0 THEN t.share_price ELSE -t.share_price END),
+       sum(CASE WHEN t.outcome THEN t.num_shares ELSE 0 END),
+       sum(CASE WHEN t.outcome THEN 0 ELSE t.num_shares END),
+       CASE WHEN p.outcome IS NULL THEN 0 ELSE
+         100 * coalesce(sum(t.num_shares) FILTER (WHERE t.outcome = p.outcome AND t.timestamp < p.ends_at), 0)
+       END,
+       CASE WHEN p.outcome IS NULL THEN 0 ELSE
+         coalesce(sum(t.share_price) FILTER (WHERE t.timestamp > p.ends_at), 0)
+       END,
+       p.outcome
+FROM public.polls p
+JOIN public.trades t ON t.poll_id = p.id
+WHERE NOT EXISTS (SELECT 1 FROM public.market_accounting m WHERE m.poll_id = p.id)
+GROUP BY p.id, p.outcome, p.ends_at;
+
+COMMIT;
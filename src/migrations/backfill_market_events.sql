@@ -0,0 +1,18 @@
+-- One-off backfill of the market_events journal from trades recorded before
+-- it existed (api.stats and api.trending build their projections from
+-- market_events). Run once against an existing database, after creating the
+-- market_events table from schema.sql and before deploying code that appends
+-- to it. Does nothing if the journal already holds trades.
+BEGIN;
+
+LOCK TABLE public.market_events IN EXCLUSIVE MODE;
+
+INSERT INTO public.market_events (type, poll_id, user_id, outcome, num_shares, cash_cents, created_at)
+SELECT 'trade', poll_id, user_id, outcome, num_shares,
+       CASE WHEN num_shares > 0 THEN share_price ELSE -share_price END,
+       timestamp
+FROM public.trades
+WHERE NOT EXISTS (SELECT 1 FROM public.market_events WHERE type = 'trade')
+ORDER BY timestamp, id;
+
+COMMIT;
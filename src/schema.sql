@@ -19,6 +19,7 @@ CREATE TABLE public.polls (
   creator bigint NOT NULL,
   outcome boolean,
   deleted boolean NOT NULL DEFAULT false,
+  liquidity_b0 real CHECK (liquidity_b0 IS NULL OR liquidity_b0 > 0),
   CONSTRAINT polls_pkey PRIMARY KEY (id),
   CONSTRAINT polls_creator_fkey FOREIGN KEY (creator) REFERENCES public.profiles(id)
 );
@@ -47,11 +48,13 @@ CREATE TABLE public.trades (
   num_shares bigint NOT NULL CHECK (num_shares <> 0),
   outcome boolean NOT NULL,
   timestamp timestamp with time zone NOT NULL DEFAULT now(),
-  share_price real NOT NULL,
+  share_price bigint NOT NULL,
   CONSTRAINT trades_pkey PRIMARY KEY (id),
   CONSTRAINT trades_poll_id_fkey FOREIGN KEY (poll_id) REFERENCES public.polls(id),
   CONSTRAINT trades_user_id_fkey FOREIGN KEY (user_id) REFERENCES public.profiles(id)
 );
+-- Keyset-paginated reads of one user's trades (trade export)
+CREATE INDEX trades_user_id_idx ON public.trades (user_id, id);
 CREATE TABLE public.user_tags (
   id bigint GENERATED ALWAYS AS IDENTITY NOT NULL UNIQUE,
   tag_id bigint NOT NULL,
@@ -59,4 +62,156 @@ CREATE TABLE public.user_tags (
   CONSTRAINT user_tags_pkey PRIMARY KEY (id),
   CONSTRAINT user_tags_tag_id_fkey FOREIGN KEY (tag_id) REFERENCES public.tags(id),
   CONSTRAINT user_tags_user_id_fkey FOREIGN KEY (user_id) REFERENCES public.profiles(id)
-);
\ No newline at end of file
+);
+CREATE TABLE public.market_accounting (
+  poll_id bigint NOT NULL,
+  collected_cents bigint NOT NULL DEFAULT 0,
+  yes_shares bigint NOT NULL DEFAULT 0,
+  no_shares bigint NOT NULL DEFAULT 0,
+  payout_cents bigint NOT NULL DEFAULT 0,
+  refund_cents bigint NOT NULL DEFAULT 0,
+  resolved_outcome boolean,
+  CONSTRAINT market_accounting_pkey PRIMARY KEY (poll_id),
+  CONSTRAINT market_accounting_poll_id_fkey FOREIGN KEY (poll_id) REFERENCES public.polls(id)
+);
+
+CREATE FUNCTION public.record_market_trade(p_poll_id bigint, p_outcome boolean, p_num_shares bigint, p_cash_cents bigint)
+RETURNS void LANGUAGE sql AS $$
+  INSERT INTO public.market_accounting AS m (poll_id, collected_cents, yes_shares, no_shares)
+  VALUES (p_poll_id, p_cash_cents,
+          CASE WHEN p_outcome THEN p_num_shares ELSE 0 END,
+          CASE WHEN p_outcome THEN 0 ELSE p_num_shares END)
+  ON CONFLICT (poll_id) DO UPDATE SET
+    collected_cents = m.collected_cents + EXCLUDED.collected_cents,
+    yes_shares = m.yes_shares + EXCLUDED.yes_shares,
+    no_shares = m.no_shares + EXCLUDED.no_shares;
+$$;
+
+CREATE FUNCTION public.record_market_settlement(p_poll_id bigint, p_outcome boolean, p_payout_cents bigint, p_refund_cents bigint)
+RETURNS void LANGUAGE sql AS $$
+  INSERT INTO public.market_accounting AS m (poll_id, payout_cents, refund_cents, resolved_outcome)
+  VALUES (p_poll_id, p_payout_cents, p_refund_cents, p_outcome)
+  ON CONFLICT (poll_id) DO UPDATE SET
+    payout_cents = EXCLUDED.payout_cents,
+    refund_cents = EXCLUDED.refund_cents,
+    resolved_outcome = EXCLUDED.resolved_outcome;
+$$;
+
+-- One page of a user's positions (trades netted per poll and side), in
+-- (poll_id, outcome) order, with the number of positions across all pages.
+-- Page with p_offset, or pass the last position seen as p_after_poll_id /
+-- p_after_outcome for a cursor that is stable while new positions open.
+-- p_limit NULL returns every position; p_include_closed also returns the
+-- positions that have been sold back to zero (their cost basis is the
+-- realized result).
+CREATE FUNCTION public.user_positions(p_user_id bigint, p_poll_id bigint DEFAULT NULL, p_status text DEFAULT NULL,
+                                      p_after_poll_id bigint DEFAULT NULL, p_after_outcome boolean DEFAULT NULL,
+                                      p_offset integer DEFAULT 0, p_limit integer DEFAULT 20,
+                                      p_include_closed boolean DEFAULT false)
+RETURNS jsonb LANGUAGE sql STABLE AS $$
+  WITH positions AS (
+    SELECT t.poll_id, t.outcome, sum(t.num_shares) AS quantity,
+           sum(CASE WHEN t.num_shares > 0 THEN t.share_price ELSE -t.share_price END) AS cost_basis_cents
+    FROM public.trades t
+    JOIN public.polls p ON p.id = t.poll_id
+    WHERE t.user_id = p_user_id
+      AND (p_poll_id IS NULL OR t.poll_id = p_poll_id)
+      AND (p_status IS NULL
+           OR (p_status = 'open' AND (p.ends_at IS NULL OR p.ends_at > now()))
+           OR (p_status = 'closed' AND p.ends_at <= now()))
+    GROUP BY t.poll_id, t.outcome
+    HAVING p_include_closed OR sum(t.num_shares) <> 0
+  ), page AS (
+    SELECT * FROM positions
+    WHERE p_after_poll_id IS NULL OR (poll_id, outcome) > (p_after_poll_id, p_after_outcome)
+    ORDER BY poll_id, outcome
+    OFFSET p_offset LIMIT p_limit
+  )
+  SELECT jsonb_build_object(
+    'total', (SELECT count(*) FROM positions),
+    'positions', COALESCE((SELECT jsonb_agg(to_jsonb(page) ORDER BY poll_id, outcome) FROM page), '[]'::jsonb)
+  );
+$$;
+
+CREATE TABLE public.market_events (
+  id bigint GENERATED ALWAYS AS IDENTITY NOT NULL UNIQUE,
+  type text NOT NULL CHECK (type IN ('trade', 'settlement')),
+  poll_id bigint NOT NULL,
+  user_id bigint,
+  outcome boolean,
+  num_shares bigint,
+  cash_cents bigint,
+  price_yes bigint,
+  price_no bigint,
+  payout_cents bigint,
+  refund_cents bigint,
+  created_at timestamp with time zone NOT NULL DEFAULT now(),
+  CONSTRAINT market_events_pkey PRIMARY KEY (id),
+  CONSTRAINT market_events_poll_id_fkey FOREIGN KEY (poll_id) REFERENCES public.polls(id)
+);
+CREATE INDEX market_events_poll_id_idx ON public.market_events (poll_id, id);
+CREATE TABLE public.event_checkpoints (
+  consumer text NOT NULL,
+  seq bigint NOT NULL DEFAULT 0,
+  updated_at timestamp with time zone NOT NULL DEFAULT now(),
+  CONSTRAINT event_checkpoints_pkey PRIMARY KEY (consumer)
+);
+-- Saved state of in-memory projections of market_events (api.events.Projection):
+-- a new process restores it and replays only the events after seq
+CREATE TABLE public.projection_snapshots (
+  name text NOT NULL,
+  version integer NOT NULL,
+  seq bigint NOT NULL,
+  state jsonb NOT NULL,
+  updated_at timestamp with time zone NOT NULL DEFAULT now(),
+  CONSTRAINT projection_snapshots_pkey PRIMARY KEY (name)
+);
+
+-- Equity history, one row per user with a column per series: element i of
+-- each array belongs to snapshot taken_at[i] (api.snapshots)
+CREATE TABLE public.portfolio_snapshots (
+  user_id bigint NOT NULL,
+  taken_at timestamp with time zone[] NOT NULL DEFAULT '{}',
+  cash_cents bigint[] NOT NULL DEFAULT '{}',
+  positions_cents bigint[] NOT NULL DEFAULT '{}',
+  CONSTRAINT portfolio_snapshots_pkey PRIMARY KEY (user_id),
+  CONSTRAINT portfolio_snapshots_user_id_fkey FOREIGN KEY (user_id) REFERENCES public.profiles(id)
+);
+
+-- Progress of each snapshot run: a run stopped by its time budget has no
+-- finished_at and is resumed after last_user_id (api.snapshots)
+CREATE TABLE public.snapshot_runs (
+  id bigint GENERATED ALWAYS AS IDENTITY NOT NULL,
+  taken_at timestamp with time zone NOT NULL,
+  last_user_id bigint NOT NULL DEFAULT 0,
+  users integer NOT NULL DEFAULT 0,
+  finished_at timestamp with time zone,
+  CONSTRAINT snapshot_runs_pkey PRIMARY KEY (id)
+);
+
+-- Shares held per user, poll and side in markets that haven't resolved
+-- (resolved ones have already been paid out into balances)
+CREATE FUNCTION public.portfolio_holdings(p_user_ids bigint[])
+RETURNS TABLE (user_id bigint, poll_id bigint, outcome boolean, quantity bigint)
+LANGUAGE sql STABLE AS $$
+  SELECT t.user_id, t.poll_id, t.outcome, sum(t.num_shares)::bigint
+  FROM public.trades t
+  JOIN public.polls p ON p.id = t.poll_id
+  WHERE t.user_id = ANY (p_user_ids) AND p.outcome IS NULL
+  GROUP BY t.user_id, t.poll_id, t.outcome
+  HAVING sum(t.num_shares) <> 0;
+$$;
+
+-- Append one snapshot for many users in a single statement, keeping the
+-- latest p_keep points of each series
+CREATE FUNCTION public.append_portfolio_snapshots(p_taken_at timestamp with time zone, p_user_ids bigint[],
+                                                  p_cash_cents bigint[], p_positions_cents bigint[], p_keep integer)
+RETURNS void LANGUAGE sql AS $$
+  INSERT INTO public.portfolio_snapshots AS s (user_id, taken_at, cash_cents, positions_cents)
+  SELECT u.user_id, ARRAY[p_taken_at], ARRAY[u.cash_cents], ARRAY[u.positions_cents]
+  FROM unnest(p_user_ids, p_cash_cents, p_positions_cents) AS u(user_id, cash_cents, positions_cents)
+  ON CONFLICT (user_id) DO UPDATE SET
+    taken_at = (s.taken_at || EXCLUDED.taken_at)[greatest(cardinality(s.taken_at) + 2 - p_keep, 1):],
+    cash_cents = (s.cash_cents || EXCLUDED.cash_cents)[greatest(cardinality(s.cash_cents) + 2 - p_keep, 1):],
+    positions_cents = (s.positions_cents || EXCLUDED.positions_cents)[greatest(cardinality(s.positions_cents) + 2 - p_keep, 1):];
+$$;
@@ -0,0 +1,326 @@
+"""
+Agent-based market simulation: synthetic traders submit orders through the
+real trade handlers (api.trade.buy_shares / sell_shares) against the
+in-memory backend in sim.backend, to stress-test pricing numerics,
+concurrency behaviour and per-trade latency at peak volumes.
+
+Trader kinds:
+- noise:     random side and size, occasionally sells part of a holding
+- informed:  knows each market's true probability (with some noise) and
+             trades towards it
+- arbitrage: buys complete YES+NO sets whenever the AMM quotes them below
+             the guaranteed $1 payout
+
+Runs are deterministic for a given seed with threads=1. With more threads
+every agent still makes the same decisions from the same random stream,
+but the prices they see depend on thread interleaving.
+
+Usage (from src/):
+    python -m sim.agents --traders 2000 --markets 20 --orders 50000 --threads 8 --seed 1
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+# api.amm builds a Supabase client at import; the simulation never uses it
+os.environ.setdefault("SUPABASE_URL", "http://localhost")
+
+from flask import Flask  # noqa: E402
+
+from api.amm import quote_trade_cents, poll_b0, share_price_bound_cents, _compute_b_ls_lmsr, _lmsr_probability, SHARE_PAYOUT_CENTS  # noqa: E402
+from api.database import override_supabase  # noqa: E402
+from api.trade import buy_shares, sell_shares  # noqa: E402
+from sim.backend import InMemorySupabase  # noqa: E402
+
+DEFAULT_BALANCE_CENTS = 100_000
+TRADER_MIX = {"noise": 0.7, "informed": 0.2, "arbitrage": 0.1}
+
+
+class MarketView:
+    """What a trader can see of one market when it is their turn."""
+
+    def __init__(self, poll_id, q_yes, q_no, b0, true_prob):
+        self.poll_id = poll_id
+        self.q_yes = q_yes
+        self.q_no = q_no
+        self.b0 = b0
+        self.true_prob = true_prob
+
+    @property
+    def prob_yes(self):
+        b = _compute_b_ls_lmsr(self.q_yes, self.q_no, b0=self.b0)
+        return _lmsr_probability(self.q_yes, self.q_no, b)
+
+
+class Trader:
+    kind = "base"
+
+    def __init__(self, user_id, rng):
+        self.user_id = user_id
+        self.rng = rng
+        self.holdings = defaultdict(int)  # (poll_id, outcome_yes) -> shares
+
+    def decide(self, market):
+        """Return a list of orders: (direction, outcome_yes, num_shares)."""
+        raise NotImplementedError
+
+    def filled(self, market, direction, outcome_yes, num_shares):
+        sign = 1 if direction == "buy" else -1
+        self.holdings[(market.poll_id, outcome_yes)] += sign * num_shares
+
+
+class NoiseTrader(Trader):
+    kind = "noise"
+
+    def decide(self, market):
+        outcome_yes = self.rng.random() < 0.5
+        held = self.holdings[(market.poll_id, outcome_yes)]
+        if held and self.rng.random() < 0.3:
+            return [("sell", outcome_yes, self.rng.randint(1, held))]
+        return [("buy", outcome_yes, self.rng.randint(1, 10))]
+
+
+class InformedTrader(Trader):
+    kind = "informed"
+    EDGE = 0.03
+
+    def decide(self, market):
+        belief = min(max(market.true_prob + self.rng.gauss(0, 0.05), 0.01), 0.99)
+        gap = belief - market.prob_yes
+        if abs(gap) < self.EDGE:
+            return []
+        # Sell the side the market now overprices before buying the other one
+        overpriced = gap < 0
+        held = self.holdings[(market.poll_id, overpriced)]
+        if held:
+            return [("sell", overpriced, held)]
+        size = max(1, int(abs(gap) * 50))
+        return [("buy", gap > 0, size)]
+
+
+class ArbitrageTrader(Trader):
+    kind = "arbitrage"
+    SET_SIZE = 5
+    MIN_PROFIT_CENTS = 1
+
+    def decide(self, market):
+        first_yes = self.rng.random() < 0.5
+        first = quote_trade_cents(market.q_yes, market.q_no, first_yes, self.SET_SIZE, b0=market.b0)
+        second = quote_trade_cents(first["q_yes_after"], first["q_no_after"], not first_yes, self.SET_SIZE, b0=market.b0)
+        cost = first["cost_cents"] + second["cost_cents"]
+        if cost <= self.SET_SIZE * SHARE_PAYOUT_CENTS - self.MIN_PROFIT_CENTS:
+            return [("buy", first_yes, self.SET_SIZE), ("buy", not first_yes, self.SET_SIZE)]
+        return []
+
+
+TRADER_KINDS = {cls.kind: cls for cls in (NoiseTrader, InformedTrader, ArbitrageTrader)}
+
+
+class Harness:
+    def __init__(self, num_traders=1000, num_markets=10, seed=0, mix=None,
+                 initial_balance=DEFAULT_BALANCE_CENTS, b0=None):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.backend = InMemorySupabase()
+        self.app = Flask(__name__)
+        self.initial_balance = initial_balance
+
+        self.markets = {}
+        for _ in range(num_markets):
+            poll_id = self.backend.add_poll(liquidity_b0=b0)
+            self.markets[poll_id] = {"true_prob": self.rng.random(), "b0": poll_b0({"liquidity_b0": b0})}
+
+        mix = mix or TRADER_MIX
+        kinds = list(mix)
+        weights = [mix[k] for k in kinds]
+        self.traders = []
+        for i in range(num_traders):
+            kind = self.rng.choices(kinds, weights)[0]
+            user_id = self.backend.add_profile(initial_balance, username=f"{kind}-{i}")
+            self.traders.append(TRADER_KINDS[kind](user_id, random.Random(f"{seed}:{i}")))
+
+        self.latencies = []
+        self.statuses = Counter()
+        self.orders_by_kind = Counter()
+        self._stats_lock = threading.Lock()
+
+    def view(self, poll_id):
+        votes = self.backend.table("poll_votes").select("yes_votes, no_votes").eq("poll_id", poll_id).execute().data
+        q_yes, q_no = (votes[0]["yes_votes"], votes[0]["no_votes"]) if votes else (0, 0)
+        market = self.markets[poll_id]
+        return MarketView(poll_id, q_yes, q_no, market["b0"], market["true_prob"])
+
+    def submit(self, trader, market, direction, outcome_yes, num_shares):
+        payload = {
+            "poll_id": market.poll_id,
+            "user_id": trader.user_id,
+            "outcome": "YES" if outcome_yes else "NO",
+            "num_shares": num_shares,
+        }
+        handler = buy_shares if direction == "buy" else sell_shares
+        start = time.perf_counter()
+        with self.app.test_request_context(f"/api/trades/{direction}", method="POST", json=payload):
+            _, status = handler()
+        elapsed = time.perf_counter() - start
+
+        if status in (200, 201):
+            trader.filled(market, direction, outcome_yes, num_shares)
+        with self._stats_lock:
+            self.latencies.append(elapsed)
+            self.statuses[status] += 1
+            self.orders_by_kind[trader.kind] += 1
+
+    def schedule(self, num_turns):
+        """Deterministic list of (trader index, poll_id) turns."""
+        poll_ids = list(self.markets)
+        return [(self.rng.randrange(len(self.traders)), self.rng.choice(poll_ids)) for _ in range(num_turns)]
+
+    def _play(self, turns):
+        for trader_idx, poll_id in turns:
+            trader = self.traders[trader_idx]
+            for direction, outcome_yes, num_shares in trader.decide(self.view(poll_id)):
+                self.submit(trader, self.view(poll_id), direction, outcome_yes, num_shares)
+
+    def run(self, num_turns, threads=1):
+        turns = self.schedule(num_turns)
+        override_supabase(self.backend)
+        try:
+            start = time.perf_counter()
+            if threads <= 1:
+                self._play(turns)
+            else:
+                # Each trader lives on one thread so its holdings are never shared
+                lanes = [[] for _ in range(threads)]
+                for turn in turns:
+                    lanes[turn[0] % threads].append(turn)
+                workers = [threading.Thread(target=self._play, args=(lane,)) for lane in lanes]
+                for worker in workers:
+                    worker.start()
+                for worker in workers:
+                    worker.join()
+            wall = time.perf_counter() - start
+        finally:
+            override_supabase(None)
+        return self.report(wall, threads)
+
+    def report(self, wall, threads):
+        latencies = sorted(self.latencies)
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 3)
+
+        prices = {poll_id: round(self.view(poll_id).prob_yes, 4) for poll_id in self.markets}
+        return {
+            "seed": self.seed,
+            "threads": threads,
+            "traders": Counter(t.kind for t in self.traders),
+            "orders": len(latencies),
+            "orders_by_kind": dict(self.orders_by_kind),
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            "wall_seconds": round(wall, 3),
+            "orders_per_second": round(len(latencies) / wall, 1) if wall else 0.0,
+            "latency_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99), "max": percentile(1.0)},
+            "final_prob_yes": prices,
+            "invariants": check_invariants(self.backend, self.initial_balance),
+        }
+
+
+def check_invariants(backend, initial_balance):
+    """
+    Cross-check the backend after a run. Every count should be zero unless
+    something went wrong. Under concurrency, stale_price_trades counts fills
+    priced off a market state another thread had already moved, and
+    balance_mismatches counts lost read-then-write balance updates.
+    """
+    trades = backend.rows("trades")
+    b0s = {poll["id"]: poll_b0(poll) for poll in backend.rows("polls")}
+    replayed = defaultdict(lambda: {True: 0, False: 0})
+    stale = 0
+    shares = defaultdict(int)
+    holdings = defaultdict(int)
+    cash = defaultdict(int)
+    collected = defaultdict(int)
+    overpriced = 0
+    for trade in trades:
+        num_shares = int(trade["num_shares"])
+        price = int(trade["share_price"])
+        shares[(trade["poll_id"], trade["outcome"])] += num_shares
+        holdings[(trade["user_id"], trade["poll_id"], trade["outcome"])] += num_shares
+        signed = price if num_shares > 0 else -price
+        cash[trade["user_id"]] += signed
+        collected[trade["poll_id"]] += signed
+        if price > abs(num_shares) * share_price_bound_cents(b0s.get(trade["poll_id"])):
+            overpriced += 1
+
+        # Re-price the trade against the state left by the trades inserted before it
+        q = replayed[trade["poll_id"]]
+        expected = quote_trade_cents(q[True], q[False], trade["outcome"], num_shares, b0=b0s.get(trade["poll_id"]))
+        if abs(expected["cost_cents"]) != price:
+            stale += 1
+        q[trade["outcome"]] += num_shares
+
+    vote_mismatches = 0
+    for votes in backend.rows("poll_votes"):
+        if votes["yes_votes"] != shares[(votes["poll_id"], True)] or votes["no_votes"] != shares[(votes["poll_id"], False)]:
+            vote_mismatches += 1
+
+    accounting_mismatches = 0
+    for row in backend.rows("market_accounting"):
+        poll_id = row["poll_id"]
+        if (row["collected_cents"] != collected[poll_id]
+                or row["yes_shares"] != shares[(poll_id, True)]
+                or row["no_shares"] != shares[(poll_id, False)]):
+            accounting_mismatches += 1
+
+    balance_mismatches = 0
+    negative_balances = 0
+    for profile in backend.rows("profiles"):
+        balance = int(profile["balance"])
+        if balance != initial_balance - cash[profile["id"]]:
+            balance_mismatches += 1
+        if balance < 0:
+            negative_balances += 1
+
+    return {
+        "vote_mismatches": vote_mismatches,
+        "accounting_mismatches": accounting_mismatches,
+        "balance_mismatches": balance_mismatches,
+        "negative_balances": negative_balances,
+        "negative_holdings": sum(1 for held in holdings.values() if held < 0),
+        "overpriced_trades": overpriced,
+        "stale_price_trades": stale,
+    }
+
+
+def run_simulation(num_traders=1000, num_markets=10, num_turns=10000, threads=1, seed=0, mix=None,
+                   initial_balance=DEFAULT_BALANCE_CENTS, b0=None):
+    harness = Harness(num_traders, num_markets, seed=seed, mix=mix, initial_balance=initial_balance, b0=b0)
+    return harness.run(num_turns, threads=threads)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run synthetic traders against the AMM and trade handlers.")
+    parser.add_argument("--traders", type=int, default=1000)
+    parser.add_argument("--markets", type=int, default=10)
+    parser.add_argument("--orders", type=int, default=10000, help="number of trader turns to schedule")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--b0", type=float, default=None, help="liquidity_b0 for every market (default: api.amm.B0)")
+    parser.add_argument("--balance", type=int, default=DEFAULT_BALANCE_CENTS, help="starting balance in cents")
+    args = parser.parse_args(argv)
+
+    report = run_simulation(args.traders, args.markets, args.orders, threads=args.threads, seed=args.seed,
+                            initial_balance=args.balance, b0=args.b0)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,470 @@
+"""
+In-memory stand-in for the Supabase client, covering the subset of the
+PostgREST query builder the API handlers use.
+
+Every execute() is atomic, like a single PostgREST request, but nothing
+spans requests: a handler that reads a balance and writes it back in two
+calls can race with another thread exactly as it would against the real
+database. That is deliberate, so the simulation harness can surface
+lost updates.
+
+Database-side behaviour the API relies on is emulated here:
+- poll_votes is kept in sync with trades (a trigger in Supabase)
+- the increment_balance, record_market_trade, record_market_settlement,
+  user_positions, portfolio_holdings and append_portfolio_snapshots RPCs
+"""
+import asyncio
+import threading
+import time
+from copy import deepcopy
+from datetime import datetime, timezone
+
+# Columns with a hash index, so eq() lookups stay O(1) as tables grow
+INDEXED_COLUMNS = {
+    "profiles": ("id",),
+    "polls": ("id",),
+    "trades": ("poll_id", "user_id"),
+    "poll_votes": ("poll_id",),
+    "market_accounting": ("poll_id",),
+    "market_events": ("poll_id",),
+    "event_checkpoints": ("consumer",),
+    "portfolio_snapshots": ("user_id",),
+}
+
+
+class InMemoryResult:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class InMemoryQuery:
+    def __init__(self, backend, table):
+        self._backend = backend
+        self._table = table
+        self._op = "select"
+        self._columns = None
+        self._payload = None
+        self._on_conflict = None
+        self._filters = []
+        self._equals = {}
+        self._order = []
+        self._range = None
+        self._single = False
+        self._count = None
+
+    # Operations
+    def select(self, *columns, count=None):
+        self._op = "select"
+        self._columns = _parse_columns(columns)
+        self._count = count
+        return self
+
+    def insert(self, payload):
+        self._op = "insert"
+        self._payload = payload
+        return self
+
+    def upsert(self, payload, on_conflict=None, **_):
+        self._op = "upsert"
+        self._payload = payload
+        self._on_conflict = on_conflict
+        return self
+
+    def update(self, values):
+        self._op = "update"
+        self._payload = values
+        return self
+
+    def delete(self):
+        self._op = "delete"
+        return self
+
+    # Filters
+    def eq(self, column, value):
+        self._equals[column] = value
+        return self._filter(column, lambda v: v == value)
+
+    def neq(self, column, value):
+        return self._filter(column, lambda v: v != value)
+
+    def gt(self, column, value):
+        return self._filter(column, lambda v: v is not None and _cmp(v, value) > 0)
+
+    def gte(self, column, value):
+        return self._filter(column, lambda v: v is not None and _cmp(v, value) >= 0)
+
+    def lt(self, column, value):
+        return self._filter(column, lambda v: v is not None and _cmp(v, value) < 0)
+
+    def lte(self, column, value):
+        return self._filter(column, lambda v: v is not None and _cmp(v, value) <= 0)
+
+    def in_(self, column, values):
+        values = list(values)
+        return self._filter(column, lambda v: v in values)
+
+    def is_(self, column, value):
+        expected = None if value in (None, "null") else value
+        return self._filter(column, lambda v: v is expected)
+
+    def _filter(self, column, predicate):
+        if "." in column:
+            raise NotImplementedError(f"Filters on embedded resources are not supported: {column}")
+        self._filters.append((column, predicate))
+        return self
+
+    # Modifiers
+    def order(self, column, desc=False):
+        self._order.append((column, desc))
+        return self
+
+    def range(self, start, end):
+        self._range = (start, end + 1)
+        return self
+
+    def limit(self, n):
+        self._range = (0, n)
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def execute(self):
+        if self._backend.latency:
+            time.sleep(self._backend.latency)
+        return self._run()
+
+    def _run(self):
+        with self._backend.lock:
+            return self._backend._execute(self)
+
+
+class InMemorySupabase:
+    """
+    Thread-safe in-memory backend. Seed it with seed_table() or the helpers,
+    then hand it to api.database.override_supabase().
+
+    latency: seconds every call waits (outside the lock) before running,
+    standing in for a PostgREST round trip
+    """
+
+    def __init__(self, latency=0.0):
+        self.lock = threading.RLock()
+        self.tables = {}
+        self._indexes = {}
+        self._next_id = {}
+        self.calls = 0
+        self.latency = latency
+
+    def table(self, name):
+        return InMemoryQuery(self, name)
+
+    def rpc(self, name, params):
+        backend = self
+
+        class _Call:
+            def execute(self):
+                if backend.latency:
+                    time.sleep(backend.latency)
+                return self._run()
+
+            def _run(self):
+                with backend.lock:
+                    backend.calls += 1
+                    return InMemoryResult(backend._rpc(name, params))
+
+        return _Call()
+
+    # Seeding helpers
+    def seed_table(self, name, rows):
+        with self.lock:
+            for row in rows:
+                self._insert_row(name, dict(row))
+
+    def add_profile(self, balance, **fields):
+        row = {"balance": balance, "admin": False, "active": True, **fields}
+        return self._insert_row("profiles", row)["id"]
+
+    def add_poll(self, **fields):
+        row = {
+            "title": "Simulated poll",
+            "description": "Created by the simulation harness",
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "ends_at": None,
+            "public": True,
+            "creator": 1,
+            "outcome": None,
+            "deleted": False,
+            "liquidity_b0": None,
+            **fields,
+        }
+        return self._insert_row("polls", row)["id"]
+
+    def rows(self, name):
+        with self.lock:
+            return deepcopy(self.tables.get(name, []))
+
+    # Internals
+    def _insert_row(self, name, row):
+        table = self.tables.setdefault(name, [])
+        if "id" not in row and name not in ("poll_votes", "market_accounting", "event_checkpoints", "portfolio_snapshots"):
+            row["id"] = self._next_id.get(name, 1)
+        if "id" in row:
+            self._next_id[name] = max(self._next_id.get(name, 1), row["id"] + 1)
+        if name == "trades":
+            row.setdefault("timestamp", datetime.now(timezone.utc).isoformat())
+            self._apply_trade_trigger(row)
+        table.append(row)
+        for column in INDEXED_COLUMNS.get(name, ()):
+            self._indexes.setdefault((name, column), {}).setdefault(row.get(column), []).append(row)
+        return row
+
+    def _apply_trade_trigger(self, trade):
+        votes = self._find("poll_votes", "poll_id", trade["poll_id"])
+        if votes is None:
+            votes = self._insert_row("poll_votes", {"poll_id": trade["poll_id"], "yes_votes": 0, "no_votes": 0})
+        key = "yes_votes" if trade["outcome"] else "no_votes"
+        votes[key] += int(trade["num_shares"])
+
+    def _find(self, name, column, value):
+        for row in self._candidates(name, {column: value}):
+            if row.get(column) == value:
+                return row
+        return None
+
+    def _candidates(self, name, equals):
+        """Rows that could match the eq() filters, narrowed by an index if one applies."""
+        best = None
+        for column, value in equals.items():
+            index = self._indexes.get((name, column))
+            if index is not None:
+                bucket = index.get(value, [])
+                if best is None or len(bucket) < len(best):
+                    best = bucket
+        return best if best is not None else self.tables.get(name, [])
+
+    def _reindex(self, name):
+        for column in INDEXED_COLUMNS.get(name, ()):
+            index = {}
+            for row in self.tables.get(name, []):
+                index.setdefault(row.get(column), []).append(row)
+            self._indexes[(name, column)] = index
+
+    def _execute(self, query):
+        self.calls += 1
+        name = query._table
+        if query._op in ("insert", "upsert"):
+            payload = query._payload if isinstance(query._payload, list) else [query._payload]
+            inserted = []
+            for values in payload:
+                existing = None
+                if query._op == "upsert":
+                    key = query._on_conflict or "id"
+                    existing = self._find(name, key, values.get(key))
+                if existing is not None:
+                    existing.update(values)
+                    inserted.append(deepcopy(existing))
+                else:
+                    inserted.append(deepcopy(self._insert_row(name, dict(values))))
+            return InMemoryResult(inserted)
+
+        matched = [row for row in self._candidates(name, query._equals) if _matches(row, query._filters)]
+
+        if query._op == "update":
+            for row in matched:
+                row.update(query._payload)
+            if set(query._payload) & set(INDEXED_COLUMNS.get(name, ())):
+                self._reindex(name)
+            return InMemoryResult(deepcopy(matched))
+
+        if query._op == "delete":
+            doomed = {id(row) for row in matched}
+            self.tables[name] = [row for row in self.tables.get(name, []) if id(row) not in doomed]
+            self._reindex(name)
+            return InMemoryResult(deepcopy(matched))
+
+        for column, desc in reversed(query._order):
+            matched.sort(key=lambda row: (row.get(column) is None, row.get(column)), reverse=desc)
+        count = len(matched) if query._count else None
+        if query._range:
+            matched = matched[query._range[0]:query._range[1]]
+        data = [_project(row, query._columns) for row in matched]
+        if query._single:
+            if len(data) != 1:
+                raise ValueError(f"Expected a single row from {name}, got {len(data)}")
+            data = data[0]
+        return InMemoryResult(data, count)
+
+    def _rpc(self, name, params):
+        if name == "increment_balance":
+            profile = self._find("profiles", "id", params["user_id"])
+            if profile is not None:
+                profile["balance"] = int(profile.get("balance") or 0) + int(params["amount"])
+            return None
+
+        if name in ("record_market_trade", "record_market_settlement"):
+            row = self._find("market_accounting", "poll_id", params["p_poll_id"])
+            if row is None:
+                row = self._insert_row("market_accounting", {
+                    "poll_id": params["p_poll_id"],
+                    "collected_cents": 0,
+                    "yes_shares": 0,
+                    "no_shares": 0,
+                    "payout_cents": 0,
+                    "refund_cents": 0,
+                    "resolved_outcome": None,
+                })
+            if name == "record_market_trade":
+                row["collected_cents"] += params["p_cash_cents"]
+                row["yes_shares" if params["p_outcome"] else "no_shares"] += params["p_num_shares"]
+            else:
+                row["payout_cents"] = params["p_payout_cents"]
+                row["refund_cents"] = params["p_refund_cents"]
+                row["resolved_outcome"] = params["p_outcome"]
+            return None
+
+        if name == "user_positions":
+            return self._user_positions(params)
+
+        if name == "portfolio_holdings":
+            holdings = {}
+            for user_id in params["p_user_ids"]:
+                for trade in self._candidates("trades", {"user_id": user_id}):
+                    poll = self._find("polls", "id", trade["poll_id"])
+                    if trade.get("user_id") != user_id or poll is None or poll.get("outcome") is not None:
+                        continue
+                    key = (user_id, trade["poll_id"], trade["outcome"])
+                    holdings[key] = holdings.get(key, 0) + int(trade["num_shares"])
+            return [{"user_id": user_id, "poll_id": poll_id, "outcome": outcome, "quantity": quantity}
+                    for (user_id, poll_id, outcome), quantity in holdings.items() if quantity != 0]
+
+        if name == "append_portfolio_snapshots":
+            keep = params["p_keep"]
+            for user_id, cash, positions in zip(params["p_user_ids"], params["p_cash_cents"], params["p_positions_cents"]):
+                row = self._find("portfolio_snapshots", "user_id", user_id)
+                if row is None:
+                    row = self._insert_row("portfolio_snapshots", {
+                        "user_id": user_id, "taken_at": [], "cash_cents": [], "positions_cents": [],
+                    })
+                for column, value in (("taken_at", params["p_taken_at"]), ("cash_cents", cash), ("positions_cents", positions)):
+                    row[column] = (row[column] + [value])[-keep:]
+            return None
+
+        raise NotImplementedError(f"RPC {name} is not emulated by the in-memory backend")
+
+    def _user_positions(self, params):
+        now = datetime.now(timezone.utc).isoformat()
+        status = params.get("p_status")
+        positions = {}
+        for trade in self._candidates("trades", {"user_id": params["p_user_id"]}):
+            if trade.get("user_id") != params["p_user_id"]:
+                continue
+            if params.get("p_poll_id") is not None and trade["poll_id"] != params["p_poll_id"]:
+                continue
+            poll = self._find("polls", "id", trade["poll_id"])
+            if poll is None:
+                continue
+            ends_at = poll.get("ends_at")
+            if status == "open" and ends_at is not None and ends_at <= now:
+                continue
+            if status == "closed" and (ends_at is None or ends_at > now):
+                continue
+            key = (trade["poll_id"], trade["outcome"])
+            position = positions.setdefault(key, {"poll_id": key[0], "outcome": key[1], "quantity": 0, "cost_basis_cents": 0})
+            shares = int(trade["num_shares"])
+            position["quantity"] += shares
+            position["cost_basis_cents"] += int(trade["share_price"]) if shares > 0 else -int(trade["share_price"])
+
+        rows = [positions[key] for key in sorted(positions)
+                if params.get("p_include_closed") or positions[key]["quantity"] != 0]
+        total = len(rows)
+        if params.get("p_after_poll_id") is not None:
+            after = (params["p_after_poll_id"], params["p_after_outcome"])
+            rows = [row for row in rows if (row["poll_id"], row["outcome"]) > after]
+        offset = params.get("p_offset") or 0
+        limit = params.get("p_limit", 20)
+        return {"total": total, "positions": rows[offset:] if limit is None else rows[offset:offset + limit]}
+
+
+class AsyncInMemoryQuery:
+    """An InMemoryQuery whose execute() is awaited, like supabase's async client."""
+
+    def __init__(self, query, latency):
+        self._query = query
+        self._latency = latency
+
+    def __getattr__(self, name):
+        method = getattr(self._query, name)
+
+        def build(*args, **kwargs):
+            method(*args, **kwargs)
+            return self
+        return build
+
+    async def execute(self):
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        return self._query._run()
+
+
+class AsyncInMemorySupabase:
+    """
+    Async view of an InMemorySupabase, for api.database.override_async_supabase().
+    Both views share the same tables. The backend's latency is awaited rather
+    than slept, so concurrent calls overlap as they would over the network.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def table(self, name):
+        return AsyncInMemoryQuery(self.backend.table(name), self.backend.latency)
+
+    def rpc(self, name, params):
+        return AsyncInMemoryQuery(self.backend.rpc(name, params), self.backend.latency)
+
+
+def _parse_columns(columns):
+    """
+    Plain column names from a select(), or None for "everything".
+    Embedded resources ("poll_tags(tags(name))") are ignored.
+    """
+    names = []
+    for spec in columns:
+        depth = 0
+        current = ""
+        for char in spec + ",":
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            if char == "," and depth == 0:
+                current = current.strip()
+                if current == "*":
+                    return None
+                if current and "(" not in current:
+                    names.append(current)
+                current = ""
+            else:
+                current += char
+    return names or None
+
+
+def _project(row, columns):
+    if columns is None:
+        return deepcopy(row)
+    return {column: deepcopy(row.get(column)) for column in columns}
+
+
+def _matches(row, filters):
+    return all(predicate(row.get(column)) for column, predicate in filters)
+
+
+def _cmp(a, b):
+    if isinstance(a, datetime):
+        a = a.isoformat()
+    if isinstance(b, datetime):
+        b = b.isoformat()
+    return (a > b) - (a < b)
@@ -0,0 +1,291 @@
+"""
+Offline liquidity tuning: replay historical trade streams under different
+b0 values and report how each choice would have behaved.
+
+The replay keeps the recorded share quantities fixed and re-prices them, so
+it answers "what would these trades have cost and moved the price" rather
+than modelling how traders would have reacted to different prices.
+
+Usage (from src/):
+    python -m sim.liquidity --b0 2 5 10
+    python -m sim.liquidity --b0-range 1 50 1000 --tag exams
+"""
+import argparse
+import json
+import math
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from api.amm import quote_trade_cents, _compute_b_ls_lmsr, _lmsr_probability, _ls_lmsr_marginal_price, SHARE_PAYOUT_CENTS  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:  # numpy is only needed for the vectorized path
+    np = None
+
+TRADES_PAGE_SIZE = 1000
+
+
+def load_trade_streams(supabase, poll_ids=None, tag=None):
+    """
+    Load every poll's trades in execution order.
+
+    Returns:
+    {
+        <poll_id>: {"outcome": True/False/None, "trades": [(outcome_yes, num_shares), ...]}
+    }
+    """
+    if tag:
+        tagged = (
+            supabase.table("poll_tags")
+            .select("poll_id, tags!inner(name)")
+            .eq("tags.name", tag)
+            .execute()
+        )
+        tagged_ids = {row["poll_id"] for row in tagged.data or []}
+        poll_ids = tagged_ids if poll_ids is None else tagged_ids & set(poll_ids)
+        if not poll_ids:
+            return {}
+
+    polls_query = supabase.table("polls").select("id, outcome")
+    if poll_ids is not None:
+        polls_query = polls_query.in_("id", list(poll_ids))
+    streams = {
+        row["id"]: {"outcome": row.get("outcome"), "trades": []}
+        for row in polls_query.execute().data or []
+    }
+    if not streams:
+        return {}
+
+    offset = 0
+    while True:
+        page = (
+            supabase.table("trades")
+            .select("poll_id, outcome, num_shares")
+            .in_("poll_id", list(streams))
+            .order("timestamp")
+            .order("id")
+            .range(offset, offset + TRADES_PAGE_SIZE - 1)
+            .execute()
+        )
+        rows = page.data or []
+        for row in rows:
+            streams[row["poll_id"]]["trades"].append((bool(row["outcome"]), int(row["num_shares"])))
+        if len(rows) < TRADES_PAGE_SIZE:
+            break
+        offset += TRADES_PAGE_SIZE
+
+    return streams
+
+
+def _replay_python(trades, b0s):
+    """
+    Replay one trade stream for each b0 with the production pricing core.
+    Returns one dict of raw accumulators per b0.
+    """
+    results = []
+    for b0 in b0s:
+        q_yes = q_no = 0.0
+        collected = 0
+        price_moves = []
+        slippage = 0.0
+        shares_traded = 0
+        for outcome_yes, shares in trades:
+            p_before = _lmsr_probability(q_yes, q_no, _compute_b_ls_lmsr(q_yes, q_no, b0=b0))
+            marginal = _ls_lmsr_marginal_price(q_yes, q_no, outcome_yes, b0=b0)
+            quote = quote_trade_cents(q_yes, q_no, outcome_yes, shares, b0=b0)
+            q_yes, q_no = quote["q_yes_after"], quote["q_no_after"]
+            collected += quote["cost_cents"]
+
+            p_after = _lmsr_probability(q_yes, q_no, _compute_b_ls_lmsr(q_yes, q_no, b0=b0))
+            price_moves.append((p_after - p_before) * 100)
+            slippage += abs(abs(quote["cost_cents"]) / abs(shares) - marginal * 100) * abs(shares)
+            shares_traded += abs(shares)
+
+        results.append({
+            "collected": collected,
+            "q_yes": q_yes,
+            "q_no": q_no,
+            "price_moves": price_moves,
+            "slippage": slippage,
+            "shares": shares_traded,
+        })
+    return results
+
+
+def _replay_numpy(trades, b0s):
+    """
+    Same replay as _replay_python, vectorized across the b0 scenarios: the
+    market state is shared by every scenario, only b differs.
+    """
+    b0 = np.asarray(b0s, dtype=float)
+    n = len(b0)
+    q_yes = q_no = 0.0
+
+    def liquidity(q_yes, q_no):
+        return b0 * math.sqrt(max(abs(q_yes) + abs(q_no), 1.0))
+
+    def cost_split(q_yes, q_no):
+        # Same split of the LS-LMSR potential as api.amm._ls_lmsr_split
+        b = liquidity(q_yes, q_no)
+        return max(q_yes, q_no), b * np.log1p(np.exp(-abs(q_yes - q_no) / b))
+
+    def prob(q_yes, q_no):
+        return 0.5 * (1.0 + np.tanh((q_yes - q_no) / (2.0 * liquidity(q_yes, q_no))))
+
+    def marginal(q_yes, q_no, outcome_yes):
+        # Same gradient as api.amm._ls_lmsr_marginal_price
+        x = (q_yes - q_no) / liquidity(q_yes, q_no)
+        log_p, log_not_p = -np.logaddexp(0.0, -x), -np.logaddexp(0.0, x)
+        p = np.exp(log_p)
+        entropy = -(p * log_p + (1.0 - p) * log_not_p)
+        Q = abs(q_yes) + abs(q_no)
+        q = q_yes if outcome_yes else q_no
+        db = 0.0 if Q <= 1.0 else b0 / (2.0 * math.sqrt(Q)) * (1.0 if q >= 0 else -1.0)
+        return (p if outcome_yes else 1.0 - p) + db * entropy
+
+    collected = np.zeros(n, dtype=np.int64)
+    slippage = np.zeros(n)
+    moves = np.zeros((len(trades), n))
+    shares_traded = 0
+    p_before = prob(q_yes, q_no)
+    for i, (outcome_yes, shares) in enumerate(trades):
+        q_yes_new = q_yes + shares if outcome_yes else q_yes
+        q_no_new = q_no if outcome_yes else q_no + shares
+
+        side_before = marginal(q_yes, q_no, outcome_yes)
+        # Mirror api.amm._ls_lmsr_cost_change and quote_trade_cents
+        top, rest = cost_split(q_yes, q_no)
+        top_new, rest_new = cost_split(q_yes_new, q_no_new)
+        amount = (top_new - top) + (rest_new - rest)
+        amount = np.round(np.maximum(amount if shares > 0 else -amount, 0.0) * 100, 6)
+        if shares > 0:
+            cents = np.ceil(amount).astype(np.int64)
+        else:
+            cents = -np.floor(amount).astype(np.int64)
+        collected += cents
+        q_yes, q_no = q_yes_new, q_no_new
+
+        p_after = prob(q_yes, q_no)
+        moves[i] = (p_after - p_before) * 100
+        slippage += np.abs(np.abs(cents) / abs(shares) - side_before * 100) * abs(shares)
+        shares_traded += abs(shares)
+        p_before = p_after
+
+    return [
+        {
+            "collected": int(collected[j]),
+            "q_yes": q_yes,
+            "q_no": q_no,
+            "price_moves": moves[:, j].tolist(),
+            "slippage": float(slippage[j]),
+            "shares": shares_traded,
+        }
+        for j in range(n)
+    ]
+
+
+def simulate(streams, b0s, vectorized=None):
+    """
+    Replay every stream under every b0 and aggregate the results per b0.
+
+    Returns a list with one entry per b0:
+    {
+        "b0": <float>,
+        "polls": <int>,
+        "trades": <int>,
+        "volatility_cents": <float>,      # std dev of per-trade YES price moves
+        "slippage_cents": <float>,        # mean |avg fill - pre-trade marginal price| per share
+        "collected_cents": <int>,
+        "worst_case_loss_cents": <int>,   # summed over polls, before resolution
+        "realized_loss_cents": <int>      # summed over resolved polls
+    }
+    """
+    b0s = [float(b0) for b0 in b0s]
+    if vectorized is None:
+        vectorized = np is not None
+    replay = _replay_numpy if vectorized else _replay_python
+
+    totals = [defaultdict(float) for _ in b0s]
+    moves = [[] for _ in b0s]
+    for stream in streams.values():
+        trades = stream["trades"]
+        if not trades:
+            continue
+        for j, result in enumerate(replay(trades, b0s)):
+            yes_liability = int(result["q_yes"]) * SHARE_PAYOUT_CENTS
+            no_liability = int(result["q_no"]) * SHARE_PAYOUT_CENTS
+            total = totals[j]
+            total["polls"] += 1
+            total["trades"] += len(trades)
+            total["slippage"] += result["slippage"]
+            total["shares"] += result["shares"]
+            total["collected_cents"] += result["collected"]
+            total["worst_case_loss_cents"] += max(yes_liability, no_liability) - result["collected"]
+            if stream.get("outcome") is not None:
+                owed = yes_liability if stream["outcome"] else no_liability
+                total["realized_loss_cents"] += owed - result["collected"]
+            moves[j].extend(result["price_moves"])
+
+    report = []
+    for b0, total, scenario_moves in zip(b0s, totals, moves):
+        volatility = 0.0
+        if scenario_moves:
+            mean = sum(scenario_moves) / len(scenario_moves)
+            volatility = math.sqrt(sum((m - mean) ** 2 for m in scenario_moves) / len(scenario_moves))
+        report.append({
+            "b0": b0,
+            "polls": int(total["polls"]),
+            "trades": int(total["trades"]),
+            "volatility_cents": round(volatility, 4),
+            "slippage_cents": round(total["slippage"] / total["shares"], 4) if total["shares"] else 0.0,
+            "collected_cents": int(total["collected_cents"]),
+            "worst_case_loss_cents": int(total["worst_case_loss_cents"]),
+            "realized_loss_cents": int(total["realized_loss_cents"]),
+        })
+    return report
+
+
+def _b0_grid(start, stop, count):
+    if count <= 1:
+        return [float(start)]
+    step = (stop - start) / (count - 1)
+    return [start + i * step for i in range(count)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay historical trades under different LS-LMSR b0 values.")
+    parser.add_argument("--b0", type=float, nargs="+", help="b0 values to try")
+    parser.add_argument("--b0-range", type=float, nargs=3, metavar=("START", "STOP", "COUNT"),
+                        help="evenly spaced b0 values, e.g. 1 50 1000")
+    parser.add_argument("--poll", type=int, nargs="+", help="only replay these poll ids")
+    parser.add_argument("--tag", help="only replay polls with this tag (a market class)")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    if args.b0_range:
+        b0s = _b0_grid(args.b0_range[0], args.b0_range[1], int(args.b0_range[2]))
+    else:
+        b0s = args.b0 or [5.0]
+
+    from dotenv import load_dotenv
+    from api.database import get_supabase
+
+    load_dotenv()
+    streams = load_trade_streams(get_supabase(), poll_ids=args.poll, tag=args.tag)
+    report = simulate(streams, b0s)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'b0':>8} {'volatility':>11} {'slippage':>9} {'collected':>10} {'worst loss':>11} {'realized':>9}")
+    for row in report:
+        print(f"{row['b0']:>8.2f} {row['volatility_cents']:>11.3f} {row['slippage_cents']:>9.3f} "
+              f"{row['collected_cents']:>10} {row['worst_case_loss_cents']:>11} {row['realized_loss_cents']:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import sys
+import os
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api.accounting import record_trade, record_settlement, get_market_accounting, summarize_accounting
+from api.amm import quote_trade_cents
+
+
+def test_record_trade_calls_rpc_with_signed_counters():
+    supabase = MagicMock()
+    record_trade(supabase, 3, False, -4, -210)
+    supabase.rpc.assert_called_once_with("record_market_trade", {
+        "p_poll_id": 3,
+        "p_outcome": False,
+        "p_num_shares": -4,
+        "p_cash_cents": -210,
+    })
+
+
+def test_record_settlement_calls_rpc():
+    supabase = MagicMock()
+    record_settlement(supabase, 3, True, 500, 20)
+    args = supabase.rpc.call_args[0]
+    assert args[0] == "record_market_settlement"
+    assert args[1]["p_payout_cents"] == 500
+    assert args[1]["p_refund_cents"] == 20
+
+
+def test_summary_for_poll_without_trades():
+    supabase = MagicMock()
+    supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = []
+    summary = get_market_accounting(supabase, 1)
+    assert summary["collected_cents"] == 0
+    assert summary["worst_case_loss_cents"] == 0
+    assert summary["resolved"] is False
+    assert summary["realized_loss_cents"] is None
+
+
+def test_worst_case_loss_within_subsidy_bound():
+    # Replay trades through the pricing core and check the LS-LMSR loss bound holds
+    q_yes, q_no, collected = 0, 0, 0
+    for outcome_yes, shares in [(True, 10), (False, 4), (True, 25), (True, -5), (False, 12)]:
+        quote = quote_trade_cents(q_yes, q_no, outcome_yes, shares)
+        collected += quote["cost_cents"]
+        q_yes, q_no = quote["q_yes_after"], quote["q_no_after"]
+
+    summary = summarize_accounting({"collected_cents": collected, "yes_shares": q_yes, "no_shares": q_no})
+    assert summary["yes_liability_cents"] == q_yes * 100
+    assert summary["worst_case_loss_cents"] <= summary["subsidy_bound_cents"]
+
+
+def test_realized_loss_after_settlement():
+    summary = summarize_accounting({
+        "collected_cents": 900,
+        "yes_shares": 10,
+        "no_shares": 3,
+        "payout_cents": 1000,
+        "refund_cents": 50,
+        "resolved_outcome": True,
+    })
+    assert summary["resolved"] is True
+    assert summary["realized_loss_cents"] == 150
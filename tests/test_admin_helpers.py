@@ -102,3 +102,88 @@ def test_update_poll_raises_if_missing_row(mock_supabase):
 
     with pytest.raises(ValueError):
         update_poll(1, title="X")
+
+
+def test_update_poll_syncs_tags_only_when_given(monkeypatch):
+    from flask import Flask
+    from api import admin
+    from sim.backend import InMemorySupabase
+
+    backend = InMemorySupabase()
+    poll_id = backend.add_poll()
+    backend.seed_table("tags", [{"name": "hockey"}, {"name": "sports"}])
+    backend.seed_table("poll_tags", [{"poll_id": poll_id, "tag_id": 1}])
+    monkeypatch.setattr(admin, "get_supabase", lambda: backend)
+    monkeypatch.setattr(admin, "current_user_is_admin", lambda: True)
+    app = Flask(__name__)
+
+    def tag_ids():
+        return sorted(r["tag_id"] for r in backend.rows("poll_tags") if r["poll_id"] == poll_id)
+
+    with app.test_request_context(json={"poll_id": poll_id, "ends_at": "2030-01-01T00:00:00+00:00"}):
+        _, status = update_poll()
+    assert status == 200
+    assert tag_ids() == [1]
+
+    with app.test_request_context(json={"poll_id": poll_id, "tags": ["sports", " Finals ", ""]}):
+        _, status = update_poll()
+    assert status == 200
+    assert tag_ids() == [2, 3]
+    assert [row["name"] for row in backend.rows("tags")][-1] == "Finals"
+
+
+def test_update_poll_keeps_liquidity_once_traded(monkeypatch):
+    from flask import Flask
+    from api import admin
+    from sim.backend import InMemorySupabase
+
+    backend = InMemorySupabase()
+    untraded = backend.add_poll()
+    traded = backend.add_poll(liquidity_b0=5.0)
+    user = backend.add_profile(balance=0)
+    backend.seed_table("trades", [{"poll_id": traded, "user_id": user, "outcome": True, "num_shares": 3, "share_price": 150}])
+    monkeypatch.setattr(admin, "get_supabase", lambda: backend)
+    monkeypatch.setattr(admin, "current_user_is_admin", lambda: True)
+    app = Flask(__name__)
+
+    def update(poll_id, liquidity_b0):
+        with app.test_request_context(json={"poll_id": poll_id, "liquidity_b0": liquidity_b0}):
+            return update_poll()
+
+    assert update(untraded, 20)[1] == 200
+    res, status = update(traded, 20)
+    assert status == 403 and "trades" in res.get_json()["error"]
+    # Resending the current value with other edits is fine
+    assert update(traded, 5)[1] == 200
+    assert [row["liquidity_b0"] for row in backend.rows("polls")] == [20.0, 5.0]
+
+
+def test_resolve_poll_settles_without_a_readable_session(monkeypatch):
+    from datetime import datetime, timedelta, timezone
+    from flask import Flask
+    from api import admin
+    from sim.backend import InMemorySupabase
+
+    backend = InMemorySupabase()
+    winner = backend.add_profile(balance=0)
+    late = backend.add_profile(balance=0)
+    ends_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    poll_id = backend.add_poll(ends_at=ends_at.isoformat())
+    backend.seed_table("trades", [
+        {"poll_id": poll_id, "user_id": winner, "outcome": True, "num_shares": 5, "share_price": 300,
+         "timestamp": (ends_at - timedelta(hours=1)).isoformat()},
+        {"poll_id": poll_id, "user_id": late, "outcome": True, "num_shares": 1, "share_price": 90,
+         "timestamp": (ends_at + timedelta(minutes=30)).isoformat()},
+    ])
+    monkeypatch.setattr(admin, "get_supabase", lambda: backend)
+    monkeypatch.setattr(admin, "current_user_is_admin", lambda: True)
+    monkeypatch.setattr(admin, "publish_resolution", lambda poll_id, outcome: None)
+    app = Flask(__name__)
+
+    # No session cookie, so the caller's own payout can't be worked out
+    with app.test_request_context(json={"poll_id": poll_id, "outcome": True}):
+        res = admin.resolve_poll()
+    assert res.get_json()["user_profit"] == 0
+    assert {row["id"]: row["balance"] for row in backend.rows("profiles")} == {winner: 500, late: 90}
+    settled = backend.rows("market_accounting")[0]
+    assert (settled["resolved_outcome"], settled["payout_cents"], settled["refund_cents"]) == (True, 500, 90)
@@ -0,0 +1,180 @@
+import random
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+import math
+
+from api.amm import (
+    quote_trade_cents,
+    settlement_cents,
+    market_price,
+    batch_market_prices,
+    share_price_bound_cents,
+    _ls_lmsr_cost,
+    _ls_lmsr_cost_change,
+    _lmsr_prices,
+    SHARE_PAYOUT_CENTS,
+)
+
+
+def _random_state(rng):
+    return rng.randint(0, 500), rng.randint(0, 500)
+
+
+def test_quote_is_integer_cents():
+    quote = quote_trade_cents(10, 5, True, 5)
+    assert isinstance(quote["cost_cents"], int)
+    assert quote["cost_cents"] > 0
+    assert isinstance(quote["price_yes"], int)
+    assert isinstance(quote["price_yes_after"], int)
+
+
+def test_sell_quote_is_negative():
+    quote = quote_trade_cents(15, 5, True, -5)
+    assert quote["cost_cents"] < 0
+    assert quote["q_yes_after"] == 10
+
+
+def test_quote_is_deterministic():
+    assert quote_trade_cents(37, 12, False, 9) == quote_trade_cents(37, 12, False, 9)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_buy_then_sell_never_creates_money(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        q_yes, q_no = _random_state(rng)
+        outcome_yes = rng.random() < 0.5
+        shares = rng.randint(1, 200)
+
+        buy = quote_trade_cents(q_yes, q_no, outcome_yes, shares)
+        sell = quote_trade_cents(buy["q_yes_after"], buy["q_no_after"], outcome_yes, -shares)
+
+        # The round trip restores the market and costs the trader at most one cent
+        assert (sell["q_yes_after"], sell["q_no_after"]) == (q_yes, q_no)
+        assert 0 <= buy["cost_cents"] + sell["cost_cents"] <= 1
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_trade_sequence_conserves_money(seed):
+    # Cash collected by the market maker must cover everything it paid out,
+    # and unwinding every position must bring the market back to where it started.
+    rng = random.Random(seed)
+    q = {True: 0, False: 0}
+    holdings = []
+    collected = 0
+    for _ in range(300):
+        if holdings and rng.random() < 0.4:
+            outcome_yes, shares = holdings.pop(rng.randrange(len(holdings)))
+            quote = quote_trade_cents(q[True], q[False], outcome_yes, -shares)
+            q[outcome_yes] -= shares
+        else:
+            outcome_yes = rng.random() < 0.5
+            shares = rng.randint(1, 50)
+            quote = quote_trade_cents(q[True], q[False], outcome_yes, shares)
+            q[outcome_yes] += shares
+            holdings.append((outcome_yes, shares))
+        collected += quote["cost_cents"]
+
+    for outcome_yes, shares in reversed(holdings):
+        quote = quote_trade_cents(q[True], q[False], outcome_yes, -shares)
+        q[outcome_yes] -= shares
+        collected += quote["cost_cents"]
+
+    assert q == {True: 0, False: 0}
+    assert collected >= 0
+
+
+def test_closing_positions_out_of_order_conserves_money():
+    collected = 0
+    q = {True: 0, False: 0}
+    for outcome_yes, shares in [(True, 20), (False, 100), (True, -20), (False, -100)]:
+        collected += quote_trade_cents(q[True], q[False], outcome_yes, shares)["cost_cents"]
+        q[outcome_yes] += shares
+    assert q == {True: 0, False: 0}
+    assert 0 <= collected <= 4
+
+
+def test_settlement_cents():
+    assert settlement_cents(7, won=True) == 7 * SHARE_PAYOUT_CENTS
+    assert settlement_cents(7, won=False) == 0
+
+
+def _extreme_state(rng):
+    scale = 10 ** rng.randint(0, 12)
+    return rng.random() * scale, rng.random() * scale * 10 ** rng.randint(-6, 6)
+
+
+def test_prices_of_very_lopsided_market():
+    # Used to overflow math.exp
+    assert _lmsr_prices(1e6, 0, 5.0) == (100, 0)
+    assert _lmsr_prices(0, 1e6, 5.0) == (0, 100)
+    price = market_price(1e12, 0)
+    assert price["prob_yes"] == 1.0
+    assert (price["price_yes"], price["price_no"]) == (100, 0)
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_fuzz_market_price(seed):
+    rng = random.Random(seed)
+    for _ in range(500):
+        q_yes, q_no = _extreme_state(rng)
+        price = market_price(q_yes, q_no)
+        assert 0.0 <= price["prob_yes"] <= 1.0
+        assert math.isclose(price["prob_yes"] + price["prob_no"], 1.0)
+        assert price["price_yes"] + price["price_no"] == 100
+        assert abs(price["price_yes"] - price["prob_yes"] * 100) <= 0.5
+
+        mirrored = market_price(q_no, q_yes)
+        assert math.isclose(mirrored["prob_yes"], price["prob_no"], abs_tol=1e-12)
+
+        # Buying YES never lowers the YES probability
+        assert market_price(q_yes + 1, q_no)["prob_yes"] >= price["prob_yes"]
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_fuzz_quotes_at_extreme_quantities(seed):
+    rng = random.Random(seed)
+    for _ in range(300):
+        q_yes, q_no = (int(q) for q in _extreme_state(rng))
+        outcome_yes = rng.random() < 0.5
+        shares = rng.randint(1, 10 ** rng.randint(0, 6))
+        quote = quote_trade_cents(q_yes, q_no, outcome_yes, shares)
+        assert 0 <= quote["cost_cents"] <= shares * share_price_bound_cents()
+
+
+def test_cost_change_matches_potential_difference():
+    rng = random.Random(0)
+    for _ in range(1000):
+        q_yes, q_no = rng.uniform(0, 500), rng.uniform(0, 500)
+        q_yes_new, q_no_new, b0 = q_yes + rng.uniform(-100, 100), q_no, rng.uniform(1, 100)
+        direct = _ls_lmsr_cost(q_yes_new, q_no_new, b0) - _ls_lmsr_cost(q_yes, q_no, b0)
+        change = _ls_lmsr_cost_change(q_yes, q_no, q_yes_new, q_no_new, b0)
+        assert math.isclose(change, direct, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def test_cost_change_keeps_precision_on_huge_markets():
+    # The difference of two ~1e12 costs would lose the cents entirely
+    cost = _ls_lmsr_cost_change(1e12, 1e12, 1e12 + 1, 1e12)
+    assert math.isclose(cost, 0.5, abs_tol=1e-4)
+    assert quote_trade_cents(10 ** 12, 10 ** 12, True, 1)["cost_cents"] == 51
+
+
+def test_batch_prices_match_scalar():
+    rng = random.Random(1)
+    q_yes, q_no, b0s = [], [], []
+    for _ in range(200):
+        y, n = _extreme_state(rng)
+        q_yes.append(y)
+        q_no.append(n)
+        b0s.append(rng.uniform(1, 100))
+    expected = [(market_price(y, n, b0)["price_yes"], market_price(y, n, b0)["price_no"])
+                for y, n, b0 in zip(q_yes, q_no, b0s)]
+    batch = batch_market_prices(q_yes, q_no, b0s)
+    # numpy's tanh form can differ from the scalar path by one ulp, which only
+    # matters exactly on a half-cent boundary
+    assert all(abs(a[0] - b[0]) <= 1 for a, b in zip(batch, expected))
+    assert sum(a != b for a, b in zip(batch, expected)) <= 2
@@ -0,0 +1,192 @@
+import sys
+import os
+import asyncio
+import json
+import time
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import admin, amm, asgi, database, index
+from api.accounting import summarize_accounting
+from api.positions import get_positions_async
+from sim.backend import InMemorySupabase, AsyncInMemorySupabase
+
+PAST = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = InMemorySupabase()
+    database.override_supabase(backend)
+    database.override_async_supabase(AsyncInMemorySupabase(backend))
+    monkeypatch.setattr(amm, "supabase", backend)
+    monkeypatch.setattr(asgi, "verify_token", lambda token: (token, None))
+    monkeypatch.setattr(index, "verify_token", lambda token: (token, None))
+    yield backend
+    database.override_supabase(None)
+    database.override_async_supabase(None)
+
+
+def _call(method, path, body=None, query=""):
+    """Run one request through the ASGI app; returns (status, headers, body)."""
+    payload = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": query.encode(),
+        "headers": [(b"content-type", b"application/json"), (b"cookie", b"sb-access-token=token")],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": payload, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    start = messages[0]
+    headers = {name.decode(): value.decode() for name, value in start["headers"]}
+    data = b"".join(m.get("body", b"") for m in messages[1:])
+    return start["status"], headers, json.loads(data) if data else None
+
+
+def _seed(backend):
+    user = backend.add_profile(balance=0)
+    open_poll = backend.add_poll(title="Open poll")
+    ended_poll = backend.add_poll(title="Ended poll", ends_at=PAST, outcome=True)
+    backend.seed_table("trades", [
+        {"poll_id": open_poll, "user_id": user, "outcome": True, "num_shares": 10, "share_price": 520},
+        {"poll_id": open_poll, "user_id": user, "outcome": False, "num_shares": 4, "share_price": 190},
+        {"poll_id": ended_poll, "user_id": user, "outcome": True, "num_shares": 3, "share_price": 150},
+    ])
+    return user, open_poll, ended_poll
+
+
+def test_positions_match_the_flask_handler(backend):
+    user, _, _ = _seed(backend)
+    status, _, body = _call("POST", "/api/positions", {"user_id": user})
+    assert status == 200
+
+    sync = index.app.test_client().post("/api/positions", json={"user_id": user})
+    assert sorted(body["positions"], key=lambda p: (p["poll_id"], p["side"])) == \
+        sorted(sync.get_json()["positions"], key=lambda p: (p["poll_id"], p["side"]))
+    ended = [p for p in body["positions"] if not p["open"]]
+    assert ended == [dict(ended[0], current_price=100, value=3.0)]
+
+
+def test_positions_concurrent_queries(backend):
+    user, open_poll, _ = _seed(backend)
+    backend.latency = 0.05
+    start = time.perf_counter()
+    body, status = asyncio.run(get_positions_async(user))
+    elapsed = time.perf_counter() - start
+    assert status == 200 and len(body["positions"]) == 3
+    # Two rounds of overlapping queries rather than six sequential ones
+    assert elapsed < 0.2
+
+    backend.latency = 0
+    body, status = asyncio.run(get_positions_async(user, open_poll, "closed"))
+    assert status == 200 and body["positions"] == [] and body["total"] == 0
+    assert asyncio.run(get_positions_async(999))[1] == 404
+    assert asyncio.run(get_positions_async("abc"))[1] == 400
+
+
+def test_poll_detail(backend):
+    user, open_poll, _ = _seed(backend)
+    status, _, body = _call("GET", f"/api/polls/{open_poll}/detail", query=f"user_id={user}")
+    assert status == 200
+    assert body["poll"]["title"] == "Open poll" and body["poll"]["has_ended"] is False
+    assert body["price"]["q_yes"] == 10 and body["price"]["q_no"] == 4
+    assert set(body["stats"]) == {"num_traders", "volume", "24h_volume", "market_maker"}
+    assert {p["side"] for p in body["positions"]} == {"Yes", "No"}
+    assert body["errors"] == {}
+
+    assert _call("GET", "/api/polls/999/detail")[0] == 404
+    assert _call("GET", "/api/polls/abc/detail")[0] == 400
+
+
+def test_stats_use_the_polls_own_liquidity(backend):
+    deep = backend.add_poll(liquidity_b0=20.0)
+    expected = summarize_accounting({}, b0=20.0)["subsidy_bound_cents"]
+    assert expected != summarize_accounting({})["subsidy_bound_cents"]
+
+    # Through Flask (get_poll_stats) and the async detail page (_stats_part)
+    status, _, stats = _call("GET", f"/api/polls/{deep}/stats")
+    assert status == 200 and stats["market_maker"]["subsidy_bound_cents"] == expected
+    status, _, body = _call("GET", f"/api/polls/{deep}/detail")
+    assert status == 200 and body["stats"]["market_maker"]["subsidy_bound_cents"] == expected
+
+
+def test_resolve_pays_out_and_refunds(backend, monkeypatch):
+    winner = backend.add_profile(balance=0)
+    loser = backend.add_profile(balance=0)
+    late = backend.add_profile(balance=0)
+    ends_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    poll = backend.add_poll(ends_at=ends_at.isoformat())
+    before = (ends_at - timedelta(hours=1)).isoformat()
+    after = (ends_at + timedelta(minutes=30)).isoformat()
+    backend.seed_table("trades", [
+        {"poll_id": poll, "user_id": winner, "outcome": True, "num_shares": 5, "share_price": 300, "timestamp": before},
+        {"poll_id": poll, "user_id": winner, "outcome": True, "num_shares": 2, "share_price": 120, "timestamp": before},
+        {"poll_id": poll, "user_id": loser, "outcome": False, "num_shares": 4, "share_price": 200, "timestamp": before},
+        {"poll_id": poll, "user_id": late, "outcome": True, "num_shares": 1, "share_price": 90, "timestamp": after},
+    ])
+
+    async def not_admin(supabase, token):
+        return None
+
+    monkeypatch.setattr(admin, "_admin_profile_async", not_admin)
+    assert _call("POST", "/api/admin/resolve", {"poll_id": poll, "outcome": True})[0] == 403
+
+    async def as_admin(supabase, token):
+        return {"id": winner, "admin": True}
+
+    monkeypatch.setattr(admin, "_admin_profile_async", as_admin)
+    assert _call("POST", "/api/admin/resolve", {"poll_id": poll})[2] == {"error": "Outcome is a required field"}
+
+    status, _, body = _call("POST", "/api/admin/resolve", {"poll_id": poll, "outcome": True})
+    assert status == 200 and body["user_profit"] == 700
+    balances = {row["id"]: row["balance"] for row in backend.rows("profiles")}
+    assert balances == {winner: 700, loser: 0, late: 90}
+    settled = backend.rows("market_accounting")[0]
+    assert settled["payout_cents"] == 700 and settled["refund_cents"] == 90
+
+
+def test_resolve_records_the_settlement_even_if_a_payout_fails(backend, monkeypatch):
+    winner = backend.add_profile(balance=0)
+    ends_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    poll = backend.add_poll(ends_at=ends_at.isoformat())
+    backend.seed_table("trades", [{"poll_id": poll, "user_id": winner, "outcome": True, "num_shares": 5,
+                                   "share_price": 300, "timestamp": (ends_at - timedelta(hours=1)).isoformat()}])
+
+    async def as_admin(supabase, token):
+        return {"id": winner, "admin": True}
+
+    rpc = backend._rpc
+
+    def failing_rpc(name, params):
+        if name == "increment_balance":
+            raise RuntimeError("connection reset")
+        return rpc(name, params)
+
+    monkeypatch.setattr(admin, "_admin_profile_async", as_admin)
+    monkeypatch.setattr(backend, "_rpc", failing_rpc)
+    status, _, body = _call("POST", "/api/admin/resolve", {"poll_id": poll, "outcome": True})
+    assert status == 500 and "connection reset" in body["error"]
+    settled = backend.rows("market_accounting")[0]
+    assert (settled["resolved_outcome"], settled["payout_cents"]) == (True, 500)
+    assert [e["type"] for e in backend.rows("market_events")] == ["settlement"]
+
+
+def test_other_routes_pass_through_to_flask(backend):
+    _, open_poll, _ = _seed(backend)
+    status, headers, body = _call("GET", f"/api/polls/{open_poll}/price")
+    assert status == 200 and headers["content-type"] == "application/json"
+    assert body["q_yes"] == 10
+
+
+def test_logged_out_requests_are_redirected(backend, monkeypatch):
+    monkeypatch.setattr(asgi, "verify_token", lambda token: None)
+    status, headers, body = _call("POST", "/api/positions", {"user_id": 1})
+    assert status == 303 and headers["location"] == "/login" and body is None
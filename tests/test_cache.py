@@ -0,0 +1,114 @@
+import sys
+import os
+from unittest.mock import patch
+
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import polls, versions
+from api.cache import LRUBackend, ResponseCache
+from api.database import override_supabase
+from sim.backend import InMemorySupabase
+
+app = Flask(__name__)
+
+
+def test_lru_evicts_least_recently_used():
+    backend = LRUBackend(max_entries=2)
+    backend.set("a", "1", ttl=60)
+    backend.set("b", "2", ttl=60)
+    backend.get("a")
+    backend.set("c", "3", ttl=60)
+    assert backend.get("a") == "1"
+    assert backend.get("b") is None
+    assert len(backend) == 2
+
+
+def test_lru_entries_expire():
+    backend = LRUBackend()
+    backend.set("a", "1", ttl=0)
+    assert backend.get("a") is None
+
+
+def test_invalidate_orphans_old_entries():
+    cache = ResponseCache("test", ttl=60, backend=LRUBackend())
+    computed = []
+
+    def compute():
+        computed.append(1)
+        return "body"
+
+    cache.get_or_compute("k", compute)
+    cache.get_or_compute("k", compute)
+    cache.invalidate()
+    cache.get_or_compute("k", compute)
+
+    assert len(computed) == 2
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_ratio"] == 1 / 3
+
+
+def test_invalidate_one_partition():
+    cache = ResponseCache("test", ttl=60, backend=LRUBackend())
+    computed = []
+
+    def compute(value):
+        computed.append(value)
+        return value
+
+    cache.get_or_compute("k", lambda: compute("a"), partition=1)
+    cache.get_or_compute("k", lambda: compute("b"), partition=2)
+    cache.invalidate(partition=1)
+    assert cache.get_or_compute("k", lambda: compute("a2"), partition=1) == "a2"
+    assert cache.get_or_compute("k", lambda: compute("b2"), partition=2) == "b"
+    cache.invalidate()
+    assert cache.get_or_compute("k", lambda: compute("b3"), partition=2) == "b3"
+    assert computed == ["a", "b", "a2", "b3"]
+
+
+def test_backend_failure_falls_back_to_computing():
+    class Broken(LRUBackend):
+        def get(self, key):
+            raise ConnectionError("cache server down")
+
+    cache = ResponseCache("broken", ttl=60, backend=Broken())
+    assert cache.get_or_compute("k", lambda: "body") == "body"
+    assert cache.stats()["errors"] == 1
+
+
+def _list(backend, query=""):
+    override_supabase(backend)
+    try:
+        with app.test_request_context(f"/api/polls{query}"):
+            response, status = polls.list_polls()
+            return status, response.get_json()
+    finally:
+        override_supabase(None)
+
+
+def test_list_polls_is_served_from_cache_until_a_poll_changes():
+    backend = InMemorySupabase()
+    backend.add_poll(title="First")
+    with patch.object(polls, "_list_polls_cache", ResponseCache("list_polls_test", ttl=60, backend=LRUBackend())) as cache:
+        versions.on_bump(lambda scopes: cache.invalidate() if versions.POLLS in scopes else None)
+
+        status, data = _list(backend)
+        assert status == 200
+        assert [p["title"] for p in data["polls"]] == ["First"]
+
+        # Same normalized parameters: no database access
+        calls = backend.calls
+        assert _list(backend, "?page=1&public=TRUE")[1] == data
+        assert backend.calls == calls
+
+        backend.add_poll(title="Second")
+        versions.bump(versions.POLLS)
+        titles = {p["title"] for p in _list(backend)[1]["polls"]}
+        assert titles == {"First", "Second"}
+
+
+def test_list_polls_rejects_invalid_filters_before_caching():
+    status, data = _list(InMemorySupabase(), "?creator=abc")
+    assert status == 400
+    assert data["error"] == "Invalid creator ID"
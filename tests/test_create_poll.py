@@ -8,6 +8,7 @@ from unittest.mock import Mock, patch, MagicMock
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
 from api.index import app
+from api import index, polls, ratelimit
 
 @pytest.fixture
 def client():
@@ -16,6 +17,13 @@ def client():
     with app.test_client() as client:
         yield client
 
+@pytest.fixture(autouse=True)
+def reset_rate_limits():
+    """Poll creation limits are counted in memory; start each test fresh."""
+    ratelimit.reset_all()
+    yield
+    ratelimit.reset_all()
+
 @pytest.fixture
 def mock_supabase():
     """Mock the Supabase client."""
@@ -32,7 +40,7 @@ def test_create_poll_valid(client, mock_supabase):
     mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [{"id": 1}]
 
     # Mock no polls created today (for rate limiting)
-    mock_supabase.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value.execute.return_value.data = []
+    mock_supabase.table.return_value.select.return_value.eq.return_value.gte.return_value.order.return_value.limit.return_value.execute.return_value.data = []
 
     # Mock poll creation
     mock_supabase.table.return_value.insert.return_value.execute.return_value.data = [{
@@ -193,7 +201,7 @@ def test_create_poll_without_end_time(client, mock_supabase):
     mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [{"id": 1}]
 
     # Mock no polls created today (for rate limiting)
-    mock_supabase.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value.execute.return_value.data = []
+    mock_supabase.table.return_value.select.return_value.eq.return_value.gte.return_value.order.return_value.limit.return_value.execute.return_value.data = []
 
     # Mock poll creation
     mock_supabase.table.return_value.insert.return_value.execute.return_value.data = [{
@@ -226,10 +234,10 @@ def test_create_poll_rate_limiting(client, mock_supabase):
     # Mock user exists
     mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [{"id": 1}]
 
-    # Mock that 2 polls have already been created today (rate limit reached)
-    mock_supabase.table.return_value.select.return_value.eq.return_value.gte.return_value.lte.return_value.execute.return_value.data = [
-        {"id": 1}, {"id": 2}
-    ]
+    # 2 polls have already been created today (rate limit reached)
+    limit = ratelimit.rate_limit("polls_per_creator", 2, 24 * 3600)
+    limit.hit(1)
+    limit.hit(1)
 
     payload = {
         "title": "Test Rate Limit Poll",
@@ -243,6 +251,59 @@ def test_create_poll_rate_limiting(client, mock_supabase):
     data = response.get_json()
     assert "rate limit" in data["error"].lower()
 
+def test_create_poll_rate_limit_counts_polls_in_the_database(client, mock_supabase, monkeypatch):
+    """The polls table decides, e.g. for polls created through another worker."""
+    monkeypatch.setattr(index, "verify_token", lambda token: (token, None))
+    client.set_cookie("sb-access-token", "token")
+    future_time = (datetime.now(timezone.utc) + timedelta(hours=24)).isoformat()
+    mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [{"id": 1}]
+
+    # 2 polls created in the last day, the first one 20 hours ago
+    first = datetime.now(timezone.utc) - timedelta(hours=20)
+    mock_supabase.table.return_value.select.return_value.eq.return_value.gte.return_value.order.return_value.limit.return_value.execute.return_value.data = [
+        {"id": 1, "created_at": first.isoformat()}, {"id": 2, "created_at": datetime.now(timezone.utc).isoformat()}
+    ]
+
+    payload = {
+        "title": "Test Rate Limit Poll",
+        "description": "This should be rate limited",
+        "ends_at": future_time,
+        "creator": 1
+    }
+
+    response = client.post('/api/polls', json=payload)
+    assert response.status_code == 429
+    assert abs(int(response.headers["Retry-After"]) - 4 * 3600) <= 5
+    mock_supabase.table.return_value.insert.assert_not_called()
+    # The rejected attempt isn't held against the in-memory limit
+    assert ratelimit.rate_limit("polls_per_creator", 2, 24 * 3600).hit(1) == 0
+
+@pytest.mark.parametrize("admin, expected_status", [(False, 403), (True, 201)])
+def test_create_poll_liquidity_b0_is_admin_only(client, mock_supabase, monkeypatch, admin, expected_status):
+    """Only admins choose a poll's base liquidity."""
+    monkeypatch.setattr(index, "verify_token", lambda token: (token, None))
+    monkeypatch.setattr(polls, "current_user_is_admin", lambda: admin)
+    client.set_cookie("sb-access-token", "token")
+    future_time = (datetime.now(timezone.utc) + timedelta(hours=24)).isoformat()
+    mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [{"id": 1}]
+    mock_supabase.table.return_value.select.return_value.eq.return_value.gte.return_value.order.return_value.limit.return_value.execute.return_value.data = []
+    mock_supabase.table.return_value.insert.return_value.execute.return_value.data = [{"id": 1, "creator": 1, "liquidity_b0": 50.0}]
+
+    payload = {
+        "title": "Deep market",
+        "description": "A poll with a lot of liquidity",
+        "ends_at": future_time,
+        "creator": 1,
+        "liquidity_b0": 50
+    }
+
+    response = client.post('/api/polls', json=payload)
+    assert response.status_code == expected_status
+    if admin:
+        assert mock_supabase.table.return_value.insert.call_args[0][0]["liquidity_b0"] == 50.0
+    else:
+        mock_supabase.table.return_value.insert.assert_not_called()
+
 def test_get_poll_valid(client, mock_supabase):
     """Test retrieving a poll by ID."""
     future_time = (datetime.now(timezone.utc) + timedelta(hours=24)).isoformat()
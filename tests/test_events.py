@@ -0,0 +1,114 @@
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import events
+from api.database import override_supabase
+from api.events import Consumer, append_trade, append_settlement, read_events, get_checkpoint
+from api.trade import buy_shares, sell_shares
+from sim.backend import InMemorySupabase
+
+app = Flask(__name__)
+
+
+def _trade(backend, handler, **payload):
+    override_supabase(backend)
+    try:
+        with app.test_request_context(json=payload):
+            return handler()
+    finally:
+        override_supabase(None)
+
+
+def test_trades_are_journaled_in_order():
+    backend = InMemorySupabase()
+    poll_id = backend.add_poll()
+    user_id = backend.add_profile(balance=10_000)
+
+    _trade(backend, buy_shares, poll_id=poll_id, user_id=user_id, outcome="YES", num_shares=6)
+    response, _ = _trade(backend, sell_shares, poll_id=poll_id, user_id=user_id, outcome="YES", num_shares=2)
+
+    journal = read_events(backend, poll_id=poll_id)
+    assert [e["type"] for e in journal] == ["trade", "trade"]
+    assert journal[0]["seq"] < journal[1]["seq"]
+    assert [e["num_shares"] for e in journal] == [6, -2]
+    assert journal[1]["cash_cents"] == -int(round(response.get_json()["payout"] * 100))
+    assert journal[1]["price_yes"] == response.get_json()["price_after"]["yes"]
+
+    # The journal agrees with the maintained accounting counters
+    accounting = backend.rows("market_accounting")[0]
+    assert sum(e["cash_cents"] for e in journal) == accounting["collected_cents"]
+
+
+def test_consumer_resumes_from_checkpoint():
+    backend = InMemorySupabase()
+    poll_id = backend.add_poll()
+    append_trade(backend, poll_id, 1, True, 5, 260, 55, 45)
+    append_trade(backend, poll_id, 2, False, 3, 140, 52, 48)
+
+    seen = []
+    consumer = Consumer("volume", seen.append, batch_size=1)
+    assert consumer.run_until_caught_up(backend) == 2
+    assert [e["user_id"] for e in seen] == [1, 2]
+
+    append_settlement(backend, poll_id, True, 500, 0)
+    assert consumer.poll(backend) == 1
+    assert seen[-1]["type"] == "settlement"
+    assert consumer.poll(backend) == 0
+    assert get_checkpoint(backend, "volume") == seen[-1]["seq"]
+
+
+def test_consumer_filters_types_but_advances_past_them():
+    backend = InMemorySupabase()
+    poll_id = backend.add_poll()
+    append_trade(backend, poll_id, 1, True, 5, 260, 55, 45)
+    append_settlement(backend, poll_id, True, 500, 0)
+
+    seen = []
+    consumer = Consumer("settlements", seen.append, types={events.SETTLEMENT})
+    assert consumer.poll(backend) == 1
+    assert get_checkpoint(backend, "settlements") == 2
+
+
+def test_consumer_waits_for_recent_gaps_only():
+    backend = InMemorySupabase()
+    now = datetime.now(timezone.utc)
+    backend.seed_table("market_events", [
+        {"id": 1, "type": "trade", "poll_id": 1, "created_at": (now - timedelta(minutes=5)).isoformat()},
+        # id 2 is missing
+        {"id": 3, "type": "trade", "poll_id": 1, "created_at": now.isoformat()},
+    ])
+    seen = []
+    consumer = Consumer("gaps", seen.append)
+    assert consumer.poll(backend) == 1
+    assert get_checkpoint(backend, "gaps") == 1
+
+    backend.tables["market_events"][1]["created_at"] = (now - timedelta(minutes=1)).isoformat()
+    assert consumer.poll(backend) == 1
+    assert get_checkpoint(backend, "gaps") == 3
+
+
+def test_gap_check_reads_timestamps_without_a_zone_as_utc():
+    backend = InMemorySupabase()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    backend.seed_table("market_events", [
+        {"id": 1, "type": "trade", "poll_id": 1, "created_at": (now - timedelta(minutes=5)).isoformat()},
+        # id 2 is missing
+        {"id": 3, "type": "trade", "poll_id": 1, "created_at": now.isoformat()},
+    ])
+    consumer = Consumer("naive", lambda event: None)
+    assert consumer.poll(backend) == 1
+    assert get_checkpoint(backend, "naive") == 1
+
+
+def test_listeners_see_appended_events(monkeypatch):
+    monkeypatch.setattr(events, "_listeners", [])
+    seen = []
+    events.on_event(seen.append)
+    backend = InMemorySupabase()
+    event = append_trade(backend, 1, 1, True, 2, 110, 52, 48)
+    assert seen == [event]
+    assert event["seq"] == 1
@@ -0,0 +1,115 @@
+import sys
+import os
+import csv
+import io
+import json
+
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import export
+from api.amm import quote_trade_cents, settlement_cents
+from sim.backend import InMemorySupabase
+
+app = Flask(__name__)
+
+PAST = "2000-01-01T00:00:00+00:00"
+
+
+def _backend():
+    backend = InMemorySupabase()
+    user_id = backend.add_profile(balance=0)
+    other = backend.add_profile(balance=0)
+    open_poll = backend.add_poll(title="Open")
+    resolved_poll = backend.add_poll(title="Resolved", ends_at=PAST, outcome=True)
+    backend.seed_table("trades", [
+        {"poll_id": open_poll, "user_id": user_id, "outcome": True, "num_shares": 10, "share_price": 500},
+        {"poll_id": open_poll, "user_id": other, "outcome": False, "num_shares": 4, "share_price": 200},
+        {"poll_id": open_poll, "user_id": user_id, "outcome": True, "num_shares": 10, "share_price": 700},
+        {"poll_id": open_poll, "user_id": user_id, "outcome": True, "num_shares": -5, "share_price": 400},
+        {"poll_id": resolved_poll, "user_id": user_id, "outcome": True, "num_shares": 3, "share_price": 150},
+        {"poll_id": resolved_poll, "user_id": user_id, "outcome": False, "num_shares": 2, "share_price": 100},
+        {"poll_id": resolved_poll, "user_id": user_id, "outcome": False, "num_shares": -2, "share_price": 40},
+    ])
+    return backend, user_id, open_poll, resolved_poll
+
+
+def _export(monkeypatch, backend, query):
+    monkeypatch.setattr(export, "get_supabase", lambda: backend)
+    with app.test_request_context(f"/api/trades/export?{query}"):
+        response, status = export.export_trades()
+    return response, status
+
+
+def test_ndjson_running_positions_and_pnl(monkeypatch):
+    backend, user_id, open_poll, resolved_poll = _backend()
+    response, status = _export(monkeypatch, backend, f"user_id={user_id}")
+    assert status == 200
+    assert response.mimetype == "application/x-ndjson"
+    assert response.is_streamed
+    assert f"trades-{user_id}.ndjson" in response.headers["Content-Disposition"]
+
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    trades = [r for r in records if r["record"] == "trade"]
+    assert [t["trade_id"] for t in trades] == [1, 3, 4, 5, 6, 7]
+    assert [t["cash_cents"] for t in trades] == [-500, -700, 400, -150, -100, 40]
+    # Selling 5 of 20 shares costing 1200 realizes 400 - 300
+    assert (trades[2]["position_shares"], trades[2]["position_cost_cents"], trades[2]["realized_pnl_cents"]) == (15, 900, 100)
+    assert trades[-1]["realized_pnl_cents"] == -60
+    assert trades[-1]["total_realized_pnl_cents"] == 40
+
+    positions = [r for r in records if r["record"] == "position"]
+    assert [(p["poll_id"], p["side"], p["position_shares"], p["status"]) for p in positions] == [
+        (open_poll, "Yes", 15, "open"),
+        (resolved_poll, "Yes", 3, "resolved"),
+    ]
+    assert positions[1]["value_cents"] == settlement_cents(3, True)
+    # Open positions are worth what selling them back would pay
+    assert positions[0]["value_cents"] == -quote_trade_cents(15, 4, True, -15)["cost_cents"]
+
+    summary = records[-1]
+    assert summary["record"] == "summary" and summary["trades"] == 6
+    assert summary["total_realized_pnl_cents"] == 40
+    assert summary["total_unrealized_pnl_cents"] == sum(p["unrealized_pnl_cents"] for p in positions)
+
+
+def test_csv_and_keyset_batches(monkeypatch):
+    backend, user_id, _, _ = _backend()
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    response, status = _export(monkeypatch, backend, f"user_id={user_id}&format=csv")
+    assert status == 200 and response.mimetype == "text/csv"
+
+    calls = backend.calls
+    chunks = iter(response.response)
+    first = next(chunks)
+    # Only the first batch of trades has been read so far
+    assert backend.calls - calls == 1
+    rows = list(csv.DictReader(io.StringIO(first + "".join(chunks))))
+    assert [row["record"] for row in rows] == ["trade"] * 6 + ["position"] * 2 + ["summary"]
+    assert rows[0]["trade_id"] == "1" and rows[0]["value_cents"] == ""
+    assert rows[-1]["trades"] == "6"
+
+
+def test_validation_before_streaming(monkeypatch):
+    backend, user_id, _, _ = _backend()
+    assert _export(monkeypatch, backend, "user_id=abc")[1] == 400
+    assert _export(monkeypatch, backend, f"user_id={user_id}&format=xlsx")[1] == 400
+    assert _export(monkeypatch, backend, "user_id=999")[1] == 404
+    monkeypatch.setattr(export, "get_supabase", lambda: None)
+    with app.test_request_context(f"/api/trades/export?user_id={user_id}"):
+        assert export.export_trades()[1] == 503
+
+
+def test_error_mid_stream_is_reported_in_band(monkeypatch):
+    backend, user_id, _, _ = _backend()
+
+    def failing_positions(supabase, positions):
+        raise RuntimeError("boom")
+        yield
+
+    monkeypatch.setattr(export, "_value_positions", failing_positions)
+    response, status = _export(monkeypatch, backend, f"user_id={user_id}")
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert status == 200
+    assert [line["record"] for line in lines[:-1]] == ["trade"] * 6
+    assert lines[-1] == {"record": "error", "error": "Server error: boom"}
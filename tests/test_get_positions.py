@@ -7,6 +7,7 @@ from unittest.mock import patch, MagicMock
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
 from api.positions import get_positions
+from api.amm import batch_market_prices, quote_trade_cents, B0
 from api.index import app
 
 
@@ -49,8 +50,8 @@ def test_get_positions_no_trades_returns_empty(mock_supabase):
 	# Mock user exists
 	mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [{"id": 1}]
 
-	# Mock trades query returns no trades
-	mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.range.return_value.execute.return_value.data = []
+	# Mock positions query returns no positions
+	mock_supabase.rpc.return_value.execute.return_value.data = {"total": 0, "positions": []}
 
 	with app.app_context():
 		data, status = _unwrap_response(get_positions(1))
@@ -59,46 +60,38 @@ def test_get_positions_no_trades_returns_empty(mock_supabase):
 		assert data['positions'] == []
 
 
-def test_get_positions_combines_trades_and_calculates_pnl(mock_supabase):
+def test_get_positions_prices_netted_positions(mock_supabase):
+	tables = {name: MagicMock() for name in ("profiles", "polls", "poll_votes")}
+	mock_supabase.table.side_effect = lambda name: tables[name]
 	# Mock user exists
-	mock_supabase.table.return_value.select.return_value.eq.return_value.execute.return_value.data = [{"id": 1}]
-
-	# Create two trades for same poll/outcome
-	trades = [
-		{"poll_id": 10, "outcome": True, "num_shares": 5, "share_price": 2.0},
-		{"poll_id": 10, "outcome": True, "num_shares": 3, "share_price": 3.0}
+	tables["profiles"].select.return_value.eq.return_value.execute.return_value.data = [{"id": 1}]
+
+	# Two buys on the same poll and side, netted by the user_positions RPC
+	mock_supabase.rpc.return_value.execute.return_value.data = {
+		"total": 1,
+		"positions": [{"poll_id": 10, "outcome": True, "quantity": 8, "cost_basis_cents": 19}],
+	}
+	tables["polls"].select.return_value.in_.return_value.execute.return_value.data = [
+		{"id": 10, "title": "Open poll", "ends_at": None, "outcome": None, "liquidity_b0": None}
+	]
+	tables["poll_votes"].select.return_value.in_.return_value.execute.return_value.data = [
+		{"poll_id": 10, "yes_votes": 8, "no_votes": 0}
 	]
 
-	mock_result = MagicMock()
-	mock_result.data = trades
-
-	mock_supabase.table.return_value.select.return_value.eq.return_value.order.return_value.range.return_value.execute.return_value = mock_result
-
-	# Patch the pricing/quote function so current price and cost are deterministic
-	# Patch the pricing/quote function so current price and cost are deterministic
-	with patch('api.positions.quote_and_cost_ls_lmsr') as quote_fn, patch('api.positions.get_poll_data') as get_poll:
-		# Return a structure used by positions: price_yes, price_no, cost
-		quote_fn.return_value = {"price_yes": 0.8, "price_no": 0.2, "cost": -4.0}
-		# Return poll data indicating poll is still open and not ended
-		get_poll.return_value = {"has_ended": False, "result": True}
-		with app.app_context():
-			data, status = _unwrap_response(get_positions(1))
-
-			assert status == 200
-			assert 'positions' in data
-			assert len(data['positions']) == 1
-
-			pos = data['positions'][0]
-			assert pos['poll_id'] == 10
-			assert pos['side'] is True
-			# `open` flag should be present
-			assert 'open' in pos
-			# quantity should be summed: 5 + 3 = 8
-			assert pos['quantity'] == 8
-			# avg_price = total_cost / quantity = (5*2 + 3*3)/8 = (10+9)/8 = 19/8
-			assert abs(pos['avg_price'] - (19.0/8.0)) < 1e-6
-			# current_price should come from quote function
-			assert pos['current_price'] == 0.8
-			# current_pnl is computed in code; ensure it's present and numeric
-			assert 'current_pnl' in pos
-			assert isinstance(pos['current_pnl'], float)
+	with app.app_context():
+		data, status = _unwrap_response(get_positions(1))
+
+	assert status == 200
+	assert mock_supabase.rpc.call_args[0][0] == "user_positions"
+	# One polls query and one poll_votes query for the whole page
+	assert tables["polls"].select.return_value.in_.call_args[0] == ("id", [10])
+	assert tables["poll_votes"].select.return_value.in_.call_count == 1
+
+	pos, = data['positions']
+	assert (pos['poll_id'], pos['side'], pos['quantity'], pos['open']) == (10, "Yes", 8, True)
+	assert pos['avg_price'] == round(19 / 8 / 100, 2)
+	(price_yes, _), = batch_market_prices([8], [0], [B0])
+	assert pos['current_price'] == price_yes
+	value_cents = -quote_trade_cents(8, 0, True, -8)["cost_cents"]
+	assert pos['value'] == value_cents / 100.0
+	assert pos['current_pnl'] == round((value_cents - 19) / 100.0, 2)
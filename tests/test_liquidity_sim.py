@@ -0,0 +1,77 @@
+import random
+import sys
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from sim.liquidity import simulate, load_trade_streams
+from api.amm import quote_trade_cents
+
+
+def _stream(seed, n=60):
+    rng = random.Random(seed)
+    trades, held = [], {True: 0, False: 0}
+    for _ in range(n):
+        outcome_yes = rng.random() < 0.6
+        if held[outcome_yes] and rng.random() < 0.3:
+            shares = -rng.randint(1, held[outcome_yes])
+        else:
+            shares = rng.randint(1, 20)
+        held[outcome_yes] += shares
+        trades.append((outcome_yes, shares))
+    return trades
+
+
+def test_collected_matches_production_pricing():
+    trades = _stream(1)
+    q_yes = q_no = collected = 0
+    for outcome_yes, shares in trades:
+        quote = quote_trade_cents(q_yes, q_no, outcome_yes, shares, b0=3.0)
+        collected += quote["cost_cents"]
+        q_yes, q_no = quote["q_yes_after"], quote["q_no_after"]
+
+    report = simulate({1: {"outcome": None, "trades": trades}}, [3.0], vectorized=False)
+    assert report[0]["collected_cents"] == collected
+    assert report[0]["trades"] == len(trades)
+
+
+def test_more_liquidity_means_less_volatility_and_slippage():
+    streams = {i: {"outcome": True, "trades": _stream(i)} for i in range(5)}
+    low, high = simulate(streams, [1.0, 20.0], vectorized=False)
+    assert high["volatility_cents"] < low["volatility_cents"]
+    assert high["slippage_cents"] < low["slippage_cents"]
+    assert low["polls"] == high["polls"] == 5
+
+
+def test_vectorized_matches_python():
+    pytest.importorskip("numpy")
+    streams = {i: {"outcome": i % 2 == 0, "trades": _stream(i)} for i in range(3)}
+    b0s = [1.0, 2.5, 5.0, 12.0]
+    fast = simulate(streams, b0s, vectorized=True)
+    slow = simulate(streams, b0s, vectorized=False)
+    for a, b in zip(fast, slow):
+        assert a["collected_cents"] == b["collected_cents"]
+        assert a["worst_case_loss_cents"] == b["worst_case_loss_cents"]
+        assert a["realized_loss_cents"] == b["realized_loss_cents"]
+        assert a["volatility_cents"] == pytest.approx(b["volatility_cents"], abs=1e-3)
+        assert a["slippage_cents"] == pytest.approx(b["slippage_cents"], abs=1e-3)
+
+
+def test_load_trade_streams_groups_by_poll():
+    supabase = MagicMock()
+    polls = MagicMock()
+    trades = MagicMock()
+    supabase.table.side_effect = lambda name: polls if name == "polls" else trades
+    polls.select.return_value.execute.return_value.data = [{"id": 1, "outcome": None}, {"id": 2, "outcome": True}]
+    page = trades.select.return_value.in_.return_value.order.return_value.order.return_value.range.return_value
+    page.execute.return_value.data = [
+        {"poll_id": 1, "outcome": True, "num_shares": 5},
+        {"poll_id": 2, "outcome": False, "num_shares": 3},
+        {"poll_id": 1, "outcome": True, "num_shares": -2},
+    ]
+
+    streams = load_trade_streams(supabase)
+    assert streams[1]["trades"] == [(True, 5), (True, -2)]
+    assert streams[2] == {"outcome": True, "trades": [(False, 3)]}
@@ -0,0 +1,108 @@
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import poll_detail
+from api.poll_detail import get_poll_detail
+
+app = Flask(__name__)
+
+
+def _slow(body, status=200, delay=0.2):
+    def handler(*args):
+        time.sleep(delay)
+        return jsonify(body), status
+    return handler
+
+
+def _detail(query=""):
+    with app.test_request_context(f"/api/polls/1/detail{query}"):
+        response, status = get_poll_detail(1)
+        return status, response.get_json()
+
+
+def test_components_are_fetched_concurrently():
+    with patch.object(poll_detail, "get_poll", _slow({"poll": {"id": 1, "tags": ["exams"]}})), \
+         patch.object(poll_detail, "get_price", _slow({"price_yes": 60, "price_no": 40})), \
+         patch.object(poll_detail, "get_poll_stats", _slow({"num_traders": 3})), \
+         patch.object(poll_detail, "get_positions", _slow({"positions": [{"poll_id": 1, "quantity": 2}]})):
+        start = time.perf_counter()
+        status, data = _detail("?user_id=5")
+        elapsed = time.perf_counter() - start
+
+    assert status == 200
+    assert elapsed < 0.6  # four 0.2s fetches, run side by side
+    assert data["poll"] == {"id": 1, "tags": ["exams"]}
+    assert data["price"]["price_yes"] == 60
+    assert data["stats"]["num_traders"] == 3
+    assert data["positions"] == [{"poll_id": 1, "quantity": 2}]
+    assert data["errors"] == {}
+
+
+def test_partial_failure_keeps_the_rest():
+    def broken(*args):
+        raise RuntimeError("stats backend down")
+
+    with patch.object(poll_detail, "get_poll", _slow({"poll": {"id": 1}}, delay=0)), \
+         patch.object(poll_detail, "get_price", _slow({"error": "Database connection not available"}, 503, delay=0)), \
+         patch.object(poll_detail, "get_poll_stats", broken):
+        status, data = _detail()
+
+    assert status == 200
+    assert data["poll"] == {"id": 1}
+    assert data["price"] is None
+    assert data["stats"] is None
+    assert data["positions"] is None
+    assert data["errors"]["price"] == {"status": 503, "error": "Database connection not available"}
+    assert data["errors"]["stats"]["status"] == 500
+
+
+def test_missing_poll_is_404():
+    with patch.object(poll_detail, "get_poll", _slow({"error": "Poll not found"}, 404, delay=0)), \
+         patch.object(poll_detail, "get_price", _slow({"error": "Poll not found"}, 404, delay=0)), \
+         patch.object(poll_detail, "get_poll_stats", _slow({}, delay=0)):
+        status, data = _detail()
+    assert status == 404
+    assert data["error"] == "Poll not found"
+
+
+def test_deadline_covers_time_spent_queued(monkeypatch):
+    calls = []
+
+    def slow_poll(*args):
+        calls.append("poll")
+        time.sleep(0.5)
+        return jsonify({"poll": {"id": 1}}), 200
+
+    def quick(name):
+        def handler(*args):
+            calls.append(name)
+            return jsonify({}), 200
+        return handler
+
+    # One busy worker: the price and stats parts sit in the queue behind the poll
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(poll_detail, "_executor", executor)
+    monkeypatch.setattr(poll_detail, "COMPONENT_TIMEOUT_SECONDS", 0.1)
+    with patch.object(poll_detail, "get_poll", slow_poll), \
+         patch.object(poll_detail, "get_price", quick("price")), \
+         patch.object(poll_detail, "get_poll_stats", quick("stats")):
+        start = time.perf_counter()
+        status, data = _detail()
+        elapsed = time.perf_counter() - start
+        executor.shutdown(wait=True)
+
+    assert status == 504
+    assert elapsed < 0.4  # one 0.1s deadline, not one per part
+    # The queued parts were cancelled instead of running after the response
+    assert calls == ["poll"]
+
+
+def test_invalid_user_id():
+    status, data = _detail("?user_id=abc")
+    assert status == 400
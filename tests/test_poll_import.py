@@ -0,0 +1,121 @@
+import sys
+import os
+import json
+from datetime import datetime, timezone, timedelta
+
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import poll_import
+from api.poll_import import import_polls, import_polls_endpoint, parse_csv
+from sim.backend import InMemorySupabase
+
+app = Flask(__name__)
+
+FUTURE = (datetime.now(timezone.utc) + timedelta(days=7)).isoformat()
+
+
+def _backend():
+    backend = InMemorySupabase()
+    backend.add_profile(balance=0)
+    backend.seed_table("tags", [{"name": "exams"}, {"name": "math"}])
+    return backend
+
+
+def _poll(title, **fields):
+    return {"title": title, "description": "A description long enough", "creator": 1, **fields}
+
+
+def test_import_reports_each_row_and_inserts_valid_ones():
+    backend = _backend()
+    rows = [
+        _poll("Midterm average above 70", tags=["exams", 2], ends_at=FUTURE),
+        _poll("No", tags=[]),
+        _poll("Unknown creator", creator=99),
+        _poll("Unknown tags", tags=["chess", 7]),
+        "not a poll",
+        _poll("Published right away", public=True, liquidity_b0=12),
+    ]
+    calls = backend.calls
+    report = import_polls(backend, rows)
+    # creators, tag ids, tag names, one poll insert, one tag link insert
+    assert backend.calls - calls == 5
+
+    assert report["created"] == 2 and report["failed"] == 4
+    results = report["results"]
+    assert results[1]["errors"] == ["Title must be at least 3 characters long"]
+    assert results[2]["errors"] == ["Creator user does not exist"]
+    assert results[3]["errors"] == ["Tag 'chess' does not exist", "Tag ID 7 does not exist"]
+    assert results[4]["errors"] == ["Row must be an object"]
+
+    polls = {row["id"]: row for row in backend.rows("polls")}
+    first, last = polls[results[0]["poll_id"]], polls[results[5]["poll_id"]]
+    assert first["public"] is False and first["ends_at"]
+    assert last["public"] is True and last["liquidity_b0"] == 12.0
+    links = sorted((r["poll_id"], r["tag_id"]) for r in backend.rows("poll_tags"))
+    assert links == [(first["id"], 1), (first["id"], 2)]
+
+
+def test_dry_run_and_all_or_nothing_insert_nothing():
+    backend = _backend()
+    rows = [_poll("A fine poll"), _poll("Bad creator", creator=5)]
+
+    report = import_polls(backend, rows, dry_run=True)
+    assert report["results"][0] == {"row": 1, "valid": True}
+    assert report["failed"] == 1
+
+    report = import_polls(backend, rows, all_or_nothing=True)
+    assert report["created"] == 0
+    assert backend.rows("polls") == []
+
+
+def test_inserts_in_chunks(monkeypatch):
+    monkeypatch.setattr(poll_import, "IMPORT_CHUNK_SIZE", 2)
+    backend = _backend()
+    report = import_polls(backend, [_poll(f"Poll number {n}") for n in range(5)])
+    assert report["created"] == 5
+    assert [r["poll_id"] for r in report["results"]] == [1, 2, 3, 4, 5]
+
+
+def test_parse_csv():
+    text = (
+        "title,description,creator,tags,ends_at,public\n"
+        "Snow day,Will classes be cancelled,1,weather; campus ,,yes\n"
+        "Exam curve,Will the final be curved,2,,,\n"
+    )
+    rows = parse_csv(text)
+    assert rows[0] == {"title": "Snow day", "description": "Will classes be cancelled", "creator": "1",
+                       "tags": ["weather", "campus"], "public": "yes"}
+    assert rows[1]["tags"] == [] and "ends_at" not in rows[1]
+
+
+def _call(backend, monkeypatch, **kwargs):
+    monkeypatch.setattr(poll_import, "get_supabase", lambda: backend)
+    monkeypatch.setattr(poll_import, "current_user_is_admin", lambda: True)
+    with app.test_request_context(method="POST", **kwargs):
+        response, status = import_polls_endpoint()
+        return response.get_json(), status
+
+
+def test_endpoint_accepts_json_and_csv(monkeypatch):
+    backend = _backend()
+    body, status = _call(backend, monkeypatch, json={"polls": [_poll("From JSON", tags=["math"])], "public": True})
+    assert status == 201
+    assert backend.rows("polls")[0]["public"] is True
+
+    csv_body = "title,description,creator,tags\nFrom CSV,Imported from a spreadsheet,1,exams\n"
+    body, status = _call(backend, monkeypatch, data=csv_body, content_type="text/csv",
+                         query_string={"dry_run": "true"})
+    assert status == 200
+    assert body["results"] == [{"row": 1, "valid": True}]
+    assert len(backend.rows("polls")) == 1
+
+    body, status = _call(backend, monkeypatch, json={"polls": [_poll("x")]})
+    assert status == 400 and body["created"] == 0
+    assert _call(backend, monkeypatch, json={"rows": []})[1] == 400
+
+
+def test_endpoint_requires_admin(monkeypatch):
+    monkeypatch.setattr(poll_import, "current_user_is_admin", lambda: False)
+    with app.test_request_context(method="POST", data=json.dumps({"polls": []}), content_type="application/json"):
+        assert import_polls_endpoint()[1] == 403
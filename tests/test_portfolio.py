@@ -0,0 +1,91 @@
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import amm, database, index, portfolio, versions
+from api.amm import poll_b0, quote_trade_cents
+from api.userinfo import get_data
+from sim.backend import InMemorySupabase
+
+PAST = "2000-01-01T00:00:00+00:00"
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = InMemorySupabase()
+    database.override_supabase(backend)
+    monkeypatch.setattr(amm, "supabase", backend)
+    portfolio._cache.invalidate()
+    yield backend
+    database.override_supabase(None)
+
+
+def _seed(backend):
+    user = backend.add_profile(balance=10_000, username="trader")
+    held = backend.add_poll(title="Held")
+    resolved = backend.add_poll(title="Resolved", ends_at=PAST, outcome=True)
+    closed_out = backend.add_poll(title="Closed out")
+    backend.seed_table("trades", [
+        {"poll_id": held, "user_id": user, "outcome": True, "num_shares": 10, "share_price": 500},
+        {"poll_id": resolved, "user_id": user, "outcome": True, "num_shares": 4, "share_price": 200},
+        {"poll_id": resolved, "user_id": user, "outcome": False, "num_shares": 2, "share_price": 100},
+        {"poll_id": closed_out, "user_id": user, "outcome": False, "num_shares": 5, "share_price": 300},
+        {"poll_id": closed_out, "user_id": user, "outcome": False, "num_shares": -5, "share_price": 320},
+    ])
+    return user, held
+
+
+def test_summary_covers_every_position(backend):
+    user, _ = _seed(backend)
+    value = -quote_trade_cents(10, 0, True, -10, b0=poll_b0(None))["cost_cents"]
+
+    summary = portfolio.portfolio_summary(backend, user)
+    # Settled: +400 - 200 and 0 - 100; sold back: 320 - 300
+    assert summary["realized_pnl"] == 1.2
+    assert summary["unrealized_pnl"] == (value - 500) / 100.0
+    assert summary["lifetime_pnl"] == pytest.approx(summary["realized_pnl"] + summary["unrealized_pnl"])
+    assert summary["positions_value"] == value / 100.0
+    assert summary["exposure"] == 5.0
+    assert summary["open_positions"] == 1
+
+
+def test_get_data_totals_are_not_limited_to_the_page(backend):
+    user, _ = _seed(backend)
+    with index.app.test_request_context("/api/user", method="POST", json={"user_id": str(user), "page_size": 1}):
+        res, status = get_data()
+    assert status == 200
+    body = res.get_json()
+    assert len(body["positions"]) == 1 and body["total_positions"] == 3
+    assert body["lifetime_pnl"] == portfolio.portfolio_summary(backend, user)["lifetime_pnl"]
+    assert body["equity"] == pytest.approx(100.0 + body["positions_value"])
+
+
+def test_positions_value_matches_the_position_list(backend):
+    user, _ = _seed(backend)
+    with index.app.test_request_context("/api/user", method="POST", json={"user_id": str(user), "status": "open"}):
+        res, status = get_data()
+    body = res.get_json()
+    assert status == 200
+    assert body["positions_value"] == pytest.approx(sum(p["value"] for p in body["positions"]))
+
+
+def test_cached_until_the_users_trades_or_a_resolution(backend):
+    user, held = _seed(backend)
+    other = backend.add_profile(balance=0)
+    first = portfolio.get_portfolio(backend, user)
+
+    calls = backend.calls
+    versions.bump(versions.user_scope(other), versions.market_scope(held))
+    assert portfolio.get_portfolio(backend, user) == first
+    assert backend.calls == calls
+
+    backend.seed_table("trades", [{"poll_id": held, "user_id": user, "outcome": True, "num_shares": 5, "share_price": 300}])
+    versions.bump(versions.user_scope(user))
+    assert portfolio.get_portfolio(backend, user)["exposure"] == 8.0
+
+    calls = backend.calls
+    versions.bump(versions.POLLS)
+    portfolio.get_portfolio(backend, user)
+    assert backend.calls > calls
@@ -0,0 +1,98 @@
+import sys
+import os
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import amm, database, index
+from api.positions import get_positions, get_positions_async
+from sim.backend import InMemorySupabase, AsyncInMemorySupabase
+
+PAST = "2000-01-01T00:00:00+00:00"
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = InMemorySupabase()
+    database.override_supabase(backend)
+    database.override_async_supabase(AsyncInMemorySupabase(backend))
+    monkeypatch.setattr(amm, "supabase", backend)
+    monkeypatch.setattr(index, "verify_token", lambda token: (token, None))
+    yield backend
+    database.override_supabase(None)
+    database.override_async_supabase(None)
+
+
+def _seed(backend):
+    """A user with 5 open positions, built from interleaved trades, and one closed out."""
+    user = backend.add_profile(balance=0)
+    polls = [backend.add_poll(title=f"Poll {n}") for n in range(3)]
+    ended = backend.add_poll(title="Ended", ends_at=PAST, outcome=False)
+    trades = []
+    for _ in range(3):
+        for poll_id in polls:
+            trades.append({"poll_id": poll_id, "user_id": user, "outcome": True, "num_shares": 2, "share_price": 100})
+    trades += [
+        {"poll_id": polls[0], "user_id": user, "outcome": False, "num_shares": 5, "share_price": 250},
+        {"poll_id": ended, "user_id": user, "outcome": False, "num_shares": 4, "share_price": 200},
+        {"poll_id": polls[1], "user_id": user, "outcome": False, "num_shares": 3, "share_price": 150},
+        {"poll_id": polls[1], "user_id": user, "outcome": False, "num_shares": -3, "share_price": 140},
+    ]
+    backend.seed_table("trades", trades)
+    return user, polls, ended
+
+
+def _page(user, **kwargs):
+    with index.app.app_context():
+        res, status = get_positions(user, **kwargs)
+    assert status == 200, res.get_json()
+    return res.get_json()
+
+
+def test_pages_hold_whole_positions(backend):
+    user, polls, ended = _seed(backend)
+    seen = []
+    cursor = None
+    while True:
+        body = _page(user, page_size=2, cursor=cursor)
+        assert body["total"] == 5 and len(body["positions"]) <= 2
+        seen += body["positions"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert [(p["poll_id"], p["side"]) for p in seen] == [
+        (polls[0], "No"), (polls[0], "Yes"), (polls[1], "Yes"), (polls[2], "Yes"), (ended, "No"),
+    ]
+    assert [p["quantity"] for p in seen] == [5, 6, 6, 6, 4]
+    assert seen[-1]["open"] is False and seen[-1]["current_price"] == 100
+
+
+def test_page_numbers_and_filters(backend):
+    user, polls, ended = _seed(backend)
+    first = _page(user, page_size=2)
+    second = _page(user, page_size=2, page=2)
+    assert second["positions"] == _page(user, page_size=2, cursor=first["next_cursor"])["positions"]
+    assert second["page"] == 2 and second["next_cursor"] is not None
+    assert _page(user, page_size=2, page=3)["next_cursor"] is None
+
+    assert [p["poll_id"] for p in _page(user, status="closed")["positions"]] == [ended]
+    assert _page(user, status="open")["total"] == 4
+    assert _page(user, poll_id=polls[0])["total"] == 2
+
+    with index.app.app_context():
+        assert get_positions(user, cursor="not a cursor")[1] == 400
+
+
+def test_endpoint_and_async_paginate_alike(backend):
+    user, _, _ = _seed(backend)
+    client = index.app.test_client()
+    client.set_cookie("sb-access-token", "token")
+    res = client.post("/api/positions", json={"user_id": user, "page_size": 3, "page": 2})
+    assert res.status_code == 200
+    body = res.get_json()
+    assert len(body["positions"]) == 2 and body["page"] == 2 and body["page_size"] == 3
+
+    async_body, status = asyncio.run(get_positions_async(user, page_size=3, page=2))
+    assert status == 200 and async_body == body
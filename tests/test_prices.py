@@ -182,3 +182,61 @@ def test_get_price_response_precision(client, mock_supabase):
     data = response.get_json()
     assert isinstance(data["price_yes"], int)
     assert isinstance(data["price_no"], int)
+
+
+def _batch_prices(backend, query):
+    from api.database import override_supabase
+    from api.prices import get_prices
+    override_supabase(backend)
+    try:
+        with app.test_request_context(f'/api/prices?{query}'):
+            response, status = get_prices()
+            return status, response.get_json()
+    finally:
+        override_supabase(None)
+
+
+def _seed_backend():
+    from sim.backend import InMemorySupabase
+    backend = InMemorySupabase()
+    open_poll = backend.add_poll()
+    yes_poll = backend.add_poll(outcome=True)
+    thin_poll = backend.add_poll(liquidity_b0=1.0)
+    backend.seed_table("trades", [
+        {"poll_id": open_poll, "user_id": 1, "outcome": True, "num_shares": 10, "share_price": 600},
+        {"poll_id": open_poll, "user_id": 1, "outcome": False, "num_shares": 5, "share_price": 250},
+        {"poll_id": thin_poll, "user_id": 1, "outcome": True, "num_shares": 10, "share_price": 900},
+    ])
+    return backend, open_poll, yes_poll, thin_poll
+
+
+def test_get_prices_matches_single_poll_pricing():
+    from api.amm import market_price
+    backend, open_poll, yes_poll, thin_poll = _seed_backend()
+    status, data = _batch_prices(backend, f'ids={thin_poll},{open_poll},{yes_poll},99')
+    assert status == 200
+    assert [p["poll_id"] for p in data["prices"]] == [thin_poll, open_poll, yes_poll]
+    assert data["missing"] == [99]
+
+    thin, market, resolved = data["prices"]
+    assert market["price_yes"] == market_price(10, 5)["price_yes"]
+    assert (market["q_yes"], market["q_no"]) == (10, 5)
+    assert thin["price_yes"] == market_price(10, 0, b0=1.0)["price_yes"]
+    assert (resolved["price_yes"], resolved["price_no"]) == (100, 0)
+
+
+def test_get_prices_uses_two_queries():
+    backend, open_poll, yes_poll, thin_poll = _seed_backend()
+    before = backend.calls
+    _batch_prices(backend, f'ids={open_poll}&ids={yes_poll},{thin_poll}')
+    assert backend.calls - before == 2
+
+
+def test_get_prices_validates_ids():
+    from api.prices import MAX_BATCH_PRICE_IDS
+    backend, *_ = _seed_backend()
+    assert _batch_prices(backend, '')[0] == 400
+    assert _batch_prices(backend, 'ids=1,abc')[0] == 400
+    assert _batch_prices(backend, 'ids=0')[0] == 400
+    too_many = ",".join(str(i) for i in range(1, MAX_BATCH_PRICE_IDS + 2))
+    assert _batch_prices(backend, f'ids={too_many}')[0] == 400
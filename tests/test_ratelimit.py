@@ -0,0 +1,101 @@
+import sys
+import os
+
+import jwt
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import ratelimit
+from api.ratelimit import MemoryStore, RateLimit, rate_limited, authenticated_user, client_ip
+
+app = Flask(__name__)
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def test_sliding_window_weighs_the_previous_window(monkeypatch):
+    clock = Clock(1000.0)  # the start of a 10s window
+    monkeypatch.setattr(ratelimit.time, "time", clock.time)
+    limit = RateLimit("test", 4, 10, store=MemoryStore())
+
+    assert [limit.hit("u") for _ in range(4)] == [0, 0, 0, 0]
+    assert limit.hit("u") == 10          # full until the window ends
+    assert limit.hit("other") == 0       # keys are independent
+
+    clock.now = 1012.5                   # a quarter into the next window
+    # 4 * 0.75 = 3 hits still count from the previous window
+    assert limit.hit("u") == 0
+    retry = limit.hit("u")
+    assert retry == 2.5                  # until one more previous hit slides out
+    clock.now += retry
+    assert limit.hit("u") == 0
+
+
+def test_refund_gives_the_hit_back(monkeypatch):
+    monkeypatch.setattr(ratelimit.time, "time", lambda: 500.0)
+    limit = RateLimit("refund", 1, 60, store=MemoryStore())
+    assert limit.hit(7) == 0
+    limit.refund(7)
+    assert limit.hit(7) == 0
+    assert limit.hit(7) > 0
+
+
+def test_store_failures_let_requests_through():
+    class Broken:
+        def incr(self, key, ttl):
+            raise ConnectionError("down")
+
+    assert RateLimit("broken", 1, 60, store=Broken()).hit("u") == 0
+
+
+def _token(subject):
+    return jwt.encode({"sub": subject}, "secret", algorithm="HS256")
+
+
+def test_decorator_returns_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(ratelimit, "_limits", {})
+    calls = []
+
+    @rate_limited("decorated", 2, 60, key=authenticated_user)
+    def handler():
+        calls.append(1)
+        return "ok", 200
+
+    # Counted per signed-in user, whatever user_id the body claims
+    alice = {"Cookie": f"sb-access-token={_token('alice')}"}
+    with app.test_request_context(json={"user_id": 1}, headers=alice):
+        assert handler() == ("ok", 200)
+    with app.test_request_context(json={"user_id": 2}, headers=alice):
+        assert handler() == ("ok", 200)
+        response, status = handler()
+    assert status == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert "rate limit" in response.get_json()["error"].lower()
+    assert len(calls) == 2
+
+    with app.test_request_context(headers={"Cookie": f"sb-access-token={_token('bob')}"}):
+        assert handler()[1] == 200
+    with app.test_request_context(headers={"X-Forwarded-For": "10.0.0.1"}):
+        assert handler()[1] == 200
+    assert ratelimit.rate_limit("decorated", 2, 60).store.get(
+        f"decorated:ip=10.0.0.1:{int(ratelimit.time.time() // 60)}") == 1
+
+
+def test_client_ip_trusts_only_the_proxy_hops(monkeypatch):
+    spoofed = {"X-Forwarded-For": "6.6.6.6, 203.0.113.7, 10.0.0.2"}
+    with app.test_request_context(headers=spoofed, environ_base={"REMOTE_ADDR": "10.0.0.3"}):
+        # Only the entry added by the one trusted proxy counts
+        assert client_ip() == "10.0.0.2"
+        monkeypatch.setenv(ratelimit.TRUSTED_PROXY_HOPS_ENV, "2")
+        assert client_ip() == "203.0.113.7"
+        monkeypatch.setenv(ratelimit.TRUSTED_PROXY_HOPS_ENV, "0")
+        assert client_ip() == "10.0.0.3"
+    monkeypatch.delenv(ratelimit.TRUSTED_PROXY_HOPS_ENV)
+    with app.test_request_context(environ_base={"REMOTE_ADDR": "10.0.0.3"}):
+        assert client_ip() == "10.0.0.3"
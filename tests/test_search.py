@@ -0,0 +1,168 @@
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import search, versions
+from api.database import override_supabase
+from api.search import SearchIndex, PollSearch, search_polls, tokenize
+from sim.backend import InMemorySupabase
+
+app = Flask(__name__)
+
+
+def _tags(*tags):
+    return [{"tags": {"id": tag_id, "name": name}} for tag_id, name in tags]
+
+
+def _index(*rows):
+    index = SearchIndex()
+    for row in rows:
+        index.add(row)
+    return index
+
+
+def _ids(found):
+    results, total = found
+    assert total == len(results)
+    return [doc["id"] for doc, _ in results]
+
+
+def test_tokenize():
+    assert tokenize("Will the Geese win, 2025?") == ["will", "the", "geese", "win", "2025"]
+
+
+def test_bm25_prefers_title_and_rarer_words():
+    index = _index(
+        {"id": 1, "title": "Goose election", "description": "Who wins the campus election vote"},
+        {"id": 2, "title": "Cafeteria menu", "description": "Will the goose election change the menu"},
+        {"id": 3, "title": "Weather", "description": "Will it snow before the exam season"},
+    )
+    assert _ids(index.search("goose election")) == [1, 2]
+    assert sorted(_ids(index.search("will the"))) == [2, 3]
+    assert index.search("goose snow") == ([], 0)
+
+    top, total = index.search("will", limit=1)
+    assert len(top) == 1 and total == 2
+
+
+def test_prefix_matches_the_last_word_only():
+    index = _index(
+        {"id": 1, "title": "Election night", "description": "A poll description"},
+        {"id": 2, "title": "Electric cars", "description": "A poll description"},
+        {"id": 3, "title": "Elected mayor", "description": "A poll description"},
+    )
+    assert _ids(index.search("electr")) == [2]
+    assert sorted(_ids(index.search("elec"))) == [1, 2, 3]
+    assert index.search("electr", prefix=False) == ([], 0)
+    assert index.search("electr night") == ([], 0)
+
+
+def test_tags_are_searchable_and_reindexing_replaces_terms():
+    index = _index({"id": 1, "title": "Hockey final", "description": "Who takes the cup",
+                    "poll_tags": _tags((4, "Sports"))})
+    assert _ids(index.search("sports")) == [1]
+
+    index.add({"id": 1, "title": "Chess final", "description": "Who takes the cup", "poll_tags": []})
+    assert index.search("sports") == ([], 0)
+    assert index.search("hockey") == ([], 0)
+    assert _ids(index.search("chess")) == [1]
+
+    index.remove(1)
+    assert len(index) == 0
+    assert index._terms == []
+
+
+def _search(backend, query_string):
+    override_supabase(backend)
+    try:
+        with app.test_request_context("/api/polls/search?" + query_string):
+            response, status = search_polls()
+            return response.get_json(), status
+    finally:
+        override_supabase(None)
+
+
+def test_endpoint_filters_and_paginates(monkeypatch):
+    monkeypatch.setattr(search, "poll_search", PollSearch())
+    backend = InMemorySupabase()
+    past = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    open_id = backend.add_poll(title="Snow day tomorrow", poll_tags=_tags((1, "weather")))
+    closed_id = backend.add_poll(title="Snow day last week", ends_at=past)
+    backend.add_poll(title="Snow day secret", public=False)
+    backend.add_poll(title="Snow day removed", deleted=True)
+
+    body, status = _search(backend, "q=snow")
+    assert status == 200
+    assert sorted(p["id"] for p in body["polls"]) == [open_id, closed_id]
+    assert "_tag_ids" not in body["polls"][0]
+
+    body, _ = _search(backend, "q=snow&status=open")
+    assert [p["id"] for p in body["polls"]] == [open_id]
+    assert body["polls"][0]["tags"] == ["weather"]
+    body, _ = _search(backend, "q=snow&status=closed")
+    assert [p["id"] for p in body["polls"]] == [closed_id]
+    body, _ = _search(backend, "q=snow&tag=1&public=all")
+    assert [p["id"] for p in body["polls"]] == [open_id]
+
+    body, _ = _search(backend, "q=snow&public=all&page=2&page_size=2")
+    assert len(body["polls"]) == 1
+    assert body["pagination"] == {"page": 2, "page_size": 2, "total": 3, "total_pages": 2}
+
+    assert _search(backend, "q=")[1] == 400
+    assert _search(backend, "q=snow&tag=abc")[1] == 400
+
+
+def test_index_follows_version_bumps(monkeypatch):
+    poll_search = PollSearch()
+    monkeypatch.setattr(search, "poll_search", poll_search)
+    monkeypatch.setattr(versions, "_listeners", [poll_search.on_bump])
+    backend = InMemorySupabase()
+    poll_id = backend.add_poll(title="Goose migration")
+    assert _search(backend, "q=goose")[0]["pagination"]["total"] == 1
+
+    new_id = backend.add_poll(title="Goose census")
+    versions.bump(versions.POLLS)
+    assert _search(backend, "q=goose")[0]["pagination"]["total"] == 2
+
+    backend.tables["polls"][0]["title"] = "Duck migration"
+    versions.bump(versions.POLLS, versions.poll_scope(poll_id))
+    body, _ = _search(backend, "q=goose")
+    assert [p["id"] for p in body["polls"]] == [new_id]
+    assert _search(backend, "q=duck")[0]["pagination"]["total"] == 1
+
+
+def test_new_polls_that_land_out_of_id_order_are_indexed(monkeypatch):
+    poll_search = PollSearch()
+    monkeypatch.setattr(search, "poll_search", poll_search)
+    monkeypatch.setattr(versions, "_listeners", [poll_search.on_bump])
+    backend = InMemorySupabase()
+    backend.add_poll(title="Goose migration")
+    _search(backend, "q=goose")
+
+    # Poll 2 commits only after poll 3 has been read
+    backend.add_poll(title="Goose census")
+    backend.add_poll(title="Goose parade")
+    late = backend.tables["polls"].pop(1)
+    versions.bump(versions.POLLS)
+    assert _search(backend, "q=goose")[0]["pagination"]["total"] == 2
+    backend.tables["polls"].insert(1, late)
+    versions.bump(versions.POLLS)
+    assert _search(backend, "q=census")[0]["pagination"]["total"] == 1
+
+
+def test_searches_use_the_old_index_while_a_rebuild_runs(monkeypatch):
+    poll_search = PollSearch()
+    monkeypatch.setattr(search, "poll_search", poll_search)
+    backend = InMemorySupabase()
+    backend.add_poll(title="Goose migration")
+    _search(backend, "q=goose")
+    backend.add_poll(title="Goose census")
+
+    monkeypatch.setattr(search, "SEARCH_REBUILD_SECONDS", 0)
+    # Another request is rebuilding: this one doesn't wait for it
+    with poll_search._build_lock:
+        assert _search(backend, "q=census")[0]["pagination"]["total"] == 0
+    assert _search(backend, "q=census")[0]["pagination"]["total"] == 1
@@ -0,0 +1,116 @@
+import sys
+import os
+import gzip
+import json
+from datetime import datetime, timezone
+
+import pytest
+from flask import Flask, Response, jsonify
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import polls, serialization, tags
+from api.serialization import FastJSONProvider, compress, dumps, parse_fields, pick
+from sim.backend import InMemorySupabase
+
+app = Flask(__name__)
+app.json = FastJSONProvider(app)
+app.after_request(compress)
+
+ROWS = [{"id": n, "title": f"Poll number {n}", "description": "x" * 40} for n in range(100)]
+
+
+@app.route("/big")
+def big():
+    return jsonify({"polls": ROWS})
+
+
+@app.route("/small")
+def small():
+    return jsonify({"ok": True})
+
+
+@app.route("/stream")
+def stream():
+    return Response((json.dumps(row) + "\n" for row in ROWS), mimetype="application/x-ndjson")
+
+
+def test_values_encode_like_flask():
+    value = {"when": datetime(2025, 1, 2, 3, 4, 5, tzinfo=timezone.utc), 1: "int key", "big": 2 ** 70, "text": "café"}
+    expected = {"when": "Thu, 02 Jan 2025 03:04:05 GMT", "1": "int key", "big": 2 ** 70, "text": "café"}
+    assert json.loads(dumps(value)) == expected
+    with app.test_request_context():
+        assert jsonify(value).get_json() == expected
+
+
+def test_falls_back_without_orjson(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert json.loads(dumps({"a": [1, 2]})) == {"a": [1, 2]}
+    with app.test_request_context(json={"a": 1}):
+        assert app.json.loads('{"b": 2}') == {"b": 2}
+
+
+def test_parse_fields_and_pick():
+    assert parse_fields(None, ("id", "title")) is None
+    assert parse_fields(" title, id,title ,", ("id", "title")) == ["title", "id"]
+    with pytest.raises(ValueError, match="Unknown field: secret"):
+        parse_fields("id,secret", ("id", "title"))
+    assert pick([{"id": 1, "title": "t", "x": 0}], ["title", "id"]) == [{"id": 1, "title": "t"}]
+    assert pick(ROWS, None) is ROWS
+
+
+def test_large_json_is_gzipped_when_accepted():
+    client = app.test_client()
+    res = client.get("/big", headers={"Accept-Encoding": "gzip, deflate"})
+    assert res.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in res.headers["Vary"]
+    assert json.loads(gzip.decompress(res.data)) == {"polls": ROWS}
+    assert int(res.headers["Content-Length"]) == len(res.data)
+
+    assert "Content-Encoding" not in client.get("/big").headers
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    streamed = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in streamed.headers and len(streamed.data.splitlines()) == 100
+
+
+def test_brotli_preferred_when_installed(monkeypatch):
+    class FakeBrotli:
+        @staticmethod
+        def compress(data, quality):
+            return b"br:" + gzip.compress(data)
+
+    monkeypatch.setattr(serialization, "brotli", FakeBrotli)
+    client = app.test_client()
+    assert client.get("/big", headers={"Accept-Encoding": "gzip, br"}).headers["Content-Encoding"] == "br"
+    assert client.get("/big", headers={"Accept-Encoding": "gzip"}).headers["Content-Encoding"] == "gzip"
+
+
+def test_list_polls_sparse_fields(monkeypatch):
+    backend = InMemorySupabase()
+    backend.add_profile(balance=0)
+    for n in range(3):
+        backend.add_poll(title=f"Poll {n}", ends_at="2000-01-01T00:00:00+00:00" if n == 0 else None)
+    monkeypatch.setattr(polls, "get_supabase", lambda: backend)
+    with app.test_request_context("/api/polls?fields=title,has_ended,id&status=open&page_size=7"):
+        res, status = polls.list_polls()
+    assert status == 200
+    body = res.get_json()
+    assert [sorted(p) for p in body["polls"]] == [["has_ended", "id", "title"]] * 2
+
+    with app.test_request_context("/api/polls?fields=title,password"):
+        res, status = polls.list_polls()
+    assert status == 400 and res.get_json()["error"] == "Unknown field: password"
+
+
+def test_list_polls_select_only_needed_columns():
+    assert polls._list_polls_select(["title", "profiles"], tag_join=False) == "id, ends_at, title, profiles!left(username)"
+    assert polls._list_polls_select(["tags"], tag_join=True) == "id, ends_at, poll_tags!inner(tag_id)"
+
+
+def test_get_all_tags_fields(monkeypatch):
+    backend = InMemorySupabase()
+    backend.seed_table("tags", [{"name": "exams"}, {"name": "math"}])
+    monkeypatch.setattr(tags, "get_supabase", lambda: backend)
+    with app.test_request_context("/api/tags/all?fields=name"):
+        res, status = tags.get_all_tags()
+    assert status == 200
+    assert sorted(res.get_json()["tags"], key=lambda t: t["name"]) == [{"name": "exams"}, {"name": "math"}]
@@ -0,0 +1,54 @@
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from sim.agents import Harness, run_simulation
+from sim.backend import InMemorySupabase
+import api.database
+
+
+def _strip_timings(report):
+    return {k: v for k, v in report.items() if k not in ("wall_seconds", "orders_per_second", "latency_ms")}
+
+
+def test_backend_query_subset():
+    backend = InMemorySupabase()
+    user = backend.add_profile(500)
+    poll = backend.add_poll()
+    backend.table("trades").insert({"poll_id": poll, "user_id": user, "outcome": True, "num_shares": 4, "share_price": 210}).execute()
+    backend.table("trades").insert({"poll_id": poll, "user_id": user, "outcome": True, "num_shares": -1, "share_price": 60}).execute()
+
+    votes = backend.table("poll_votes").select("yes_votes, no_votes").eq("poll_id", poll).execute().data
+    assert votes == [{"yes_votes": 3, "no_votes": 0}]
+
+    result = backend.table("trades").select("num_shares", count="exact").eq("user_id", user).order("id", desc=True).range(0, 0).execute()
+    assert result.count == 2
+    assert result.data == [{"num_shares": -1}]
+
+    backend.rpc("increment_balance", {"user_id": user, "amount": 100}).execute()
+    assert backend.table("profiles").select("balance").eq("id", user).single().execute().data == {"balance": 600}
+
+
+def test_single_threaded_runs_are_deterministic():
+    first = run_simulation(num_traders=60, num_markets=3, num_turns=400, seed=7)
+    second = run_simulation(num_traders=60, num_markets=3, num_turns=400, seed=7)
+    assert _strip_timings(first) == _strip_timings(second)
+    assert first["orders"] > 0
+
+
+def test_invariants_hold_and_backend_is_released():
+    report = run_simulation(num_traders=80, num_markets=4, num_turns=600, seed=3)
+    assert all(count == 0 for count in report["invariants"].values())
+    assert set(report["statuses"]) <= {"200", "201", "400"}
+    assert api.database._client_override is None
+
+
+def test_threaded_run_keeps_ledgers_consistent():
+    harness = Harness(num_traders=40, num_markets=2, seed=5)
+    report = harness.run(300, threads=4)
+    invariants = report["invariants"]
+    # Prices may be stale under concurrency, but money and shares must still add up
+    assert invariants["vote_mismatches"] == 0
+    assert invariants["accounting_mismatches"] == 0
+    assert invariants["balance_mismatches"] == 0
+    assert invariants["negative_holdings"] == 0
@@ -0,0 +1,132 @@
+import sys
+import os
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import snapshots
+from api.amm import poll_b0, quote_trade_cents
+from sim.backend import InMemorySupabase
+
+app = Flask(__name__)
+
+START = datetime(2025, 11, 1, tzinfo=timezone.utc)
+
+
+def _backend():
+    backend = InMemorySupabase()
+    holder = backend.add_profile(balance=5_000)
+    resolved_holder = backend.add_profile(balance=2_000)
+    idle = backend.add_profile(balance=100)
+    market = backend.add_poll(title="Open")
+    resolved = backend.add_poll(title="Resolved", outcome=True)
+    backend.seed_table("trades", [
+        {"poll_id": market, "user_id": holder, "outcome": True, "num_shares": 10, "share_price": 500},
+        {"poll_id": market, "user_id": holder, "outcome": False, "num_shares": 4, "share_price": 200},
+        {"poll_id": market, "user_id": resolved_holder, "outcome": True, "num_shares": 3, "share_price": 150},
+        {"poll_id": market, "user_id": resolved_holder, "outcome": True, "num_shares": -3, "share_price": 140},
+        {"poll_id": resolved, "user_id": resolved_holder, "outcome": True, "num_shares": 6, "share_price": 300},
+    ])
+    return backend, (holder, resolved_holder, idle)
+
+
+def _run(backend, runs, batch_size=2):
+    for n in range(runs):
+        report = snapshots.take_snapshots(backend, taken_at=START + timedelta(hours=n), batch_size=batch_size)
+    return report
+
+
+def _curve(monkeypatch, backend, query):
+    monkeypatch.setattr(snapshots, "get_supabase", lambda: backend)
+    with app.test_request_context(f"/api/user/equity?{query}"):
+        res, status = snapshots.get_equity_curve()
+    return res.get_json(), status
+
+
+def test_snapshot_values_every_user_in_batches():
+    backend, (holder, resolved_holder, idle) = _backend()
+    calls = backend.calls
+    report = _run(backend, 1)
+    assert report["users"] == 3 and report["markets"] == 1 and report["complete"]
+    # Opening the run, two batches of users (profiles, holdings, append,
+    # progress), plus the one market read once (polls and poll_votes)
+    assert backend.calls - calls == 2 + 2 * 4 + 2
+
+    yes_value = -quote_trade_cents(10, 4, True, -10, b0=poll_b0(None))["cost_cents"]
+    no_value = -quote_trade_cents(10, 4, False, -4, b0=poll_b0(None))["cost_cents"]
+    rows = {row["user_id"]: row for row in backend.rows("portfolio_snapshots")}
+    assert rows[holder]["cash_cents"] == [5_000]
+    assert rows[holder]["positions_cents"] == [yes_value + no_value]
+    # Sold back to zero, and resolved markets are already paid into the balance
+    assert rows[resolved_holder]["positions_cents"] == [0]
+    assert rows[idle]["taken_at"] == [START.isoformat()]
+
+
+def test_run_out_of_time_is_resumed_by_the_next_invocation():
+    backend, (holder, resolved_holder, idle) = _backend()
+    report = snapshots.take_snapshots(backend, taken_at=START, batch_size=1, time_budget=0)
+    assert report["users"] == 1 and not report["complete"]
+    assert report["last_user_id"] == holder
+    run, = backend.rows("snapshot_runs")
+    assert run["last_user_id"] == holder and run["finished_at"] is None
+
+    # The next invocation keeps the run's taken_at and starts after holder
+    report = snapshots.take_snapshots(backend, taken_at=START + timedelta(hours=1), batch_size=1)
+    assert report["taken_at"] == START.isoformat()
+    assert report["users"] == 2 and report["complete"]
+    run, = backend.rows("snapshot_runs")
+    assert run["users"] == 3 and run["finished_at"] is not None
+    rows = {row["user_id"]: row for row in backend.rows("portfolio_snapshots")}
+    assert all(rows[user_id]["taken_at"] == [START.isoformat()] for user_id in (holder, resolved_holder, idle))
+
+    # With nothing left to resume, a new run starts
+    report = _run(backend, 1)
+    assert report["complete"] and len(backend.rows("snapshot_runs")) == 2
+
+
+def test_series_are_capped(monkeypatch):
+    backend, (holder, _, _) = _backend()
+    monkeypatch.setattr(snapshots, "SNAPSHOT_MAX_POINTS", 3)
+    _run(backend, 5)
+    row = backend.rows("portfolio_snapshots")[0]
+    assert row["taken_at"] == [(START + timedelta(hours=n)).isoformat() for n in (2, 3, 4)]
+    assert len(row["cash_cents"]) == len(row["positions_cents"]) == 3
+
+
+def test_equity_curve(monkeypatch):
+    backend, (holder, _, _) = _backend()
+    _run(backend, 10)
+
+    body, status = _curve(monkeypatch, backend, f"user_id={holder}")
+    assert status == 200 and len(body["taken_at"]) == 10
+    assert body["equity"] == [round(c + p, 2) for c, p in zip(body["cash"], body["positions"])]
+    assert body["cash"][0] == 50.0
+
+    body, _ = _curve(monkeypatch, backend, f"user_id={holder}&points=4")
+    assert body["taken_at"] == [(START + timedelta(hours=n)).isoformat() for n in (0, 3, 6, 9)]
+
+    since = (START + timedelta(hours=7)).isoformat().replace("+00:00", "Z")
+    body, _ = _curve(monkeypatch, backend, f"user_id={holder}&since={since}")
+    assert len(body["taken_at"]) == 3
+
+    new_user = backend.add_profile(balance=0)
+    assert _curve(monkeypatch, backend, f"user_id={new_user}") == (
+        {"user_id": new_user, "taken_at": [], "equity": [], "cash": [], "positions": []}, 200)
+    assert _curve(monkeypatch, backend, "user_id=999")[1] == 404
+    assert _curve(monkeypatch, backend, f"user_id={holder}&since=yesterday")[1] == 400
+
+
+def test_cron_requires_the_secret(monkeypatch):
+    backend, _ = _backend()
+    monkeypatch.setattr(snapshots, "get_supabase", lambda: backend)
+    monkeypatch.delenv(snapshots.CRON_SECRET_ENV, raising=False)
+    with app.test_request_context("/api/cron/snapshots"):
+        assert snapshots.run_snapshots()[1] == 503
+
+    monkeypatch.setenv(snapshots.CRON_SECRET_ENV, "s3cret")
+    with app.test_request_context("/api/cron/snapshots", headers={"Authorization": "Bearer wrong"}):
+        assert snapshots.run_snapshots()[1] == 401
+    with app.test_request_context("/api/cron/snapshots", headers={"Authorization": "Bearer s3cret"}):
+        res, status = snapshots.run_snapshots()
+    assert status == 200 and res.get_json()["users"] == 3
@@ -0,0 +1,118 @@
+import sys
+import os
+from datetime import datetime, timezone, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import events
+from api.events import append_trade
+from api.stats import HyperLogLog, DistinctCounter, HourlyRing, StatsProjection
+from sim.backend import InMemorySupabase
+
+
+def test_hyperloglog_estimate_is_close():
+    sketch = HyperLogLog()
+    for user_id in range(50_000):
+        sketch.add(user_id)
+    assert abs(len(sketch) - 50_000) / 50_000 < 0.1
+    assert len(sketch.registers) == 1024
+
+
+def test_distinct_counter_is_exact_while_small():
+    counter = DistinctCounter(exact_limit=100)
+    for user_id in [1, 2, 2, 3, 1]:
+        counter.add(user_id)
+    assert len(counter) == 3
+    for user_id in range(500):
+        counter.add(user_id)
+    assert isinstance(counter._items, HyperLogLog)
+    assert abs(len(counter) - 500) < 50
+
+
+def test_hourly_ring_rolls_over():
+    ring = HourlyRing(hours=24)
+    ring.add(100, 50)
+    ring.add(110, 20)
+    ring.add(123, 5)
+    assert ring.total(123) == 75
+    assert ring.total(124) == 25   # hour 100 has left the window
+    ring.add(124, 7)               # reuses hour 100's slot
+    assert ring.total(124) == 32
+    ring.add(99, 1000)             # too old to count
+    assert ring.total(124) == 32
+
+
+def _seed(backend, poll_id, trades):
+    for user_id, cents, hours_ago in trades:
+        created_at = (datetime.now(timezone.utc) - timedelta(hours=hours_ago)).isoformat()
+        backend.seed_table("market_events", [{
+            "type": "trade", "poll_id": poll_id, "user_id": user_id, "outcome": True,
+            "num_shares": 1 if cents > 0 else -1, "cash_cents": cents, "created_at": created_at,
+        }])
+
+
+def test_projection_replays_the_journal():
+    backend = InMemorySupabase()
+    _seed(backend, 1, [(7, 500, 30), (8, 200, 2), (7, -120, 1)])
+    _seed(backend, 2, [(9, 90, 0)])
+    backend.seed_table("market_events", [{"type": "settlement", "poll_id": 2, "outcome": True,
+                                          "payout_cents": 100, "refund_cents": 0}])
+
+    stats = StatsProjection().get(backend, [1, 2, 3])
+    assert stats[1] == {"num_traders": 2, "volume": 820, "24h_volume": 320}
+    assert stats[2] == {"num_traders": 1, "volume": 90, "24h_volume": 90}
+    assert stats[3] == {"num_traders": 0, "volume": 0, "24h_volume": 0}
+
+
+def test_own_trades_apply_without_a_query(monkeypatch):
+    monkeypatch.setattr(events, "_listeners", [])
+    backend = InMemorySupabase()
+    projection = StatsProjection(refresh_seconds=60)
+    events.on_event(projection.on_event)
+    projection.refresh(backend, force=True)
+
+    append_trade(backend, 1, 4, True, 3, 160, 55, 45)
+    append_trade(backend, 1, 5, False, 2, 90, 53, 47)
+
+    calls = backend.calls
+    assert projection.get(backend, [1])[1] == {"num_traders": 2, "volume": 250, "24h_volume": 250}
+    assert backend.calls == calls
+
+
+def test_other_workers_trades_are_picked_up():
+    backend = InMemorySupabase()
+    projection = StatsProjection(refresh_seconds=60)
+    projection.refresh(backend, force=True)
+
+    _seed(backend, 1, [(4, 100, 0)])
+    # Out-of-sequence event: this process didn't journal seq 1, so it forces a refresh
+    projection.on_event({"seq": 2, "type": "trade", "poll_id": 1, "user_id": 5, "cash_cents": 10})
+    _seed(backend, 1, [(5, 10, 0)])
+    assert projection.get(backend, [1])[1]["volume"] == 110
+
+
+def test_new_process_starts_from_the_snapshot(monkeypatch):
+    monkeypatch.setattr(events, "SNAPSHOT_MIN_EVENTS", 3)
+    backend = InMemorySupabase()
+    _seed(backend, 1, [(7, 500, 30), (8, 200, 2), (7, -120, 1)])
+    _seed(backend, 2, [(9, 90, 0)])
+    first = StatsProjection()
+    expected = first.get(backend, [1, 2])
+    assert [row["seq"] for row in backend.rows("projection_snapshots")] == [4]
+
+    _seed(backend, 2, [(10, 40, 0)])
+    second = StatsProjection()
+    read = []
+    monkeypatch.setattr(events, "read_events", lambda *args, **kwargs: read.append(kwargs["after_seq"]) or [])
+    second.refresh(backend)
+    # Only the events after the snapshot are read
+    assert read == [4]
+    assert second.get(backend, [1, 2]) == expected
+
+
+def test_snapshot_keeps_approximate_counters():
+    counter = DistinctCounter(exact_limit=10)
+    for user_id in range(200):
+        counter.add(user_id)
+    restored = DistinctCounter.from_state(counter.to_state())
+    assert restored._items.registers == counter._items.registers
+    assert DistinctCounter.from_state(DistinctCounter().to_state())._items == set()
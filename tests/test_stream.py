@@ -0,0 +1,173 @@
+import json
+import sys
+import os
+
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import stream
+from api.database import override_supabase
+from api.stream import PriceBroker, publish_trade, publish_resolution, stream_prices
+from api.trade import buy_shares
+from sim.backend import InMemorySupabase
+
+app = Flask(__name__)
+
+
+def _quote(price_yes):
+    return {"price_yes_after": price_yes, "price_no_after": 100 - price_yes, "q_yes_after": 3, "q_no_after": 1}
+
+
+def _events(chunks):
+    events = []
+    for chunk in chunks:
+        if chunk.startswith(":"):
+            continue
+        data = [line for line in chunk.splitlines() if line.startswith("data: ")][0]
+        events.append(json.loads(data[len("data: "):]))
+    return events
+
+
+def test_publish_without_subscribers_is_a_no_op():
+    broker = PriceBroker()
+    assert broker.publish(1, {"type": "price", "trades": 1}) == 0
+    assert broker.latest(1) is None
+
+
+def test_burst_is_coalesced_into_one_event():
+    broker = PriceBroker()
+    subscription = broker.subscribe(1)
+    for price in (51, 55, 60):
+        broker.publish(1, {"type": "price", "price_yes": price, "trades": 1, "volume_shares": 2, "volume_cents": 100})
+
+    event = subscription.get(timeout=0)
+    assert event["price_yes"] == 60
+    assert event["trades"] == 3
+    assert event["volume_shares"] == 6
+    assert event["volume_cents"] == 300
+    assert subscription.get(timeout=0) is None
+
+
+def test_resolution_survives_later_events():
+    broker = PriceBroker()
+    subscription = broker.subscribe(1)
+    broker.publish(1, {"type": "resolved", "outcome": True})
+    broker.publish(1, {"type": "price", "outcome": None, "trades": 1})
+    event = subscription.get(timeout=0)
+    assert event["type"] == "resolved"
+    assert event["outcome"] is True
+
+
+def test_latest_is_dropped_when_last_viewer_leaves():
+    broker = PriceBroker()
+    subscription = broker.subscribe(1)
+    broker.publish(1, {"type": "price", "price_yes": 70})
+    assert broker.latest(1)["price_yes"] == 70
+    broker.unsubscribe(subscription)
+    assert broker.latest(1) is None
+    assert broker.subscriber_count(1) == 0
+
+
+def test_cached_snapshot_expires(monkeypatch):
+    broker = PriceBroker()
+    broker.subscribe(1)
+    broker.publish(1, {"type": "price", "price_yes": 70})
+    assert broker.latest(1, max_age=5)["price_yes"] == 70
+
+    later = stream.time.monotonic() + 10
+    monkeypatch.setattr(stream.time, "monotonic", lambda: later)
+    assert broker.latest(1, max_age=5) is None
+
+
+def test_new_viewer_reads_trades_made_elsewhere(monkeypatch):
+    monkeypatch.setattr(stream, "broker", PriceBroker())
+    backend = InMemorySupabase()
+    poll_id = backend.add_poll()
+    stream.broker.subscribe(poll_id)
+    stream.broker.remember(poll_id, {"type": "snapshot", "poll_id": poll_id, "price_yes": 50, "q_yes": 0, "outcome": None})
+    # Another worker's trade, which this process never saw
+    backend.seed_table("poll_votes", [{"poll_id": poll_id, "yes_votes": 8, "no_votes": 0}])
+    later = stream.time.monotonic() + stream.STREAM_SNAPSHOT_TTL_SECONDS + 1
+    monkeypatch.setattr(stream.time, "monotonic", lambda: later)
+    override_supabase(backend)
+    try:
+        with app.test_request_context():
+            response, status = stream_prices(poll_id)
+        first = _events([next(response.response)])[0]
+        response.close()
+    finally:
+        override_supabase(None)
+
+    assert status == 200
+    assert first["q_yes"] == 8
+    assert first["price_yes"] > 50
+
+
+def test_viewer_that_leaves_before_reading_is_unsubscribed(monkeypatch):
+    monkeypatch.setattr(stream, "broker", PriceBroker())
+    backend = InMemorySupabase()
+    poll_id = backend.add_poll()
+    override_supabase(backend)
+    try:
+        with app.test_request_context():
+            response, status = stream_prices(poll_id)
+    finally:
+        override_supabase(None)
+
+    assert status == 200
+    assert stream.broker.subscriber_count(poll_id) == 1
+    # The generator never started; the server still closes the response
+    response.close()
+    assert stream.broker.subscriber_count(poll_id) == 0
+
+
+def test_stream_delivers_snapshot_trades_and_resolution(monkeypatch):
+    monkeypatch.setattr(stream, "broker", PriceBroker())
+    monkeypatch.setattr(stream, "STREAM_MIN_INTERVAL_SECONDS", 0)
+    backend = InMemorySupabase()
+    poll_id = backend.add_poll()
+    override_supabase(backend)
+    try:
+        with app.test_request_context():
+            response, status = stream_prices(poll_id)
+        assert status == 200
+        assert response.mimetype == "text/event-stream"
+
+        body = response.response
+        first = _events([next(body)])[0]
+        assert first["type"] == "snapshot"
+        assert (first["price_yes"], first["price_no"]) == (50, 50)
+
+        publish_trade(poll_id, True, 4, 230, _quote(58))
+        publish_trade(poll_id, True, 1, 60, _quote(60))
+        publish_resolution(poll_id, True)
+        events = _events(list(body))
+        response.close()
+    finally:
+        override_supabase(None)
+
+    assert events[-1]["type"] == "resolved"
+    assert events[-1]["trades"] == 2
+    assert events[-1]["volume_shares"] == 5
+    assert stream.broker.subscriber_count(poll_id) == 0
+
+
+def test_buy_publishes_to_viewers(monkeypatch):
+    monkeypatch.setattr(stream, "broker", PriceBroker())
+    backend = InMemorySupabase()
+    poll_id = backend.add_poll()
+    user_id = backend.add_profile(balance=10_000)
+    subscription = stream.broker.subscribe(poll_id)
+    override_supabase(backend)
+    try:
+        with app.test_request_context(json={"poll_id": poll_id, "user_id": user_id, "outcome": "YES", "num_shares": 5}):
+            response, status = buy_shares()
+    finally:
+        override_supabase(None)
+
+    assert status == 201
+    event = subscription.get(timeout=0)
+    assert event["type"] == "price"
+    assert event["price_yes"] == response.get_json()["price_after"]["yes"]
+    assert event["q_yes"] == 5
+    assert event["volume_cents"] == int(round(response.get_json()["cost"] * 100))
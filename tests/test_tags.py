@@ -205,3 +205,161 @@ def test_get_tag_by_id_success(monkeypatch):
     body = resp[0].get_json()
     assert body["message"] == "Successfully retrieved tag"
     assert body["tag"]["id"] == 10
+
+
+# Tag registry
+
+import api.tags as api_tags
+from api.tags import TagTrie, TagRegistry, upsert_tags, sync_poll_tags
+from api.database import override_supabase
+from sim.backend import InMemorySupabase
+
+
+def test_trie_completes_prefixes_case_insensitively():
+    trie = TagTrie()
+    for tag_id, name in enumerate(["Hockey", "hockey-night", "Housing", "math"], start=1):
+        trie.insert(name, tag_id)
+    assert trie.complete("ho") == {1, 2, 3}
+    assert trie.complete("HOC") == {1, 2}
+    assert trie.complete("x") == set()
+
+    trie.remove("hockey-night", 2)
+    assert trie.complete("hock") == {1}
+    trie.remove("Hockey", 1)
+    assert trie.complete("h") == {3}
+    assert "c" not in trie._root.children["h"].children["o"].children
+
+
+def _tagged_backend():
+    backend = InMemorySupabase()
+    backend.seed_table("tags", [{"name": "hockey"}, {"name": "housing"}, {"name": "math"}])
+    backend.seed_table("poll_tags", [
+        {"poll_id": 1, "tag_id": 1}, {"poll_id": 2, "tag_id": 1}, {"poll_id": 2, "tag_id": 2},
+    ])
+    return backend
+
+
+def test_registry_loads_counts_and_completes():
+    registry = TagRegistry()
+    registry.sync(_tagged_backend())
+
+    assert registry.lookup(" hockey ") == 1
+    # Names are unique case-sensitively in the tags table, so lookups are too
+    assert registry.lookup("Hockey") is None
+    assert registry.lookup("chess") is None
+    assert [t["name"] for t in registry.complete("h")] == ["hockey", "housing"]
+    assert registry.complete("h", limit=1) == [{"id": 1, "name": "hockey", "polls": 2}]
+    assert registry.poll_ids(1) == {1, 2}
+    assert registry.tag_names(2) == ["hockey", "housing"]
+    assert [t["polls"] for t in registry.all()] == [2, 1, 0]
+
+    registry.unlink(2, {1})
+    assert registry.poll_ids(1) == {1}
+
+
+def test_registry_picks_up_new_rows_incrementally(monkeypatch):
+    backend = _tagged_backend()
+    registry = TagRegistry()
+    registry.sync(backend)
+    backend.seed_table("tags", [{"name": "chess"}])
+    backend.seed_table("poll_tags", [{"poll_id": 3, "tag_id": 4}])
+
+    registry.sync(backend)
+    assert registry.lookup("chess") is None  # within the refresh interval
+
+    monkeypatch.setattr(api_tags, "TAG_REGISTRY_REFRESH_SECONDS", 0)
+    calls = backend.calls
+    registry.sync(backend)
+    assert registry.lookup("chess") == 4
+    assert registry.poll_ids(4) == {3}
+    assert backend.calls - calls == 2
+
+
+def test_registry_reads_rows_that_land_out_of_id_order(monkeypatch):
+    monkeypatch.setattr(api_tags, "TAG_REGISTRY_REFRESH_SECONDS", 0)
+    backend = _tagged_backend()
+    registry = TagRegistry()
+    registry.sync(backend)
+
+    # Another worker creates chess (4) while this one creates go (5)
+    backend.seed_table("tags", [{"name": "chess"}, {"name": "go"}])
+    registry.register([backend.rows("tags")[-1]])
+    registry.sync(backend)
+    assert registry.lookup("chess") == 4
+
+    # poker (6) commits only after bridge (7) has been read
+    backend.seed_table("tags", [{"name": "poker"}, {"name": "bridge"}])
+    poker = backend.tables["tags"].pop(-2)
+    registry.sync(backend)
+    assert registry.lookup("bridge") == 7
+    backend.tables["tags"].append(poker)
+    registry.sync(backend)
+    assert registry.lookup("poker") == 6
+
+
+def test_upsert_tags_keeps_names_case_sensitive():
+    backend = _tagged_backend()
+    api_tags.registry.invalidate()
+    ids = upsert_tags(backend, ["Hockey", "hockey"])
+    assert ids == {"Hockey": 4, "hockey": 1}
+    assert [row["name"] for row in backend.rows("tags")][-1] == "Hockey"
+
+
+def test_registry_does_not_reload_for_each_client():
+    # get_supabase() returns a new client per request
+    backend = _tagged_backend()
+    registry = TagRegistry()
+    registry.sync(backend)
+
+    other_client = _tagged_backend()
+    registry.sync(other_client)
+    assert other_client.calls == 0
+    assert registry.lookup("math") == 3
+
+    registry.invalidate()
+    registry.sync(other_client)
+    assert other_client.calls == 2
+
+
+def test_registry_reloads_when_the_data_source_is_overridden():
+    registry = TagRegistry()
+    registry.sync(_tagged_backend())
+
+    backend = InMemorySupabase()
+    backend.seed_table("tags", [{"name": "chess"}])
+    override_supabase(backend)
+    try:
+        registry.sync(backend)
+    finally:
+        override_supabase(None)
+    assert registry.lookup("hockey") is None
+    assert registry.lookup("chess") == 1
+
+
+def test_upsert_tags_creates_missing_tags_in_one_call():
+    backend = _tagged_backend()
+    api_tags.registry.invalidate()
+    assert upsert_tags(backend, ["math"]) == {"math": 3}
+
+    calls = backend.calls
+    ids = upsert_tags(backend, ["hockey", "chess", "go", "chess"])
+    assert backend.calls - calls == 1
+    assert ids == {"hockey": 1, "chess": 4, "go": 5}
+    assert sorted(row["name"] for row in backend.rows("tags")) == ["chess", "go", "hockey", "housing", "math"]
+
+
+def test_sync_poll_tags_diffs_in_constant_round_trips():
+    backend = _tagged_backend()
+    api_tags.registry.invalidate()
+    upsert_tags(backend, [])  # load the registry
+
+    calls = backend.calls
+    added, removed = sync_poll_tags(backend, 2, ["math", "chess", "go", "hockey"])
+    assert backend.calls - calls == 4
+    assert added == {3, 4, 5} and removed == {2}
+    assert sorted(r["tag_id"] for r in backend.rows("poll_tags") if r["poll_id"] == 2) == [1, 3, 4, 5]
+    assert api_tags.registry.tag_names(2) == ["hockey", "math", "chess", "go"]
+
+    calls = backend.calls
+    assert sync_poll_tags(backend, 2, ["hockey", "math", "chess", "go"]) == (set(), set())
+    assert backend.calls - calls == 1
@@ -147,3 +147,34 @@ def test_sell_more_than_owned_fails(client, trade_env):
     assert response.status_code == 400
     assert "sell more shares" in response.get_json()["error"].lower()
     trade_env["trades_table"].insert.assert_not_called()
+
+
+def test_trade_succeeds_when_follow_up_work_fails(monkeypatch):
+    from api import amm, database, trade, versions
+    from sim.backend import InMemorySupabase
+
+    backend = InMemorySupabase()
+    user_id = backend.add_profile(balance=10_000)
+    poll_id = backend.add_poll()
+    database.override_supabase(backend)
+    monkeypatch.setattr(amm, "supabase", backend)
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("journal unavailable")
+
+    monkeypatch.setattr(trade, "append_trade", broken)
+    version = versions.current([versions.user_scope(user_id)])[0]
+    try:
+        payload = {"poll_id": poll_id, "user_id": user_id, "outcome": "YES", "num_shares": 5}
+        with app.test_request_context("/api/trades/buy", method="POST", json=payload):
+            response, status = trade.buy_shares()
+    finally:
+        database.override_supabase(None)
+
+    # The trade went through, so it is reported as such
+    assert status == 201
+    assert response.get_json()["new_balance"] < 10_000
+    assert len(backend.rows("trades")) == 1
+    # The other steps still ran, before and after the failing one
+    assert backend.rows("market_accounting")[0]["yes_shares"] == 5
+    assert versions.current([versions.user_scope(user_id)])[0] != version
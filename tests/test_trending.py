@@ -0,0 +1,199 @@
+import json
+import sys
+import threading
+import os
+from datetime import datetime, timezone, timedelta
+
+from flask import Flask
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import trending, versions
+from api.database import override_supabase
+from api.trending import TrendingProjection, TRENDING_HALF_LIFE_SECONDS, get_trending
+from sim.backend import InMemorySupabase
+
+app = Flask(__name__)
+
+
+def _trade(backend, poll_id, user_id, cents, price_yes, hours_ago=0):
+    created_at = (datetime.now(timezone.utc) - timedelta(hours=hours_ago)).isoformat()
+    backend.seed_table("market_events", [{
+        "type": "trade", "poll_id": poll_id, "user_id": user_id, "outcome": True,
+        "num_shares": 1, "cash_cents": cents, "price_yes": price_yes, "price_no": 100 - price_yes,
+        "created_at": created_at,
+    }])
+
+
+def _ids(entries):
+    return [row["id"] for row, _ in entries]
+
+
+def test_ranks_by_activity_and_hides_unlisted_polls():
+    backend = InMemorySupabase()
+    quiet = backend.add_poll()
+    busy = backend.add_poll()
+    private = backend.add_poll(public=False)
+    ended = backend.add_poll(ends_at=(datetime.now(timezone.utc) - timedelta(hours=1)).isoformat())
+    backend.add_poll()  # never traded
+
+    _trade(backend, quiet, 1, 100, 51)
+    for user_id in (2, 3, 4):
+        _trade(backend, busy, user_id, 300, 55)
+    _trade(backend, private, 1, 10_000, 90)
+    _trade(backend, ended, 1, 10_000, 90)
+
+    entries, total = TrendingProjection().page(backend, 1, 20)
+    assert _ids(entries) == [busy, quiet]
+    assert total == 2
+    assert entries[0][1] > entries[1][1] > 0
+
+
+def test_old_activity_decays():
+    backend = InMemorySupabase()
+    stale = backend.add_poll()
+    fresh = backend.add_poll()
+    _trade(backend, stale, 1, 2_000, 50, hours_ago=48)
+    _trade(backend, fresh, 2, 500, 50)
+
+    entries, _ = TrendingProjection().page(backend, 1, 20)
+    assert _ids(entries) == [fresh, stale]
+    # 48h is eight half-lives
+    assert abs(entries[1][1] - (20 + 5) / 2 ** 8) < 0.01
+
+
+def test_restored_snapshot_ranks_the_same():
+    backend = InMemorySupabase()
+    polls = [backend.add_poll() for _ in range(3)]
+    for n, poll_id in enumerate(polls):
+        for user_id in range(n + 1):
+            _trade(backend, poll_id, user_id, 100 * (n + 1), 50 + n, hours_ago=n)
+    projection = TrendingProjection()
+    projection.refresh(backend)
+
+    restored = TrendingProjection()
+    restored.restore(json.loads(json.dumps(projection.snapshot())))
+    restored._consumer.seq = projection._consumer.seq
+    # The last trader and price are remembered: a repeat trade by the same
+    # user at the same price adds only its volume in both
+    now = datetime.now(timezone.utc).isoformat()
+    for p in (projection, restored):
+        p.on_event({"seq": p._consumer.seq + 1, "type": "trade", "poll_id": polls[0], "user_id": 0,
+                    "cash_cents": 100, "price_yes": 50, "created_at": now})
+    assert restored._keys == projection._keys
+    assert restored._ranking == projection._ranking
+
+
+def test_settled_polls_leave_the_feed():
+    backend = InMemorySupabase()
+    poll_id = backend.add_poll()
+    _trade(backend, poll_id, 1, 100, 52)
+    projection = TrendingProjection(refresh_seconds=0)
+    assert _ids(projection.page(backend, 1, 20)[0]) == [poll_id]
+
+    backend.seed_table("market_events", [{"type": "settlement", "poll_id": poll_id, "outcome": True}])
+    assert projection.page(backend, 1, 20) == ([], 0)
+
+
+def test_rescaling_keeps_the_order():
+    projection = TrendingProjection()
+    start = datetime.now(timezone.utc) - timedelta(days=400)
+    for day, poll_id in ((0, 1), (399, 2), (399, 3), (399, 3)):
+        created_at = (start + timedelta(days=day)).isoformat()
+        projection.apply({"type": "trade", "poll_id": poll_id, "user_id": day,
+                          "cash_cents": 100, "price_yes": 50, "created_at": created_at})
+    assert projection._landmark > start.timestamp() + TRENDING_HALF_LIFE_SECONDS
+    assert [poll_id for _, poll_id in projection._ranking] == [3, 2, 1]
+
+
+def test_poll_edits_drop_cached_rows():
+    backend = InMemorySupabase()
+    poll_id = backend.add_poll()
+    _trade(backend, poll_id, 1, 100, 52)
+    projection = TrendingProjection(refresh_seconds=60)
+    assert projection.page(backend, 1, 20)[1] == 1
+
+    backend.tables["polls"][0]["public"] = False
+    projection.forget_polls([versions.POLLS, versions.poll_scope(poll_id)])
+    assert projection.page(backend, 1, 20)[1] == 0
+
+
+def test_old_sightings_are_pruned():
+    projection = TrendingProjection()
+    start = datetime.now(timezone.utc) - timedelta(days=3)
+    for user_id in range(50):
+        projection.apply({"type": "trade", "poll_id": 1, "user_id": user_id,
+                          "cash_cents": 100, "price_yes": 50, "created_at": start.isoformat()})
+    later = start + timedelta(seconds=2 * TRENDING_HALF_LIFE_SECONDS)
+    projection.apply({"type": "trade", "poll_id": 2, "user_id": 1,
+                      "cash_cents": 100, "price_yes": 50, "created_at": later.isoformat()})
+    assert list(projection._last_seen) == [2]
+
+
+def test_rows_load_without_holding_the_lock():
+    backend = InMemorySupabase()
+    poll_id = backend.add_poll()
+    _trade(backend, poll_id, 1, 100, 52)
+    projection = TrendingProjection(refresh_seconds=60)
+    projection.refresh(backend)
+
+    acquired = []
+    query = backend.table
+
+    def table(name):
+        if name == "polls":
+            # A trade on another thread needs the lock while the rows are fetched
+            def apply():
+                if projection._lock.acquire(timeout=1):
+                    acquired.append(True)
+                    projection._lock.release()
+            thread = threading.Thread(target=apply)
+            thread.start()
+            thread.join()
+        return query(name)
+
+    backend.table = table
+    entries, total = projection.page(backend, 1, 20)
+    assert acquired == [True]
+    assert _ids(entries) == [poll_id] and total == 1
+
+
+def test_page_loads_rows_only_until_it_is_filled(monkeypatch):
+    backend = InMemorySupabase()
+    poll_ids = [backend.add_poll() for _ in range(10)]
+    backend.tables["polls"][-1]["public"] = False
+    for rank, poll_id in enumerate(poll_ids):
+        _trade(backend, poll_id, rank, 100 * (rank + 1), 50)
+    monkeypatch.setattr(trending, "_FETCH_CHUNK", 3)
+    projection = TrendingProjection(refresh_seconds=60)
+
+    entries, total = projection.page(backend, 1, 2)
+    assert _ids(entries) == [poll_ids[8], poll_ids[7]]
+    # One chunk of rows, 2 of its 3 polls listed: 2 + 7 * 2 / 3 estimated
+    assert len(projection._rows) == 3 and total == 7
+
+    # The last page walks the whole ranking, so its total is exact
+    entries, total = projection.page(backend, 5, 2)
+    assert _ids(entries) == [poll_ids[0]] and total == 9
+    assert len(projection._rows) == 10
+
+
+def test_endpoint_paginates(monkeypatch):
+    backend = InMemorySupabase()
+    poll_ids = [backend.add_poll() for _ in range(5)]
+    for rank, poll_id in enumerate(poll_ids):
+        _trade(backend, poll_id, rank, 100 * (rank + 1), 50)
+    monkeypatch.setattr(trending, "projection", TrendingProjection())
+
+    override_supabase(backend)
+    try:
+        with app.test_request_context("/api/polls/trending?page=2&page_size=2"):
+            response, status = get_trending()
+    finally:
+        override_supabase(None)
+
+    body = response.get_json()
+    assert status == 200
+    assert [p["id"] for p in body["polls"]] == [poll_ids[2], poll_ids[1]]
+    assert body["pagination"] == {"page": 2, "page_size": 2, "total": 5, "total_pages": 3}
+    assert body["polls"][0]["tags"] == []
+    assert "poll_tags" not in body["polls"][0]
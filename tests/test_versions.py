@@ -0,0 +1,119 @@
+import sys
+import os
+import time
+
+from flask import Flask, jsonify
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+from api import versions
+from api.versions import conditional, bump, poll_scope, market_scope
+
+app = Flask(__name__)
+calls = []
+
+
+@app.route("/price/<poll_id>")
+@conditional(lambda poll_id: [poll_scope(poll_id), market_scope(poll_id)], max_age=5)
+def price(poll_id):
+    calls.append(poll_id)
+    return jsonify({"poll_id": poll_id}), 200
+
+
+@app.route("/public/<poll_id>")
+@conditional(lambda poll_id: [poll_scope(poll_id)], max_age=60, public=True)
+def public_price(poll_id):
+    return jsonify({"poll_id": poll_id}), 200
+
+
+@app.route("/board")
+@conditional(lambda: [versions.BALANCES], per_user=True)
+def board():
+    return jsonify({}), 200
+
+
+@app.route("/missing/<poll_id>")
+@conditional(lambda poll_id: [poll_scope(poll_id)])
+def missing(poll_id):
+    return jsonify({"error": "Poll not found"}), 404
+
+
+def test_unchanged_data_is_not_recomputed():
+    client = app.test_client()
+    first = client.get("/price/1")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "private, max-age=5"
+    etag = first.headers["ETag"]
+
+    calls.clear()
+    second = client.get("/price/1", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["ETag"] == etag
+    assert calls == []
+
+
+def test_only_public_responses_go_to_shared_caches():
+    client = app.test_client()
+    assert client.get("/public/1").headers["Cache-Control"] == "public, max-age=60"
+    assert client.get("/price/1").headers["Cache-Control"].startswith("private")
+
+
+def test_bump_invalidates_only_its_poll():
+    client = app.test_client()
+    etag_1 = client.get("/price/1").headers["ETag"]
+    etag_2 = client.get("/price/2").headers["ETag"]
+
+    bump(market_scope(1))
+    assert client.get("/price/1", headers={"If-None-Match": etag_1}).status_code == 200
+    assert client.get("/price/2", headers={"If-None-Match": etag_2}).status_code == 304
+
+
+def test_epoch_rollover_expires_validators(monkeypatch):
+    client = app.test_client()
+    etag = client.get("/price/3").headers["ETag"]
+    now = time.time()
+    monkeypatch.setattr(versions.time, "time", lambda: now + versions.VERSION_TTL_SECONDS)
+    assert client.get("/price/3", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_if_modified_since(monkeypatch):
+    client = app.test_client()
+    bump(poll_scope(4))
+    now = time.time()
+    # Once the second of the last write is over, Last-Modified is advertised
+    monkeypatch.setattr(versions.time, "time", lambda: now + 1)
+    last_modified = client.get("/price/4").headers["Last-Modified"]
+    assert client.get("/price/4", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    monkeypatch.setattr(versions.time, "time", lambda: now + 2)
+    bump(market_scope(4))
+    assert client.get("/price/4", headers={"If-Modified-Since": last_modified}).status_code == 200
+
+
+def test_per_user_validators_depend_on_session():
+    client = app.test_client()
+    client.set_cookie("sb-access-token", "alice")
+    alice = client.get("/board")
+    assert alice.headers["Cache-Control"] == "private, no-cache"
+
+    client.set_cookie("sb-access-token", "bob")
+    assert client.get("/board", headers={"If-None-Match": alice.headers["ETag"]}).status_code == 200
+
+
+def test_per_user_routes_ignore_if_modified_since(monkeypatch):
+    client = app.test_client()
+    later = time.time() + 60
+    monkeypatch.setattr(versions.time, "time", lambda: later)
+    client.set_cookie("sb-access-token", "alice")
+    alice = client.get("/board")
+    assert "Last-Modified" not in alice.headers
+
+    # Another session's date must not validate; only the ETag can
+    client.set_cookie("sb-access-token", "bob")
+    since = "Fri, 01 Jan 2100 00:00:00 GMT"
+    assert client.get("/board", headers={"If-Modified-Since": since}).status_code == 200
+
+
+def test_errors_carry_no_validators():
+    response = app.test_client().get("/missing/5")
+    assert response.status_code == 404
+    assert "ETag" not in response.headers